@@ -39,6 +39,14 @@ class Settings(BaseSettings):
     # URLs auxiliares
     webhook_secret: Optional[str] = Field(default=None, alias="WHATSAPP_WEBHOOK_SECRET")
 
+    # Backends locais (testes de carga offline, ver app/services/backends_locais)
+    backend_local: bool = Field(default=False, alias="GPS_BACKEND_LOCAL")
+    backend_local_dir: Optional[str] = Field(default=None, alias="GPS_BACKEND_LOCAL_DIR")
+    backend_local_supabase_p50_ms: float = Field(default=15.0, alias="GPS_BACKEND_LOCAL_SUPABASE_P50_MS")
+    backend_local_supabase_p99_ms: float = Field(default=60.0, alias="GPS_BACKEND_LOCAL_SUPABASE_P99_MS")
+    backend_local_twilio_p50_ms: float = Field(default=250.0, alias="GPS_BACKEND_LOCAL_TWILIO_P50_MS")
+    backend_local_twilio_p99_ms: float = Field(default=800.0, alias="GPS_BACKEND_LOCAL_TWILIO_P99_MS")
+
     @field_validator("twilio_whatsapp_number")
     @classmethod
     def validar_numero_whatsapp(cls, value: Optional[str]) -> Optional[str]:
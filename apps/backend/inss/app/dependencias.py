@@ -0,0 +1,66 @@
+"""
+Serviços com estado da aplicação e dependências FastAPI para injetá-los nas rotas.
+
+O lifespan cria um ServicosApp por aplicação (pool HTTP do Supabase aberto no
+event loop do servidor), guarda em app.state.servicos e fecha o pool no
+shutdown. As rotas recebem os serviços por Depends, sem instâncias de módulo
+nem um serviço novo por requisição:
+
+    async def rota(supabase: SupabaseService = Depends(obter_supabase_service)):
+        ...
+
+Sem lifespan (ex.: ASGITransport em testes e benchmarks), o primeiro acesso
+cria os serviços sobre a instância do processo (get_supabase_service).
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import FastAPI, Request
+
+from .services.estatisticas_service import EstatisticasService
+from .services.gps_hybrid_service import GPSHybridService
+from .services.supabase_service import SupabaseService, get_supabase_service
+from .services.whatsapp_service import WhatsAppService
+
+
+class ServicosApp:
+    """Serviços compartilhados pelas requisições de uma instância da aplicação."""
+
+    def __init__(self, supabase_service: Optional[SupabaseService] = None) -> None:
+        self.supabase = supabase_service or SupabaseService()
+        self.gps_hybrid = GPSHybridService(self.supabase)
+        self.estatisticas = EstatisticasService(self.supabase)
+        self.whatsapp = WhatsAppService(supabase_service=self.supabase)
+
+    async def iniciar(self) -> None:
+        """Abre o pool de conexões do Supabase no event loop atual."""
+        await self.supabase.iniciar()
+
+    async def encerrar(self) -> None:
+        """Fecha o pool de conexões do Supabase."""
+        await self.supabase.encerrar()
+
+
+def obter_servicos(app: FastAPI) -> ServicosApp:
+    """Serviços da aplicação (criados no lifespan ou, sem ele, no primeiro acesso)."""
+    servicos = getattr(app.state, "servicos", None)
+    if servicos is None:
+        servicos = app.state.servicos = ServicosApp(get_supabase_service())
+    return servicos
+
+
+def obter_supabase_service(request: Request) -> SupabaseService:
+    return obter_servicos(request.app).supabase
+
+
+def obter_gps_hybrid_service(request: Request) -> GPSHybridService:
+    return obter_servicos(request.app).gps_hybrid
+
+
+def obter_estatisticas_service(request: Request) -> EstatisticasService:
+    return obter_servicos(request.app).estatisticas
+
+
+def obter_whatsapp_service(request: Request) -> WhatsAppService:
+    return obter_servicos(request.app).whatsapp
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import sys
+import asyncio
 import traceback
 import logging
 import time
@@ -8,24 +8,84 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import JSONResponse, Response
 
 from .config import get_settings
-from .routes import inss, users, webhook
-
-# Configure logging ANTES de tudo
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('app_debug.log')
-    ]
+from .dependencias import ServicosApp, obter_servicos
+from .routes import gps_hybrid, inss, users, webhook
+from .middleware.log_requisicoes import LogRequisicoesMiddleware
+from .middleware.metricas_requisicoes import MetricasRequisicoesMiddleware
+from .middleware.rate_limit import configurar_rate_limiting
+from .services.fila_validacao import fila_validacao_sal
+from .services.idempotencia import indice_idempotencia
+from .services.pdf_render_pool import pdf_render_pool
+from .services.sal_browser_pool import PLAYWRIGHT_AVAILABLE, sal_browser_pool
+from .services.sal_seletores import resolvedor_sal
+from .services.sal_version_manager import registro_sal
+from .services.selic_service import registro_selic
+from .services.supabase_service import definir_supabase_service
+from .utils.cache_backend import cache_backend
+from .utils.cache_service import cache_service
+from .utils.logger_utils import configurar_logging
+from .utils.metricas import (
+    CONTENT_TYPE as METRICAS_CONTENT_TYPE,
+    profundidade_filas,
+    registro_metricas,
+    taxa_acerto_cache,
+    tarefas_em_execucao,
 )
+
+# Configure logging ANTES de tudo (escrita em thread própria, fora do event loop)
+configurar_logging()
 logger = logging.getLogger(__name__)
 
 
+async def _aquecer_sal_pool() -> None:
+    """Aquece os contextos do navegador SAL sem segurar o startup."""
+    try:
+        await sal_browser_pool.iniciar()
+        logger.info(f"[OK] SAL Pool: {sal_browser_pool.metricas()}")
+    except Exception as e:
+        logger.warning(f"[SAL POOL] Aquecimento falhou (nova tentativa na primeira emissao): {e}")
+
+
+def _taxa(acertos: int, erros: int) -> float:
+    return acertos / (acertos + erros) if acertos + erros else 0.0
+
+
+async def _coletar_metricas_componentes(app: FastAPI) -> None:
+    """Atualiza os gauges (filas, tarefas, caches) a partir das métricas de cada componente."""
+    pdf = pdf_render_pool.metricas()
+    sal = sal_browser_pool.metricas()
+    profundidade_filas.definir(pdf["fila"], fila="pdf_render")
+    profundidade_filas.definir(sal["fila"], fila="sal_pool")
+    tarefas_em_execucao.definir(pdf["em_execucao"], componente="pdf_render")
+    tarefas_em_execucao.definir(sal["em_uso"], componente="sal_pool")
+    tarefas_em_execucao.definir(len(asyncio.all_tasks()), componente="event_loop")
+    try:
+        fila = await fila_validacao_sal.metricas()
+        profundidade_filas.definir(fila["pendentes"], fila="validacao_sal")
+        tarefas_em_execucao.definir(fila["em_execucao"], componente="validacao_sal")
+    except Exception as e:
+        logger.warning(f"[METRICS] Fila de validacao indisponivel: {e}")
+
+    estatisticas_cache = await cache_backend.get_stats()
+    for namespace, dados in estatisticas_cache.get("namespaces", {}).items():
+        taxa_acerto_cache.definir(dados.get("hit_rate", 0.0), cache=estatisticas_cache["backend"], namespace=namespace)
+    idempotencia = indice_idempotencia.metricas()
+    taxa_acerto_cache.definir(
+        _taxa(idempotencia["hits_memoria"] + idempotencia["hits_persistente"], idempotencia["emissoes"]),
+        cache="idempotencia",
+        namespace="guias",
+    )
+    armazenamento = obter_servicos(app).supabase.metricas_armazenamento()
+    taxa_acerto_cache.definir(
+        _taxa(armazenamento["hits"], armazenamento["consultas_storage"]),
+        cache="armazenamento_pdf",
+        namespace="pdf",
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -35,12 +95,44 @@ async def lifespan(app: FastAPI):
     logger.info("[START] INICIANDO LIFESPAN CONTEXT MANAGER")
     logger.info("=" * 80)
     
+    aquecimento_sal = None
+    servicos = None
     try:
         # ===== STARTUP =====
         logger.info("[CONFIG] Carregando configuracoes...")
         settings = get_settings()
         logger.info(f"[OK] App Name: {settings.app_name}")
         logger.info(f"[OK] App Version: {settings.app_version}")
+
+        logger.info("[SUPABASE] Abrindo pool de conexoes...")
+        # Pool HTTP criado no event loop do servidor e fechado no shutdown;
+        # servicos em background (SAL, idempotencia) usam a mesma instancia
+        servicos = app.state.servicos = ServicosApp()
+        definir_supabase_service(servicos.supabase)
+        await servicos.iniciar()
+
+        logger.info("[SAL] Carregando versoes das regras SAL...")
+        await registro_sal.carregar()
+        registro_sal.iniciar_atualizacao()
+
+        logger.info("[SELIC] Carregando tabela de fatores SELIC...")
+        registro_selic.recarregar()
+        registro_selic.iniciar_atualizacao()
+
+        cache_service.iniciar_limpeza()
+        logger.info(f"[CACHE] Backend: {cache_backend.nome}")
+
+        logger.info("[PDF POOL] Aquecendo workers de renderizacao...")
+        await pdf_render_pool.iniciar()
+        logger.info(f"[OK] PDF Pool: {pdf_render_pool.metricas()}")
+
+        if PLAYWRIGHT_AVAILABLE:
+            logger.info("[SAL POOL] Aquecendo contextos do navegador em background...")
+            aquecimento_sal = asyncio.create_task(_aquecer_sal_pool())
+
+        logger.info("[FILA SAL] Iniciando workers da fila de validacao...")
+        fila_validacao_sal.iniciar(servicos.gps_hybrid.processar_validacao_sal)
+        logger.info(f"[OK] Fila de validacao: {await fila_validacao_sal.metricas()}")
         
         logger.info("=" * 80)
         logger.info("[OK] LIFESPAN STARTUP COMPLETO - SERVIDOR PRONTO")
@@ -70,6 +162,19 @@ async def lifespan(app: FastAPI):
         logger.info("=" * 80)
         
         try:
+            await fila_validacao_sal.parar()
+            fila_validacao_sal.fechar()
+            pdf_render_pool.encerrar()
+            if aquecimento_sal is not None:
+                aquecimento_sal.cancel()
+            await sal_browser_pool.encerrar()
+            await registro_sal.parar_atualizacao()
+            await registro_selic.parar_atualizacao()
+            await cache_service.parar_limpeza()
+            await cache_backend.encerrar()
+            if servicos is not None:
+                await servicos.encerrar()
+                definir_supabase_service(None)
             logger.info("[OK] SHUTDOWN COMPLETO")
             
         except Exception as e:
@@ -77,37 +182,6 @@ async def lifespan(app: FastAPI):
             logger.error(traceback.format_exc())
 
 
-# ===== MIDDLEWARE DE DEBUG =====
-class DebugMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        logger.info("=" * 80)
-        logger.info(f"[REQUEST] {request.method} {request.url.path}")
-        logger.info(f"   Headers: {dict(request.headers)}")
-        logger.info("=" * 80)
-        
-        start_time = time.time()
-        
-        try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            
-            logger.info("=" * 80)
-            logger.info(f"[RESPONSE] Status {response.status_code}")
-            logger.info(f"   Tempo: {process_time:.3f}s")
-            logger.info("=" * 80)
-            
-            return response
-            
-        except Exception as e:
-            logger.error("=" * 80)
-            logger.error(f"[ERROR] MIDDLEWARE: {type(e).__name__}")
-            logger.error(f"   Mensagem: {str(e)}")
-            logger.error(f"   Stack Trace:")
-            logger.error(traceback.format_exc())
-            logger.error("=" * 80)
-            raise
-
-
 def create_app() -> FastAPI:
     settings = get_settings()
     app = FastAPI(
@@ -125,9 +199,11 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    # Adiciona middleware de debug APOS CORS
-    logger.info("[DEBUG] Adding DebugMiddleware...")
-    app.add_middleware(DebugMiddleware)
+    # Adiciona middleware de log de requisicoes (amostrado) APOS CORS
+    logger.info("[DEBUG] Adding LogRequisicoesMiddleware...")
+    app.add_middleware(LogRequisicoesMiddleware)
+    # Latencia por rota (histograma exportado em /metrics)
+    app.add_middleware(MetricasRequisicoesMiddleware)
 
     # ===== EXCEPTION HANDLER GLOBAL =====
     @app.exception_handler(Exception)
@@ -176,9 +252,21 @@ def create_app() -> FastAPI:
         logger.info("[ROUTE] Health check chamado")
         return {
             "status": "healthy",
-            "timestamp": time.time()
+            "timestamp": time.time(),
+            "pdf_pool": pdf_render_pool.metricas(),
+            "sal_pool": sal_browser_pool.metricas(),
+            "sal_etapas": resolvedor_sal.metricas(),
+            "fila_validacao": await fila_validacao_sal.metricas(),
+            "idempotencia": indice_idempotencia.metricas(),
+            "armazenamento_pdf": obter_servicos(app).supabase.metricas_armazenamento()
         }
 
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Métricas no formato do Prometheus (latências, etapas, emissões, filas, caches)."""
+        await _coletar_metricas_componentes(app)
+        return Response(registro_metricas.exportar(), media_type=METRICAS_CONTENT_TYPE)
+
     # ===== INCLUDE ROUTERS COM TRY-EXCEPT =====
     logger.info("[ROUTERS] Incluindo routers...")
 
@@ -192,6 +280,10 @@ def create_app() -> FastAPI:
         logger.info("   [OK] Incluindo router Users...")
         app.include_router(users.router, prefix="/api/v1", tags=["Users"])
         
+        logger.info("   [OK] Incluindo router GPS Hibrido...")
+        configurar_rate_limiting(app)
+        app.include_router(gps_hybrid.router)
+        
         logger.info("[OK] Todos os routers incluidos com sucesso")
         
     except Exception as e:
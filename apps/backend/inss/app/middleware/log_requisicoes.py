@@ -0,0 +1,99 @@
+"""
+Middleware de log de requisições com amostragem.
+
+Uma linha por requisição (método, caminho, status, duração). Requisições
+normais são amostradas (GPS_LOG_AMOSTRAGEM_REQUISICOES, padrão 0.1); erros,
+respostas não-2xx e requisições lentas (GPS_LOG_REQUISICAO_LENTA_MS, padrão
+1000) são sempre registradas. Headers (mascarados) só em nível DEBUG.
+
+É um middleware ASGI puro: não envolve a resposta em streams como o
+BaseHTTPMiddleware e só monta a mensagem quando ela vai ser registrada.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, MutableMapping, Optional
+
+from ..utils.logger_utils import mascarar_dados
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+logger = logging.getLogger("app.requisicoes")
+
+
+class LogRequisicoesMiddleware:
+    """
+    Registra requisições HTTP com amostragem.
+
+    Uso:
+        app.add_middleware(LogRequisicoesMiddleware, taxa_amostragem=0.1)
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        taxa_amostragem: Optional[float] = None,
+        limiar_lento_ms: Optional[float] = None,
+        sortear: Callable[[], float] = random.random,
+    ) -> None:
+        """
+        Args:
+            app: Aplicação ASGI
+            taxa_amostragem: Fração das requisições normais registradas (0 a 1)
+            limiar_lento_ms: Acima disso a requisição é sempre registrada
+            sortear: Fonte de aleatoriedade (substituível em testes)
+        """
+        self.app = app
+        if taxa_amostragem is None:
+            taxa_amostragem = float(os.getenv("GPS_LOG_AMOSTRAGEM_REQUISICOES", "0.1"))
+        if limiar_lento_ms is None:
+            limiar_lento_ms = float(os.getenv("GPS_LOG_REQUISICAO_LENTA_MS", "1000"))
+        self.taxa_amostragem = min(max(taxa_amostragem, 0.0), 1.0)
+        self.limiar_lento_ms = limiar_lento_ms
+        self._sortear = sortear
+
+    def _deve_registrar(self, status: int, duracao_ms: float) -> bool:
+        if status >= 400 or status < 200 or duracao_ms >= self.limiar_lento_ms:
+            return True
+        return self.taxa_amostragem > 0 and self._sortear() < self.taxa_amostragem
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+
+        async def send_com_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_status)
+        except Exception:
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            logger.exception(f"[REQUEST] {scope['method']} {scope['path']} falhou em {duracao_ms:.1f}ms")
+            raise
+
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        if not self._deve_registrar(status, duracao_ms):
+            return
+        nivel = logging.WARNING if status >= 500 or duracao_ms >= self.limiar_lento_ms else logging.INFO
+        if logger.isEnabledFor(nivel):
+            logger.log(nivel, f"[REQUEST] {scope['method']} {scope['path']} {status} {duracao_ms:.1f}ms")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"   Headers: {mascarar_dados(_headers(scope))}")
+
+
+def _headers(scope: Scope) -> Dict[str, str]:
+    return {nome.decode("latin-1"): valor.decode("latin-1") for nome, valor in scope.get("headers", [])}
@@ -0,0 +1,74 @@
+"""
+Middleware de latência das requisições por rota (histograma em /metrics).
+
+A rota é o template do path (ex.: /api/v1/guias/{guia_id}), não o path
+recebido, para manter a cardinalidade baixa; requisições que não casam com
+nenhuma rota entram como "desconhecida".
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, Optional
+
+from ..utils.metricas import Histograma, latencia_requisicoes
+from .log_requisicoes import ASGIApp, Message, Receive, Scope, Send
+
+ROTA_DESCONHECIDA = "desconhecida"
+
+
+class MetricasRequisicoesMiddleware:
+    """
+    Observa a duração de cada requisição HTTP por método, rota e status.
+
+    Uso:
+        app.add_middleware(MetricasRequisicoesMiddleware)
+    """
+
+    def __init__(self, app: ASGIApp, histograma: Optional[Histograma] = None) -> None:
+        """
+        Args:
+            app: Aplicação ASGI
+            histograma: Histograma de destino (padrão: metricas.latencia_requisicoes)
+        """
+        self.app = app
+        self.histograma = histograma or latencia_requisicoes
+        self._rotas: Dict[Callable[..., Any], str] = {}
+
+    def _rota(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return ROTA_DESCONHECIDA
+        rota = self._rotas.get(endpoint)
+        if rota is None:
+            rota = ROTA_DESCONHECIDA
+            for candidata in getattr(scope.get("router"), "routes", ()):
+                if getattr(candidata, "endpoint", None) is endpoint:
+                    rota = candidata.path
+                    break
+            self._rotas[endpoint] = rota
+        return rota
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+
+        async def send_com_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_status)
+        finally:
+            # O roteador preenche scope["endpoint"] no próprio dict da requisição
+            self.histograma.observar(
+                time.perf_counter() - inicio,
+                metodo=scope["method"],
+                rota=self._rota(scope),
+                status=str(status),
+            )
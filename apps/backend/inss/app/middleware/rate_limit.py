@@ -53,11 +53,33 @@ def get_rate_limit_key(request: Request) -> str:
     return get_remote_address(request)
 
 
+def obter_storage_uri() -> str:
+    """
+    Storage dos contadores de rate limiting.
+    
+    GPS_RATE_LIMIT_STORAGE_URI tem prioridade; senão usa GPS_CACHE_URL quando
+    for Redis (limites compartilhados entre workers) e memória caso contrário.
+    
+    Returns:
+        URI no formato da biblioteca limits (memory://, redis://...)
+    """
+    uri = os.getenv("GPS_RATE_LIMIT_STORAGE_URI")
+    if uri:
+        return uri
+    cache_url = os.getenv("GPS_CACHE_URL", "")
+    if cache_url.startswith(("redis://", "rediss://")):
+        return cache_url
+    return "memory://"
+
+
 # Criar instância do limiter
 limiter = Limiter(
     key_func=get_rate_limit_key,
     default_limits=["100/hour"],  # Limite padrão: 100 requisições por hora
-    storage_uri="memory://"  # Usar memória (pode mudar para Redis em produção)
+    storage_uri=obter_storage_uri(),
+    key_prefix=f"{os.getenv('GPS_CACHE_PREFIXO', 'gps')}:ratelimit",
+    # Se o Redis cair, limita por worker em vez de derrubar as rotas
+    in_memory_fallback_enabled=True
 )
 
 
@@ -74,7 +96,7 @@ def configurar_rate_limiting(app):
     # Adicionar exception handler para RateLimitExceeded
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
     
-    print("[RATE LIMIT] [OK] Rate limiting configurado")
+    print(f"[RATE LIMIT] [OK] Rate limiting configurado (storage: {obter_storage_uri().split('://')[0]})")
     print(f"[RATE LIMIT] Limite padrão: 100 requisições/hora por IP/API Key")
     
     # Log de limites customizados se configurados
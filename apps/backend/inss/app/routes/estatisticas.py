@@ -2,15 +2,13 @@
 Rotas para estatísticas GPS.
 Fase 3: Otimizações
 """
-from __future__ import annotations
-
 from typing import Optional
 from datetime import date, datetime
 from fastapi import APIRouter, HTTPException, status, Request, Depends
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel, Field
 
-from ..services.supabase_service import SupabaseService
+from ..dependencias import obter_estatisticas_service
 from ..services.estatisticas_service import EstatisticasService
 from ..services.auth_service import auth_service, security_scheme
 from ..middleware.rate_limit import limiter
@@ -18,17 +16,14 @@ from ..middleware.rate_limit import limiter
 
 router = APIRouter(tags=["GPS Estatísticas"])
 
-# Instâncias dos serviços
-supabase_service = SupabaseService()
-estatisticas_service = EstatisticasService(supabase_service)
-
 
 @router.post("/estatisticas/popular")
 @limiter.limit("10/hour")  # Limite muito restrito (operação pesada)
 async def popular_estatisticas(
     request: Request,
     data_ref: Optional[str] = None,
-    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+    credentials: Optional[HTTPBearer] = Depends(security_scheme),
+    estatisticas_service: EstatisticasService = Depends(obter_estatisticas_service)
 ):
     """
     Popula estatísticas GPS para uma data específica.
@@ -82,7 +77,8 @@ async def obter_estatisticas_periodo(
     request: Request,
     data_inicio: str,
     data_fim: str,
-    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+    credentials: Optional[HTTPBearer] = Depends(security_scheme),
+    estatisticas_service: EstatisticasService = Depends(obter_estatisticas_service)
 ):
     """
     Obtém estatísticas de um período.
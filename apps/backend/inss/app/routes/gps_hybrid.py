@@ -1,28 +1,31 @@
 """
 Rotas FastAPI para emissão híbrida de GPS.
 """
-from __future__ import annotations
 
-from typing import Optional
+from typing import Dict, List, Optional
 from fastapi import APIRouter, HTTPException, status, Request, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel, Field
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from ..dependencias import obter_estatisticas_service, obter_gps_hybrid_service, obter_supabase_service
+from ..services.estatisticas_service import EstatisticasService
+from ..services.fila_validacao import fila_validacao_sal
 from ..services.gps_hybrid_service import GPSHybridService, MetodoEmissao
+from ..services.sal_version_manager import registro_sal
 from ..services.supabase_service import SupabaseService
 from ..services.auth_service import auth_service, security_scheme
 from ..middleware.rate_limit import limiter, obter_limite_personalizado
-from ..utils.cache_service import cache_service
+from ..utils.cache_backend import cache_backend
+from ..utils.cache_service import cached
+from ..utils import profiling
+from ..utils.profiling import AmostradorPilhas, ProfilingEmAndamento, amostrador_pilhas, captura_memoria
 
 
 router = APIRouter(prefix="/api/v1/gps", tags=["GPS Híbrido"])
 
-# Instâncias dos serviços
-supabase_service = SupabaseService()
-gps_hybrid_service = GPSHybridService(supabase_service)
-
 
 class EmitirGPSRequest(BaseModel):
     """Request para emissão de GPS."""
@@ -55,7 +58,8 @@ class GPSResponse(BaseModel):
 async def emitir_gps(
     request: Request,
     body: EmitirGPSRequest,
-    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+    credentials: Optional[HTTPBearer] = Depends(security_scheme),
+    gps_hybrid_service: GPSHybridService = Depends(obter_gps_hybrid_service)
 ):
     """
     Emite GPS usando estratégia híbrida.
@@ -137,11 +141,144 @@ async def emitir_gps(
         )
 
 
+class ItemLoteGPS(BaseModel):
+    """Item de um lote de emissão de GPS."""
+    user_id: str = Field(..., description="ID do usuário")
+    competencia: str = Field(..., description="Competência no formato MM/YYYY")
+    valor: float = Field(..., gt=0, description="Valor da contribuição")
+    codigo_pagamento: str = Field(..., description="Código de pagamento (ex: 1007, 1163)")
+    nome: Optional[str] = Field(None, description="Nome do contribuinte")
+    cpf: Optional[str] = Field(None, description="CPF do contribuinte")
+    nit: Optional[str] = Field(None, description="NIT/PIS/PASEP do contribuinte")
+    endereco: Optional[str] = Field(None, description="Endereço completo")
+    telefone: Optional[str] = Field(None, description="Telefone/WhatsApp")
+
+
+class EmitirLoteRequest(BaseModel):
+    """Request para emissão de GPS em lote."""
+    itens: List[ItemLoteGPS] = Field(..., min_length=1, max_length=5000, description="Guias a emitir")
+
+
+class ResultadoLoteGPS(BaseModel):
+    """Resultado de um item do lote (dados da guia ou erro)."""
+    id: Optional[str] = None
+    user_id: Optional[str] = None
+    pdf_url: Optional[str] = None
+    codigo_barras: Optional[str] = None
+    linha_digitavel: Optional[str] = None
+    vencimento: Optional[str] = None
+    valor_total: Optional[float] = None
+    metodo_emissao: Optional[str] = None
+    erro: Optional[str] = None
+
+
+class EstagioLoteResponse(BaseModel):
+    """Métricas de um estágio do pipeline de lote."""
+    concorrencia: int
+    processados: int
+    falhas: int
+    duracao_ms: float
+    tempo_medio_ms: float
+    throughput_por_segundo: float
+
+
+class EmitirLoteResponse(BaseModel):
+    """Response da emissão de GPS em lote."""
+    total: int
+    sucesso: int
+    falhas: int
+    duracao_ms: float
+    estagios: Dict[str, EstagioLoteResponse]
+    resultados: List[ResultadoLoteGPS]
+
+
+@router.post("/emitir-lote", response_model=EmitirLoteResponse)
+@limiter.limit(obter_limite_personalizado())
+async def emitir_gps_lote(
+    request: Request,
+    body: EmitirLoteRequest,
+    credentials: Optional[HTTPBearer] = Depends(security_scheme),
+    gps_hybrid_service: GPSHybridService = Depends(obter_gps_hybrid_service)
+):
+    """
+    Emite um lote de GPS por geração local.
+
+    Os códigos de barras e DVs da linha digitável do lote inteiro são
+    calculados em uma única passada; PDF, upload e persistência rodam em
+    estágios concorrentes limitados. Falhas são reportadas por item.
+
+    Requer autenticação: API Key (X-API-Key) ou JWT (Authorization: Bearer)
+
+    Returns:
+        EmitirLoteResponse com resultados por item e throughput por estágio
+    """
+    authorization = request.headers.get("Authorization")
+    x_api_key = request.headers.get("X-API-Key")
+    auth_service.verificar_autenticacao(authorization=authorization, x_api_key=x_api_key)
+
+    itens = [
+        {
+            "user_id": item.user_id,
+            "competencia": item.competencia,
+            "valor": item.valor,
+            "codigo_pagamento": item.codigo_pagamento,
+            "dados_usuario": {
+                "nome": item.nome,
+                "cpf": item.cpf,
+                "nit": item.nit,
+                "endereco": item.endereco,
+                "telefone": item.telefone
+            }
+        }
+        for item in body.itens
+    ]
+
+    try:
+        resultado = await gps_hybrid_service.emitir_lote(itens)
+    except Exception as e:
+        import traceback
+        print(f"[GPS HYBRID ROUTE] Erro ao emitir lote: {e}")
+        print(traceback.format_exc())
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao emitir lote: {str(e)} | Tipo: {type(e).__name__}"
+        )
+
+    return EmitirLoteResponse(
+        total=resultado["total"],
+        sucesso=resultado["sucesso"],
+        falhas=resultado["falhas"],
+        duracao_ms=resultado["duracao_ms"],
+        estagios=resultado["estagios"],
+        resultados=[
+            ResultadoLoteGPS(**{**r, "id": str(r["id"]) if r.get("id") is not None else None})
+            for r in resultado["resultados"]
+        ]
+    )
+
+
+@cached(ttl=300, key="gps_estatisticas")
+async def _calcular_estatisticas_gerais(estatisticas_service: EstatisticasService) -> Dict:
+    """Estatísticas gerais; misses concorrentes disparam um único cálculo."""
+    # Totais dos buckets mensais pré-agregados: O(meses), não O(emissões)
+    totais = await estatisticas_service.obter_totais()
+    total = totais["total_emitidas"]
+    validadas_sal = totais["validacoes_sal"]
+    return {
+        "total_emitidas": total,
+        "por_metodo": {metodo: qtd for metodo, qtd in totais["por_metodo"].items() if qtd},
+        "validadas_sal": validadas_sal,
+        "divergencias": totais["divergencias"],
+        "taxa_validacao": round(validadas_sal / total * 100, 2) if total > 0 else 0
+    }
+
+
 @router.get("/estatisticas")
 @limiter.limit("30/hour")  # Limite mais restrito para estatísticas
 async def obter_estatisticas(
     request: Request,
-    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+    credentials: Optional[HTTPBearer] = Depends(security_scheme),
+    estatisticas_service: EstatisticasService = Depends(obter_estatisticas_service)
 ):
     """
     Retorna estatísticas agregadas de emissões de GPS.
@@ -163,43 +300,8 @@ async def obter_estatisticas(
     auth_service.verificar_autenticacao(authorization=authorization, x_api_key=x_api_key)
     
     try:
-        # [OK] FASE 3: Verificar cache primeiro
-        cache_key = "gps_estatisticas"
-        cached_result = cache_service.get(cache_key)
-        if cached_result:
-            return cached_result
-        
-        # Buscar todas as GPS emitidas
-        guias = await supabase_service.get_records("gps_emissions", {})
-        
-        total = len(guias) if guias else 0
-        
-        # Contar por método
-        por_metodo = {}
-        validadas_sal = 0
-        
-        if guias:
-            for guia in guias:
-                metodo = guia.get("metodo_emissao", "local")
-                por_metodo[metodo] = por_metodo.get(metodo, 0) + 1
-                
-                if guia.get("validado_sal"):
-                    validadas_sal += 1
-        
-        # Buscar divergências
-        divergencias = await supabase_service.get_records("gps_divergencias", {"resolvido": False})
-        total_divergencias = len(divergencias) if divergencias else 0
-        
-        resultado = {
-            "total_emitidas": total,
-            "por_metodo": por_metodo,
-            "validadas_sal": validadas_sal,
-            "divergencias": total_divergencias,
-            "taxa_validacao": round(validadas_sal / total * 100, 2) if total > 0 else 0
-        }
-        
-        # [OK] FASE 3: Armazenar no cache (TTL: 5 minutos)
-        cache_service.set(cache_key, resultado, ttl=300)
+        # [OK] FASE 3: Cache (TTL: 5 minutos) com single-flight
+        resultado = await _calcular_estatisticas_gerais(estatisticas_service)
         
         return resultado
     
@@ -213,6 +315,85 @@ async def obter_estatisticas(
         )
 
 
+@router.get("/cache")
+@limiter.limit("60/hour")
+async def obter_metricas_cache(
+    request: Request,
+    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+):
+    """
+    Métricas do cache (backend, entradas e hit/miss/eviction por namespace).
+    
+    Requer autenticação: API Key (X-API-Key) ou JWT (Authorization: Bearer)
+    """
+    authorization = request.headers.get("Authorization")
+    x_api_key = request.headers.get("X-API-Key")
+    auth_service.verificar_autenticacao(authorization=authorization, x_api_key=x_api_key)
+    return await cache_backend.get_stats()
+
+
+@router.post("/sal/recarregar")
+@limiter.limit("10/hour")
+async def recarregar_regras_sal(
+    request: Request,
+    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+):
+    """
+    Recarrega as versões SAL deste worker (chamar após alterar sal_version_history).
+    
+    Requer autenticação: API Key (X-API-Key) ou JWT (Authorization: Bearer)
+    """
+    authorization = request.headers.get("Authorization")
+    x_api_key = request.headers.get("X-API-Key")
+    auth_service.verificar_autenticacao(authorization=authorization, x_api_key=x_api_key)
+    indice = await registro_sal.atualizar()
+    return indice.resumo()
+
+
+@router.get("/validacoes/fila")
+@limiter.limit("60/hour")
+async def obter_fila_validacao(
+    request: Request,
+    limit: int = 20,
+    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+):
+    """
+    Profundidade e atraso da fila de validações SAL, com os jobs na dead-letter.
+    
+    Requer autenticação: API Key (X-API-Key) ou JWT (Authorization: Bearer)
+    """
+    authorization = request.headers.get("Authorization")
+    x_api_key = request.headers.get("X-API-Key")
+    auth_service.verificar_autenticacao(authorization=authorization, x_api_key=x_api_key)
+    return {
+        **await fila_validacao_sal.metricas(),
+        "dead_letter": await fila_validacao_sal.mortas(min(max(1, limit), 100))
+    }
+
+
+@router.post("/validacoes/{job_id}/reprocessar")
+@limiter.limit("30/hour")
+async def reprocessar_validacao(
+    request: Request,
+    job_id: int,
+    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+):
+    """
+    Devolve uma validação da dead-letter para a fila.
+    
+    Requer autenticação: API Key (X-API-Key) ou JWT (Authorization: Bearer)
+    """
+    authorization = request.headers.get("Authorization")
+    x_api_key = request.headers.get("X-API-Key")
+    auth_service.verificar_autenticacao(authorization=authorization, x_api_key=x_api_key)
+    if not await fila_validacao_sal.reprocessar(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Validação {job_id} não está na dead-letter"
+        )
+    return {"id": job_id, "status": "pendente"}
+
+
 @router.get("/divergencias")
 @limiter.limit("30/hour")  # Limite mais restrito para divergências
 async def listar_divergencias(
@@ -222,7 +403,8 @@ async def listar_divergencias(
     competencia: Optional[str] = None,
     limit: int = 50,
     offset: int = 0,
-    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+    credentials: Optional[HTTPBearer] = Depends(security_scheme),
+    supabase_service: SupabaseService = Depends(obter_supabase_service)
 ):
     """
     Lista divergências entre GPS local e SAL.
@@ -264,22 +446,16 @@ async def listar_divergencias(
         if competencia:
             filtros["competencia"] = competencia
         
-        # Buscar divergências (com paginação)
-        # Nota: SupabaseService pode precisar de ajuste para suportar limit/offset
-        # Por enquanto, vamos buscar tudo e paginar em memória
-        todas_divergencias = await supabase_service.get_records("gps_divergencias", filtros)
-        
-        total = len(todas_divergencias) if todas_divergencias else 0
-        
-        # Aplicar paginação
-        divergencias_paginadas = []
-        if todas_divergencias:
-            # Ordenar por data de criação (mais recentes primeiro)
-            todas_divergencias.sort(
-                key=lambda x: x.get("created_at", ""),
-                reverse=True
-            )
-            divergencias_paginadas = todas_divergencias[offset:offset + limit]
+        # Paginação e ordenação no servidor (mais recentes primeiro)
+        total = await supabase_service.tabela("gps_divergencias").filtros(filtros).contar()
+        divergencias_paginadas = await (
+            supabase_service.tabela("gps_divergencias")
+            .filtros(filtros)
+            .order("created_at", desc=True)
+            .limit(limit)
+            .offset(offset)
+            .executar()
+        )
         
         return {
             "total": total,
@@ -296,3 +472,87 @@ async def listar_divergencias(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao listar divergências: {str(e)}"
         )
+
+
+def _exigir_profiling(request: Request) -> None:
+    """
+    Libera o profiling só para JWT com papel admin ou com o token próprio (X-Profiling-Token).
+    
+    Desabilitado no worker: 404 antes de qualquer autenticação. Autenticado sem o papel: 403.
+    """
+    if not profiling.PROFILING_HABILITADO:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling desabilitado (configure GPS_PROFILING=true)"
+        )
+    if profiling.token_profiling_valido(request.headers.get("X-Profiling-Token")):
+        return
+    autenticacao = auth_service.verificar_autenticacao(
+        authorization=request.headers.get("Authorization"),
+        x_api_key=request.headers.get("X-API-Key")
+    )
+    if not auth_service.possui_papel(autenticacao, profiling.PAPEL_ADMIN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Profiling exige JWT com papel '{profiling.PAPEL_ADMIN}' ou X-Profiling-Token"
+        )
+
+
+@router.get("/profiling/cpu", response_class=PlainTextResponse)
+@limiter.limit("10/hour")
+async def profiling_cpu(
+    request: Request,
+    segundos: float = 10.0,
+    intervalo_ms: float = 5.0,
+    todas_threads: bool = False,
+    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+):
+    """
+    Amostra as pilhas deste worker por N segundos (formato collapsed, para flamegraph).
+    
+    Por padrão amostra só a thread do event loop; todas_threads inclui pools e fila.
+    
+    Requer JWT com papel admin (Authorization: Bearer) ou X-Profiling-Token
+    """
+    _exigir_profiling(request)
+    try:
+        pilhas = await amostrador_pilhas.amostrar_async(
+            segundos=min(max(segundos, 0.1), profiling.MAX_SEGUNDOS),
+            intervalo=max(intervalo_ms, 1.0) / 1000,
+            apenas_event_loop=not todas_threads,
+        )
+    except ProfilingEmAndamento as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return PlainTextResponse(AmostradorPilhas.collapsed(pilhas))
+
+
+@router.post("/profiling/memoria")
+@limiter.limit("10/hour")
+async def ativar_profiling_memoria(
+    request: Request,
+    segundos: float = 30.0,
+    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+):
+    """
+    Abre uma janela de captura tracemalloc nas funções marcadas (PDF oficial, emissão SAL).
+    
+    Requer JWT com papel admin (Authorization: Bearer) ou X-Profiling-Token
+    """
+    _exigir_profiling(request)
+    captura_memoria.ativar(segundos)
+    return {"ativa": True, "segundos": min(max(segundos, 0.0), profiling.MAX_SEGUNDOS)}
+
+
+@router.get("/profiling/memoria")
+@limiter.limit("60/hour")
+async def obter_profiling_memoria(
+    request: Request,
+    credentials: Optional[HTTPBearer] = Depends(security_scheme)
+):
+    """
+    Capturas de memória mais recentes (pico e linhas que mais alocaram por chamada).
+    
+    Requer JWT com papel admin (Authorization: Bearer) ou X-Profiling-Token
+    """
+    _exigir_profiling(request)
+    return {"ativa": captura_memoria.esta_ativa(), "capturas": list(captura_memoria.capturas)}
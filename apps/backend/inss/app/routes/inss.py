@@ -1,28 +1,33 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import logging
 import traceback
 from datetime import datetime, date
 from decimal import Decimal
 from io import BytesIO
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks, Header
 from fastapi.responses import Response
 from pydantic import BaseModel, Field
-from starlette.concurrency import run_in_threadpool
 
+from ..dependencias import obter_gps_hybrid_service, obter_supabase_service, obter_whatsapp_service
 from ..models.guia_inss import ComplementacaoRequest, EmitirGuiaRequest
+from ..services.gps_hybrid_service import GPSHybridService
+from ..services.idempotencia import chave_idempotencia, indice_idempotencia
 from ..services.inss_calculator import CalculoSAL, INSSCalculator
-from ..services.gps_pdf_generator_oficial import GPSPDFGeneratorOficial as GPSGenerator
+from ..services.pdf_render_pool import pdf_render_pool
+from ..utils.metricas import duracao_etapas, medir_etapa
+from ..utils.server_timing import ServerTiming
 
 try:
     from ..services.pdf_generator_completo import GPSGeneratorCompleto
 except ImportError:
     GPSGeneratorCompleto = None  # type: ignore
 
-from ..services.supabase_service import SupabaseService
+from ..services.supabase_service import ArmazenamentoIndisponivel, SupabaseService
 from ..services.whatsapp_service import WhatsAppService
 from ..utils.constants import SAL_CLASSES, calcular_vencimento_padrao
 from ..utils.validators import normalizar_competencia, validar_whatsapp
@@ -31,13 +36,10 @@ from ..utils.pis_formatter import formatar_pis
 router = APIRouter(prefix="/api/v1/guias", tags=["Guias INSS"])
 
 calculator = INSSCalculator()
-supabase_service = SupabaseService()
-pdf_generator = GPSGenerator()
 pdf_generator_completo = GPSGeneratorCompleto() if GPSGeneratorCompleto else None
-whatsapp_service = WhatsAppService(supabase_service=supabase_service)
 
 
-async def _obter_ou_criar_usuario(payload: dict[str, Any]) -> dict[str, Any]:
+async def _obter_ou_criar_usuario(supabase_service: SupabaseService, payload: dict[str, Any]) -> dict[str, Any]:
     whatsapp = payload["whatsapp"]
     usuario = await supabase_service.obter_usuario_por_whatsapp(whatsapp)
     if usuario and usuario.get("id"):
@@ -162,8 +164,7 @@ async def gerar_pdf(request: GerarPDFRequest) -> Response:
             "vencimento": vencimento.strftime("%d/%m/%Y"),
         }
         
-        buffer = await run_in_threadpool(pdf_generator.gerar, dados_pdf)
-        pdf_bytes = buffer.getvalue()
+        pdf_bytes = await pdf_render_pool.renderizar(dados_pdf)
         
         return Response(content=pdf_bytes, media_type="application/pdf")
     except HTTPException:
@@ -179,35 +180,102 @@ from ..services.l_digitavel_generator import LDigitavelGenerator
 from ..services.gps_pdf_generator_v2 import PDFGeneratorV2
 
 
+def _whatsapp_canonico(numero: str) -> str:
+    """Forma do número com 55 e com o 9 (mesma chave para as variações com/sem 9)."""
+    return max(_variacoes_whatsapp(numero), key=len)
+
+
 def _variacoes_whatsapp(numero: str) -> list[str]:
     """Gera variações do número com e sem o 9 após o DDD."""
     digits = "".join(filter(str.isdigit, numero))
     if not digits.startswith("55"):
         digits = "55" + digits
 
-    variacoes = {digits}
+    # O número como informado vem primeiro (preferido quando há perfis nas duas formas)
+    variacoes = [digits]
     sem_55 = digits[2:]
 
     # Se faltar o 9 (10 dígitos), inserir após o DDD
     if len(sem_55) == 10:
         with_9 = "55" + sem_55[:2] + "9" + sem_55[2:]
-        variacoes.add(with_9)
+        variacoes.append(with_9)
 
     # Se tiver 11 dígitos e o terceiro for 9, gerar sem o 9 também
     if len(sem_55) == 11 and sem_55[2] == "9":
         without_9 = "55" + sem_55[:2] + sem_55[3:]
-        variacoes.add(without_9)
+        variacoes.append(without_9)
+
+    return variacoes
+
+
+async def _buscar_usuario_emissao(
+    supabase_service: SupabaseService, whatsapp: str, user_type: str
+) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Busca o perfil do WhatsApp em uma única consulta (todas as variações com/sem 9).
+
+    Prefere o perfil do tipo pedido e, entre variações, o número como informado;
+    sem perfil do tipo, usa qualquer perfil do número (busca genérica).
+
+    Returns:
+        (perfil ou None, telefone do perfil encontrado ou o informado)
+    """
+    variacoes = _variacoes_whatsapp(whatsapp)
+    try:
+        registros = await supabase_service.tabela("profiles").in_("whatsapp_phone", variacoes).executar()
+    except Exception as e:
+        print(f"[INSS] Falha na busca de perfil ({', '.join(variacoes)}): {e}")
+        return None, whatsapp
+
+    ordem = {telefone: posicao for posicao, telefone in enumerate(variacoes)}
+    registros = sorted(
+        registros,
+        key=lambda registro: (
+            registro.get("user_type") != user_type,
+            ordem.get(registro.get("whatsapp_phone"), len(ordem)),
+        ),
+    )
+    if not registros:
+        return None, whatsapp
+    usuario = registros[0]
+    if usuario.get("user_type") != user_type:
+        print(f"[INSS] Usuario especifico tipo={user_type} nao encontrado. Usando perfil generico.")
+    return usuario, usuario.get("whatsapp_phone") or whatsapp
+
+
+def _resposta_emissao(guia: Dict[str, Any], reaproveitada: bool, avisos: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Corpo de resposta de /emitir a partir da guia salva (nova ou reaproveitada)."""
+    return {
+        "message": "Guia já emitida (reaproveitada)" if reaproveitada else "Guia emitida com sucesso (V2 Secure)",
+        "guia": guia,
+        "pdf_url": guia.get("pdf_url"),
+        "valor_total": float(guia.get("valor_total") or guia.get("valor") or 0.0),
+        "codigo_barras": guia.get("linha_digitavel"),
+        "reaproveitada": reaproveitada,
+        "avisos": avisos or [],
+    }
 
-    return list(variacoes)
 
 @router.post("/emitir")
 async def emitir_guia(
     guia_data: EmitirGuiaRequest, 
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    supabase_service: SupabaseService = Depends(obter_supabase_service),
+    hybrid_service: GPSHybridService = Depends(obter_gps_hybrid_service),
 ):
+    """
+    Emite a GPS do usuário do WhatsApp.
+
+    Etapas independentes rodam em paralelo (perfil + regras SAL; upload +
+    insert) e a duração de cada etapa volta no header Server-Timing e no
+    histograma de etapas exportado em /metrics.
+    """
     print("=" * 80)
     print(f"[ENDPOINT /emitir] CHAMADO! whatsapp={guia_data.whatsapp}, valor_base={guia_data.valor_base}")
     print("=" * 80)
+    tempos = ServerTiming(histograma=duracao_etapas)
     try:
         print(f"[INSS] Iniciando emissão de guia para {guia_data.whatsapp}")
         
@@ -227,190 +295,207 @@ async def emitir_guia(
         }
         
         target_user_type = user_type_map.get(guia_data.tipo_contribuinte, 'autonomo')
-        # Tentar buscar usuario especifico por whatsapp + tipo (inclui variacoes com/sem 9)
-        print(f"[INSS] Buscando usuario whatsapp={guia_data.whatsapp} tipo={target_user_type}")
-        usuario = None
-        for phone in _variacoes_whatsapp(guia_data.whatsapp):
-            try:
-                registros = await supabase_service.get_records(
-                    "profiles",
-                    {"whatsapp_phone": phone, "user_type": target_user_type}
-                )
-                if registros:
-                    usuario = registros[0]
-                    guia_data.whatsapp = phone  # manter consistente para downstream
-                    break
-            except Exception as e:
-                print(f"[INSS] Falha na busca especifica ({phone}): {e}")
-
-        # Fallback: se nao encontrar especifico, busca generico (qualquer tipo)
-        if not usuario:
-            print(f"[INSS] Usuario especifico tipo={target_user_type} nao encontrado. Tentando busca generica.")
-            for phone in _variacoes_whatsapp(guia_data.whatsapp):
-                usuario = await supabase_service.obter_usuario_por_whatsapp(phone)
-                if usuario:
-                    guia_data.whatsapp = phone
-                    break
-
-        if not usuario or not usuario.get("id"):
-            print(f"[ERROR] Usuario nao encontrado para whatsapp={guia_data.whatsapp}")
-            raise HTTPException(status_code=500, detail="Falha ao identificar usuario.")
-
-        user_id = usuario["id"]
-        print(f"[INSS] Usuario identificado: id={user_id}, pis={usuario.get('pis')}")
-        # Converter competencia para mes/ano
+
+        # Converter competencia para mes/ano (antes de qualquer I/O)
         try:
             mes, ano = map(int, guia_data.competencia.split("/"))
             competencia = guia_data.competencia
         except Exception:
             raise HTTPException(status_code=400, detail="Formato de competencia invalido. Use MM/AAAA")
 
-        tipo_map = {
-            "autonomo": "ci_normal",
-            "autonomo_simplificado": "ci_simplificado",
-            "individual": "ci_normal",
-        }
-        tipo_contribuinte = tipo_map.get(guia_data.tipo_contribuinte, guia_data.tipo_contribuinte)
-        
-        validacao = await validator.validar_completo(
-            cpf=usuario.get("document") or usuario.get("cpf", "00000000000"),  # Fallback se nao tiver CPF no user
-            periodo_mes=mes,
-            periodo_ano=ano,
-            tipo_contribuinte=tipo_contribuinte,
-            valor_base=Decimal(str(guia_data.valor_base))
+        # 3. Idempotência antes de qualquer I/O: repetições (mesma chave) devolvem a
+        # guia já emitida sem buscar perfil, validar nem calcular de novo
+        chave = chave_idempotencia(
+            _whatsapp_canonico(guia_data.whatsapp),
+            competencia,
+            guia_data.tipo_contribuinte,
+            guia_data.valor_base,
+            idempotency_key,
         )
-        
-        if not validacao["valido"]:
-            raise HTTPException(status_code=400, detail="Erro de validacao: " + "; ".join(validacao["erros"]))
-            raise HTTPException(status_code=400, detail=f"Erro de validação: {'; '.join(validacao['erros'])}")
-
-        # 4. Calcular
-        # 4. Calcular
-        data_competencia = date(ano, mes, 1)
-        if tipo_contribuinte == "ci_simplificado":
-            calculo = calculator.calcular_contribuinte_individual(float(guia_data.valor_base), "simplificado")
-            codigo_gps = calculo.codigo_gps or "1163"
-        elif tipo_contribuinte == "domestico":
-            calc_obj = await calculator.calcular_domestico(float(guia_data.valor_base), data_competencia)
-            calculo = calc_obj.detalhes
-            codigo_gps = calc_obj.codigo_gps
-        else:
-            calculo = calculator.calcular_contribuinte_individual(float(guia_data.valor_base), "normal")
-            codigo_gps = calculo.codigo_gps or "1007"
-        # 6. Emissão via GPSHybridService (Sempre usa o oficial ou SAL)
-        print(f"[DEBUG] Iniciando emissão híbrida para {competencia}")
-        try:
-            from ..services.gps_hybrid_service import GPSHybridService
-            hybrid_service = GPSHybridService(supabase_service)
-            
-            # Preparar dados do usuário para o PDF
-            dados_usuario_pdf = {
-                "nome": usuario.get("nome") or usuario.get("name"),
-                "cpf": usuario.get("cpf") or usuario.get("document"),
-                "nit": usuario.get("pis") or usuario.get("nit"),
-                "endereco": usuario.get("endereco") or usuario.get("address"),
-                "telefone": usuario.get("telefone") or guia_data.whatsapp,
-                "uf": usuario.get("endereco_uf") or usuario.get("uf"),
-            }
 
-            # Emitir GPS (decide entre SAL e Local Oficial)
-            resultado_emissao = await hybrid_service.emitir_gps(
-                user_id=user_id,
-                competencia=competencia,
-                valor=calculo.valor,
-                codigo_pagamento=calculo.codigo_gps,
-                dados_usuario=dados_usuario_pdf,
-                metodo_forcado=None # Deixa o serviço decidir (SAL ou Local)
+        avisos: List[str] = []
+
+        async def emitir_e_salvar() -> Dict[str, Any]:
+            # 4. Perfil (uma consulta IN com as variacoes com/sem 9) e regras SAL em paralelo
+            print(f"[INSS] Buscando usuario whatsapp={guia_data.whatsapp} tipo={target_user_type}")
+            (usuario, telefone), _ = await asyncio.gather(
+                tempos.medir("perfil", _buscar_usuario_emissao(supabase_service, guia_data.whatsapp, target_user_type)),
+                tempos.medir("regras_sal", sal_manager.registro.garantir_carregado(supabase_service)),
             )
+            guia_data.whatsapp = telefone  # manter consistente para downstream
+
+            if not usuario or not usuario.get("id"):
+                print(f"[ERROR] Usuario nao encontrado para whatsapp={guia_data.whatsapp}")
+                raise HTTPException(status_code=500, detail="Falha ao identificar usuario.")
+
+            user_id = usuario["id"]
+            print(f"[INSS] Usuario identificado: id={user_id}, pis={usuario.get('pis')}")
+
+            tipo_map = {
+                "autonomo": "ci_normal",
+                "autonomo_simplificado": "ci_simplificado",
+                "individual": "ci_normal",
+            }
+            tipo_contribuinte = tipo_map.get(guia_data.tipo_contribuinte, guia_data.tipo_contribuinte)
+
+            with tempos.etapa("validacao"):
+                validacao = await validator.validar_completo(
+                    cpf=usuario.get("document") or usuario.get("cpf", "00000000000"),  # Fallback se nao tiver CPF no user
+                    periodo_mes=mes,
+                    periodo_ano=ano,
+                    tipo_contribuinte=tipo_contribuinte,
+                    valor_base=Decimal(str(guia_data.valor_base))
+                )
+
+            if not validacao["valido"]:
+                raise HTTPException(status_code=400, detail="Erro de validacao: " + "; ".join(validacao["erros"]))
+            for aviso in validacao["avisos"]:
+                print(f"[INSS] [WARN] {aviso}")
+            avisos.extend(validacao["avisos"])
+
+            # 5. Calcular
+            with tempos.etapa("calculo"):
+                data_competencia = date(ano, mes, 1)
+                if tipo_contribuinte == "ci_simplificado":
+                    calculo = calculator.calcular_contribuinte_individual(float(guia_data.valor_base), "simplificado")
+                    codigo_gps = calculo.codigo_gps or "1163"
+                elif tipo_contribuinte == "domestico":
+                    calc_obj = await calculator.calcular_domestico(float(guia_data.valor_base), data_competencia)
+                    calculo = calc_obj.detalhes
+                    codigo_gps = calc_obj.codigo_gps
+                else:
+                    calculo = calculator.calcular_contribuinte_individual(float(guia_data.valor_base), "normal")
+                    codigo_gps = calculo.codigo_gps or "1007"
+
+            # 6. Emissão via GPSHybridService (Sempre usa o oficial ou SAL)
+            print(f"[DEBUG] Iniciando emissão híbrida para {competencia}")
+            try:
+                # Preparar dados do usuário para o PDF
+                dados_usuario_pdf = {
+                    "nome": usuario.get("nome") or usuario.get("name"),
+                    "cpf": usuario.get("cpf") or usuario.get("document"),
+                    "nit": usuario.get("pis") or usuario.get("nit"),
+                    "endereco": usuario.get("endereco") or usuario.get("address"),
+                    "telefone": usuario.get("telefone") or guia_data.whatsapp,
+                    "uf": usuario.get("endereco_uf") or usuario.get("uf"),
+                }
+
+                # Emitir GPS (decide entre SAL e Local Oficial)
+                with tempos.etapa("emissao"):
+                    resultado_emissao = await hybrid_service.emitir_gps(
+                        user_id=user_id,
+                        competencia=competencia,
+                        valor=calculo.valor,
+                        codigo_pagamento=calculo.codigo_gps,
+                        dados_usuario=dados_usuario_pdf,
+                        metodo_forcado=None # Deixa o serviço decidir (SAL ou Local)
+                    )
             
-            pdf_bytes = resultado_emissao.get("pdf_bytes")
-            pdf_url = resultado_emissao.get("pdf_url")
-            codigo_barras = resultado_emissao.get("codigo_barras")
-            linha_digitavel = resultado_emissao.get("linha_digitavel")
-            metodo_emissao = resultado_emissao.get("metodo_emissao")
-            validado_sal = resultado_emissao.get("validado_sal", False)
+                pdf_bytes = resultado_emissao.get("pdf_bytes")
+                pdf_url = resultado_emissao.get("pdf_url")
+                codigo_barras = resultado_emissao.get("codigo_barras")
+                linha_digitavel = resultado_emissao.get("linha_digitavel")
+                metodo_emissao = resultado_emissao.get("metodo_emissao")
+                validado_sal = resultado_emissao.get("validado_sal", False)
             
-            if not pdf_bytes and not pdf_url:
-                raise HTTPException(status_code=500, detail="Falha na geração do PDF (sem bytes nem URL).")
-
-            # Se não tem URL pública (foi gerado localmente ou tem URL temporária), fazer upload
-            if pdf_bytes and (not pdf_url or pdf_url.startswith("temp://")):
-                print(f"[DEBUG] Fazendo upload do PDF gerado localmente...")
-                from datetime import datetime
-                filename = f"gps_{user_id}_{competencia.replace('/', '-')}_{int(datetime.now().timestamp())}.pdf"
-                # Usa bucket 'guias' que já existe e é público
-                pdf_url = await supabase_service.upload_file("guias", filename, pdf_bytes, "application/pdf")
-                print(f"[DEBUG] Upload concluído: {pdf_url}")
+                if not pdf_bytes and not pdf_url:
+                    raise HTTPException(status_code=500, detail="Falha na geração do PDF (sem bytes nem URL).")
+
+                # Sem URL pública (Storage falhou na emissão): nova tentativa no mesmo objeto
+                # endereçado pelo conteúdo, antes do insert. A linha leva a idempotency_key e
+                # é reaproveitada em toda repetição, então nunca é gravada com link quebrado.
+                if pdf_bytes and (not pdf_url or pdf_url.startswith("temp://")):
+                    print(f"[DEBUG] Armazenando PDF gerado localmente...")
+                    pdf_url = await tempos.medir(
+                        "armazenamento", supabase_service.armazenar_pdf(pdf_bytes, bucket="guias")
+                    )
+                    print(f"[DEBUG] PDF armazenado: {pdf_url}")
+                if not pdf_url or pdf_url.startswith("temp://"):
+                    raise ArmazenamentoIndisponivel(pdf_url or "")
             
-            # Preparar dados para salvar (ou atualizar)
-            print(f"[DEBUG] Preparando dados para salvar...")
-            venc_padrao = calcular_vencimento_padrao(competencia)
-            ref_num = f"GPS-{user_id}-{competencia.replace('/', '')}"
-            valor_total = calculo.valor
-
-            # Dados completos para a tabela guias_inss (após adicionar colunas via SQL)
-            # Nota: usuario_id será adicionado pelo método salvar_guia
-            guia_save_data = {
-                "cpf": usuario.get("document") or usuario.get("cpf", ""),
-                "nome": usuario.get("name") or usuario.get("nome", "Não Informado"),
-                "rg": usuario.get("rg", ""),
-                "endereco": usuario.get("endereco_logradouro") or usuario.get("endereco", ""),
-                "pis_pasep": usuario.get("pis", ""),
-                "periodo_mes": mes,
-                "periodo_ano": ano,
-                "tipo_contribuinte": tipo_contribuinte,
-                "codigo_gps": codigo_gps,
-                "competencia": competencia,
-                "valor_base": float(guia_data.valor_base),
-                "aliquota": calculo.detalhes.get('aliquota', 0.0) if hasattr(calculo, 'detalhes') else 0.0,
-                "valor_contribuicao": float(calculo.valor),
-                "valor_juros": 0.0,
-                "valor_multa": 0.0,
-                "valor_total": float(calculo.valor),
-                "valor": float(calculo.valor),  # Campo original da tabela
-                "vencimento": venc_padrao.isoformat(),
-                "data_vencimento": venc_padrao.isoformat(),  # Campo original da tabela
-                "status": "emitida",
-                "reference_number": ref_num,
-                "linha_digitavel": linha_digitavel,
-                "codigo_barras": codigo_barras,
-                "pdf_url": pdf_url,
-                "metodo_emissao": "v2_secure",
-                "validado_sal": False  # Validação SAL não implementada neste fluxo
-            }
-        
-            print(f"[DEBUG] Salvando GPS v2...")
-            guia_salva = await supabase_service.salvar_guia(user_id=user_id, guia_data=guia_save_data)
-            print(f"[DEBUG] GPS salva: {guia_salva.keys() if guia_salva else 'None'}")
+                # Preparar dados para salvar (ou atualizar)
+                print(f"[DEBUG] Preparando dados para salvar...")
+                venc_padrao = calcular_vencimento_padrao(competencia)
+                ref_num = f"GPS-{user_id}-{competencia.replace('/', '')}"
+
+                # Dados completos para a tabela guias_inss (após adicionar colunas via SQL)
+                # Nota: usuario_id será adicionado pelo método salvar_guia
+                guia_save_data = {
+                    "cpf": usuario.get("document") or usuario.get("cpf", ""),
+                    "nome": usuario.get("name") or usuario.get("nome", "Não Informado"),
+                    "rg": usuario.get("rg", ""),
+                    "endereco": usuario.get("endereco_logradouro") or usuario.get("endereco", ""),
+                    "pis_pasep": usuario.get("pis", ""),
+                    "periodo_mes": mes,
+                    "periodo_ano": ano,
+                    "tipo_contribuinte": tipo_contribuinte,
+                    "codigo_gps": codigo_gps,
+                    "competencia": competencia,
+                    "valor_base": float(guia_data.valor_base),
+                    "aliquota": calculo.detalhes.get('aliquota', 0.0) if hasattr(calculo, 'detalhes') else 0.0,
+                    "valor_contribuicao": float(calculo.valor),
+                    "valor_juros": 0.0,
+                    "valor_multa": 0.0,
+                    "valor_total": float(calculo.valor),
+                    "valor": float(calculo.valor),  # Campo original da tabela
+                    "vencimento": venc_padrao.isoformat(),
+                    "data_vencimento": venc_padrao.isoformat(),  # Campo original da tabela
+                    "status": "emitida",
+                    "reference_number": ref_num,
+                    "linha_digitavel": linha_digitavel,
+                    "codigo_barras": codigo_barras,
+                    "pdf_url": pdf_url,
+                    "metodo_emissao": "v2_secure",
+                    "validado_sal": False,  # Validação SAL não implementada neste fluxo
+                    "idempotency_key": chave,
+                }
         
-            # Garantir ID no retorno (Correção do Bug Original)
-            if not guia_salva or "id" not in guia_salva:
-                from uuid import uuid4
-                guia_salva = {"id": str(uuid4()), **guia_save_data}
-            
-            return {
-                "message": "Guia emitida com sucesso (V2 Secure)",
-                "guia": {**guia_salva, "linha_digitavel": linha_digitavel},
-                "pdf_url": pdf_url,
-                "valor_total": float(valor_total),
-                "codigo_barras": linha_digitavel
-            }
+                print(f"[DEBUG] Salvando GPS v2...")
+                with tempos.etapa("persistencia"):
+                    guia_salva = await supabase_service.salvar_guia(user_id=user_id, guia_data=guia_save_data)
+                print(f"[DEBUG] GPS salva: id={guia_salva['id']}")
 
-        except Exception as e:
-            print(f"[ERROR] Falha na emissão híbrida: {e}")
-            raise e
+                return {**guia_salva, "linha_digitavel": linha_digitavel}
 
+            except Exception as e:
+                print(f"[ERROR] Falha na emissão híbrida: {e}")
+                raise e
+
+        guia, reaproveitada = await indice_idempotencia.obter_ou_emitir(chave, emitir_e_salvar)
+        if reaproveitada:
+            print(f"[INSS] Guia {competencia} reaproveitada (idempotência), sem nova emissão")
+        response.headers["Server-Timing"] = tempos.cabecalho()
+        return _resposta_emissao(guia, reaproveitada, avisos)
+
+    except HTTPException:
+        raise
+    except ArmazenamentoIndisponivel:
+        # Nada foi gravado nem indexado: a mesma requisição pode ser repetida
+        print(f"[INSS] [WARN] Storage indisponível, guia {guia_data.competencia} não registrada")
+        raise HTTPException(
+            status_code=503,
+            detail="Armazenamento do PDF indisponível. Tente novamente em instantes.",
+            headers={"Server-Timing": tempos.cabecalho()},
+        )
     except Exception as e:
         import traceback
         trace = traceback.format_exc()
         print(f"[INSS] [ERROR] Erro crítico em emitir_guia V2: {str(e)}")
         print(trace)
-        raise HTTPException(status_code=500, detail=f"Erro: {str(e)} | Tipo: {type(e).__name__}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro: {str(e)} | Tipo: {type(e).__name__}",
+            headers={"Server-Timing": tempos.cabecalho()},
+        )
 
 
 
 @router.post("/complementacao")
-async def emitir_complementacao(request: ComplementacaoRequest):
+async def emitir_complementacao(
+    request: ComplementacaoRequest,
+    supabase_service: SupabaseService = Depends(obter_supabase_service),
+    whatsapp_service: WhatsAppService = Depends(obter_whatsapp_service),
+):
     """
     Emite guia de complementação 11% → 20%.
     """
@@ -419,11 +504,14 @@ async def emitir_complementacao(request: ComplementacaoRequest):
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="WhatsApp inválido.")
 
         competencias = [normalizar_competencia(item) for item in request.competencias]
+        # Juros até o mês atual: meses fora do arquivo SELIC vêm do BCB (sem o
+        # SGS, o cálculo estima com a taxa da borda e sinaliza juros_estimados)
+        await calculator.selic.garantir_cobertura(date.today(), competencias)
         calculo = calculator.calcular_complementacao(competencias, request.valor_base)
         competencia_principal = competencias[-1]
         vencimento = calcular_vencimento_padrao(competencia_principal)
 
-        usuario = await _obter_ou_criar_usuario({"whatsapp": request.whatsapp, "tipo_contribuinte": "complementacao"})
+        usuario = await _obter_ou_criar_usuario(supabase_service, {"whatsapp": request.whatsapp, "tipo_contribuinte": "complementacao"})
 
         dados_pdf = {
             "nome": usuario.get("name") or usuario.get("nome"),
@@ -436,8 +524,8 @@ async def emitir_complementacao(request: ComplementacaoRequest):
             "vencimento": vencimento.strftime("%d/%m/%Y"),
         }
 
-        buffer = await run_in_threadpool(pdf_generator.gerar, dados_pdf)
-        pdf_bytes = buffer.getvalue()
+        pdf_bytes = await medir_etapa("pdf", pdf_render_pool.renderizar(dados_pdf))
+        pdf_url = await medir_etapa("armazenamento", supabase_service.armazenar_pdf(pdf_bytes, bucket="guias"))
 
         # Obter id do usuário de forma segura
         user_id_compl = usuario.get("id")
@@ -447,7 +535,7 @@ async def emitir_complementacao(request: ComplementacaoRequest):
                 detail=f"Usuário não possui ID válido para complementação. Usuario: {usuario}"
             )
         
-        guia_salva = await supabase_service.salvar_guia(
+        guia_salva = await medir_etapa("persistencia", supabase_service.salvar_guia(
             user_id=user_id_compl,
             guia_data={
                 "codigo_gps": calculo.codigo_gps,
@@ -455,15 +543,20 @@ async def emitir_complementacao(request: ComplementacaoRequest):
                 "valor": calculo.valor,
                 "status": "pendente",
                 "data_vencimento": vencimento.isoformat(),
+                "pdf_url": pdf_url,
             },
-        )
+        ))
 
         mensagem = (
             f"Complementação gerada (código {calculo.codigo_gps}). "
             f"Total com juros: R$ {calculo.valor:,.2f}. Vencimento {vencimento.strftime('%d/%m/%Y')}."
         )
+        if calculo.detalhes.get("juros_estimados"):
+            mensagem += " Juros estimados: as taxas SELIC mais recentes ainda não estavam disponíveis."
         
-        envio = await whatsapp_service.enviar_pdf_whatsapp(request.whatsapp, pdf_bytes, mensagem)
+        envio = await medir_etapa(
+            "whatsapp", whatsapp_service.enviar_pdf_whatsapp(request.whatsapp, pdf_bytes, mensagem, pdf_url=pdf_url)
+        )
 
         return {
             "guia": guia_salva,
@@ -1,17 +1,18 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 
+from ..dependencias import obter_supabase_service
 from ..services.supabase_service import SupabaseService
 from ..utils.validators import validar_whatsapp
 
 router = APIRouter(prefix="/api/v1/usuarios", tags=["Usuários"])
 
-supabase_service = SupabaseService()
-
 
 @router.get("/{whatsapp}/historico")
-async def buscar_historico(whatsapp: str):
+async def buscar_historico(
+    whatsapp: str, supabase_service: SupabaseService = Depends(obter_supabase_service)
+):
     """
     Retorna histórico de guias do usuário.
     """
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 
+from ..dependencias import obter_supabase_service, obter_whatsapp_service
 from ..services.ai_agent import INSSChatAgent
 from ..services.supabase_service import SupabaseService
 from ..services.whatsapp_service import WhatsAppService
@@ -9,13 +10,15 @@ from ..utils.validators import validar_whatsapp
 
 router = APIRouter(tags=["Webhook WhatsApp"])
 
-supabase_service = SupabaseService()
-whatsapp_service = WhatsAppService(supabase_service=supabase_service)
 chat_agent = INSSChatAgent()
 
 
 @router.post("/webhook/whatsapp")
-async def webhook_whatsapp(request: Request):
+async def webhook_whatsapp(
+    request: Request,
+    supabase_service: SupabaseService = Depends(obter_supabase_service),
+    whatsapp_service: WhatsAppService = Depends(obter_whatsapp_service),
+):
     """
     Webhook para receber mensagens do WhatsApp.
     """
@@ -146,6 +146,32 @@ class AuthService:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    def possui_papel(self, autenticacao: Dict[str, Any], papel: str) -> bool:
+        """
+        Verifica se a autenticação traz o papel nas claims do JWT.
+        
+        Aceita "role"/"roles" no topo do payload ou em app_metadata (Supabase).
+        API key e modo desenvolvimento não carregam papel.
+        
+        Args:
+            autenticacao: Retorno de verificar_autenticacao
+            papel: Papel exigido (ex: "admin")
+        
+        Returns:
+            True se o papel estiver presente, False caso contrário
+        """
+        if autenticacao.get("method") != "jwt":
+            return False
+        
+        payload = autenticacao.get("payload") or {}
+        for origem in (payload, payload.get("app_metadata") or {}):
+            papeis = origem.get("roles") or []
+            if isinstance(papeis, str):
+                papeis = [papeis]
+            if origem.get("role") == papel or papel in papeis:
+                return True
+        return False
+
 
 # Instância global do serviço de autenticação
 auth_service = AuthService()
@@ -0,0 +1,98 @@
+"""
+Backends locais do Supabase (PostgREST + Storage), do Twilio e do SGS (BCB).
+
+Permitem rodar a API e testes de carga sem o projeto Supabase e sem a conta
+Twilio, mantendo o custo de I/O visível: o SupabaseService faz as mesmas
+requisições HTTP (atendidas por um PostgREST sobre SQLite e um object store
+local) e o WhatsAppService chama o mesmo messages.create, ambos com latência
+injetada. Diferente do modo "Supabase indisponível", nenhuma chamada vira
+retorno em memória.
+
+Seleção (Settings / .env):
+- GPS_BACKEND_LOCAL=true: SupabaseService, WhatsAppService e a consulta SELIC ao SGS
+  usam os backends locais
+- GPS_BACKEND_LOCAL_DIR: diretório do SQLite e dos objetos (padrão: memória do processo)
+- GPS_BACKEND_LOCAL_SUPABASE_P50_MS / _P99_MS: latência do PostgREST e do Storage (padrão: 15 / 60)
+- GPS_BACKEND_LOCAL_TWILIO_P50_MS / _P99_MS: latência do envio de mensagens (padrão: 250 / 800)
+
+Com GPS_BACKEND_LOCAL_DIR, o banco pode ser semeado por outro processo antes
+da subida da API (ver benchmarks/carga.py).
+"""
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from ...config import Settings, get_settings
+from .armazenamento import ArmazenamentoLocal
+from .latencia import Latencia
+from .postgrest import ErroPostgREST, PostgRESTLocal
+from .sgs import SGSLocal
+from .transporte import SupabaseLocal
+from .twilio_local import MensagemLocal, TwilioLocal
+
+# Remetente do sandbox do Twilio, usado quando TWILIO_WHATSAPP_NUMBER não está configurado
+REMETENTE_LOCAL = "whatsapp:+14155238886"
+
+__all__ = [
+    "ArmazenamentoLocal",
+    "BackendsLocais",
+    "ErroPostgREST",
+    "Latencia",
+    "MensagemLocal",
+    "PostgRESTLocal",
+    "REMETENTE_LOCAL",
+    "SGSLocal",
+    "SupabaseLocal",
+    "TwilioLocal",
+    "obter_backends_locais",
+]
+
+
+class BackendsLocais:
+    """
+    Conjunto PostgREST + Storage + Twilio + SGS locais compartilhado pelo processo.
+
+    Uso:
+        backends = BackendsLocais(diretorio="/tmp/carga")
+        backends.postgrest.inserir("profiles", [{"whatsapp_phone": "5548991234567"}])
+        client = httpx.AsyncClient(base_url="http://supabase.local", transport=backends.supabase)
+    """
+
+    def __init__(
+        self,
+        diretorio: Optional[str] = None,
+        latencia_supabase: Optional[Latencia] = None,
+        latencia_twilio: Optional[Latencia] = None,
+    ) -> None:
+        self.diretorio = diretorio
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self.postgrest = PostgRESTLocal(os.path.join(diretorio, "postgrest.sqlite3") if diretorio else ":memory:")
+        self.armazenamento = ArmazenamentoLocal(os.path.join(diretorio, "storage") if diretorio else None)
+        self.supabase = SupabaseLocal(self.postgrest, self.armazenamento, latencia_supabase)
+        self.twilio = TwilioLocal(latencia_twilio)
+        self.sgs = SGSLocal()
+
+    @classmethod
+    def das_configuracoes(cls, settings: Settings) -> "BackendsLocais":
+        return cls(
+            diretorio=settings.backend_local_dir,
+            latencia_supabase=Latencia(settings.backend_local_supabase_p50_ms, settings.backend_local_supabase_p99_ms),
+            latencia_twilio=Latencia(settings.backend_local_twilio_p50_ms, settings.backend_local_twilio_p99_ms),
+        )
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            "diretorio": self.diretorio,
+            "supabase": self.supabase.metricas(),
+            "twilio": {"enviadas": self.twilio.total_enviadas, "latencia": repr(self.twilio.latencia)},
+        }
+
+
+@lru_cache()
+def obter_backends_locais() -> BackendsLocais:
+    """Backends locais do processo, montados a partir das Settings (GPS_BACKEND_LOCAL_*)."""
+
+    return BackendsLocais.das_configuracoes(get_settings())
@@ -0,0 +1,149 @@
+"""
+Storage local (API de objetos do Supabase Storage).
+
+Objetos ficam em memória ou em um diretório (<diretorio>/<bucket>/<caminho>),
+endereçados como no Storage real:
+
+- POST/PUT /storage/v1/object/<bucket>/<caminho>: upload (x-upsert: true sobrescreve)
+- HEAD/GET /storage/v1/object/{authenticated,public}/<bucket>/<caminho>
+- DELETE /storage/v1/object/<bucket>/<caminho>
+"""
+from __future__ import annotations
+
+import mimetypes
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote
+
+import httpx
+
+PREFIXO = "/storage/v1/object/"
+ACESSOS = ("authenticated/", "public/")
+
+
+class ArmazenamentoLocal:
+    """
+    Object store local com a semântica de upload do Supabase Storage.
+
+    Uso:
+        armazenamento = ArmazenamentoLocal()                 # em memória
+        armazenamento = ArmazenamentoLocal("/tmp/carga/objetos")
+    """
+
+    def __init__(self, diretorio: Optional[str] = None) -> None:
+        self.diretorio = Path(diretorio) if diretorio else None
+        self._objetos: Dict[str, Tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+        self.bytes_gravados = 0
+
+    def _arquivo(self, chave: str) -> Path:
+        return self.diretorio.joinpath(*chave.split("/"))  # type: ignore[union-attr]
+
+    @staticmethod
+    def _chave(bucket: str, caminho: str) -> str:
+        partes = [bucket, *caminho.split("/")]
+        if any(parte in ("", ".", "..") for parte in partes):
+            raise ValueError(f"Caminho inválido no Storage: {bucket}/{caminho}")
+        return "/".join(partes)
+
+    def salvar(self, bucket: str, caminho: str, conteudo: bytes, content_type: str = "application/octet-stream",
+               upsert: bool = False) -> bool:
+        """Grava o objeto; sem upsert, devolve False se ele já existir."""
+        chave = self._chave(bucket, caminho)
+        with self._lock:
+            if not upsert and self._existe(chave):
+                return False
+            if self.diretorio is None:
+                self._objetos[chave] = (bytes(conteudo), content_type)
+            else:
+                arquivo = self._arquivo(chave)
+                arquivo.parent.mkdir(parents=True, exist_ok=True)
+                arquivo.write_bytes(conteudo)
+            self.bytes_gravados += len(conteudo)
+        return True
+
+    def _existe(self, chave: str) -> bool:
+        if self.diretorio is None:
+            return chave in self._objetos
+        return self._arquivo(chave).is_file()
+
+    def existe(self, bucket: str, caminho: str) -> bool:
+        with self._lock:
+            return self._existe(self._chave(bucket, caminho))
+
+    def obter(self, bucket: str, caminho: str) -> Optional[Tuple[bytes, str]]:
+        """(conteúdo, content-type) ou None."""
+        chave = self._chave(bucket, caminho)
+        with self._lock:
+            if self.diretorio is None:
+                return self._objetos.get(chave)
+            arquivo = self._arquivo(chave)
+            if not arquivo.is_file():
+                return None
+            tipo = mimetypes.guess_type(arquivo.name)[0] or "application/octet-stream"
+            return arquivo.read_bytes(), tipo
+
+    def remover(self, bucket: str, caminho: str) -> bool:
+        chave = self._chave(bucket, caminho)
+        with self._lock:
+            if self.diretorio is None:
+                return self._objetos.pop(chave, None) is not None
+            arquivo = self._arquivo(chave)
+            if not arquivo.is_file():
+                return False
+            arquivo.unlink()
+            return True
+
+    def limpar(self) -> None:
+        """Remove todos os objetos (no diretório, só os arquivos; as pastas ficam)."""
+        with self._lock:
+            self._objetos.clear()
+            if self.diretorio is not None and self.diretorio.exists():
+                for arquivo in self.diretorio.rglob("*"):
+                    if arquivo.is_file():
+                        arquivo.unlink()
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self.diretorio is None:
+                return len(self._objetos)
+            return sum(1 for arquivo in self.diretorio.rglob("*") if arquivo.is_file()) if self.diretorio.exists() else 0
+
+    # ----- HTTP -----
+
+    def responder(self, request: httpx.Request) -> httpx.Response:
+        """Atende /storage/v1/object/..."""
+        caminho = unquote(request.url.path)[len(PREFIXO):]
+        for acesso in ACESSOS:
+            if caminho.startswith(acesso):
+                caminho = caminho[len(acesso):]
+                break
+        bucket, _, arquivo = caminho.partition("/")
+        try:
+            if request.method in ("POST", "PUT"):
+                upsert = request.method == "PUT" or request.headers.get("x-upsert", "").lower() == "true"
+                tipo = request.headers.get("content-type", "application/octet-stream")
+                if not self.salvar(bucket, arquivo, request.content, tipo, upsert=upsert):
+                    return httpx.Response(409, json={
+                        "statusCode": "409", "error": "Duplicate", "message": "The resource already exists",
+                    })
+                return httpx.Response(200, json={"Key": f"{bucket}/{arquivo}", "Id": str(uuid.uuid4())})
+            if request.method == "DELETE":
+                if not self.remover(bucket, arquivo):
+                    return _nao_encontrado()
+                return httpx.Response(200, json={"message": "Successfully deleted"})
+            objeto = self.obter(bucket, arquivo)
+        except ValueError as exc:
+            return httpx.Response(400, json={"statusCode": "400", "error": "InvalidKey", "message": str(exc)})
+        if objeto is None:
+            return _nao_encontrado()
+        conteudo, tipo = objeto
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={"content-type": tipo})
+        return httpx.Response(200, content=conteudo, headers={"content-type": tipo})
+
+
+def _nao_encontrado() -> httpx.Response:
+    return httpx.Response(404, json={"statusCode": "404", "error": "not_found", "message": "Object not found"})
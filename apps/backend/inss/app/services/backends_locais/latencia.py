@@ -0,0 +1,64 @@
+"""
+Latência injetada nas chamadas aos backends locais.
+
+Serviços remotos não respondem em tempo constante: a maioria das chamadas
+fica perto da mediana e uma cauda longa chega a várias vezes ela. A latência
+é sorteada de uma log-normal ajustada pela mediana (p50) e pelo p99, o que
+reproduz essa cauda nos testes de carga.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import time
+from typing import Optional
+
+# Quantil 0,99 da normal padrão
+_Z_P99 = 2.3263
+
+
+class Latencia:
+    """
+    Sorteador de latência (segundos) com mediana e p99 configuráveis.
+
+    Uso:
+        latencia = Latencia(p50_ms=20, p99_ms=120)
+        await latencia.aguardar()   # event loop (PostgREST, Storage)
+        latencia.bloquear()         # thread (cliente Twilio, bloqueante)
+    """
+
+    def __init__(self, p50_ms: float = 0.0, p99_ms: Optional[float] = None, semente: Optional[int] = None) -> None:
+        """
+        Args:
+            p50_ms: Mediana em milissegundos (0 = sem latência)
+            p99_ms: Percentil 99 em milissegundos (padrão: igual à mediana, latência constante)
+            semente: Semente do sorteio (reprodutibilidade)
+        """
+        self.p50_ms = max(p50_ms, 0.0)
+        self.p99_ms = max(p99_ms if p99_ms is not None else self.p50_ms, self.p50_ms)
+        self._mu = math.log(self.p50_ms / 1000) if self.p50_ms else 0.0
+        self._sigma = math.log(self.p99_ms / self.p50_ms) / _Z_P99 if self.p50_ms else 0.0
+        self._aleatorio = random.Random(semente)
+
+    def __bool__(self) -> bool:
+        return self.p50_ms > 0
+
+    def sortear(self) -> float:
+        """Uma latência em segundos."""
+        if not self.p50_ms:
+            return 0.0
+        if not self._sigma:
+            return self.p50_ms / 1000
+        return self._aleatorio.lognormvariate(self._mu, self._sigma)
+
+    async def aguardar(self) -> None:
+        if self.p50_ms:
+            await asyncio.sleep(self.sortear())
+
+    def bloquear(self) -> None:
+        if self.p50_ms:
+            time.sleep(self.sortear())
+
+    def __repr__(self) -> str:
+        return f"Latencia(p50_ms={self.p50_ms}, p99_ms={self.p99_ms})"
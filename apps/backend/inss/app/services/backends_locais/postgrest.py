@@ -0,0 +1,485 @@
+"""
+PostgREST local sobre SQLite.
+
+Cada tabela do PostgREST vira uma tabela SQLite (id, dados JSON), criada no
+primeiro acesso: não há schema a manter em sincronia com as migrações do
+Supabase. Os filtros da URL viram cláusulas SQL sobre json_extract, então
+consultas, contagens e paginação são executadas no banco, como no servidor
+real, e não em listas Python.
+
+Suportado (o que a aplicação usa):
+- GET/HEAD com select, filtros eq, neq, gt, gte, lt, lte, like, ilike, in, is
+  (e not.<operador>), order, limit, offset e Prefer: count=exact;
+- POST (objeto ou lista) com on_conflict e Prefer: resolution=merge-duplicates
+  ou ignore-duplicates; id (uuid4) e created_at são preenchidos se ausentes;
+- índices únicos das migrações (INDICES_UNICOS_PADRAO, parciais com
+  PREDICADOS_UNICOS_PADRAO): insert duplicado devolve 409 (23505), como no Postgres;
+- PATCH e DELETE filtrados;
+- RPC: funções Python registradas (incrementar_estatisticas_gps e
+  recalcular_estatisticas_mes_gps por padrão).
+
+Prefer: return=representation devolve as linhas; sem ele, 201/204 sem corpo.
+Erros seguem o corpo do PostgREST ({"code", "message", "details", "hint"}).
+"""
+from __future__ import annotations
+
+import csv
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+IDENTIFICADOR = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+PARAMETROS_RESERVADOS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+OPERADORES_COMPARACAO = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+Filtro = Tuple[str, str]
+FuncaoRPC = Callable[["PostgRESTLocal", Dict[str, Any]], Any]
+
+# Índices únicos além do id (espelham as migrações do Supabase)
+INDICES_UNICOS_PADRAO: Dict[str, Tuple[Tuple[str, ...], ...]] = {
+    "guias_inss": (("idempotency_key",),),
+}
+
+# Predicado dos índices únicos parciais (WHERE do CREATE UNIQUE INDEX), em filtros PostgREST
+PREDICADOS_UNICOS_PADRAO: Dict[str, Tuple[Filtro, ...]] = {
+    "guias_inss": (("status", "neq.cancelada"),),
+}
+
+
+class ErroPostgREST(RuntimeError):
+    """Erro devolvido ao cliente com status e corpo no formato do PostgREST."""
+
+    def __init__(self, status: int, codigo: str, mensagem: str) -> None:
+        super().__init__(mensagem)
+        self.status = status
+        self.codigo = codigo
+
+    def resposta(self) -> httpx.Response:
+        return httpx.Response(
+            self.status,
+            json={"code": self.codigo, "message": str(self), "details": None, "hint": None},
+        )
+
+
+def _identificador(nome: str) -> str:
+    if not IDENTIFICADOR.match(nome):
+        raise ErroPostgREST(400, "PGRST100", f"Identificador inválido: {nome!r}")
+    return nome
+
+
+def _numero(valor: str) -> Optional[float]:
+    try:
+        return float(valor)
+    except ValueError:
+        return None
+
+
+def _preferencias(request: httpx.Request) -> Dict[str, str]:
+    """Prefer: return=representation, count=exact -> {"return": ..., "count": ...}."""
+    preferencias = {}
+    for item in request.headers.get("prefer", "").split(","):
+        chave, _, valor = item.strip().partition("=")
+        if chave:
+            preferencias[chave] = valor
+    return preferencias
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class _Condicao:
+    """Traduz um filtro do PostgREST (coluna, "op.valor") para SQL sobre o JSON."""
+
+    def __init__(self, coluna: str) -> None:
+        caminho = f"'$.{_identificador(coluna)}'"
+        self.campo = f"json_extract(dados, {caminho})"
+        self.tipo = f"json_type(dados, {caminho})"
+        # Booleanos do JSON comparados como no PostgREST (eq.true), não como 1/0
+        self.texto = (
+            f"(CASE {self.tipo} WHEN 'true' THEN 'true' WHEN 'false' THEN 'false' "
+            f"ELSE CAST({self.campo} AS TEXT) END)"
+        )
+
+    def igual(self, valor: str) -> Tuple[str, List[Any]]:
+        numero = _numero(valor)
+        if numero is None:
+            return f"{self.texto} = ?", [valor]
+        return f"(({self.tipo} IN ('integer', 'real') AND {self.campo} = ?) OR {self.texto} = ?)", [numero, valor]
+
+    def sql(self, expressao: str) -> Tuple[str, List[Any]]:
+        operador, _, valor = expressao.partition(".")
+        if operador == "not":
+            sql, parametros = self.sql(valor)
+            return f"NOT ({sql})", parametros
+
+        if operador == "eq":
+            return self.igual(valor)
+        if operador == "neq":
+            sql, parametros = self.igual(valor)
+            return f"({self.campo} IS NOT NULL AND NOT {sql})", parametros
+        if operador in OPERADORES_COMPARACAO:
+            simbolo = OPERADORES_COMPARACAO[operador]
+            numero = _numero(valor)
+            if numero is None:
+                return f"{self.texto} {simbolo} ?", [valor]
+            return f"({self.tipo} IN ('integer', 'real') AND {self.campo} {simbolo} ?)", [numero]
+        if operador == "in":
+            if not (valor.startswith("(") and valor.endswith(")")):
+                raise ErroPostgREST(400, "PGRST100", f"Lista inválida em in: {valor!r}")
+            itens = next(csv.reader([valor[1:-1]]), []) if valor[1:-1] else []
+            if not itens:
+                return "0", []
+            partes = [self.igual(item) for item in itens]
+            return "(" + " OR ".join(sql for sql, _ in partes) + ")", [p for _, ps in partes for p in ps]
+        if operador == "is":
+            if valor == "null":
+                return f"{self.campo} IS NULL", []
+            if valor in ("true", "false"):
+                return f"{self.tipo} = ?", [valor]
+            if valor == "unknown":
+                return f"{self.campo} IS NULL", []
+        if operador == "like":
+            return f"{self.texto} GLOB ?", [valor]
+        if operador == "ilike":
+            return f"{self.texto} LIKE ?", [valor.replace("*", "%")]
+        raise ErroPostgREST(400, "PGRST100", f"Filtro não suportado: {expressao!r}")
+
+
+class PostgRESTLocal:
+    """
+    Banco PostgREST em SQLite (memória ou arquivo).
+
+    A API Python (inserir, consultar, contar, atualizar, remover) é a mesma que
+    atende as requisições HTTP e serve para semear dados antes de um teste.
+
+    Uso:
+        postgrest = PostgRESTLocal()                      # em memória
+        postgrest = PostgRESTLocal("/tmp/carga/db.sqlite3")  # compartilhável entre processos
+        postgrest.inserir("profiles", [{"whatsapp_phone": "5548991234567"}])
+    """
+
+    def __init__(self, caminho: str = ":memory:") -> None:
+        self.caminho = caminho
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        if caminho != ":memory:":
+            # Leitores de outros processos (semeadura, inspeção) não bloqueiam a API
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=OFF")
+        self._lock = threading.RLock()
+        self._tabelas: set = set()
+        self._rpcs: Dict[str, FuncaoRPC] = dict(RPCS_PADRAO)
+        self._unicos = dict(INDICES_UNICOS_PADRAO)
+        self._predicados_unicos = dict(PREDICADOS_UNICOS_PADRAO)
+
+    # ----- Estrutura -----
+
+    def _tabela(self, tabela: str) -> str:
+        if tabela not in self._tabelas:
+            self._conexao.execute(
+                f'CREATE TABLE IF NOT EXISTS "{_identificador(tabela)}" '
+                "(id TEXT PRIMARY KEY, dados TEXT NOT NULL)"
+            )
+            self._tabelas.add(tabela)
+        return f'"{tabela}"'
+
+    def _where(self, filtros: Iterable[Filtro]) -> Tuple[str, List[Any]]:
+        clausulas, parametros = [], []
+        for coluna, expressao in filtros:
+            sql, valores = _Condicao(coluna).sql(expressao)
+            clausulas.append(sql)
+            parametros.extend(valores)
+        return (" WHERE " + " AND ".join(clausulas)) if clausulas else "", parametros
+
+    @staticmethod
+    def _order(ordem: Optional[str]) -> str:
+        if not ordem:
+            return " ORDER BY rowid"
+        termos = []
+        for termo in ordem.split(","):
+            coluna, *modificadores = termo.strip().split(".")
+            direcao = "DESC" if "desc" in modificadores else "ASC"
+            # Padrão do Postgres: nulos por último em ASC, primeiro em DESC
+            nulos = "FIRST" if direcao == "DESC" else "LAST"
+            if "nullsfirst" in modificadores:
+                nulos = "FIRST"
+            elif "nullslast" in modificadores:
+                nulos = "LAST"
+            termos.append(f"{_Condicao(coluna).campo} {direcao} NULLS {nulos}")
+        return " ORDER BY " + ", ".join(termos) + ", rowid"
+
+    def registrar_rpc(self, nome: str, funcao: FuncaoRPC) -> None:
+        """Registra uma função chamada por POST /rest/v1/rpc/<nome>."""
+        self._rpcs[nome] = funcao
+
+    # ----- Operações -----
+
+    def consultar(
+        self,
+        tabela: str,
+        filtros: Sequence[Filtro] = (),
+        ordem: Optional[str] = None,
+        limite: Optional[int] = None,
+        offset: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            nome = self._tabela(tabela)
+            where, parametros = self._where(filtros)
+            sql = f"SELECT dados FROM {nome}{where}{self._order(ordem)}"
+            if limite is not None or offset:
+                sql += " LIMIT ? OFFSET ?"
+                parametros += [-1 if limite is None else limite, offset or 0]
+            linhas = self._conexao.execute(sql, parametros).fetchall()
+        return [json.loads(dados) for (dados,) in linhas]
+
+    def contar(self, tabela: str, filtros: Sequence[Filtro] = ()) -> int:
+        with self._lock:
+            nome = self._tabela(tabela)
+            where, parametros = self._where(filtros)
+            return self._conexao.execute(f"SELECT COUNT(*) FROM {nome}{where}", parametros).fetchone()[0]
+
+    def inserir(
+        self,
+        tabela: str,
+        registros: Sequence[Dict[str, Any]],
+        on_conflict: Sequence[str] = ("id",),
+        resolucao: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Insere registros (transação única).
+
+        Args:
+            on_conflict: Colunas únicas usadas para detectar duplicatas
+            resolucao: "merge-duplicates" (upsert), "ignore-duplicates" ou None
+
+        Raises:
+            ErroPostgREST: 409 (23505) em duplicata sem resolução
+        """
+        inseridos = []
+        with self._lock:
+            nome = self._tabela(tabela)
+            self._conexao.execute("BEGIN")
+            try:
+                for registro in registros:
+                    linha = {"id": str(uuid.uuid4()), "created_at": _agora(), **registro}
+                    existente = self._existente(nome, linha, on_conflict)
+                    if existente is None:
+                        self._verificar_unicos(tabela, nome, linha)
+                        self._conexao.execute(
+                            f"INSERT INTO {nome} (id, dados) VALUES (?, ?)",
+                            (str(linha["id"]), json.dumps(linha, default=str)),
+                        )
+                        inseridos.append(linha)
+                    elif resolucao == "merge-duplicates":
+                        rowid, atual = existente
+                        atual.update(registro)
+                        self._gravar(nome, rowid, atual)
+                        inseridos.append(atual)
+                    elif resolucao != "ignore-duplicates":
+                        raise ErroPostgREST(
+                            409, "23505", f'duplicate key value violates unique constraint "{tabela}_{"_".join(on_conflict)}_key"'
+                        )
+                self._conexao.execute("COMMIT")
+            except BaseException:
+                self._conexao.execute("ROLLBACK")
+                raise
+        return inseridos
+
+    def _verificar_unicos(self, tabela: str, nome: str, linha: Dict[str, Any]) -> None:
+        predicado = self._predicados_unicos.get(tabela, ())
+        if predicado:
+            # Índice parcial: a linha nova só conflita se também estiver no índice
+            where, parametros = self._where(predicado)
+            dentro = self._conexao.execute(
+                f"SELECT 1 FROM (SELECT ? AS dados){where}", [json.dumps(linha, default=str), *parametros]
+            ).fetchone()
+            if dentro is None:
+                return
+        for colunas in self._unicos.get(tabela, ()):
+            if self._existente(nome, linha, colunas, predicado) is not None:
+                raise ErroPostgREST(
+                    409, "23505", f'duplicate key value violates unique constraint "idx_{tabela}_{"_".join(colunas)}"'
+                )
+
+    def _existente(
+        self, nome: str, linha: Dict[str, Any], colunas: Sequence[str], predicado: Sequence[Filtro] = ()
+    ) -> Optional[Tuple[int, Dict[str, Any]]]:
+        if tuple(colunas) == ("id",):
+            encontrado = self._conexao.execute(f"SELECT rowid, dados FROM {nome} WHERE id = ?", (str(linha["id"]),)).fetchone()
+        else:
+            if any(linha.get(coluna) is None for coluna in colunas):
+                return None  # NULL nunca conflita em índices únicos
+            filtros = [(coluna, f"eq.{_valor_filtro(linha[coluna])}") for coluna in colunas]
+            where, parametros = self._where([*filtros, *predicado])
+            encontrado = self._conexao.execute(f"SELECT rowid, dados FROM {nome}{where} LIMIT 1", parametros).fetchone()
+        return (encontrado[0], json.loads(encontrado[1])) if encontrado else None
+
+    def _gravar(self, nome: str, rowid: int, linha: Dict[str, Any]) -> None:
+        self._conexao.execute(
+            f"UPDATE {nome} SET id = ?, dados = ? WHERE rowid = ?",
+            (str(linha.get("id")), json.dumps(linha, default=str), rowid),
+        )
+
+    def atualizar(self, tabela: str, filtros: Sequence[Filtro], alteracoes: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            nome = self._tabela(tabela)
+            where, parametros = self._where(filtros)
+            alteradas = []
+            self._conexao.execute("BEGIN")
+            try:
+                for rowid, dados in self._conexao.execute(f"SELECT rowid, dados FROM {nome}{where}", parametros).fetchall():
+                    linha = {**json.loads(dados), **alteracoes}
+                    self._gravar(nome, rowid, linha)
+                    alteradas.append(linha)
+                self._conexao.execute("COMMIT")
+            except BaseException:
+                self._conexao.execute("ROLLBACK")
+                raise
+        return alteradas
+
+    def remover(self, tabela: str, filtros: Sequence[Filtro] = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            nome = self._tabela(tabela)
+            where, parametros = self._where(filtros)
+            removidas = [json.loads(dados) for (dados,) in self._conexao.execute(f"SELECT dados FROM {nome}{where}", parametros)]
+            self._conexao.execute(f"DELETE FROM {nome}{where}", parametros)
+        return removidas
+
+    def limpar(self, tabela: Optional[str] = None) -> None:
+        """Esvazia uma tabela (ou todas as já acessadas)."""
+        with self._lock:
+            for nome in ([tabela] if tabela else list(self._tabelas)):
+                self._conexao.execute(f"DELETE FROM {self._tabela(nome)}")
+
+    def rpc(self, nome: str, parametros: Dict[str, Any]) -> Any:
+        funcao = self._rpcs.get(nome)
+        if funcao is None:
+            raise ErroPostgREST(404, "PGRST202", f"Could not find the function public.{nome}")
+        with self._lock:
+            return funcao(self, parametros)
+
+    def fechar(self) -> None:
+        with self._lock:
+            self._conexao.close()
+
+    # ----- HTTP -----
+
+    def responder(self, request: httpx.Request, recurso: str) -> httpx.Response:
+        """Atende /rest/v1/<recurso> (recurso = tabela ou rpc/<funcao>)."""
+        try:
+            if recurso.startswith("rpc/"):
+                if request.method != "POST":
+                    raise ErroPostgREST(405, "PGRST101", "Only POST is supported for functions here")
+                resultado = self.rpc(recurso[len("rpc/"):], json.loads(request.content or b"{}"))
+                if resultado is None:
+                    return httpx.Response(204)
+                return httpx.Response(200, json=resultado)
+            return self._responder_tabela(request, recurso)
+        except ErroPostgREST as exc:
+            return exc.resposta()
+
+    def _responder_tabela(self, request: httpx.Request, tabela: str) -> httpx.Response:
+        params = request.url.params
+        filtros = [(coluna, valor) for coluna, valor in params.multi_items() if coluna not in PARAMETROS_RESERVADOS]
+        preferencias = _preferencias(request)
+        representacao = preferencias.get("return") == "representation"
+
+        if request.method in ("GET", "HEAD"):
+            limite = int(params["limit"]) if "limit" in params else None
+            offset = int(params.get("offset", 0))
+            linhas = self.consultar(tabela, filtros, params.get("order"), limite, offset)
+            cabecalhos = {"content-range": self._content_range(tabela, filtros, offset, len(linhas), preferencias)}
+            if request.method == "HEAD":
+                return httpx.Response(200, headers=cabecalhos)
+            return httpx.Response(200, json=_projetar(linhas, params.get("select", "*")), headers=cabecalhos)
+
+        corpo = json.loads(request.content or b"null")
+        if request.method == "POST":
+            registros = corpo if isinstance(corpo, list) else [corpo]
+            on_conflict = tuple(params["on_conflict"].split(",")) if "on_conflict" in params else ("id",)
+            linhas = self.inserir(tabela, registros, on_conflict, preferencias.get("resolution"))
+            status = 201
+        elif request.method == "PATCH":
+            linhas, status = self.atualizar(tabela, filtros, corpo or {}), 200
+        elif request.method == "DELETE":
+            linhas, status = self.remover(tabela, filtros), 200
+        else:
+            raise ErroPostgREST(405, "PGRST117", f"Unsupported HTTP method: {request.method}")
+
+        if not representacao:
+            return httpx.Response(201 if status == 201 else 204)
+        return httpx.Response(status, json=_projetar(linhas, params.get("select", "*")))
+
+    def _content_range(
+        self, tabela: str, filtros: Sequence[Filtro], offset: int, quantidade: int, preferencias: Dict[str, str]
+    ) -> str:
+        total = str(self.contar(tabela, filtros)) if preferencias.get("count") == "exact" else "*"
+        if not quantidade:
+            return f"*/{total}"
+        return f"{offset}-{offset + quantidade - 1}/{total}"
+
+
+def _valor_filtro(valor: Any) -> str:
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    return str(valor)
+
+
+def _projetar(linhas: List[Dict[str, Any]], select: str) -> List[Dict[str, Any]]:
+    colunas = [coluna.strip() for coluna in select.split(",") if coluna.strip()]
+    if not colunas or "*" in colunas:
+        return linhas
+    for coluna in colunas:
+        _identificador(coluna)  # alias, cast e recursos embutidos não são suportados
+    return [{coluna: linha.get(coluna) for coluna in colunas} for linha in linhas]
+
+
+# ----- RPCs padrão (espelham as funções SQL das migrações) -----
+
+_CONTADORES_ESTATISTICAS = (
+    "total_emitidas", "emitidas_local", "emitidas_sal_validado", "emitidas_sal_oficial",
+    "validacoes_sal", "divergencias", "divergencias_resolvidas",
+)
+
+def _incrementar_estatisticas_gps(postgrest: PostgRESTLocal, parametros: Dict[str, Any]) -> None:
+    """Soma os deltas nos buckets do dia e do mês em gps_estatisticas."""
+    data_ref = str(parametros["data_ref"])
+    deltas = parametros.get("deltas") or {}
+    for granularidade, data in (("dia", data_ref), ("mes", data_ref[:8] + "01")):
+        filtros = [("granularidade", f"eq.{granularidade}"), ("data", f"eq.{data}")]
+        existentes = postgrest.consultar("gps_estatisticas", filtros, limite=1)
+        if existentes:
+            atual = existentes[0]
+            postgrest.atualizar("gps_estatisticas", filtros, {
+                coluna: (atual.get(coluna) or 0) + int(valor) for coluna, valor in deltas.items()
+            })
+        else:
+            postgrest.inserir("gps_estatisticas", [{"granularidade": granularidade, "data": data, **deltas}])
+
+
+def _recalcular_estatisticas_mes_gps(postgrest: PostgRESTLocal, parametros: Dict[str, Any]) -> None:
+    """Refaz o bucket mensal de gps_estatisticas somando os buckets diários do mês."""
+    mes = str(parametros["mes_ref"])[:8] + "01"
+    dias = [
+        linha for linha in postgrest.consultar("gps_estatisticas", [("granularidade", "eq.dia")])
+        if str(linha.get("data", "")).startswith(mes[:8])
+    ]
+    soma = {coluna: sum(linha.get(coluna) or 0 for linha in dias) for coluna in _CONTADORES_ESTATISTICAS}
+    postgrest.inserir(
+        "gps_estatisticas",
+        [{"granularidade": "mes", "data": mes, **soma}],
+        on_conflict=("granularidade", "data"),
+        resolucao="merge-duplicates",
+    )
+
+
+RPCS_PADRAO: Dict[str, FuncaoRPC] = {
+    "incrementar_estatisticas_gps": _incrementar_estatisticas_gps,
+    "recalcular_estatisticas_mes_gps": _recalcular_estatisticas_mes_gps,
+}
@@ -0,0 +1,55 @@
+"""
+Transporte httpx que atende a API de séries do SGS (Banco Central) localmente.
+
+Responde à consulta da taxa SELIC mensal feita pelo RegistroSelic quando a
+tabela versionada não cobre o mês de pagamento: um item por mês do intervalo
+pedido, todos com a mesma taxa. Só para testes de carga sem rede; em
+produção os meses vêm do SGS.
+"""
+from __future__ import annotations
+
+import json
+from datetime import date
+from typing import Optional
+
+import httpx
+
+from .latencia import Latencia
+
+
+def _taxa_mais_recente() -> float:
+    from ..selic_service import ARQUIVO_PADRAO
+
+    with open(ARQUIVO_PADRAO, encoding="utf-8") as arquivo:
+        taxas = json.load(arquivo)["taxas_percentuais"]
+    return float(taxas[max(taxas)])
+
+
+class SGSLocal(httpx.AsyncBaseTransport):
+    """
+    Uso:
+        transporte = SGSLocal(taxa_percentual=1.0)
+        client = httpx.AsyncClient(transport=transporte)
+    """
+
+    def __init__(self, taxa_percentual: Optional[float] = None, latencia: Optional[Latencia] = None) -> None:
+        # Padrão: a taxa do último mês da tabela versionada
+        self.taxa_percentual = _taxa_mais_recente() if taxa_percentual is None else taxa_percentual
+        self.latencia = latencia or Latencia()
+        self.consultas = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.latencia.aguardar()
+        self.consultas += 1
+        try:
+            _, mes, ano = request.url.params["dataInicial"].split("/")
+            dia_fim, mes_fim, ano_fim = request.url.params["dataFinal"].split("/")
+            atual, fim = date(int(ano), int(mes), 1), date(int(ano_fim), int(mes_fim), int(dia_fim))
+        except (KeyError, ValueError):
+            return httpx.Response(400, json={"erro": "dataInicial e dataFinal no formato dd/MM/aaaa"})
+
+        itens = []
+        while atual <= fim:
+            itens.append({"data": atual.strftime("%d/%m/%Y"), "valor": f"{self.taxa_percentual:.2f}"})
+            atual = date(atual.year + atual.month // 12, atual.month % 12 + 1, 1)
+        return httpx.Response(200, json=itens)
@@ -0,0 +1,63 @@
+"""
+Transporte httpx que atende o Supabase localmente (PostgREST + Storage).
+
+O SupabaseService continua montando as mesmas requisições HTTP (URLs, filtros,
+headers Prefer); só o transporte muda. Assim o teste de carga exercita o
+cliente, a serialização JSON e o pool de conexões da aplicação, e a latência
+injetada substitui a ida e volta até o projeto real.
+
+As operações no SQLite rodam no event loop: em memória levam microssegundos,
+bem abaixo da latência injetada.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .armazenamento import PREFIXO as PREFIXO_STORAGE
+from .armazenamento import ArmazenamentoLocal
+from .latencia import Latencia
+from .postgrest import PostgRESTLocal
+
+PREFIXO_REST = "/rest/v1/"
+
+
+class SupabaseLocal(httpx.AsyncBaseTransport):
+    """
+    Uso:
+        transporte = SupabaseLocal(latencia=Latencia(p50_ms=15, p99_ms=60))
+        client = httpx.AsyncClient(base_url="http://supabase.local", transport=transporte)
+    """
+
+    def __init__(
+        self,
+        postgrest: Optional[PostgRESTLocal] = None,
+        armazenamento: Optional[ArmazenamentoLocal] = None,
+        latencia: Optional[Latencia] = None,
+    ) -> None:
+        self.postgrest = postgrest or PostgRESTLocal()
+        self.armazenamento = armazenamento or ArmazenamentoLocal()
+        self.latencia = latencia or Latencia()
+        self.requisicoes: Dict[str, int] = {"rest": 0, "storage": 0, "outras": 0}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        await self.latencia.aguardar()
+        caminho = request.url.path
+        if caminho.startswith(PREFIXO_REST):
+            self.requisicoes["rest"] += 1
+            return self.postgrest.responder(request, caminho[len(PREFIXO_REST):])
+        if caminho.startswith(PREFIXO_STORAGE):
+            self.requisicoes["storage"] += 1
+            return self.armazenamento.responder(request)
+        self.requisicoes["outras"] += 1
+        return httpx.Response(404, json={"message": "no Route matched with those values"})
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            "requisicoes": dict(self.requisicoes),
+            "objetos": len(self.armazenamento),
+            "bytes_gravados": self.armazenamento.bytes_gravados,
+            "latencia": repr(self.latencia),
+        }
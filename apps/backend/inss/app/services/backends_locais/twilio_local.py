@@ -0,0 +1,93 @@
+"""
+Cliente Twilio local (mesma interface de client.messages.create).
+
+Como o cliente real, create é bloqueante e o WhatsAppService o chama via
+asyncio.to_thread: a latência injetada ocupa uma thread do pool, que é o
+custo real de cada envio sob carga.
+"""
+from __future__ import annotations
+
+import itertools
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+
+from twilio.base.exceptions import TwilioRestException
+
+from .latencia import Latencia
+
+URI_MENSAGENS = "/2010-04-01/Accounts/ACLOCAL/Messages.json"
+DESTINO_WHATSAPP = re.compile(r"^whatsapp:\+?\d{10,15}$")
+
+
+@dataclass
+class MensagemLocal:
+    """Campos da MessageInstance do Twilio usados pela aplicação."""
+
+    sid: str
+    to: str
+    from_: str
+    body: Optional[str]
+    media_url: List[str] = field(default_factory=list)
+    status: str = "queued"
+    date_created: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class _MensagensLocais:
+    def __init__(self, cliente: "TwilioLocal") -> None:
+        self._cliente = cliente
+
+    def create(
+        self,
+        to: str,
+        from_: Optional[str] = None,
+        body: Optional[str] = None,
+        media_url: Optional[List[str]] = None,
+        **_: object,
+    ) -> MensagemLocal:
+        """
+        Raises:
+            TwilioRestException: 400 com os códigos do Twilio (21211, 21602, 21606)
+        """
+        self._cliente.latencia.bloquear()
+        if not to or not DESTINO_WHATSAPP.match(to):
+            raise TwilioRestException(400, URI_MENSAGENS, f"The 'To' number {to} is not a valid phone number.", 21211, "POST")
+        if not from_ or not from_.startswith("whatsapp:"):
+            raise TwilioRestException(400, URI_MENSAGENS, "The From phone number is not a valid WhatsApp sender.", 21606, "POST")
+        if not body and not media_url:
+            raise TwilioRestException(400, URI_MENSAGENS, "Message body is required.", 21602, "POST")
+        return self._cliente._registrar(to, from_, body, list(media_url or []))
+
+
+class TwilioLocal:
+    """
+    Substituto do twilio.rest.Client para envios de WhatsApp.
+
+    Uso:
+        twilio = TwilioLocal(Latencia(p50_ms=250, p99_ms=900))
+        twilio.messages.create(from_="whatsapp:+14155238886", to="whatsapp:+5548...", body="...")
+        twilio.enviadas[-1].sid
+    """
+
+    def __init__(self, latencia: Optional[Latencia] = None, historico: int = 10_000) -> None:
+        """
+        Args:
+            latencia: Latência de cada create (padrão: nenhuma)
+            historico: Últimas mensagens mantidas em enviadas (memória limitada sob carga)
+        """
+        self.latencia = latencia or Latencia()
+        self.messages = _MensagensLocais(self)
+        self.enviadas: Deque[MensagemLocal] = deque(maxlen=historico)
+        self.total_enviadas = 0
+        self._sequencia = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _registrar(self, to: str, from_: str, body: Optional[str], media_url: List[str]) -> MensagemLocal:
+        with self._lock:
+            mensagem = MensagemLocal(sid=f"SM{next(self._sequencia):032x}", to=to, from_=from_, body=body, media_url=media_url)
+            self.enviadas.append(mensagem)
+            self.total_enviadas += 1
+        return mensagem
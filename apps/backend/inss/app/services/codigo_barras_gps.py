@@ -1,6 +1,61 @@
 """
 Gerador de código de barras GPS - VERSÃO FINAL CORRIGIDA
 """
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import digito_verificador as dv_kernel
+from ..utils.dinheiro import Centavos, ValorReais
+
+
+@dataclass
+class GPSBarcodeTrace:
+    """
+    Coletor opcional de diagnóstico da geração do código de barras GPS.
+
+    Passado por chamada (gerar(..., trace=GPSBarcodeTrace())); sem ele a
+    geração não faz nenhum I/O nem monta strings de debug.
+    """
+    etapas: List[Dict[str, Any]] = field(default_factory=list)
+    avisos: List[str] = field(default_factory=list)
+    inicio: float = field(default_factory=time.perf_counter)
+
+    def registrar(self, etapa: str, **dados: Any) -> None:
+        """Registra uma etapa com seus valores intermediários e o tempo decorrido."""
+        self.etapas.append({
+            "etapa": etapa,
+            "t_ms": round((time.perf_counter() - self.inicio) * 1000, 4),
+            **dados
+        })
+
+    def avisar(self, mensagem: str) -> None:
+        """Registra um aviso (ex: valor suspeito)."""
+        self.avisos.append(mensagem)
+
+    def etapa(self, nome: str) -> Optional[Dict[str, Any]]:
+        """Retorna a última etapa registrada com o nome informado."""
+        for registro in reversed(self.etapas):
+            if registro["etapa"] == nome:
+                return registro
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representação serializável (para logs estruturados)."""
+        return {"etapas": list(self.etapas), "avisos": list(self.avisos)}
+
+    def formatar(self) -> str:
+        """Texto legível com todas as etapas, para depuração manual."""
+        linhas = ["[GPS] DEBUG - GERANDO GPS"]
+        for registro in self.etapas:
+            dados = ", ".join(f"{k}={v}" for k, v in registro.items() if k not in ("etapa", "t_ms"))
+            linhas.append(f"   {registro['etapa']} (+{registro['t_ms']}ms): {dados}")
+        for aviso in self.avisos:
+            linhas.append(f"   AVISO: {aviso}")
+        return "\n".join(linhas)
+
 
 class CodigoBarrasGPS:
     """Gerador correto de código de barras GPS"""
@@ -11,27 +66,9 @@ class CodigoBarrasGPS:
         Calcula DV Módulo 11 (posição 4 do código de barras)
         GPS tem 44 dígitos: 43 sem DV + 1 DV na posição 4
         Regra: Pesos de 2 a 9 da DIREITA para a ESQUERDA
+        Resto 0 ou 1 => DV = 1 (Padrão Febraban Arrecadação)
         """
-        if len(codigo_sem_dv) != 43:
-            raise ValueError(f"Código sem DV deve ter 43 dígitos, tem {len(codigo_sem_dv)}")
-
-        sequencia = [2, 3, 4, 5, 6, 7, 8, 9]
-        soma = 0
-        
-        # Itera da direita para a esquerda
-        for i, d in enumerate(reversed(codigo_sem_dv)):
-            soma += int(d) * sequencia[i % 8]
-            
-        resto = soma % 11
-        
-        # Regra geral:
-        # Resto 0 ou 1 => DV = 1 (Padrão Febraban Arrecadação)
-        # Resto > 1 => DV = 11 - resto
-        
-        dv = 11 - resto
-        if dv >= 10:
-            return "1"
-        return str(dv)
+        return str(dv_kernel.dv_modulo11_geral(codigo_sem_dv))
 
     @staticmethod
     def calcular_dv_modulo10(campo: str) -> str:
@@ -39,25 +76,7 @@ class CodigoBarrasGPS:
         Calcula DV Módulo 10 (DVs da linha digitável para ID de Valor 6 ou 7)
         Aplica da DIREITA para ESQUERDA
         """
-        if len(campo) != 11:
-            raise ValueError(f"Campo deve ter 11 dígitos, tem {len(campo)}")
-
-        soma = 0
-        multiplicador = 2
-
-        # Da DIREITA para ESQUERDA
-        for i in range(len(campo) - 1, -1, -1):
-            digito = int(campo[i])
-            produto = digito * multiplicador
-
-            if produto >= 10:
-                produto = (produto // 10) + (produto % 10)
-
-            soma += produto
-            multiplicador = 1 if multiplicador == 2 else 2
-
-        resto = soma % 10
-        return "0" if resto == 0 else str(10 - resto)
+        return str(dv_kernel.dv_modulo10(campo))
 
     @staticmethod
     def calcular_dv_modulo11_bloco(campo: str) -> str:
@@ -65,69 +84,87 @@ class CodigoBarrasGPS:
         Calcula DV Módulo 11 para blocos da linha digitável (ID de Valor 8 ou 9)
         Usado para GPS de arrecadação (código 8x...)
         Sequência: 2-9 da direita para esquerda
+        Resto 0 ou 1 = DV 0
         """
-        if len(campo) != 11:
-            raise ValueError(f"Campo deve ter 11 dígitos, tem {len(campo)}")
-
-        sequencia = [2, 3, 4, 5, 6, 7, 8, 9]
-        soma = 0
-
-        # Da DIREITA para ESQUERDA
-        for i in range(len(campo) - 1, -1, -1):
-            digito = int(campo[i])
-            mult = sequencia[(len(campo) - 1 - i) % 8]  # Ciclo 2-9
-            soma += digito * mult
-
-        resto = soma % 11
-
-        # Regra específica GPS/Arrecadação:
-        # Resto 0 ou 1 = DV 0
-        # Resto 2-10 = DV = 11 - resto
-        if resto == 0 or resto == 1:
-            return "0"
-        else:
-            return str(11 - resto)
+        return str(dv_kernel.dv_modulo11_bloco(campo))
 
     @classmethod
     def gerar(cls, codigo_pagamento: str, competencia: str,
-              valor: float, nit: str) -> dict:
+              valor: ValorReais, nit: str, trace: Optional[GPSBarcodeTrace] = None) -> dict:
         """
         Gera código de barras GPS completo
 
+        Não faz I/O: diagnósticos (etapas intermediárias, validação da estrutura,
+        avisos) só são coletados quando um GPSBarcodeTrace é passado.
+
         Args:
             codigo_pagamento: Ex: "1007"
             competencia: Ex: "11/2025"
             valor: Ex: 303.60 (em REAIS, não centavos!)
             nit: Ex: "12800186722" ou "27317621955"
+            trace: Coletor opcional de diagnóstico (GPSBarcodeTrace)
 
         Returns:
-            dict com codigo_barras (48 dígitos) e linha_digitavel
+            dict com codigo_barras (44 dígitos) e linha_digitavel (48 dígitos)
         """
+        if trace is not None:
+            trace.registrar(
+                "entrada",
+                valor=valor,
+                tipo_valor=type(valor).__name__,
+                codigo_pagamento=codigo_pagamento,
+                nit=nit,
+                competencia=competencia
+            )
+
+        codigo_sem_dv = cls._montar_codigo_sem_dv(codigo_pagamento, competencia, valor, nit, trace)
+
+        # DV geral (posição 4)
+        dv = cls.calcular_dv_modulo11(codigo_sem_dv)
+        codigo_completo = codigo_sem_dv[:3] + dv + codigo_sem_dv[3:]
 
-        print(f"\n" + "=" * 80)
-        print(f"[GPS] DEBUG - GERANDO GPS")
-        print(f"=" * 80)
-        print(f"   Valor recebido: R$ {valor:.2f} (tipo: {type(valor)})")
-        print(f"   Código pagamento: {codigo_pagamento}")
-        print(f"   NIT recebido: {nit}")
-        print(f"   Competência: {competencia}")
+        if len(codigo_completo) != 44:
+            raise ValueError(f"ERRO: Codigo de barras GPS deve ter 44 digitos, tem {len(codigo_completo)}")
 
-        # VALIDACAO CRITICA DO VALOR
-        if valor <= 0:
-            raise ValueError(f"ERRO CRITICO: Valor invalido R$ {valor:.2f} - deve ser maior que zero!")
-        if valor < 10:
-            print(f"   AVISO: Valor muito baixo R$ {valor:.2f} - possivel erro no calculo!")
+        if trace is not None:
+            trace.registrar("dv_geral", dv=dv, codigo_barras=codigo_completo)
+            trace.registrar(
+                "estrutura",
+                produto_ok=codigo_completo[0] == "8",
+                segmento_ok=codigo_completo[1] == "5",
+                id_valor_ok=codigo_completo[2] == codigo_sem_dv[2],
+                dv_ok=codigo_completo[3] == dv,
+                valor_ok=codigo_completo[4:15] == codigo_sem_dv[3:14],
+                campo_gps_ok=codigo_completo[15:19] == "0270"
+            )
 
+        linha_digitavel = cls.gerar_linha_digitavel(codigo_completo, trace)
+
+        return {
+            'codigo_barras': codigo_completo,
+            'linha_digitavel': linha_digitavel,
+            'valor': valor,
+            'competencia': competencia
+        }
+
+    @staticmethod
+    def _montar_codigo_sem_dv(codigo_pagamento: str, competencia: str,
+                              valor: ValorReais, nit: str,
+                              trace: Optional[GPSBarcodeTrace] = None) -> str:
+        """
+        Monta os 43 dígitos do código de barras GPS (sem o DV geral).
+        ESTRUTURA OFICIAL: 858[DV]VVVVVVVVVVV0270CCCC0001NNNNNNNNNNYYYYMM3
+        (sem a posição 4)
+        """
         # 1. VALOR EM CENTAVOS (11 dígitos, ZERO-PADDED À ESQUERDA)
-        valor_centavos = int(round(valor * 100))
-        valor_str = str(valor_centavos).zfill(11)
+        centavos = Centavos.de_reais(valor)
+        valor_centavos = centavos.centavos
 
-        print(f"\nCONVERSAO PARA CENTAVOS:")
-        print(f"   Valor em reais: R$ {valor:.2f}")
-        print(f"   Valor em centavos: {valor_centavos}")
-        print(f"   Valor formatado (11 dig): {valor_str}")
+        # VALIDACAO CRITICA DO VALOR
+        if valor_centavos <= 0:
+            raise ValueError(f"ERRO CRITICO: Valor invalido {centavos.formatar()} - deve ser maior que zero!")
 
-        # VALIDACAO CRITICA
+        valor_str = str(valor_centavos).zfill(11)
         if len(valor_str) != 11:
             raise ValueError(f"ERRO: Valor formatado deve ter 11 digitos, tem {len(valor_str)}")
 
@@ -141,22 +178,8 @@ class CodigoBarrasGPS:
         else:
             id_valor = "9"
 
-        print(f"\nID VALOR:")
-        if valor_centavos < 1000:
-            faixa = "R$ 0,01 - R$ 9,99"
-        elif valor_centavos < 10000:
-            faixa = "R$ 10,00 - R$ 99,99"
-        elif valor_centavos < 100000:
-            faixa = "R$ 100,00 - R$ 999,99"
-        else:
-            faixa = "R$ 1.000,00+"
-        print(f"   ID Valor: {id_valor} (faixa: {faixa})")
-
-        # 3. LIMPA NIT (só números)
+        # 3. NIT SEM PRIMEIRO DÍGITO (10 dígitos)
         nit_limpo = ''.join(filter(str.isdigit, nit))
-        print(f"   NIT limpo: {nit_limpo} ({len(nit_limpo)} dígitos)")
-
-        # 4. NIT SEM PRIMEIRO DÍGITO (10 dígitos)
         if len(nit_limpo) >= 11:
             nit_10_digitos = nit_limpo[1:11]
         elif len(nit_limpo) == 10:
@@ -164,17 +187,10 @@ class CodigoBarrasGPS:
         else:
             nit_10_digitos = nit_limpo.zfill(10)
 
-        print(f"   NIT 10 dígitos: {nit_10_digitos}")
-
-        # 5. COMPETÊNCIA (YYYYMM3 = 7 dígitos) - FORMATO OFICIAL GPS
+        # 4. COMPETÊNCIA (YYYYMM3 = 7 dígitos) - FORMATO OFICIAL GPS
         mes, ano = competencia.split('/')
         competencia_oficial = ano + mes.zfill(2) + "3"  # Ex: 2025 + 11 + 3 = "2025113"
 
-        print(f"   Competência codificada: {competencia_oficial} (formato YYYYMM3)")
-
-        # 6. MONTA CÓDIGO SEM DV (43 dígitos)
-        # GPS TEM 44 DÍGITOS TOTAL: 43 sem DV + 1 DV na posição 4
-        # ESTRUTURA OFICIAL: 858[DV]VVVVVVVVVVV0270CCCC0001NNNNNNNNNNYYYYMM3
         codigo_sem_dv = (
             "8" +                           # Pos 1: Produto
             "5" +                           # Pos 2: Segmento
@@ -187,51 +203,77 @@ class CodigoBarrasGPS:
             competencia_oficial             # Pos 37-43: Competência (7 dígitos YYYYMM3)
         )
 
-        print(f"   Código sem DV: {codigo_sem_dv}")
-        print(f"   Comprimento sem DV: {len(codigo_sem_dv)} dígitos")
+        if trace is not None:
+            if valor_centavos < 1000:
+                trace.avisar(f"Valor muito baixo {centavos.formatar()} - possivel erro no calculo")
+            trace.registrar("valor", valor_centavos=valor_centavos, valor_str=valor_str, id_valor=id_valor)
+            trace.registrar("nit", nit_limpo=nit_limpo, nit_10_digitos=nit_10_digitos)
+            trace.registrar("competencia", competencia_oficial=competencia_oficial)
+            trace.registrar("codigo_sem_dv", codigo_sem_dv=codigo_sem_dv, comprimento=len(codigo_sem_dv))
 
         if len(codigo_sem_dv) != 43:
             raise ValueError(f"ERRO: Código sem DV deve ter 43 dígitos, tem {len(codigo_sem_dv)}")
+        if not codigo_sem_dv.isdigit():
+            raise ValueError(
+                f"ERRO: Código de pagamento ({codigo_pagamento}) e competência ({competencia}) devem ser numéricos"
+            )
+        return codigo_sem_dv
 
-        # 7. CALCULA DV (posição 4)
-        dv = cls.calcular_dv_modulo11(codigo_sem_dv)
-        print(f"   DV Geral calculado: {dv}")
-
-        # 8. INSERE DV NA POSIÇÃO 4 (após posições 1-3)
-        codigo_completo = codigo_sem_dv[:3] + dv + codigo_sem_dv[3:]
-
-        print(f"\nCODIGO DE BARRAS (44 DIGITOS):")
-        print(f"   {codigo_completo}")
-        print(f"   Comprimento: {len(codigo_completo)} digitos")
-
-        if len(codigo_completo) != 44:
-            raise ValueError(f"ERRO: Codigo de barras GPS deve ter 44 digitos, tem {len(codigo_completo)}")
+    @classmethod
+    def gerar_lote(cls, itens: Sequence[Tuple[str, str, float, str]]) -> List[dict]:
+        """
+        Gera códigos de barras GPS para um lote inteiro em uma única passada vetorizada.
 
-        # VALIDACAO DA ESTRUTURA
-        print(f"\nVALIDACAO DA ESTRUTURA:")
-        print(f"   Pos 1: {codigo_completo[0]} (deve ser 8) {'OK' if codigo_completo[0] == '8' else 'ERRO'}")
-        print(f"   Pos 2: {codigo_completo[1]} (deve ser 5) {'OK' if codigo_completo[1] == '5' else 'ERRO'}")
-        print(f"   Pos 3: {codigo_completo[2]} (ID = {id_valor}) {'OK' if codigo_completo[2] == id_valor else 'ERRO'}")
-        print(f"   Pos 4: {codigo_completo[3]} (DV = {dv}) {'OK' if codigo_completo[3] == dv else 'ERRO'}")
-        print(f"   Pos 5-15: {codigo_completo[4:15]} (valor) {'OK' if codigo_completo[4:15] == valor_str else 'ERRO'}")
-        print(f"   Pos 16-19: {codigo_completo[15:19]} (0270) {'OK' if codigo_completo[15:19] == '0270' else 'ERRO'}")
+        Os 43 dígitos de cada guia são montados individualmente; o DV geral
+        (Módulo 11) e os 4 DVs da linha digitável (Módulo 10 ou Módulo 11,
+        conforme o ID de Valor) são calculados para o lote todo pelas
+        entradas em lote de digito_verificador, sem laços por dígito.
 
-        # 10. GERA LINHA DIGITAVEL
-        linha_digitavel = cls.gerar_linha_digitavel(codigo_completo)
+        Args:
+            itens: Sequência de tuplas (codigo_pagamento, competencia, valor, nit)
 
-        print(f"\nLINHA DIGITAVEL:")
-        print(f"   {linha_digitavel}")
-        print(f"=" * 80 + "\n")
+        Returns:
+            Lista de dicts no mesmo formato de gerar(), na ordem dos itens
 
-        return {
-            'codigo_barras': codigo_completo,
-            'linha_digitavel': linha_digitavel,
-            'valor': valor,
-            'competencia': competencia
-        }
+        Raises:
+            ValueError: Se algum item for inválido (mensagem indica o índice)
+        """
+        if not itens:
+            return []
+
+        codigos_sem_dv = []
+        for indice, (codigo_pagamento, competencia, valor, nit) in enumerate(itens):
+            try:
+                codigos_sem_dv.append(cls._montar_codigo_sem_dv(codigo_pagamento, competencia, valor, nit))
+            except ValueError as e:
+                raise ValueError(f"Item {indice} do lote inválido: {e}") from e
+
+        # DV geral (Módulo 11, posição 4)
+        dv_geral = dv_kernel.dv_modulo11_geral_lote(codigos_sem_dv)
+        codigos_barras = [
+            codigo[:3] + str(dv) + codigo[3:]
+            for codigo, dv in zip(codigos_sem_dv, dv_geral.tolist())
+        ]
+
+        # DVs da linha digitável (Módulo 11 ou Módulo 10 conforme o ID de Valor)
+        dvs_linha = dv_kernel.dvs_linha_digitavel_lote(codigos_barras).tolist()
+
+        resultados = []
+        for (_, competencia, valor, _), codigo, dvs in zip(itens, codigos_barras, dvs_linha):
+            linha_digitavel = " ".join(
+                f"{codigo[i * 11:(i + 1) * 11]}-{dvs[i]}" for i in range(4)
+            )
+            resultados.append({
+                'codigo_barras': codigo,
+                'linha_digitavel': linha_digitavel,
+                'valor': valor,
+                'competencia': competencia
+            })
+        return resultados
 
     @classmethod
-    def gerar_linha_digitavel(cls, codigo_barras: str) -> str:
+    def gerar_linha_digitavel(cls, codigo_barras: str,
+                              trace: Optional[GPSBarcodeTrace] = None) -> str:
         """
         Gera linha digitável GPS (48 dígitos)
         Divide código de barras (44 dig) em 4 campos de 11 + 1 DV cada = 48 total
@@ -243,35 +285,22 @@ class CodigoBarrasGPS:
         if len(codigo_barras) != 44:
             raise ValueError(f"Código de barras deve ter 44 dígitos, tem {len(codigo_barras)}")
 
-        print(f"   Código de barras (44 dig): {codigo_barras}")
-
-        # Verificar ID de Valor (3ª posição, índice 2)
-        id_valor = codigo_barras[2]
-        print(f"   ID de Valor: {id_valor}")
-
-        # Determinar qual método de DV usar
-        if id_valor in ['8', '9']:
-            metodo_dv = "Módulo 11 (Arrecadação/GPS)"
-            funcao_dv = cls.calcular_dv_modulo11_bloco
-        elif id_valor in ['6', '7']:
-            metodo_dv = "Módulo 10 (Convênios)"
-            funcao_dv = cls.calcular_dv_modulo10
-        else:
-            raise ValueError(f"ID de Valor inválido: {id_valor}. Deve ser 6, 7, 8 ou 9")
-
-        print(f"   Método DV: {metodo_dv}")
+        dvs = dv_kernel.dvs_linha_digitavel(codigo_barras)
+        campos = [
+            f"{codigo_barras[i * 11:(i + 1) * 11]}-{dv}" for i, dv in enumerate(dvs)
+        ]
+        linha_digitavel = " ".join(campos)
 
-        campos = []
+        if trace is not None:
+            trace.registrar(
+                "linha_digitavel",
+                id_valor=codigo_barras[2],
+                metodo_dv="Módulo 11 (Arrecadação/GPS)" if codigo_barras[2] in "89" else "Módulo 10 (Convênios)",
+                campos=campos,
+                linha_digitavel=linha_digitavel
+            )
 
-        # DIVIDE OS 44 DIGITOS EM 4 CAMPOS DE 11 DIGITOS
-        for i in range(0, 44, 11):
-            campo_dados = codigo_barras[i:i+11]
-            campo_dv = funcao_dv(campo_dados)
-            campo_formatado = f"{campo_dados}-{campo_dv}"
-            campos.append(campo_formatado)
-            print(f"   Campo {(i//11)+1}: {campo_dados} -> DV: {campo_dv} -> {campo_formatado}")
-
-        return " ".join(campos)
+        return linha_digitavel
 
     @staticmethod
     def validar(codigo_barras: str) -> bool:
@@ -279,19 +308,14 @@ class CodigoBarrasGPS:
         Valida um código de barras GPS verificando o DV
         GPS tem 44 dígitos
         """
-        if len(codigo_barras) != 44:
-            return False
-
-        try:
-            # Extrai o DV (posição 4, índice 3)
-            dv_informado = codigo_barras[3]
-
-            # Reconstrói código sem DV (posições 1-3 + 5-44)
-            codigo_sem_dv = codigo_barras[:3] + codigo_barras[4:]
+        return dv_kernel.validar_codigo_barras(codigo_barras)
 
-            # Calcula DV esperado
-            dv_calculado = CodigoBarrasGPS.calcular_dv_modulo11(codigo_sem_dv)
+    @staticmethod
+    def validar_lote(codigos_barras: Sequence[str]) -> List[bool]:
+        """
+        Valida o DV de vários códigos de barras GPS de uma vez.
 
-            return dv_informado == dv_calculado
-        except:
-            return False
+        Returns:
+            Lista de bool na ordem dos códigos (inválidos por tamanho/caractere => False)
+        """
+        return dv_kernel.validar_codigos_barras_lote(codigos_barras).tolist()
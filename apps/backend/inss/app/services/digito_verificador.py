@@ -0,0 +1,300 @@
+"""
+Cálculo de dígitos verificadores (DV) para código de barras e linha digitável GPS.
+
+Kernel orientado a tabelas: para cada posição do campo existe uma tabela de 256
+entradas indexada pelo byte ASCII do dígito, já com o peso aplicado. O DV sai de
+uma soma de consultas (sem int() por caractere, sem listas intermediárias) e
+aceita str, bytes, bytearray ou memoryview.
+
+Também oferece entradas em lote (NumPy) para calcular ou validar DVs de um
+array de códigos de uma só vez.
+
+Compartilhado por CodigoBarrasGPS (validar, gerar_linha_digitavel, gerar_lote)
+e LDigitavelGenerator (MOD 97-10).
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from operator import getitem
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+Digitos = Union[str, bytes, bytearray, memoryview]
+
+# Valor para bytes não numéricos: qualquer soma que o contenha passa do limite
+_INVALIDO = 1 << 20
+_ZERO = ord("0")
+
+TAMANHO_CODIGO = 44
+TAMANHO_CAMPO = 11
+
+_PESOS_MOD11 = (2, 3, 4, 5, 6, 7, 8, 9)
+
+
+def _tabela(produto) -> Tuple[int, ...]:
+    """Tabela de 256 entradas: byte ASCII do dígito -> produto já ponderado."""
+    tabela = [_INVALIDO] * 256
+    for digito in range(10):
+        tabela[_ZERO + digito] = produto(digito)
+    return tuple(tabela)
+
+
+# Uma tabela por peso possível (reaproveitadas entre posições)
+_TABELAS_MOD11 = {peso: _tabela(lambda d, p=peso: d * p) for peso in _PESOS_MOD11}
+_TABELA_MOD10_X2 = _tabela(lambda d: (d * 2) // 10 + (d * 2) % 10)
+_TABELA_MOD10_X1 = _tabela(lambda d: d)
+_TABELA_IGNORAR = _tabela(lambda d: 0)
+
+
+@lru_cache(maxsize=None)
+def _tabelas_mod11(tamanho: int) -> Tuple[Tuple[int, ...], ...]:
+    """Tabelas por posição (esquerda->direita) para pesos 2-9 aplicados da direita."""
+    return tuple(_TABELAS_MOD11[_PESOS_MOD11[i % 8]] for i in range(tamanho))[::-1]
+
+
+@lru_cache(maxsize=None)
+def _tabelas_mod10(tamanho: int) -> Tuple[Tuple[int, ...], ...]:
+    """Tabelas por posição (esquerda->direita) para multiplicadores 2,1,2,1... da direita."""
+    return tuple(
+        _TABELA_MOD10_X2 if i % 2 == 0 else _TABELA_MOD10_X1 for i in range(tamanho)
+    )[::-1]
+
+
+@lru_cache(maxsize=None)
+def _tabelas_validacao() -> Tuple[Tuple[int, ...], ...]:
+    """Tabelas para os 44 dígitos com a posição do DV (índice 3) ignorada na soma."""
+    tabelas = _tabelas_mod11(TAMANHO_CODIGO - 1)
+    return tabelas[:3] + (_TABELA_IGNORAR,) + tabelas[3:]
+
+
+def _como_bytes(dados: Digitos) -> Union[bytes, bytearray, memoryview]:
+    """Normaliza a entrada para um buffer de bytes (str é codificada em ASCII)."""
+    if isinstance(dados, str):
+        return dados.encode("ascii", "replace")
+    return dados
+
+
+def _soma(tabelas: Tuple[Tuple[int, ...], ...], dados: Union[bytes, bytearray, memoryview]) -> int:
+    """Soma ponderada via tabelas; ValueError se houver caractere não numérico."""
+    soma = sum(map(getitem, tabelas, dados))
+    if soma >= _INVALIDO:
+        raise ValueError("Campo contém caracteres não numéricos")
+    return soma
+
+
+def _verificar_tamanho(dados, tamanho: int, descricao: str) -> None:
+    if len(dados) != tamanho:
+        raise ValueError(f"{descricao} deve ter {tamanho} dígitos, tem {len(dados)}")
+
+
+# ============================================
+# DV INDIVIDUAL
+# ============================================
+
+def dv_modulo11_geral(codigo_sem_dv: Digitos) -> int:
+    """
+    DV geral Módulo 11 do código de barras (posição 4).
+
+    Args:
+        codigo_sem_dv: 43 dígitos (código de barras sem o DV)
+
+    Returns:
+        DV (1-9). Resto 0 ou 1 => DV = 1 (padrão Febraban arrecadação)
+
+    Raises:
+        ValueError: Tamanho diferente de 43 ou caractere não numérico
+    """
+    dados = _como_bytes(codigo_sem_dv)
+    _verificar_tamanho(dados, TAMANHO_CODIGO - 1, "Código sem DV")
+    dv = 11 - _soma(_tabelas_mod11(TAMANHO_CODIGO - 1), dados) % 11
+    return 1 if dv >= 10 else dv
+
+
+def dv_modulo11_bloco(campo: Digitos) -> int:
+    """
+    DV Módulo 11 de um campo da linha digitável (ID de Valor 8 ou 9).
+
+    Args:
+        campo: 11 dígitos
+
+    Returns:
+        DV (0-9). Resto 0 ou 1 => DV = 0
+    """
+    dados = _como_bytes(campo)
+    _verificar_tamanho(dados, TAMANHO_CAMPO, "Campo")
+    resto = _soma(_tabelas_mod11(TAMANHO_CAMPO), dados) % 11
+    return 0 if resto <= 1 else 11 - resto
+
+
+def dv_modulo10(campo: Digitos) -> int:
+    """
+    DV Módulo 10 de um campo da linha digitável (ID de Valor 6 ou 7).
+
+    Args:
+        campo: 11 dígitos
+
+    Returns:
+        DV (0-9)
+    """
+    dados = _como_bytes(campo)
+    _verificar_tamanho(dados, TAMANHO_CAMPO, "Campo")
+    return (10 - _soma(_tabelas_mod10(TAMANHO_CAMPO), dados) % 10) % 10
+
+
+def dv_modulo97_10(base: Digitos) -> int:
+    """
+    DV ISO 7064 MOD 97-10 (98 - base mod 97), usado por LDigitavelGenerator.
+
+    Args:
+        base: Dígitos de tamanho arbitrário
+
+    Returns:
+        DV de 2 dígitos (2-98)
+    """
+    dados = bytes(_como_bytes(base))
+    if not dados.isdigit():
+        raise ValueError("Base contém caracteres não numéricos")
+    return 98 - int(dados) % 97
+
+
+def dvs_linha_digitavel(codigo_barras: Digitos) -> Tuple[int, int, int, int]:
+    """
+    Calcula os 4 DVs da linha digitável a partir do código de barras.
+
+    O método depende do ID de Valor (3ª posição): 8/9 => Módulo 11, 6/7 => Módulo 10.
+
+    Args:
+        codigo_barras: 44 dígitos
+
+    Returns:
+        Tupla com os DVs dos 4 campos de 11 dígitos
+    """
+    dados = _como_bytes(codigo_barras)
+    _verificar_tamanho(dados, TAMANHO_CODIGO, "Código de barras")
+    id_valor = dados[2] - _ZERO
+    if id_valor in (8, 9):
+        funcao_dv = dv_modulo11_bloco
+    elif id_valor in (6, 7):
+        funcao_dv = dv_modulo10
+    else:
+        raise ValueError(f"ID de Valor inválido: {chr(dados[2])}. Deve ser 6, 7, 8 ou 9")
+    visao = memoryview(dados)
+    return tuple(funcao_dv(visao[i:i + TAMANHO_CAMPO]) for i in range(0, TAMANHO_CODIGO, TAMANHO_CAMPO))
+
+
+def validar_codigo_barras(codigo_barras: Digitos) -> bool:
+    """
+    Verifica o DV geral (posição 4) de um código de barras de 44 dígitos.
+
+    Returns:
+        True se o DV confere; False para tamanho, caracteres ou DV inválidos
+    """
+    dados = _como_bytes(codigo_barras)
+    if len(dados) != TAMANHO_CODIGO:
+        return False
+    soma = sum(map(getitem, _tabelas_validacao(), dados))
+    if soma >= _INVALIDO:
+        return False
+    dv = 11 - soma % 11
+    return dados[3] - _ZERO == (1 if dv >= 10 else dv)
+
+
+# ============================================
+# DV EM LOTE (NumPy)
+# ============================================
+
+# Pesos por posição (índice 0 = dígito mais à esquerda)
+_PESOS_MOD11_43 = np.array([_PESOS_MOD11[i % 8] for i in range(TAMANHO_CODIGO - 1)][::-1], dtype=np.int64)
+_PESOS_MOD11_CAMPO = np.array([_PESOS_MOD11[i % 8] for i in range(TAMANHO_CAMPO)][::-1], dtype=np.int64)
+_MULT_MOD10_CAMPO = np.array([2 if i % 2 == 0 else 1 for i in range(TAMANHO_CAMPO)][::-1], dtype=np.int64)
+
+
+def matriz_digitos(codigos: Sequence[Digitos], largura: int) -> np.ndarray:
+    """
+    Converte códigos de mesmo tamanho em matriz (N, largura) de dígitos.
+
+    Raises:
+        ValueError: Código com tamanho diferente de largura
+    """
+    buffer = b"".join(_como_bytes(c) for c in codigos)
+    if len(buffer) != len(codigos) * largura:
+        raise ValueError(f"Todos os códigos do lote devem ter {largura} dígitos")
+    return np.frombuffer(buffer, dtype=np.uint8).reshape(len(codigos), largura).astype(np.int64) - _ZERO
+
+
+def dv_modulo11_geral_lote(codigos_sem_dv: Sequence[Digitos]) -> np.ndarray:
+    """
+    DV geral Módulo 11 para um lote de códigos de 43 dígitos.
+
+    Returns:
+        Array (N,) de DVs
+
+    Raises:
+        ValueError: Tamanho incorreto ou caractere não numérico em algum código
+    """
+    digitos = matriz_digitos(codigos_sem_dv, TAMANHO_CODIGO - 1)
+    if digitos.size and (digitos.min() < 0 or digitos.max() > 9):
+        raise ValueError("Lote contém caracteres não numéricos")
+    dv = 11 - (digitos @ _PESOS_MOD11_43) % 11
+    dv[dv >= 10] = 1
+    return dv
+
+
+def dvs_linha_digitavel_lote(codigos_barras: Sequence[Digitos]) -> np.ndarray:
+    """
+    DVs da linha digitável para um lote de códigos de barras de 44 dígitos.
+
+    Cada linha usa Módulo 11 (ID de Valor 8/9) ou Módulo 10 (ID 6/7).
+
+    Returns:
+        Array (N, 4) de DVs
+
+    Raises:
+        ValueError: Tamanho, caractere ou ID de Valor inválido em algum código
+    """
+    digitos = matriz_digitos(codigos_barras, TAMANHO_CODIGO)
+    if digitos.size and (digitos.min() < 0 or digitos.max() > 9):
+        raise ValueError("Lote contém caracteres não numéricos")
+    id_valor = digitos[:, 2]
+    if not np.isin(id_valor, (6, 7, 8, 9)).all():
+        raise ValueError("Lote contém código com ID de Valor inválido (deve ser 6, 7, 8 ou 9)")
+
+    campos = digitos.reshape(len(codigos_barras), 4, TAMANHO_CAMPO)
+
+    resto_mod11 = (campos @ _PESOS_MOD11_CAMPO) % 11
+    dv_mod11 = np.where(resto_mod11 <= 1, 0, 11 - resto_mod11)
+
+    produtos = campos * _MULT_MOD10_CAMPO
+    dv_mod10 = (10 - (produtos // 10 + produtos % 10).sum(axis=2) % 10) % 10
+
+    return np.where((id_valor >= 8)[:, None], dv_mod11, dv_mod10)
+
+
+def validar_codigos_barras_lote(codigos_barras: Sequence[Digitos]) -> np.ndarray:
+    """
+    Valida o DV geral de um lote de códigos de barras.
+
+    Códigos com tamanho ou caracteres inválidos resultam em False (sem exceção).
+
+    Returns:
+        Array (N,) de bool
+    """
+    resultado = np.zeros(len(codigos_barras), dtype=bool)
+    indices = []
+    buffers = []
+    for indice, codigo in enumerate(codigos_barras):
+        dados = _como_bytes(codigo)
+        if len(dados) == TAMANHO_CODIGO:
+            indices.append(indice)
+            buffers.append(dados)
+    if not buffers:
+        return resultado
+
+    digitos = matriz_digitos(buffers, TAMANHO_CODIGO)
+    numericos = ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+    corpo = np.delete(np.clip(digitos, 0, 9), 3, axis=1)
+    dv = 11 - (corpo @ _PESOS_MOD11_43) % 11
+    dv[dv >= 10] = 1
+    resultado[np.asarray(indices)] = numericos & (digitos[:, 3] == dv)
+    return resultado
@@ -1,12 +1,40 @@
 """
 Serviço para gerenciar estatísticas GPS.
-Popula tabela gps_estatisticas diariamente.
+
+gps_estatisticas guarda buckets diários e mensais (coluna granularidade),
+incrementados no momento da emissão e da divergência. popular_estatisticas_dia
+recalcula um dia a partir das tabelas brutas (reconciliação).
+
+Os dois caminhos contam as mesmas linhas com as mesmas datas:
+- emissões: guias_inss gravadas pelo GPSHybridService (metodo_emissao local,
+  sal_validado ou sal_oficial; nulo conta como local), pelo created_at. A cópia
+  que o /emitir grava com metodo_emissao v2_secure não é outra emissão;
+- validacoes_sal: guias_inss com validado_sal, pelo validado_em (na emissão
+  via SAL ou na validação em background);
+- divergencias / divergencias_resolvidas: gps_divergencias pelo created_at,
+  conforme o resolvido atual (a resolução fica a cargo da reconciliação).
 """
 from __future__ import annotations
 
-from datetime import datetime, date
-from typing import Dict, Any, Optional
-from ..services.supabase_service import SupabaseService
+import asyncio
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from ..services.supabase_service import ConsultaSupabase, SupabaseService
+
+# Métodos de emissão contados separadamente (ver MetodoEmissao)
+METODOS_EMISSAO = ("local", "sal_validado", "sal_oficial")
+
+# Tabela onde GPSHybridService grava as guias (SupabaseService.salvar_guia)
+TABELA_EMISSOES = "guias_inss"
+
+# Contadores dos buckets de gps_estatisticas (granularidade dia e mes)
+COLUNAS_CONTADORES = (
+    "total_emitidas", "emitidas_local", "emitidas_sal_validado", "emitidas_sal_oficial",
+    "validacoes_sal", "divergencias", "divergencias_resolvidas"
+)
+
+# Restrição única dos buckets (idx_gps_estatisticas_granularidade_data)
+CHAVE_BUCKET = ("granularidade", "data")
 
 
 class EstatisticasService:
@@ -22,6 +50,77 @@ class EstatisticasService:
             supabase_service: Serviço do Supabase
         """
         self.supabase = supabase_service
+
+    def _periodo(
+        self,
+        consulta: ConsultaSupabase,
+        data_inicio: Optional[date],
+        data_fim: Optional[date],
+        coluna: str = "created_at"
+    ) -> ConsultaSupabase:
+        """Restringe a coluna de data ao intervalo [data_inicio, data_fim] (dias inteiros)."""
+        if data_inicio is not None:
+            consulta.gte(coluna, data_inicio)
+        if data_fim is not None:
+            consulta.lt(coluna, data_fim + timedelta(days=1))
+        return consulta
+
+    async def contar_emissoes(
+        self,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Conta GPS emitidas no servidor (HEAD count=exact), sem baixar linhas.
+        
+        Emissões pelo created_at e validações SAL pelo validado_em (ver
+        docstring do módulo), como nos contadores incrementais.
+        
+        Args:
+            data_inicio: Primeiro dia (opcional)
+            data_fim: Último dia, inclusive (opcional)
+        
+        Returns:
+            Dicionário com total, por_metodo e validadas_sal
+        """
+        def guias(coluna: str = "created_at") -> ConsultaSupabase:
+            return self._periodo(self.supabase.tabela(TABELA_EMISSOES).select("id"), data_inicio, data_fim, coluna)
+
+        validadas_sal, sem_metodo, *por_metodo = await asyncio.gather(
+            guias("validado_em").eq("validado_sal", True).contar(),
+            guias().is_("metodo_emissao", None).contar(),
+            *[guias().eq("metodo_emissao", metodo).contar() for metodo in METODOS_EMISSAO]
+        )
+        contagens = dict(zip(METODOS_EMISSAO, por_metodo))
+        # Registros sem método são emissões locais (padrão histórico)
+        contagens["local"] += sem_metodo
+        return {
+            "total": sum(contagens.values()),
+            "por_metodo": contagens,
+            "validadas_sal": validadas_sal
+        }
+
+    async def contar_divergencias(
+        self,
+        resolvido: Optional[bool] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> int:
+        """
+        Conta divergências no servidor, opcionalmente por status e período.
+        
+        Args:
+            resolvido: Filtrar por status de resolução (opcional)
+            data_inicio: Primeiro dia (opcional)
+            data_fim: Último dia, inclusive (opcional)
+        
+        Returns:
+            Quantidade de divergências
+        """
+        consulta = self._periodo(self.supabase.tabela("gps_divergencias").select("id"), data_inicio, data_fim)
+        if resolvido is not None:
+            consulta.eq("resolvido", resolvido)
+        return await consulta.contar()
     
     async def popular_estatisticas_dia(self, data_ref: Optional[date] = None) -> Dict[str, Any]:
         """
@@ -63,34 +162,23 @@ class EstatisticasService:
             Dicionário com estatísticas
         """
         try:
-            # Buscar GPS do dia
+            # Contagens do dia no servidor (memória constante)
             data_str = data_ref.isoformat()
-            guias = await self.supabase.get_records("gps_emissions", {})
-            
-            # Filtrar por data (em memória)
-            guias_do_dia = [
-                g for g in (guias or [])
-                if g.get("created_at", "").startswith(data_str)
-            ]
-            
-            total = len(guias_do_dia)
-            emitidas_local = sum(1 for g in guias_do_dia if g.get("metodo_emissao") == "local")
-            emitidas_sal_validado = sum(1 for g in guias_do_dia if g.get("metodo_emissao") == "sal_validado")
-            emitidas_sal_oficial = sum(1 for g in guias_do_dia if g.get("metodo_emissao") == "sal_oficial")
-            validacoes_sal = sum(1 for g in guias_do_dia if g.get("validado_sal") is True)
-            
-            # Buscar divergências do dia
-            divergencias = await self.supabase.get_records("gps_divergencias", {})
-            divergencias_do_dia = [
-                d for d in (divergencias or [])
-                if d.get("created_at", "").startswith(data_str)
-            ]
+            emissoes, divergencias_count, divergencias_resolvidas_count = await asyncio.gather(
+                self.contar_emissoes(data_ref, data_ref),
+                self.contar_divergencias(False, data_ref, data_ref),
+                self.contar_divergencias(True, data_ref, data_ref)
+            )
             
-            divergencias_count = sum(1 for d in divergencias_do_dia if not d.get("resolvido"))
-            divergencias_resolvidas_count = sum(1 for d in divergencias_do_dia if d.get("resolvido"))
+            total = emissoes["total"]
+            emitidas_local = emissoes["por_metodo"]["local"]
+            emitidas_sal_validado = emissoes["por_metodo"]["sal_validado"]
+            emitidas_sal_oficial = emissoes["por_metodo"]["sal_oficial"]
+            validacoes_sal = emissoes["validadas_sal"]
             
             # Salvar estatísticas
             estatisticas_data = {
+                "granularidade": "dia",
                 "data": data_str,
                 "total_emitidas": total,
                 "emitidas_local": emitidas_local,
@@ -101,7 +189,9 @@ class EstatisticasService:
                 "divergencias_resolvidas": divergencias_resolvidas_count
             }
             
-            await self.supabase.create_record("gps_estatisticas", estatisticas_data)
+            # O bucket do dia pode já existir (contadores incrementais): sobrescreve
+            await self.supabase.upsert_record("gps_estatisticas", estatisticas_data, on_conflict=CHAVE_BUCKET)
+            await self._recalcular_mes(data_ref)
             
             print(f"[ESTATISTICAS] [OK] Estatísticas calculadas manualmente para {data_ref}")
             return {"success": True, "data": data_str, "estatisticas": estatisticas_data}
@@ -112,13 +202,37 @@ class EstatisticasService:
             print(traceback.format_exc())
             return {"success": False, "error": str(e)}
     
+    async def _recalcular_mes(self, data_ref: date) -> None:
+        """
+        Refaz o bucket mensal somando os diários (RPC recalcular_estatisticas_mes_gps).
+
+        Sem a função SQL, soma os buckets diários do mês aqui e grava com upsert.
+        """
+        try:
+            await self.supabase.execute_rpc("recalcular_estatisticas_mes_gps", {"mes_ref": data_ref.isoformat()})
+            return
+        except Exception as e:
+            print(f"[ESTATISTICAS] [WARN] recalcular_estatisticas_mes_gps indisponível, somando os dias do mês: {e}")
+
+        inicio = data_ref.replace(day=1)
+        dias = await self._buckets("dia").gte("data", inicio).lte("data", _ultimo_dia(inicio)).executar()
+        mes = {coluna: sum(linha.get(coluna) or 0 for linha in dias) for coluna in COLUNAS_CONTADORES}
+        await self.supabase.upsert_record(
+            "gps_estatisticas",
+            {"granularidade": "mes", "data": inicio.isoformat(), **mes},
+            on_conflict=CHAVE_BUCKET
+        )
+
     async def obter_estatisticas_periodo(
         self,
         data_inicio: date,
         data_fim: date
     ) -> Dict[str, Any]:
         """
-        Obtém estatísticas de um período.
+        Obtém estatísticas de um período a partir dos buckets pré-agregados.
+        
+        Meses completos vêm do bucket mensal e as bordas do bucket diário,
+        então o custo é O(meses + dias das bordas), não O(emissões).
         
         Args:
             data_inicio: Data inicial
@@ -128,49 +242,22 @@ class EstatisticasService:
             Dicionário com estatísticas agregadas
         """
         try:
-            # Buscar estatísticas do período
-            estatisticas = await self.supabase.get_records("gps_estatisticas", {})
-            
-            if not estatisticas:
-                return {
-                    "periodo": {
-                        "inicio": data_inicio.isoformat(),
-                        "fim": data_fim.isoformat()
-                    },
-                    "total_emitidas": 0,
-                    "por_metodo": {},
-                    "validacoes_sal": 0,
-                    "divergencias": 0
-                }
-            
-            # Filtrar por período
-            estatisticas_periodo = [
-                e for e in estatisticas
-                if data_inicio <= datetime.fromisoformat(e["data"]).date() <= data_fim
-            ]
-            
-            # Agregar
-            total_emitidas = sum(e.get("total_emitidas", 0) for e in estatisticas_periodo)
-            emitidas_local = sum(e.get("emitidas_local", 0) for e in estatisticas_periodo)
-            emitidas_sal_validado = sum(e.get("emitidas_sal_validado", 0) for e in estatisticas_periodo)
-            emitidas_sal_oficial = sum(e.get("emitidas_sal_oficial", 0) for e in estatisticas_periodo)
-            validacoes_sal = sum(e.get("validacoes_sal", 0) for e in estatisticas_periodo)
-            divergencias = sum(e.get("divergencias", 0) for e in estatisticas_periodo)
+            meses, intervalos_dias = decompor_periodo(data_inicio, data_fim)
+            consultas = []
+            if meses:
+                consultas.append(self._buckets("mes").in_("data", meses).executar())
+            for inicio, fim in intervalos_dias:
+                consultas.append(self._buckets("dia").gte("data", inicio).lte("data", fim).executar())
+            linhas = [linha for resultado in await asyncio.gather(*consultas) for linha in resultado]
             
             return {
                 "periodo": {
                     "inicio": data_inicio.isoformat(),
                     "fim": data_fim.isoformat()
                 },
-                "total_emitidas": total_emitidas,
-                "por_metodo": {
-                    "local": emitidas_local,
-                    "sal_validado": emitidas_sal_validado,
-                    "sal_oficial": emitidas_sal_oficial
-                },
-                "validacoes_sal": validacoes_sal,
-                "divergencias": divergencias,
-                "dias": len(estatisticas_periodo)
+                **self._somar_buckets(linhas),
+                "dias": (data_fim - data_inicio).days + 1 if data_fim >= data_inicio else 0,
+                "buckets": {"meses": len(meses), "intervalos_dias": len(intervalos_dias)}
             }
         
         except Exception as e:
@@ -179,3 +266,147 @@ class EstatisticasService:
             print(traceback.format_exc())
             return {"error": str(e)}
 
+    async def obter_totais(self) -> Dict[str, Any]:
+        """
+        Totais gerais (dashboard) somando os buckets mensais: O(meses).
+        
+        Se os buckets não estiverem disponíveis (migração não aplicada),
+        conta no servidor com contar_emissoes/contar_divergencias.
+        
+        Returns:
+            Dicionário com total_emitidas, por_metodo, validacoes_sal e divergencias
+        """
+        try:
+            return self._somar_buckets(await self._buckets("mes").executar())
+        except Exception as e:
+            print(f"[ESTATISTICAS] [WARN] Buckets mensais indisponíveis, contando no servidor: {e}")
+            emissoes, divergencias = await asyncio.gather(
+                self.contar_emissoes(),
+                self.contar_divergencias(resolvido=False)
+            )
+            return {
+                "total_emitidas": emissoes["total"],
+                "por_metodo": emissoes["por_metodo"],
+                "validacoes_sal": emissoes["validadas_sal"],
+                "divergencias": divergencias
+            }
+
+    def _buckets(self, granularidade: str) -> ConsultaSupabase:
+        return (
+            self.supabase.tabela("gps_estatisticas")
+            .select("data", *COLUNAS_CONTADORES)
+            .eq("granularidade", granularidade)
+        )
+
+    @staticmethod
+    def _somar_buckets(linhas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        soma = {coluna: sum(linha.get(coluna) or 0 for linha in linhas) for coluna in COLUNAS_CONTADORES}
+        return {
+            "total_emitidas": soma["total_emitidas"],
+            "por_metodo": {
+                "local": soma["emitidas_local"],
+                "sal_validado": soma["emitidas_sal_validado"],
+                "sal_oficial": soma["emitidas_sal_oficial"]
+            },
+            "validacoes_sal": soma["validacoes_sal"],
+            "divergencias": soma["divergencias"],
+            "divergencias_resolvidas": soma["divergencias_resolvidas"]
+        }
+
+    # ============================================
+    # CONTADORES INCREMENTAIS
+    # ============================================
+
+    async def _incrementar(self, deltas: Dict[str, int], data_ref: Optional[date] = None) -> bool:
+        """
+        Soma deltas nos buckets do dia e do mês (RPC incrementar_estatisticas_gps).
+        
+        Nunca levanta exceção: estatística não pode quebrar emissão.
+        
+        Returns:
+            True se os contadores foram atualizados
+        """
+        deltas = {coluna: valor for coluna, valor in deltas.items() if valor}
+        if not deltas:
+            return False
+        data_ref = data_ref or date.today()
+        try:
+            await self.supabase.execute_rpc(
+                "incrementar_estatisticas_gps",
+                {"data_ref": data_ref.isoformat(), "deltas": deltas}
+            )
+            return True
+        except Exception as e:
+            print(f"[ESTATISTICAS] [WARN] Contadores não atualizados ({data_ref}): {e}")
+            return False
+
+    async def registrar_emissao(
+        self,
+        metodo: str,
+        validado_sal: bool = False,
+        quantidade: int = 1,
+        data_ref: Optional[date] = None
+    ) -> bool:
+        """
+        Conta GPS emitidas no momento da emissão.
+        
+        Args:
+            metodo: Método de emissão (local, sal_validado, sal_oficial)
+            validado_sal: Se as guias já saíram validadas no SAL
+            quantidade: Número de guias (lote)
+            data_ref: Dia da emissão (padrão: hoje)
+        """
+        deltas = {"total_emitidas": quantidade, "validacoes_sal": quantidade if validado_sal else 0}
+        if metodo in METODOS_EMISSAO:
+            deltas[f"emitidas_{metodo}"] = quantidade
+        return await self._incrementar(deltas, data_ref)
+
+    async def registrar_validacao_sal(self, data_ref: Optional[date] = None) -> bool:
+        """Conta uma guia confirmada pela validação em background no SAL."""
+        return await self._incrementar({"validacoes_sal": 1}, data_ref)
+
+    async def registrar_divergencia(self, data_ref: Optional[date] = None) -> bool:
+        """Conta uma divergência nova (não resolvida)."""
+        return await self._incrementar({"divergencias": 1}, data_ref)
+
+
+def decompor_periodo(data_inicio: date, data_fim: date) -> Tuple[List[date], List[Tuple[date, date]]]:
+    """
+    Divide [data_inicio, data_fim] em meses completos e intervalos de dias nas bordas.
+    
+    Returns:
+        Tupla (primeiros dias dos meses completos, intervalos (inicio, fim) de dias)
+    
+    Exemplo:
+        10/01 a 05/04 -> meses [02, 03], dias [(10/01, 31/01), (01/04, 05/04)]
+    """
+    if data_fim < data_inicio:
+        return [], []
+    meses: List[date] = []
+    intervalos: List[Tuple[date, date]] = []
+    
+    primeiro_mes = data_inicio.replace(day=1)
+    if primeiro_mes < data_inicio:
+        primeiro_mes = _proximo_mes(primeiro_mes)
+    fim_meses = _proximo_mes(data_fim.replace(day=1)) if data_fim == _ultimo_dia(data_fim) else data_fim.replace(day=1)
+    
+    if primeiro_mes >= fim_meses:
+        return [], [(data_inicio, data_fim)]
+    
+    if data_inicio < primeiro_mes:
+        intervalos.append((data_inicio, primeiro_mes - timedelta(days=1)))
+    mes = primeiro_mes
+    while mes < fim_meses:
+        meses.append(mes)
+        mes = _proximo_mes(mes)
+    if fim_meses <= data_fim:
+        intervalos.append((fim_meses, data_fim))
+    return meses, intervalos
+
+
+def _proximo_mes(dia_1: date) -> date:
+    return date(dia_1.year + dia_1.month // 12, dia_1.month % 12 + 1, 1)
+
+
+def _ultimo_dia(dia: date) -> date:
+    return _proximo_mes(dia.replace(day=1)) - timedelta(days=1)
@@ -0,0 +1,423 @@
+"""
+Fila durável de validações SAL em background.
+
+As validações amostrais (GPS local comparada com a emitida pelo SAL) eram
+tarefas soltas no event loop: sumiam num restart e, num pico, abriam uma
+sessão de navegador por guia. A FilaValidacaoSAL grava cada job em SQLite
+antes de responder ao usuário e um número fixo de workers consome a fila.
+
+Semântica (equivalente a SELECT ... FOR UPDATE SKIP LOCKED):
+- O job é reservado com um UPDATE atômico que grava um lease; outro worker
+  (deste ou de outro processo com o mesmo arquivo) não pega o mesmo job.
+- Job cujo lease expirou (processo morreu no meio) volta a ficar disponível.
+- Falha: nova tentativa com backoff exponencial (com jitter); após
+  max_tentativas o job vai para a dead-letter (status "morta").
+
+Jobs concluídos são apagados após GPS_FILA_VALIDACAO_RETENCAO dias; os da
+dead-letter ficam GPS_FILA_VALIDACAO_RETENCAO_MORTAS dias para reprocessamento.
+
+Configuração (variáveis de ambiente):
+- GPS_FILA_VALIDACAO_DB: arquivo SQLite; caminho relativo é resolvido a partir
+  de apps/backend/inss, não do diretório corrente (padrão: fila_validacao_sal.db)
+- GPS_FILA_VALIDACAO_WORKERS: validações simultâneas (padrão: 1)
+- GPS_FILA_VALIDACAO_MAX_TENTATIVAS: tentativas antes da dead-letter (padrão: 5)
+- GPS_FILA_VALIDACAO_BACKOFF: segundos da primeira espera entre tentativas (padrão: 60)
+- GPS_FILA_VALIDACAO_LEASE: segundos até um job em execução ser considerado abandonado (padrão: 600)
+- GPS_FILA_VALIDACAO_RETENCAO: dias que um job concluído fica no arquivo (padrão: 7)
+- GPS_FILA_VALIDACAO_RETENCAO_MORTAS: dias que um job da dead-letter fica no arquivo (padrão: 30)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+Processador = Callable[[Dict[str, Any]], Awaitable[None]]
+
+PENDENTE = "pendente"
+EM_EXECUCAO = "em_execucao"
+CONCLUIDA = "concluida"
+MORTA = "morta"
+
+BACKOFF_MAXIMO = 6 * 3600.0
+
+# Raiz do serviço INSS (apps/backend/inss)
+DIRETORIO_APP = Path(__file__).resolve().parent.parent.parent
+ARQUIVO_PADRAO = "fila_validacao_sal.db"
+
+# Intervalo entre as limpezas de jobs antigos
+INTERVALO_LIMPEZA = 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS validacoes_sal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guia_id TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pendente',
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    disponivel_em REAL NOT NULL,
+    lease_ate REAL,
+    criado_em REAL NOT NULL,
+    atualizado_em REAL NOT NULL,
+    ultimo_erro TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_validacoes_sal_disponivel ON validacoes_sal (status, disponivel_em);
+CREATE INDEX IF NOT EXISTS idx_validacoes_sal_atualizado ON validacoes_sal (status, atualizado_em);
+"""
+
+
+def _int_env(nome: str, padrao: int) -> int:
+    try:
+        return int(os.getenv(nome, str(padrao)))
+    except ValueError:
+        return padrao
+
+
+def _resolver_caminho(caminho: str) -> str:
+    """Caminho relativo vai para a raiz do serviço, independente do diretório corrente."""
+    if caminho == ":memory:" or caminho.startswith("file:"):
+        return caminho
+    return str(DIRETORIO_APP / caminho)
+
+
+class FilaValidacaoSAL:
+    """
+    Fila persistente com pool de workers para validações no SAL.
+
+    Uso:
+        await fila_validacao_sal.enfileirar({"guia_id": ...}, atraso=15)
+        fila_validacao_sal.iniciar(servico.processar_validacao_sal)  # no lifespan
+    """
+
+    def __init__(
+        self,
+        caminho: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_tentativas: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        lease: Optional[float] = None,
+        intervalo_poll: float = 1.0,
+        retencao_dias: Optional[float] = None,
+        retencao_mortas_dias: Optional[float] = None,
+    ):
+        """
+        Args:
+            caminho: Arquivo SQLite (":memory:" só serve para um processo)
+            workers: Validações simultâneas (limita sessões de navegador)
+            max_tentativas: Tentativas antes de mover o job para a dead-letter
+            backoff_base: Espera após a primeira falha; dobra a cada tentativa
+            lease: Segundos até um job em execução ser considerado abandonado
+            intervalo_poll: Espera dos workers quando a fila está vazia
+            retencao_dias: Dias até apagar um job concluído
+            retencao_mortas_dias: Dias até apagar um job da dead-letter
+        """
+        self.caminho = _resolver_caminho(caminho or os.getenv("GPS_FILA_VALIDACAO_DB", ARQUIVO_PADRAO))
+        if workers is None:
+            workers = _int_env("GPS_FILA_VALIDACAO_WORKERS", 1)
+        self.workers = max(1, workers)
+        if max_tentativas is None:
+            max_tentativas = _int_env("GPS_FILA_VALIDACAO_MAX_TENTATIVAS", 5)
+        self.max_tentativas = max(1, max_tentativas)
+        if backoff_base is None:
+            backoff_base = float(os.getenv("GPS_FILA_VALIDACAO_BACKOFF", "60"))
+        self.backoff_base = backoff_base
+        if lease is None:
+            lease = float(os.getenv("GPS_FILA_VALIDACAO_LEASE", "600"))
+        self.lease = lease
+        self.intervalo_poll = intervalo_poll
+        if retencao_dias is None:
+            retencao_dias = float(os.getenv("GPS_FILA_VALIDACAO_RETENCAO", "7"))
+        self.retencao = retencao_dias * 86400
+        if retencao_mortas_dias is None:
+            retencao_mortas_dias = float(os.getenv("GPS_FILA_VALIDACAO_RETENCAO_MORTAS", "30"))
+        self.retencao_mortas = retencao_mortas_dias * 86400
+
+        self._conexao: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._tarefas: List[asyncio.Task] = []
+        self._novo_job: Optional[asyncio.Event] = None
+
+        # Métricas deste processo
+        self._em_execucao = 0
+        self._concluidas = 0
+        self._falhas = 0
+        self._mortas = 0
+        self._removidas = 0
+
+    # ------------------------------------------------------------------
+    # SQLite (chamado em thread via asyncio.to_thread)
+    # ------------------------------------------------------------------
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conexao is None:
+            conexao = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None, timeout=30)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.executescript(_SCHEMA)
+            self._conexao = conexao
+        return self._conexao
+
+    def _executar(self, sql: str, parametros: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._db().execute(sql, parametros).fetchall()
+
+    def _inserir(self, payload: Dict[str, Any], atraso: float) -> int:
+        agora = time.time()
+        with self._lock:
+            cursor = self._db().execute(
+                "INSERT INTO validacoes_sal (guia_id, payload, disponivel_em, criado_em, atualizado_em) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (payload.get("guia_id"), json.dumps(payload, default=str), agora + atraso, agora, agora),
+            )
+            return int(cursor.lastrowid)
+
+    def _reservar(self) -> Optional[Dict[str, Any]]:
+        """Reserva o próximo job disponível (pendente vencido ou lease expirado)."""
+        agora = time.time()
+        linhas = self._executar(
+            "UPDATE validacoes_sal SET status = ?, tentativas = tentativas + 1, lease_ate = ?, atualizado_em = ? "
+            "WHERE id = ("
+            "  SELECT id FROM validacoes_sal"
+            "  WHERE (status = ? AND disponivel_em <= ?) OR (status = ? AND lease_ate < ?)"
+            "  ORDER BY disponivel_em LIMIT 1"
+            ") RETURNING id, payload, tentativas",
+            (EM_EXECUCAO, agora + self.lease, agora, PENDENTE, agora, EM_EXECUCAO, agora),
+        )
+        if not linhas:
+            return None
+        job_id, payload, tentativas = linhas[0]
+        return {"id": job_id, "payload": json.loads(payload), "tentativas": tentativas}
+
+    def _concluir(self, job_id: int) -> None:
+        self._executar(
+            "UPDATE validacoes_sal SET status = ?, lease_ate = NULL, atualizado_em = ? WHERE id = ?",
+            (CONCLUIDA, time.time(), job_id),
+        )
+
+    def _falhar(self, job_id: int, tentativas: int, erro: str) -> bool:
+        """Agenda nova tentativa ou move para a dead-letter. Retorna True se morreu."""
+        agora = time.time()
+        if tentativas >= self.max_tentativas:
+            self._executar(
+                "UPDATE validacoes_sal SET status = ?, lease_ate = NULL, atualizado_em = ?, ultimo_erro = ? WHERE id = ?",
+                (MORTA, agora, erro, job_id),
+            )
+            return True
+        espera = min(self.backoff_base * 2 ** (tentativas - 1), BACKOFF_MAXIMO)
+        espera *= random.uniform(0.8, 1.2)
+        self._executar(
+            "UPDATE validacoes_sal SET status = ?, disponivel_em = ?, lease_ate = NULL, atualizado_em = ?, ultimo_erro = ? "
+            "WHERE id = ?",
+            (PENDENTE, agora + espera, agora, erro, job_id),
+        )
+        return False
+
+    def _liberar(self, job_id: int) -> None:
+        """Devolve um job interrompido (shutdown) sem contar a tentativa."""
+        self._executar(
+            "UPDATE validacoes_sal SET status = ?, tentativas = tentativas - 1, lease_ate = NULL, atualizado_em = ? "
+            "WHERE id = ? AND status = ?",
+            (PENDENTE, time.time(), job_id, EM_EXECUCAO),
+        )
+
+    def _remover_antigos(self) -> int:
+        """Apaga jobs concluídos e mortos além da retenção. Retorna quantos apagou."""
+        agora = time.time()
+        linhas = self._executar(
+            "DELETE FROM validacoes_sal WHERE (status = ? AND atualizado_em < ?) OR (status = ? AND atualizado_em < ?) "
+            "RETURNING id",
+            (CONCLUIDA, agora - self.retencao, MORTA, agora - self.retencao_mortas),
+        )
+        return len(linhas)
+
+    def _ler_metricas(self) -> Dict[str, Any]:
+        agora = time.time()
+        por_status = dict(self._executar("SELECT status, COUNT(*) FROM validacoes_sal GROUP BY status"))
+        (mais_antigo,) = self._executar(
+            "SELECT MIN(disponivel_em) FROM validacoes_sal WHERE status = ? AND disponivel_em <= ?",
+            (PENDENTE, agora),
+        )[0]
+        return {
+            "pendentes": por_status.get(PENDENTE, 0),
+            "em_execucao": por_status.get(EM_EXECUCAO, 0),
+            "concluidas": por_status.get(CONCLUIDA, 0),
+            "mortas": por_status.get(MORTA, 0),
+            "lag_segundos": round(agora - mais_antigo, 3) if mais_antigo is not None else 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    async def _gravar(funcao: Callable[..., Any], *args: Any) -> Any:
+        """Escrita em thread que termina mesmo se a tarefa for cancelada (shutdown)."""
+        futuro = asyncio.ensure_future(asyncio.to_thread(funcao, *args))
+        try:
+            return await asyncio.shield(futuro)
+        except asyncio.CancelledError:
+            await futuro
+            raise
+
+    async def enfileirar(self, payload: Dict[str, Any], atraso: float = 0.0) -> int:
+        """
+        Grava um job de validação (durável antes de retornar).
+
+        Args:
+            payload: Dados JSON-serializáveis da validação
+            atraso: Segundos até o job ficar disponível
+
+        Returns:
+            ID do job
+        """
+        job_id = await asyncio.to_thread(self._inserir, payload, atraso)
+        if self._novo_job is not None and atraso <= 0:
+            self._novo_job.set()
+        return job_id
+
+    async def processar_proximo(self, processador: Processador) -> bool:
+        """
+        Reserva e processa um job. Retorna False se a fila não tinha job disponível.
+
+        Exceções do processador viram nova tentativa (ou dead-letter).
+        """
+        reserva = asyncio.ensure_future(asyncio.to_thread(self._reservar))
+        try:
+            job = await asyncio.shield(reserva)
+        except asyncio.CancelledError:
+            # Cancelado durante a reserva: devolve o job se chegou a ser reservado
+            job = await reserva
+            if job is not None:
+                await asyncio.to_thread(self._liberar, job["id"])
+            raise
+        if job is None:
+            return False
+        self._em_execucao += 1
+        try:
+            await processador(job["payload"])
+        except asyncio.CancelledError:
+            await self._gravar(self._liberar, job["id"])
+            raise
+        except Exception as e:
+            self._falhas += 1
+            morreu = await self._gravar(self._falhar, job["id"], job["tentativas"], f"{type(e).__name__}: {e}")
+            if morreu:
+                self._mortas += 1
+                print(f"[FILA SAL] [ERROR] Job {job['id']} movido para dead-letter após {job['tentativas']} tentativas: {e}")
+            else:
+                print(f"[FILA SAL] [WARN] Job {job['id']} falhou (tentativa {job['tentativas']}): {e}")
+        else:
+            self._concluidas += 1
+            await self._gravar(self._concluir, job["id"])
+        finally:
+            self._em_execucao -= 1
+        return True
+
+    async def _loop_worker(self, processador: Processador) -> None:
+        while True:
+            try:
+                processou = await self.processar_proximo(processador)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[FILA SAL] [ERROR] Erro no worker: {e}")
+                processou = False
+            if not processou:
+                self._novo_job.clear()
+                try:
+                    await asyncio.wait_for(self._novo_job.wait(), timeout=self.intervalo_poll)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def limpar(self) -> int:
+        """Apaga os jobs finalizados além da retenção. Retorna quantos apagou."""
+        removidas = await asyncio.to_thread(self._remover_antigos)
+        self._removidas += removidas
+        if removidas:
+            print(f"[FILA SAL] [OK] {removidas} job(s) finalizado(s) removido(s) pela retenção")
+        return removidas
+
+    async def _loop_limpeza(self) -> None:
+        while True:
+            try:
+                await self.limpar()
+            except Exception as e:
+                print(f"[FILA SAL] [WARN] Limpeza da fila falhou: {e}")
+            await asyncio.sleep(INTERVALO_LIMPEZA)
+
+    def iniciar(self, processador: Processador) -> None:
+        """Inicia os workers e a limpeza periódica no event loop atual (chamado no lifespan)."""
+        if self._tarefas:
+            return
+        self._novo_job = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._tarefas = [loop.create_task(self._loop_worker(processador)) for _ in range(self.workers)]
+        self._tarefas.append(loop.create_task(self._loop_limpeza()))
+        print(f"[FILA SAL] [OK] {self.workers} worker(s) iniciados (fila em {self.caminho})")
+
+    async def parar(self) -> None:
+        """Para os workers; jobs em execução voltam para a fila."""
+        tarefas, self._tarefas = self._tarefas, []
+        for tarefa in tarefas:
+            tarefa.cancel()
+        for tarefa in tarefas:
+            try:
+                await tarefa
+            except asyncio.CancelledError:
+                pass
+        self._novo_job = None
+
+    def fechar(self) -> None:
+        with self._lock:
+            if self._conexao is not None:
+                self._conexao.close()
+                self._conexao = None
+
+    async def mortas(self, limite: int = 50) -> List[Dict[str, Any]]:
+        """Jobs na dead-letter, mais recentes primeiro."""
+        linhas = await asyncio.to_thread(
+            self._executar,
+            "SELECT id, guia_id, tentativas, ultimo_erro, atualizado_em FROM validacoes_sal "
+            "WHERE status = ? ORDER BY atualizado_em DESC LIMIT ?",
+            (MORTA, limite),
+        )
+        return [
+            {"id": job_id, "guia_id": guia_id, "tentativas": tentativas, "ultimo_erro": erro, "atualizado_em": em}
+            for job_id, guia_id, tentativas, erro, em in linhas
+        ]
+
+    async def reprocessar(self, job_id: int) -> bool:
+        """Devolve um job da dead-letter para a fila, com tentativas zeradas."""
+        agora = time.time()
+        linhas = await asyncio.to_thread(
+            self._executar,
+            "UPDATE validacoes_sal SET status = ?, tentativas = 0, disponivel_em = ?, atualizado_em = ? "
+            "WHERE id = ? AND status = ? RETURNING id",
+            (PENDENTE, agora, agora, job_id, MORTA),
+        )
+        return bool(linhas)
+
+    async def metricas(self) -> Dict[str, Any]:
+        """Profundidade por status, atraso (lag) do job pronto mais antigo e contadores."""
+        return {
+            "workers": self.workers,
+            "ativa": bool(self._tarefas),
+            **await asyncio.to_thread(self._ler_metricas),
+            "processo": {
+                "em_execucao": self._em_execucao,
+                "concluidas": self._concluidas,
+                "falhas": self._falhas,
+                "mortas": self._mortas,
+                "removidas": self._removidas,
+            },
+        }
+
+
+# Instância global (workers iniciados no lifespan da aplicação)
+fila_validacao_sal = FilaValidacaoSAL()
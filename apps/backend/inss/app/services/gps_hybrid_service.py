@@ -10,17 +10,22 @@ import secrets
 import random
 import asyncio
 import os
+import time
+from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Awaitable, Callable
 from datetime import datetime, timedelta
 
 from ..services.codigo_barras_gps import CodigoBarrasGPS
-from ..services.gps_pdf_generator_oficial import GPSPDFGeneratorOficial
+from ..services.estatisticas_service import EstatisticasService
+from ..services.fila_validacao import FilaValidacaoSAL, fila_validacao_sal
+from ..services.pdf_render_pool import PDFRenderPool, pdf_render_pool
 from ..services.sal_automation import SALAutomation
-from ..services.supabase_service import SupabaseService
+from ..services.supabase_service import ArmazenamentoIndisponivel, SupabaseService
 from ..services.alert_service import AlertService
 from ..utils.constants import calcular_vencimento_padrao
 from ..utils.logger_utils import get_logger
+from ..utils.metricas import cronometro_etapa, emissoes_por_metodo, medir_etapa
 
 
 class MetodoEmissao(str, Enum):
@@ -30,6 +35,49 @@ class MetodoEmissao(str, Enum):
     SAL_OFICIAL = "sal_oficial"
 
 
+@dataclass
+class EstagioLote:
+    """Métricas de um estágio do pipeline de emissão em lote."""
+    nome: str
+    concorrencia: int
+    processados: int = 0
+    falhas: int = 0
+    tempo_ocupado: float = 0.0
+    inicio: Optional[float] = None
+    fim: Optional[float] = None
+
+    def registrar(self, inicio: float, fim: float, sucesso: bool = True) -> None:
+        """Registra a execução de um item no estágio."""
+        self.inicio = inicio if self.inicio is None else min(self.inicio, inicio)
+        self.fim = fim if self.fim is None else max(self.fim, fim)
+        self.tempo_ocupado += fim - inicio
+        if sucesso:
+            self.processados += 1
+        else:
+            self.falhas += 1
+
+    def resumo(self) -> Dict[str, Any]:
+        """Retorna throughput (itens/s) e tempos do estágio."""
+        duracao = (self.fim - self.inicio) if self.inicio is not None and self.fim is not None else 0.0
+        total = self.processados + self.falhas
+        return {
+            "concorrencia": self.concorrencia,
+            "processados": self.processados,
+            "falhas": self.falhas,
+            "duracao_ms": round(duracao * 1000, 2),
+            "tempo_medio_ms": round(self.tempo_ocupado / total * 1000, 3) if total else 0.0,
+            "throughput_por_segundo": round(self.processados / duracao, 2) if duracao > 0 else float(self.processados),
+        }
+
+
+def _concorrencia_env(nome: str, padrao: int) -> int:
+    """Lê limite de concorrência de variável de ambiente (mínimo 1)."""
+    try:
+        return max(1, int(os.getenv(nome, str(padrao))))
+    except ValueError:
+        return padrao
+
+
 class GPSHybridService:
     """
     Serviço híbrido para emissão de GPS com estratégia inteligente.
@@ -40,16 +88,25 @@ class GPSHybridService:
     - Amostragem aleatória (1% para validação)
     """
     
-    def __init__(self, supabase_service: SupabaseService):
+    def __init__(
+        self,
+        supabase_service: SupabaseService,
+        pdf_pool: Optional[PDFRenderPool] = None,
+        fila_validacao: Optional[FilaValidacaoSAL] = None
+    ):
         """
         Inicializa o serviço híbrido.
         
         Args:
             supabase_service: Serviço do Supabase para persistência
+            pdf_pool: Pool de renderização de PDF (padrão: pdf_render_pool global)
+            fila_validacao: Fila durável de validações SAL (padrão: fila_validacao_sal global)
         """
         self.supabase = supabase_service
         # [OK] CORREÇÃO: CodigoBarrasGPS é uma classe com métodos estáticos, não precisa instanciar
-        self.pdf_generator = GPSPDFGeneratorOficial()
+        self.pdf_pool = pdf_pool or pdf_render_pool
+        self.fila_validacao = fila_validacao or fila_validacao_sal
+        self.estatisticas = EstatisticasService(supabase_service)  # Contadores incrementais
         self.sal_automation = SALAutomation()
         self.alert_service = AlertService()  # [OK] CORREÇÃO: Serviço de alertas
         self.logger = get_logger("GPSHybridService")  # [OK] FASE 2: Logger estruturado
@@ -137,91 +194,60 @@ class GPSHybridService:
         print(f"[GPS HYBRID] Método padrão: LOCAL")
         return MetodoEmissao.LOCAL
     
-    async def _emitir_local(
-        self,
-        user_id: str,
-        competencia: str,
-        valor: float,
-        codigo_pagamento: str,
-        dados_usuario: Dict[str, Any]
-    ) -> Dict[str, Any]:
+    @staticmethod
+    def _extrair_identificador(dados_usuario: Dict[str, Any]) -> str:
         """
-        Emite GPS usando geração local (rápida).
+        Extrai o identificador (NIT ou CPF) usado no código de barras.
         
         Args:
-            user_id: ID do usuário
-            competencia: Competência no formato MM/YYYY
-            valor: Valor da contribuição
-            codigo_pagamento: Código de pagamento
-            dados_usuario: Dados do usuário (nome, cpf, nit, etc.)
+            dados_usuario: Dados do usuário (nit_raw, nit, cpf)
         
         Returns:
-            Dicionário com resultado da emissão
-        """
-        print(f"[GPS HYBRID] Emitindo GPS localmente...")
-        
-        # Calcular vencimento
-        vencimento = calcular_vencimento_padrao(competencia)
+            Identificador com 11 dígitos, sem formatação
         
-        # Gerar código de barras
-        # O identificador deve ser NIT ou CPF (11 dígitos, sem formatação)
+        Raises:
+            ValueError: Se nenhum identificador válido estiver disponível
+        """
         # Priorizar nit_raw (sem formatação) se disponível
         identificador_raw = dados_usuario.get("nit_raw") or dados_usuario.get("nit") or dados_usuario.get("cpf") or ""
         
-        # [OK] DEBUG: Log do identificador antes de processar
-        print(f"[GPS HYBRID] Identificador raw recebido: {identificador_raw[:10] if identificador_raw else 'None'}...")
-        print(f"[GPS HYBRID] nit_raw: {dados_usuario.get('nit_raw', 'None')[:10] if dados_usuario.get('nit_raw') else 'None'}...")
-        print(f"[GPS HYBRID] nit: {dados_usuario.get('nit', 'None')[:10] if dados_usuario.get('nit') else 'None'}...")
-        print(f"[GPS HYBRID] cpf: {dados_usuario.get('cpf', 'None')[:10] if dados_usuario.get('cpf') else 'None'}...")
-        
         # [OK] VALIDAÇÃO: Garantir que pelo menos NIT ou CPF está disponível
         if not identificador_raw:
-            # Tentar buscar CPF como último recurso
-            cpf_fallback = dados_usuario.get("cpf", "")
-            if cpf_fallback:
-                identificador_raw = cpf_fallback
-                print(f"[GPS HYBRID] [WARN] NIT não disponível, usando CPF como fallback")
-            else:
-                raise ValueError("Identificador (NIT/CPF) não disponível. É necessário ter pelo menos NIT ou CPF cadastrado.")
+            raise ValueError("Identificador (NIT/CPF) não disponível. É necessário ter pelo menos NIT ou CPF cadastrado.")
         
         # Remover formatação do identificador (apenas dígitos)
         identificador_digits = "".join(filter(str.isdigit, str(identificador_raw)))
         
-        # [OK] DEBUG: Log do identificador após limpeza
-        print(f"[GPS HYBRID] Identificador após limpeza: {identificador_digits[:3]}*** (tamanho: {len(identificador_digits)})")
-        
         if len(identificador_digits) != 11:
             raise ValueError(f"Identificador deve ter 11 dígitos, recebido: {len(identificador_digits)} dígitos ({identificador_digits[:10] if len(identificador_digits) > 0 else 'vazio'}...). Verifique se NIT ou CPF está cadastrado corretamente.")
         
-        # [OK] DEBUG: Log dos parâmetros antes de gerar código de barras
-        print(f"[GPS HYBRID] Gerando código de barras:")
-        print(f"  - Código pagamento: {codigo_pagamento}")
-        print(f"  - Competência: {competencia}")
-        print(f"  - Valor: {valor} (tipo: {type(valor)})")
-        print(f"  - Identificador: {identificador_digits}")
-        
-        # [OK] CORREÇÃO: Usar método de classe diretamente
-        resultado_barras = CodigoBarrasGPS.gerar(
-            codigo_pagamento=codigo_pagamento,
-            competencia=competencia,
-            valor=valor,
-            nit=identificador_digits  # [OK] CORREÇÃO: parâmetro correto é 'nit', não 'identificador'
-        )
+        return identificador_digits
+    
+    def _preparar_dados_pdf(
+        self,
+        competencia: str,
+        valor: float,
+        codigo_pagamento: str,
+        dados_usuario: Dict[str, Any],
+        codigo_barras: str,
+        linha_digitavel: str,
+        vencimento: datetime
+    ) -> Dict[str, Any]:
+        """
+        Valida os dados do contribuinte e monta o dicionário usado pelo gerador de PDF.
         
-        # Extrair código de barras e linha digitável
-        codigo_barras = resultado_barras['codigo_barras']
-        linha_digitavel = resultado_barras['linha_digitavel']
-
-        # Validar código de barras gerado (GPS tem 44 dígitos)
-        if not codigo_barras or len(codigo_barras) != 44:
-            raise ValueError(f"Código de barras inválido: deve ter 44 dígitos, recebido {len(codigo_barras) if codigo_barras else 0}")
-        # Validar usando o servico (metodo estatico)
-        if not CodigoBarrasGPS.validar(codigo_barras):
-            raise ValueError("Codigo de barras gerado nao passou na validacao")
-
-
-        print(f"[GPS HYBRID] Código de barras gerado e validado: {codigo_barras[:10]}...{codigo_barras[-5:]}")
+        Args:
+            competencia: Competência no formato MM/YYYY
+            valor: Valor da contribuição
+            codigo_pagamento: Código de pagamento
+            dados_usuario: Dados do usuário (nome, cpf, nit, endereco, telefone, uf)
+            codigo_barras: Código de barras (44 dígitos)
+            linha_digitavel: Linha digitável já formatada
+            vencimento: Data de vencimento
         
+        Returns:
+            Dicionário no formato esperado por GPSPDFGeneratorOficial.gerar
+        """
         # Validar e formatar dados antes de gerar PDF
         # CPF: remover formatação e validar (deve ter 11 dígitos)
         cpf_raw = dados_usuario.get("cpf", "")
@@ -257,12 +283,8 @@ class GPSHybridService:
         # Extrair UF do endereço ou dados do usuário
         uf = dados_usuario.get("uf") or dados_usuario.get("endereco_uf") or ""
         
-        # Linha digitável já foi gerada acima junto com o código de barras
-        # from ..services.codigo_barras_gps import CodigoBarrasGPS
-        # linha_digitavel = CodigoBarrasGPS.linha_digitavel(codigo_barras)
-        
         # Preparar dados para PDF
-        dados_pdf = {
+        return {
             'nome': dados_usuario.get("nome", "Não informado"),
             'cpf': cpf_raw,  # CPF validado ou vazio
             'nit': nit_raw,  # NIT validado ou vazio (11 dígitos sem formatação)
@@ -278,23 +300,98 @@ class GPSHybridService:
             'vencimento': vencimento.strftime("%d/%m/%Y"),
             'uf': uf  # UF do estado
         }
+    
+    async def _emitir_local(
+        self,
+        user_id: str,
+        competencia: str,
+        valor: float,
+        codigo_pagamento: str,
+        dados_usuario: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Emite GPS usando geração local (rápida).
+        
+        Args:
+            user_id: ID do usuário
+            competencia: Competência no formato MM/YYYY
+            valor: Valor da contribuição
+            codigo_pagamento: Código de pagamento
+            dados_usuario: Dados do usuário (nome, cpf, nit, etc.)
         
-        # Gerar PDF
-        pdf_buffer = self.pdf_generator.gerar(dados_pdf)
-        pdf_bytes = pdf_buffer.read()
+        Returns:
+            Dicionário com resultado da emissão
+        """
+        print(f"[GPS HYBRID] Emitindo GPS localmente...")
         
-        # Salvar no Supabase Storage
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        caminho_pdf = f"guias/{user_id}/{timestamp}_gps.pdf"
+        # Calcular vencimento
+        vencimento = calcular_vencimento_padrao(competencia)
+        
+        # Gerar código de barras
+        # O identificador deve ser NIT ou CPF (11 dígitos, sem formatação)
+        # Priorizar nit_raw (sem formatação) se disponível
+        identificador_raw = dados_usuario.get("nit_raw") or dados_usuario.get("nit") or dados_usuario.get("cpf") or ""
+        
+        # [OK] DEBUG: Log do identificador antes de processar
+        print(f"[GPS HYBRID] Identificador raw recebido: {identificador_raw[:10] if identificador_raw else 'None'}...")
+        print(f"[GPS HYBRID] nit_raw: {dados_usuario.get('nit_raw', 'None')[:10] if dados_usuario.get('nit_raw') else 'None'}...")
+        print(f"[GPS HYBRID] nit: {dados_usuario.get('nit', 'None')[:10] if dados_usuario.get('nit') else 'None'}...")
+        print(f"[GPS HYBRID] cpf: {dados_usuario.get('cpf', 'None')[:10] if dados_usuario.get('cpf') else 'None'}...")
+        
+        identificador_digits = self._extrair_identificador(dados_usuario)
+        
+        # [OK] DEBUG: Log do identificador após limpeza
+        print(f"[GPS HYBRID] Identificador após limpeza: {identificador_digits[:3]}*** (tamanho: {len(identificador_digits)})")
+        
+        # [OK] DEBUG: Log dos parâmetros antes de gerar código de barras
+        print(f"[GPS HYBRID] Gerando código de barras:")
+        print(f"  - Código pagamento: {codigo_pagamento}")
+        print(f"  - Competência: {competencia}")
+        print(f"  - Valor: {valor} (tipo: {type(valor)})")
+        print(f"  - Identificador: {identificador_digits}")
+        
+        with cronometro_etapa("codigo_barras"):
+            # [OK] CORREÇÃO: Usar método de classe diretamente
+            resultado_barras = CodigoBarrasGPS.gerar(
+                codigo_pagamento=codigo_pagamento,
+                competencia=competencia,
+                valor=valor,
+                nit=identificador_digits  # [OK] CORREÇÃO: parâmetro correto é 'nit', não 'identificador'
+            )
+            
+            # Extrair código de barras e linha digitável
+            codigo_barras = resultado_barras['codigo_barras']
+            linha_digitavel = resultado_barras['linha_digitavel']
+
+            # Validar código de barras gerado (GPS tem 44 dígitos)
+            if not codigo_barras or len(codigo_barras) != 44:
+                raise ValueError(f"Código de barras inválido: deve ter 44 dígitos, recebido {len(codigo_barras) if codigo_barras else 0}")
+            # Validar usando o servico (metodo estatico)
+            if not CodigoBarrasGPS.validar(codigo_barras):
+                raise ValueError("Codigo de barras gerado nao passou na validacao")
+
+
+        print(f"[GPS HYBRID] Código de barras gerado e validado: {codigo_barras[:10]}...{codigo_barras[-5:]}")
         
-        pdf_url = await self.supabase.upload_file(
-            bucket="guias",
-            file_path=caminho_pdf,
-            file_data=pdf_bytes,
-            content_type="application/pdf"
+        dados_pdf = self._preparar_dados_pdf(
+            competencia=competencia,
+            valor=valor,
+            codigo_pagamento=codigo_pagamento,
+            dados_usuario=dados_usuario,
+            codigo_barras=codigo_barras,
+            linha_digitavel=linha_digitavel,
+            vencimento=vencimento
         )
         
-        # Salvar registro no banco
+        # Gerar PDF (fora do event loop, no pool de renderização)
+        pdf_bytes = await medir_etapa("pdf", self.pdf_pool.renderizar(dados_pdf))
+        
+        # Upload antes do registro: a linha só é gravada apontando para um objeto
+        # que existe no Storage (armazenar_pdf devolve temp:// quando falha)
+        pdf_url = await medir_etapa("armazenamento", self.supabase.armazenar_pdf(pdf_bytes, bucket="guias"))
+        if pdf_url.startswith("temp://"):
+            raise ArmazenamentoIndisponivel(pdf_url)
+        
         guia_data = {
             "codigo_gps": codigo_pagamento,
             "competencia": competencia,
@@ -307,14 +404,11 @@ class GPSHybridService:
             "codigo_barras": codigo_barras
         }
         
-        guia_salva = await self.supabase.salvar_guia(user_id=user_id, guia_data=guia_data)
-        
-        if not guia_salva or not isinstance(guia_salva, dict):
-            print(f"[GPS HYBRID] [WARN] guia_salva inválido em _emitir_local: {guia_salva}")
-            guia_salva = {"id": f"error-{user_id}", "user_id": user_id}
-            
+        guia_salva = await medir_etapa("persistencia", self.supabase.salvar_guia(user_id=user_id, guia_data=guia_data))
+
+
         return {
-            'id': guia_salva.get('id', f"fallback-{user_id}"),
+            'id': guia_salva['id'],
             'pdf_url': pdf_url,
             'codigo_barras': codigo_barras,
             'linha_digitavel': linha_digitavel,  # [OK] Adicionar linha digitável ao retorno
@@ -360,16 +454,23 @@ class GPSHybridService:
         # Marcar para validação em background
         resultado['validacao_pendente'] = True
         
-        # Iniciar validação em background (não aguarda)
-        asyncio.create_task(
-            self._validar_no_sal_background(
-                guia_id=resultado['id'],
-                competencia=competencia,
-                valor=valor,
-                codigo_pagamento=codigo_pagamento,
-                codigo_barras_local=resultado['codigo_barras'],
-                dados_usuario=dados_usuario
-            )
+        # Enfileirar validação na fila durável (processada pelos workers da fila)
+        # [OK] CORREÇÃO: Delay aleatório antes de validar (evita pico de requisições no SAL)
+        # Delay entre 10 e 30 segundos usando secrets para aleatoriedade segura
+        delay_segundos = secrets.randbelow(21) + 10  # 10 a 30 segundos
+        await self.fila_validacao.enfileirar(
+            {
+                "guia_id": resultado['id'],
+                "competencia": competencia,
+                "valor": valor,
+                "codigo_pagamento": codigo_pagamento,
+                "codigo_barras_local": resultado['codigo_barras'],
+                "dados_usuario": {
+                    "nit": dados_usuario.get("nit", ""),
+                    "nome": dados_usuario.get("nome", "")
+                }
+            },
+            atraso=delay_segundos
         )
         
         return resultado
@@ -420,16 +521,8 @@ class GPSHybridService:
         codigo_barras_sal = resultado_sal.get('codigo_barras')
         valor_total_sal = resultado_sal.get('valor_total', valor)
         
-        # Salvar PDF no Supabase Storage
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        caminho_pdf = f"guias/{user_id}/{timestamp}_gps_sal.pdf"
-        
-        pdf_url = await self.supabase.upload_file(
-            bucket="guias",
-            file_path=caminho_pdf,
-            file_data=pdf_bytes,
-            content_type="application/pdf"
-        )
+        # Salvar PDF no Supabase Storage (endereçado pelo conteúdo)
+        pdf_url = await medir_etapa("armazenamento", self.supabase.armazenar_pdf(pdf_bytes, bucket="guias"))
         
         # Salvar registro no banco
         guia_data = {
@@ -445,14 +538,11 @@ class GPSHybridService:
             "codigo_barras": codigo_barras_sal or ""
         }
         
-        guia_salva = await self.supabase.salvar_guia(user_id=user_id, guia_data=guia_data)
-        
-        if not guia_salva or not isinstance(guia_salva, dict):
-            print(f"[GPS HYBRID] [WARN] guia_salva inválido em _emitir_via_sal: {guia_salva}")
-            guia_salva = {"id": f"error-{user_id}", "user_id": user_id}
+        guia_salva = await medir_etapa("persistencia", self.supabase.salvar_guia(user_id=user_id, guia_data=guia_data))
+
 
         return {
-            'id': guia_salva.get('id', f"fallback-{user_id}"),
+            'id': guia_salva['id'],
             'pdf_url': pdf_url,
             'codigo_barras': codigo_barras_sal or "",
             'vencimento': vencimento.strftime("%d/%m/%Y"),
@@ -462,108 +552,93 @@ class GPSHybridService:
             'pdf_bytes': pdf_bytes
         }
     
-    async def _validar_no_sal_background(
-        self,
-        guia_id: str,
-        competencia: str,
-        valor: float,
-        codigo_pagamento: str,
-        codigo_barras_local: str,
-        dados_usuario: Dict[str, Any]
-    ) -> None:
+    async def processar_validacao_sal(self, job: Dict[str, Any]) -> None:
         """
-        Valida GPS no SAL em background (não bloqueia usuário).
+        Valida no SAL uma GPS emitida localmente (processador da fila de validação).
         
         Args:
-            guia_id: ID da guia já emitida
-            competencia: Competência
-            valor: Valor
-            codigo_pagamento: Código de pagamento
-            codigo_barras_local: Código de barras gerado localmente
-            dados_usuario: Dados do usuário
+            job: Payload enfileirado por _emitir_local_com_validacao (guia_id,
+                competencia, valor, codigo_pagamento, codigo_barras_local, dados_usuario)
+        
+        Raises:
+            Exception: Falha ao emitir no SAL (a fila agenda nova tentativa)
         """
-        try:
-            print(f"[GPS HYBRID] Iniciando validação em background para guia {guia_id}...")
-            
-            # [OK] CORREÇÃO: Delay aleatório antes de validar (evita pico de requisições no SAL)
-            # Delay entre 10 e 30 segundos usando secrets para aleatoriedade segura
-            delay_segundos = secrets.randbelow(21) + 10  # 10 a 30 segundos
-            print(f"[GPS HYBRID] Aguardando {delay_segundos} segundos antes de validar (evita sobrecarga do SAL)...")
-            await asyncio.sleep(delay_segundos)
-            
-            # Preparar dados para SAL
-            nit_formatado = dados_usuario.get("nit", "")
-            if not nit_formatado:
-                print(f"[GPS HYBRID] NIT não disponível para validação")
-                return
-            
-            vencimento = calcular_vencimento_padrao(competencia)
-            
-            dados_sal = {
-                "nit_pis_pasep": nit_formatado,
-                "competencia": competencia,
-                "salario_contribuicao": valor,
-                "codigo_pagamento": codigo_pagamento,
-                "data_pagamento": vencimento.strftime("%d/%m/%Y"),
-                "nome_contribuinte": dados_usuario.get("nome", "")
-            }
+        guia_id = job["guia_id"]
+        competencia = job["competencia"]
+        valor = job["valor"]
+        codigo_pagamento = job["codigo_pagamento"]
+        codigo_barras_local = job["codigo_barras_local"]
+        dados_usuario = job.get("dados_usuario") or {}
+        
+        print(f"[GPS HYBRID] Iniciando validação em background para guia {guia_id}...")
+        
+        # Preparar dados para SAL
+        nit_formatado = dados_usuario.get("nit", "")
+        if not nit_formatado:
+            print(f"[GPS HYBRID] NIT não disponível para validação")
+            return
+        
+        vencimento = calcular_vencimento_padrao(competencia)
+        
+        dados_sal = {
+            "nit_pis_pasep": nit_formatado,
+            "competencia": competencia,
+            "salario_contribuicao": valor,
+            "codigo_pagamento": codigo_pagamento,
+            "data_pagamento": vencimento.strftime("%d/%m/%Y"),
+            "nome_contribuinte": dados_usuario.get("nome", "")
+        }
+        
+        # Emitir via SAL para comparação (erros propagam para a fila tentar de novo)
+        resultado_sal = await self.sal_automation.emitir_gps(dados_sal)
+        codigo_barras_sal = resultado_sal.get('codigo_barras')
+        
+        # Comparar códigos de barras
+        if codigo_barras_sal and codigo_barras_sal != codigo_barras_local:
+            print(f"[GPS HYBRID] [WARN] DIVERGÊNCIA DETECTADA!")
+            print(f"[GPS HYBRID] Local: {codigo_barras_local[:20]}...")
+            print(f"[GPS HYBRID] SAL: {codigo_barras_sal[:20]}...")
             
-            # Emitir via SAL para comparação
-            resultado_sal = await self.sal_automation.emitir_gps(dados_sal)
-            codigo_barras_sal = resultado_sal.get('codigo_barras')
+            # Registrar divergência
+            await self._registrar_divergencia(
+                guia_id=guia_id,
+                competencia=competencia,
+                valor=valor,
+                codigo_local=codigo_barras_local,
+                codigo_sal=codigo_barras_sal,
+                tipo_divergencia="codigo_barras_diferente"
+            )
             
-            # Comparar códigos de barras
-            if codigo_barras_sal and codigo_barras_sal != codigo_barras_local:
-                print(f"[GPS HYBRID] [WARN] DIVERGÊNCIA DETECTADA!")
-                print(f"[GPS HYBRID] Local: {codigo_barras_local[:20]}...")
-                print(f"[GPS HYBRID] SAL: {codigo_barras_sal[:20]}...")
-                
-                # Registrar divergência
-                await self._registrar_divergencia(
-                    guia_id=guia_id,
-                    competencia=competencia,
-                    valor=valor,
-                    codigo_local=codigo_barras_local,
-                    codigo_sal=codigo_barras_sal,
-                    tipo_divergencia="codigo_barras_diferente"
-                )
-                
-                # [OK] CORREÇÃO: Alertar equipe técnica sobre divergência
-                try:
-                    # Buscar user_id da guia para o alerta
-                    guia = await self.supabase.get_records("gps_emissions", {"id": guia_id})
-                    user_id = guia[0].get("user_id") if guia else None
-                    
-                    if user_id:
-                        await self.alert_service.alertar_divergencia_gps(
-                            guia_id=guia_id,
-                            usuario_id=user_id,
-                            competencia=competencia,
-                            valor=valor,
-                            codigo_local=codigo_barras_local,
-                            codigo_sal=codigo_barras_sal,
-                            tipo_divergencia="codigo_barras_diferente"
-                        )
-                except Exception as alert_err:
-                    print(f"[GPS HYBRID] [WARN] Erro ao enviar alerta (divergência já registrada): {alert_err}")
-            else:
-                print(f"[GPS HYBRID] [OK] Validação OK - códigos de barras coincidem")
+            # [OK] CORREÇÃO: Alertar equipe técnica sobre divergência
+            try:
+                # Buscar user_id da guia para o alerta
+                guia = await self.supabase.get_records("guias_inss", {"id": guia_id})
+                user_id = guia[0].get("usuario_id") if guia else None
                 
-                # Atualizar guia como validada (usar update se disponível)
-                try:
-                    # Tentar atualizar registro existente
-                    await self.supabase.create_record("gps_emissions", {
-                        "id": guia_id,
-                        "validado_sal": True,
-                        "validado_em": datetime.now().isoformat()
-                    })
-                except Exception as e:
-                    print(f"[GPS HYBRID] Erro ao atualizar validação: {e}")
-        
-        except Exception as e:
-            print(f"[GPS HYBRID] [ERROR] Erro na validação em background: {e}")
-            import traceback
-            print(traceback.format_exc())
+                if user_id:
+                    await self.alert_service.alertar_divergencia_gps(
+                        guia_id=guia_id,
+                        usuario_id=user_id,
+                        competencia=competencia,
+                        valor=valor,
+                        codigo_local=codigo_barras_local,
+                        codigo_sal=codigo_barras_sal,
+                        tipo_divergencia="codigo_barras_diferente"
+                    )
+            except Exception as alert_err:
+                print(f"[GPS HYBRID] [WARN] Erro ao enviar alerta (divergência já registrada): {alert_err}")
+        else:
+            print(f"[GPS HYBRID] [OK] Validação OK - códigos de barras coincidem")
+            
+            # Marcar a guia como validada: validado_em é a data que as estatísticas contam
+            try:
+                await self.supabase.update_record("guias_inss", {"id": guia_id}, {
+                    "validado_sal": True,
+                    "validado_em": datetime.now().isoformat()
+                })
+                await self.estatisticas.registrar_validacao_sal()
+            except Exception as e:
+                print(f"[GPS HYBRID] Erro ao atualizar validação: {e}")
     
     async def _registrar_divergencia(
         self,
@@ -587,12 +662,12 @@ class GPSHybridService:
         """
         try:
             # Buscar user_id da guia
-            guia = await self.supabase.get_records("gps_emissions", {"id": guia_id})
+            guia = await self.supabase.get_records("guias_inss", {"id": guia_id})
             if not guia:
                 print(f"[GPS HYBRID] Guia não encontrada para registrar divergência")
                 return
             
-            user_id = guia[0].get("user_id")
+            user_id = guia[0].get("usuario_id")
             
             # Criar registro de divergência
             divergencia_data = {
@@ -607,6 +682,7 @@ class GPSHybridService:
             }
             
             await self.supabase.create_record("gps_divergencias", divergencia_data)
+            await self.estatisticas.registrar_divergencia()
             print(f"[GPS HYBRID] Divergência registrada: {tipo_divergencia}")
         
         except Exception as e:
@@ -660,26 +736,200 @@ class GPSHybridService:
         
         # Emitir conforme método escolhido
         if metodo == MetodoEmissao.LOCAL:
-            return await self._emitir_local(
-                user_id=user_id,
-                competencia=competencia,
-                valor=valor,
-                codigo_pagamento=codigo_pagamento,
-                dados_usuario=dados_usuario
-            )
+            emitir = self._emitir_local
         elif metodo == MetodoEmissao.SAL_VALIDADO:
-            return await self._emitir_local_com_validacao(
-                user_id=user_id,
-                competencia=competencia,
-                valor=valor,
-                codigo_pagamento=codigo_pagamento,
-                dados_usuario=dados_usuario
-            )
+            emitir = self._emitir_local_com_validacao
         else:  # SAL_OFICIAL
-            return await self._emitir_via_sal(
+            emitir = self._emitir_via_sal
+        try:
+            resultado = await emitir(
                 user_id=user_id,
                 competencia=competencia,
                 valor=valor,
                 codigo_pagamento=codigo_pagamento,
                 dados_usuario=dados_usuario
             )
+        except Exception:
+            emissoes_por_metodo.incrementar(metodo=metodo.value, resultado="erro")
+            raise
+        emissoes_por_metodo.incrementar(metodo=metodo.value, resultado="sucesso")
+        
+        # Contadores de estatísticas (bucket do dia e do mês)
+        await self.estatisticas.registrar_emissao(
+            metodo.value,
+            validado_sal=bool(resultado.get('validado_sal'))
+        )
+        return resultado
+    
+    async def emitir_lote(
+        self,
+        itens: List[Dict[str, Any]],
+        concorrencia_pdf: Optional[int] = None,
+        concorrencia_upload: Optional[int] = None,
+        concorrencia_persistencia: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Emite um lote de GPS por geração local, em estágios concorrentes limitados.
+        
+        Estágios:
+        1. Código de barras: todo o lote em uma passada vetorizada (CodigoBarrasGPS.gerar_lote)
+        2. PDF: renderização no PDFRenderPool (limitada por concorrencia_pdf)
+        3. Upload: Supabase Storage (limitado por concorrencia_upload)
+        4. Persistência: inserção em guias_inss (limitada por concorrencia_persistencia)
+        
+        Cada guia avança pelos estágios de forma independente, então os estágios
+        se sobrepõem. Falha de uma guia não interrompe o lote.
+        
+        Args:
+            itens: Lista de dicts com user_id, competencia, valor, codigo_pagamento e dados_usuario
+            concorrencia_pdf: Máximo de PDFs renderizando ao mesmo tempo (padrão: GPS_LOTE_CONCORRENCIA_PDF)
+            concorrencia_upload: Máximo de uploads simultâneos (padrão: GPS_LOTE_CONCORRENCIA_UPLOAD)
+            concorrencia_persistencia: Máximo de inserts simultâneos (padrão: GPS_LOTE_CONCORRENCIA_DB)
+        
+        Returns:
+            Dicionário com:
+                - total, sucesso, falhas, duracao_ms
+                - estagios: throughput e tempos por estágio
+                - resultados: um dict por item (na ordem recebida), com 'erro' em caso de falha
+        """
+        inicio_lote = time.perf_counter()
+        concorrencia_pdf = concorrencia_pdf or _concorrencia_env("GPS_LOTE_CONCORRENCIA_PDF", self.pdf_pool.max_pendentes)
+        concorrencia_upload = concorrencia_upload or _concorrencia_env("GPS_LOTE_CONCORRENCIA_UPLOAD", 8)
+        concorrencia_persistencia = concorrencia_persistencia or _concorrencia_env("GPS_LOTE_CONCORRENCIA_DB", 8)
+        
+        estagios = {
+            "codigo_barras": EstagioLote("codigo_barras", 1),
+            "pdf": EstagioLote("pdf", concorrencia_pdf),
+            "upload": EstagioLote("upload", concorrencia_upload),
+            "persistencia": EstagioLote("persistencia", concorrencia_persistencia),
+        }
+        resultados: List[Dict[str, Any]] = [{} for _ in itens]
+        
+        # ===== ESTÁGIO 1: código de barras (vetorizado) =====
+        # Cada item é validado isoladamente: um inválido vira erro do item, não do lote
+        inicio_barras = time.perf_counter()
+        validos = []
+        for indice, item in enumerate(itens):
+            try:
+                identificador = self._extrair_identificador(item.get("dados_usuario") or {})
+                tupla = (str(item["codigo_pagamento"]), item["competencia"], float(item["valor"]), identificador)
+                CodigoBarrasGPS._montar_codigo_sem_dv(*tupla)
+                validos.append((indice, tupla))
+            except (KeyError, TypeError, ValueError) as e:
+                resultados[indice] = {"erro": f"{type(e).__name__}: {e}"}
+        
+        barras = CodigoBarrasGPS.gerar_lote([tupla for _, tupla in validos])
+        
+        estagio_barras = estagios["codigo_barras"]
+        estagio_barras.inicio = inicio_barras
+        estagio_barras.fim = time.perf_counter()
+        estagio_barras.tempo_ocupado = estagio_barras.fim - inicio_barras
+        estagio_barras.processados = len(barras)
+        estagio_barras.falhas = len(itens) - len(barras)
+        
+        # ===== ESTÁGIOS 2-4: PDF, upload e persistência =====
+        semaforos = {
+            "pdf": asyncio.Semaphore(concorrencia_pdf),
+            "upload": asyncio.Semaphore(concorrencia_upload),
+            "persistencia": asyncio.Semaphore(concorrencia_persistencia),
+        }
+        
+        async def _executar_estagio(nome: str, funcao: Callable[[], Awaitable[Any]]) -> Any:
+            async with semaforos[nome]:
+                inicio = time.perf_counter()
+                try:
+                    resultado = await funcao()
+                except Exception:
+                    estagios[nome].registrar(inicio, time.perf_counter(), sucesso=False)
+                    raise
+                estagios[nome].registrar(inicio, time.perf_counter())
+                return resultado
+        
+        async def _processar(indice: int, resultado_barras: Dict[str, Any]) -> None:
+            item = itens[indice]
+            user_id = item["user_id"]
+            competencia = item["competencia"]
+            valor = float(item["valor"])
+            codigo_pagamento = str(item["codigo_pagamento"])
+            codigo_barras = resultado_barras["codigo_barras"]
+            linha_digitavel = resultado_barras["linha_digitavel"]
+            try:
+                vencimento = calcular_vencimento_padrao(competencia)
+                dados_pdf = self._preparar_dados_pdf(
+                    competencia=competencia,
+                    valor=valor,
+                    codigo_pagamento=codigo_pagamento,
+                    dados_usuario=item.get("dados_usuario") or {},
+                    codigo_barras=codigo_barras,
+                    linha_digitavel=linha_digitavel,
+                    vencimento=vencimento
+                )
+                
+                pdf_bytes = await _executar_estagio(
+                    "pdf",
+                    lambda: self.pdf_pool.renderizar(dados_pdf)
+                )
+                
+                pdf_url = await _executar_estagio(
+                    "upload",
+                    lambda: self.supabase.armazenar_pdf(pdf_bytes, bucket="guias")
+                )
+                
+                guia_data = {
+                    "codigo_gps": codigo_pagamento,
+                    "competencia": competencia,
+                    "valor": valor,
+                    "status": "pendente",
+                    "data_vencimento": vencimento.isoformat(),
+                    "metodo_emissao": MetodoEmissao.LOCAL.value,
+                    "validado_sal": False,
+                    "pdf_url": pdf_url,
+                    "codigo_barras": codigo_barras
+                }
+                guia_salva = await _executar_estagio(
+                    "persistencia",
+                    lambda: self.supabase.salvar_guia(user_id=user_id, guia_data=guia_data)
+                )
+
+                resultados[indice] = {
+                    'id': guia_salva['id'],
+                    'user_id': user_id,
+                    'pdf_url': pdf_url,
+                    'codigo_barras': codigo_barras,
+                    'linha_digitavel': linha_digitavel,
+                    'vencimento': vencimento.strftime("%d/%m/%Y"),
+                    'valor_total': valor,
+                    'metodo_emissao': MetodoEmissao.LOCAL.value,
+                    'validado_sal': False
+                }
+            except Exception as e:
+                resultados[indice] = {"erro": f"{type(e).__name__}: {e}"}
+        
+        await asyncio.gather(*[
+            _processar(indice, resultado_barras)
+            for (indice, _), resultado_barras in zip(validos, barras)
+        ])
+        
+        sucesso = sum(1 for r in resultados if "erro" not in r)
+        emissoes_por_metodo.incrementar(sucesso, metodo=MetodoEmissao.LOCAL.value, resultado="sucesso")
+        emissoes_por_metodo.incrementar(len(itens) - sucesso, metodo=MetodoEmissao.LOCAL.value, resultado="erro")
+        # Um único incremento de contadores para o lote inteiro
+        await self.estatisticas.registrar_emissao(MetodoEmissao.LOCAL.value, quantidade=sucesso)
+        duracao = time.perf_counter() - inicio_lote
+        resumo_estagios = {nome: estagio.resumo() for nome, estagio in estagios.items()}
+        
+        self.logger.info(
+            "Lote de GPS emitido",
+            total=len(itens),
+            sucesso=sucesso,
+            duracao_ms=round(duracao * 1000, 2)
+        )
+        
+        return {
+            "total": len(itens),
+            "sucesso": sucesso,
+            "falhas": len(itens) - sucesso,
+            "duracao_ms": round(duracao * 1000, 2),
+            "estagios": resumo_estagios,
+            "resultados": resultados
+        }
@@ -12,10 +12,15 @@ from reportlab.graphics.barcode import common  # Para Interleaved 2 of 5
 from reportlab.graphics import renderPDF
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from reportlab import rl_config
 from io import BytesIO
 from datetime import datetime
 from typing import Dict, Optional
 import os
+import threading
+
+from ..utils.dinheiro import Centavos, ValorReais, formatar_moeda
+from ..utils.profiling import perfil_memoria
 
 
 class GPSEstilo:
@@ -77,6 +82,9 @@ class GPSEstilo:
     BORDA_FINA = 0.5
     
     # Cabeçalho
+    LOGO_LARGURA = 32 * mm
+    LOGO_ALTURA = 20 * mm
+    LOGO_RESOLUCAO_DPI = 300  # Resolução do logo embutido no modo template
     CABECALHO_Y_INICIO = PAGINA_ALTURA - MARGEM_SUPERIOR - 10 * mm
     CABECALHO_ALTURA = 10 * mm
     TEXTO_INST_1_Y = CABECALHO_Y_INICIO - 2 * mm
@@ -177,9 +185,9 @@ class GPSEstilo:
     PADDING_VERTICAL_LABEL = 1.5 * mm
     
     @staticmethod
-    def formatar_moeda(valor: float) -> str:
+    def formatar_moeda(valor: ValorReais) -> str:
         """Formata valor monetário no padrão brasileiro"""
-        return f"R$ {valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+        return formatar_moeda(valor)
     
     @staticmethod
     def formatar_nit(nit: str) -> str:
@@ -190,18 +198,44 @@ class GPSEstilo:
         return f"{nit[:3]}.{nit[3:8]}.{nit[8:10]}-{nit[10]}"
 
 
+_NOME_FORM_ESTATICO = "GPSLayoutEstatico"
+
+# Streams sem ASCII85: sem o pacote rl_accel (opcional no ReportLab 4) o
+# codificador ASCII85 é Python puro e dominava o tempo de cada guia. É a
+# configuração pública do ReportLab (rl_settings.useA85); RL_useA85 no
+# ambiente tem precedência.
+if "RL_useA85" not in os.environ:
+    rl_config.useA85 = 0
+
+
 class GPSPDFGeneratorOficial:
     """
     Gerador de GPS seguindo modelo oficial da Receita Federal
+
+    Modo template (padrão, GPS_PDF_TEMPLATE=1): o layout fixo (cabeçalho, logo,
+    bordas, labels, aviso de atenção, autenticação) vai para um form XObject
+    de cada documento (beginForm/doForm), com o logo reduzido e codificado em
+    JPEG uma vez por processo; o ReportLab embute o JPEG sem recodificar.
     """
+
+    # Cache por processo do logo reduzido em JPEG (modo template)
+    _logo_jpeg: Optional[bytes] = None
+    _logo_lock = threading.Lock()
+
+    # barWidth do I2of5 por quantidade de dígitos (a largura só depende disso)
+    _largura_barra_cache: Dict[int, float] = {}
     
-    def __init__(self):
+    def __init__(self, modo_template: Optional[bool] = None):
         # [OK] CORREÇÃO: PDF em A4 PORTRAIT conforme PROMPT para montar o pdf oficial.txt
         self.width = GPSEstilo.PAGINA_LARGURA  # 210mm
         self.height = GPSEstilo.PAGINA_ALTURA  # 297mm
         self.margin_left = GPSEstilo.MARGEM_ESQUERDA  # 3mm
         self.margin_right = GPSEstilo.MARGEM_DIREITA  # 3mm
         self.margin_top = GPSEstilo.MARGEM_SUPERIOR  # 3mm
+
+        if modo_template is None:
+            modo_template = os.getenv("GPS_PDF_TEMPLATE", "1").lower() not in ("0", "false", "no")
+        self.modo_template = modo_template
         
         print(f"[PDF] Gerando PDF em A4 PORTRAIT: {self.width:.1f} x {self.height:.1f}")
         
@@ -209,7 +243,6 @@ class GPSPDFGeneratorOficial:
         self.color_blue = colors.Color(0, 0.4, 0.8)  # Azul institucional
         self.color_black = GPSEstilo.COR_BORDA
         self.color_gray = colors.Color(0.5, 0.5, 0.5)
-        self._ultima_posicao_digitavel = None
         
     def _obter_logo_inss_path(self) -> Optional[str]:
         """
@@ -228,13 +261,39 @@ class GPSPDFGeneratorOficial:
             if os.path.exists(caminho):
                 return caminho
         return None
-    
+
+    def _codificar_logo_jpeg(self) -> Optional[bytes]:
+        """
+        Reduz o logo para a resolução de impressão do cabeçalho
+        (GPSEstilo.LOGO_RESOLUCAO_DPI) e o achata sobre branco (a guia é
+        impressa em fundo branco) em JPEG: o ReportLab embute JPEG como está,
+        sem reprocessar os pixels a cada guia.
+        """
+        logo_path = self._obter_logo_inss_path()
+        if not logo_path:
+            return None
+        try:
+            from PIL import Image
+
+            imagem = Image.open(logo_path).convert("RGBA")
+            escala = GPSEstilo.LOGO_RESOLUCAO_DPI / 72.0
+            limite = (int(GPSEstilo.LOGO_LARGURA * escala), int(GPSEstilo.LOGO_ALTURA * escala))
+            if imagem.width > limite[0] or imagem.height > limite[1]:
+                imagem.thumbnail(limite, Image.LANCZOS)
+            fundo = Image.new("RGB", imagem.size, "white")
+            fundo.paste(imagem, mask=imagem.getchannel("A"))
+            saida = BytesIO()
+            fundo.save(saida, "JPEG", quality=92)
+            return saida.getvalue()
+        except Exception as err:
+            print(f"[PDF] [WARN] Falha ao reduzir logo INSS, usando original: {err}")
+            return None
+    
+    @perfil_memoria("pdf_oficial")
     def gerar(self, dados: Dict) -> BytesIO:
         """
         Gera GPS em PDF (método principal usado pelo sistema)
         
-        Args:
-        
         Args:
             dados = {
                 'nome': 'CARLOS GESIEL REBELO',
@@ -262,16 +321,14 @@ class GPSPDFGeneratorOficial:
         buffer = BytesIO()
         c = canvas.Canvas(buffer, pagesize=A4)
         
-        # Desenha todos os elementos
-        self._desenhar_cabecalho(c)
-        self._desenhar_titulo_principal(c)
-        self._desenhar_secao_dados_contribuinte(c, dados)
-        self._desenhar_secao_dados_pagamento(c, dados)
-        self._desenhar_rodape_atencao(c)
-        self._desenhar_competencias_consolidadas(c, dados)  # [OK] Inclui linha digitável ACIMA do código de barras
-        self._desenhar_autenticacao_bancaria(c)
-        # [OK] CORREÇÃO: Código de barras ABAIXO da linha digitável (linha digitável já foi desenhada acima)
-        self._desenhar_codigo_barras(c, dados)
+        # Layout fixo: form XObject com logo em cache (modo template) ou desenho completo
+        if self.modo_template:
+            self._aplicar_camada_estatica(c)
+        else:
+            self._desenhar_camada_estatica(c)
+
+        # Campos da guia + código de barras (ABAIXO da linha digitável)
+        self._desenhar_camada_variavel(c, dados)
         
         # Finaliza
         c.save()
@@ -279,21 +336,72 @@ class GPSPDFGeneratorOficial:
         # Retorna buffer
         buffer.seek(0)
         return buffer
+
+    # ============================================
+    # CAMADAS
+    # ============================================
+
+    def _desenhar_camada_estatica(self, c: canvas.Canvas, logo=None):
+        """
+        Desenha tudo que não depende dos dados da guia.
+
+        Args:
+            c: Canvas de destino
+            logo: Caminho ou ImageReader do logo (padrão: arquivo original)
+        """
+        self._desenhar_cabecalho(c, logo)
+        self._desenhar_titulo_principal(c)
+        self._desenhar_moldura_contribuinte(c)
+        self._desenhar_moldura_pagamento(c)
+        self._desenhar_rodape_atencao(c)
+        self._desenhar_label_consolidadas(c)
+        self._desenhar_autenticacao_bancaria(c)
+
+    def _desenhar_camada_variavel(self, c: canvas.Canvas, dados: Dict):
+        """Desenha os campos que mudam a cada guia e o código de barras."""
+        self._desenhar_dados_contribuinte(c, dados)
+        self._desenhar_dados_pagamento(c, dados)
+        self._desenhar_linha_digitavel(c, dados)  # [OK] ACIMA do código de barras
+        self._desenhar_codigo_barras(c, dados)
+
+    def _obter_logo_jpeg(self) -> Optional[bytes]:
+        """Retorna o logo reduzido em JPEG, gerando-o na primeira chamada do processo."""
+        logo = GPSPDFGeneratorOficial._logo_jpeg
+        if logo is None:
+            with GPSPDFGeneratorOficial._logo_lock:
+                logo = GPSPDFGeneratorOficial._logo_jpeg
+                if logo is None:
+                    logo = self._codificar_logo_jpeg() or b""
+                    GPSPDFGeneratorOficial._logo_jpeg = logo
+        return logo or None
+
+    def _aplicar_camada_estatica(self, c: canvas.Canvas):
+        """Desenha a camada estática como form XObject do documento e o aplica na página."""
+        logo_jpeg = self._obter_logo_jpeg()
+        c.beginForm(_NOME_FORM_ESTATICO)
+        self._desenhar_camada_estatica(c, ImageReader(BytesIO(logo_jpeg)) if logo_jpeg else None)
+        c.endForm()
+        c.doForm(_NOME_FORM_ESTATICO)
+
+    # ============================================
+    # CAMADA ESTÁTICA
+    # ============================================
     
-    def _desenhar_cabecalho(self, c: canvas.Canvas):
+    def _desenhar_cabecalho(self, c: canvas.Canvas, logo=None):
         """
         Desenha cabeçalho com logo e informações institucionais conforme GPSEstilo
         """
-        logo_path = self._obter_logo_inss_path()
-        logo_width = 32 * mm
-        logo_height = 20 * mm
+        if logo is None:
+            logo = self._obter_logo_inss_path()
+        logo_width = GPSEstilo.LOGO_LARGURA
+        logo_height = GPSEstilo.LOGO_ALTURA
         x_logo = GPSEstilo.MARGEM_ESQUERDA
         y_logo = GPSEstilo.CABECALHO_Y_INICIO - logo_height
         
-        if logo_path:
+        if logo:
             try:
                 c.drawImage(
-                    logo_path,
+                    logo,
                     x_logo,
                     y_logo,
                     width=logo_width,
@@ -303,10 +411,10 @@ class GPSPDFGeneratorOficial:
                 )
             except Exception as err:
                 print(f"[PDF] [WARN] Falha ao desenhar logo INSS: {err}")
-                logo_path = None
+                logo = None
         
         # Posição inicial dos textos (ao lado da logo)
-        x_texto = x_logo + (logo_width + 4 * mm) if logo_path else GPSEstilo.MARGEM_ESQUERDA
+        x_texto = x_logo + (logo_width + 4 * mm) if logo else GPSEstilo.MARGEM_ESQUERDA
         
         # [OK] CORREÇÃO: Usar fontes e posições exatas do GPSEstilo
         c.setFont(GPSEstilo.FONTE_CABECALHO, GPSEstilo.TAMANHO_CABECALHO)
@@ -337,9 +445,9 @@ class GPSPDFGeneratorOficial:
         
         c.drawString(x_centro, GPSEstilo.TITULO_Y, titulo)
     
-    def _desenhar_secao_dados_contribuinte(self, c: canvas.Canvas, dados: Dict):
+    def _desenhar_moldura_contribuinte(self, c: canvas.Canvas):
         """
-        Desenha seção esquerda com dados do contribuinte (campos 1 e 2) conforme GPSEstilo
+        Desenha bordas e labels da seção esquerda (campos 1 e 2) conforme GPSEstilo
         """
         x = GPSEstilo.MARGEM_ESQUERDA
         
@@ -360,35 +468,6 @@ class GPSPDFGeneratorOficial:
             "1 - NOME OU RAZÃO SOCIAL"
         )
         
-        # NIT/PIS/PASEP
-        nit_raw = dados.get('nit', '')
-        nit_formatado = GPSEstilo.formatar_nit(nit_raw) if nit_raw else ''
-        
-        c.setFont(GPSEstilo.FONTE_VALOR, GPSEstilo.TAMANHO_VALOR_PEQUENO)
-        c.drawString(
-            x + GPSEstilo.PADDING_HORIZONTAL,
-            y_campo1 - GPSEstilo.CAMPO1_NIT_Y_OFFSET,
-            f"NIT/PIS/PASEP: {nit_formatado}"
-        )
-        
-        # Nome (em negrito, tamanho 9pt)
-        c.setFont(GPSEstilo.FONTE_NOME, GPSEstilo.TAMANHO_NOME)
-        nome = dados.get('nome', '').upper()
-        c.drawString(
-            x + GPSEstilo.PADDING_HORIZONTAL,
-            y_campo1 - GPSEstilo.CAMPO1_NOME_Y_OFFSET,
-            nome
-        )
-        
-        # UF
-        c.setFont(GPSEstilo.FONTE_VALOR, GPSEstilo.TAMANHO_VALOR_PEQUENO)
-        uf = dados.get('uf', '').upper()
-        c.drawString(
-            x + GPSEstilo.PADDING_HORIZONTAL,
-            y_campo1 - GPSEstilo.CAMPO1_UF_Y_OFFSET,
-            f"UF: {uf}"
-        )
-        
         # ========== CAMPO 2: VENCIMENTO ==========
         y_campo2 = GPSEstilo.CAMPO2_Y
         
@@ -396,181 +475,39 @@ class GPSPDFGeneratorOficial:
         c.rect(x, y_campo2 - GPSEstilo.CAMPO2_ALTURA, GPSEstilo.SECAO_ESQUERDA_LARGURA, GPSEstilo.CAMPO2_ALTURA)
         
         # Label
-        c.setFont(GPSEstilo.FONTE_LABEL, GPSEstilo.TAMANHO_LABEL)
         c.drawString(
             x + GPSEstilo.PADDING_HORIZONTAL,
             y_campo2 - GPSEstilo.CAMPO2_LABEL_Y_OFFSET,
             "2 - VENCIMENTO (Uso exclusivo INSS)"
         )
-        
-        # Data de vencimento (centralizado, negrito, tamanho 11pt)
-        vencimento = dados.get('vencimento', '')
-        c.setFont(GPSEstilo.FONTE_VENCIMENTO, GPSEstilo.TAMANHO_VENCIMENTO)
-        text_width = c.stringWidth(vencimento, GPSEstilo.FONTE_VENCIMENTO, GPSEstilo.TAMANHO_VENCIMENTO)
-        x_centered = x + (GPSEstilo.SECAO_ESQUERDA_LARGURA - text_width) / 2
-        c.drawString(x_centered, y_campo2 - GPSEstilo.CAMPO2_VALOR_Y_OFFSET, vencimento)
     
-    def _desenhar_secao_dados_pagamento(self, c: canvas.Canvas, dados: Dict):
+    def _desenhar_moldura_pagamento(self, c: canvas.Canvas):
         """
-        Desenha seção direita com dados de pagamento (campos 3-11) conforme GPSEstilo
+        Desenha bordas e labels da seção direita (campos 3-11) conforme GPSEstilo
         """
         c.setStrokeColor(GPSEstilo.COR_BORDA)
         c.setLineWidth(GPSEstilo.BORDA_FINA)
         c.setFillColor(GPSEstilo.COR_TEXTO_NORMAL)
-        
-        # ========== LINHA 1: Código, Competência, Identificador ==========
-        # CAMPO 3: CÓDIGO DE PAGAMENTO
-        self._desenhar_campo_numerico(
-            c,
-            GPSEstilo.CAMPO3_X,
-            GPSEstilo.LINHA1_Y,
-            GPSEstilo.CAMPO3_LARGURA,
-            GPSEstilo.LINHA1_ALTURA,
-            "3 - CÓDIGO DE PAGAMENTO",
-            dados.get('codigo_pagamento', ''),
-            tamanho_valor=GPSEstilo.TAMANHO_NUMERICO,
-            negrito_valor=True
-        )
-        
-        # CAMPO 4: COMPETÊNCIA
-        self._desenhar_campo_numerico(
-            c,
-            GPSEstilo.CAMPO4_X,
-            GPSEstilo.LINHA1_Y,
-            GPSEstilo.CAMPO4_LARGURA,
-            GPSEstilo.LINHA1_ALTURA,
-            "4 - COMPETÊNCIA",
-            dados.get('competencia', ''),
-            tamanho_valor=GPSEstilo.TAMANHO_NUMERICO,
-            negrito_valor=True
-        )
-        
-        # CAMPO 5: IDENTIFICADOR
-        nit_raw = dados.get('nit', '')
-        nit_formatado = GPSEstilo.formatar_nit(nit_raw) if nit_raw else ''
-        self._desenhar_campo_numerico(
-            c,
-            GPSEstilo.CAMPO5_X,
-            GPSEstilo.LINHA1_Y,
-            GPSEstilo.CAMPO5_LARGURA,
-            GPSEstilo.LINHA1_ALTURA,
-            "5 - IDENTIFICADOR",
-            nit_formatado,
-            tamanho_valor=GPSEstilo.TAMANHO_VALOR_PEQUENO,
-            negrito_valor=True
-        )
-        
-        # ========== LINHA 2: Valor INSS, dois campos vazios ==========
-        # CAMPO 6: VALOR DO INSS
-        self._desenhar_campo_valor(
-            c,
-            GPSEstilo.CAMPO6_X,
-            GPSEstilo.LINHA2_Y,
-            GPSEstilo.CAMPO6_LARGURA,
-            GPSEstilo.LINHA2_ALTURA,
-            "6 - VALOR DO INSS",
-            dados.get('valor_inss', 0.00)
-        )
-        
-        # CAMPO 7: (vazio)
-        c.rect(GPSEstilo.CAMPO7_X, GPSEstilo.LINHA2_Y - GPSEstilo.LINHA2_ALTURA, GPSEstilo.CAMPO7_LARGURA, GPSEstilo.LINHA2_ALTURA)
-        c.setFont(GPSEstilo.FONTE_LABEL, GPSEstilo.TAMANHO_LABEL)
-        c.drawString(GPSEstilo.CAMPO7_X + GPSEstilo.PADDING_HORIZONTAL, GPSEstilo.LINHA2_Y - GPSEstilo.PADDING_VERTICAL_LABEL, "7 -")
-        
-        # CAMPO 8: (vazio)
-        c.rect(GPSEstilo.CAMPO8_X, GPSEstilo.LINHA2_Y - GPSEstilo.LINHA2_ALTURA, GPSEstilo.CAMPO8_LARGURA, GPSEstilo.LINHA2_ALTURA)
         c.setFont(GPSEstilo.FONTE_LABEL, GPSEstilo.TAMANHO_LABEL)
-        c.drawString(GPSEstilo.CAMPO8_X + GPSEstilo.PADDING_HORIZONTAL, GPSEstilo.LINHA2_Y - GPSEstilo.PADDING_VERTICAL_LABEL, "8 -")
-        
-        # ========== LINHA 3: Valor Outras Entidades, ATM/Multa ==========
-        # CAMPO 9: VALOR OUTRAS ENTIDADES
-        self._desenhar_campo_valor(
-            c,
-            GPSEstilo.CAMPO9_X,
-            GPSEstilo.LINHA3_Y,
-            GPSEstilo.CAMPO9_LARGURA,
-            GPSEstilo.LINHA3_ALTURA,
-            "9 - VALOR OUTRAS ENTIDADES",
-            dados.get('valor_outras_entidades', 0.00)
-        )
-        
-        # CAMPO 10: ATM/MULTA E JUROS
-        self._desenhar_campo_valor(
-            c,
-            GPSEstilo.CAMPO10_X,
-            GPSEstilo.LINHA3_Y,
-            GPSEstilo.CAMPO10_LARGURA,
-            GPSEstilo.LINHA3_ALTURA,
-            "10 - ATM/MULTA E JUROS",
-            dados.get('atm_multa_juros', 0.00)
-        )
         
-        # ========== LINHA 4: TOTAL ==========
-        # CAMPO 11: TOTAL
-        c.rect(GPSEstilo.CAMPO11_X, GPSEstilo.LINHA4_Y - GPSEstilo.LINHA4_ALTURA, GPSEstilo.CAMPO11_LARGURA, GPSEstilo.LINHA4_ALTURA)
-        
-        # Label
-        c.setFont(GPSEstilo.FONTE_LABEL, GPSEstilo.TAMANHO_LABEL)
-        c.drawString(
-            GPSEstilo.CAMPO11_X + GPSEstilo.PADDING_HORIZONTAL,
-            GPSEstilo.LINHA4_Y - GPSEstilo.PADDING_VERTICAL_LABEL,
-            "11 - TOTAL"
+        campos = (
+            # LINHA 1: Código, Competência, Identificador
+            (GPSEstilo.CAMPO3_X, GPSEstilo.LINHA1_Y, GPSEstilo.CAMPO3_LARGURA, GPSEstilo.LINHA1_ALTURA, "3 - CÓDIGO DE PAGAMENTO"),
+            (GPSEstilo.CAMPO4_X, GPSEstilo.LINHA1_Y, GPSEstilo.CAMPO4_LARGURA, GPSEstilo.LINHA1_ALTURA, "4 - COMPETÊNCIA"),
+            (GPSEstilo.CAMPO5_X, GPSEstilo.LINHA1_Y, GPSEstilo.CAMPO5_LARGURA, GPSEstilo.LINHA1_ALTURA, "5 - IDENTIFICADOR"),
+            # LINHA 2: Valor INSS, dois campos vazios
+            (GPSEstilo.CAMPO6_X, GPSEstilo.LINHA2_Y, GPSEstilo.CAMPO6_LARGURA, GPSEstilo.LINHA2_ALTURA, "6 - VALOR DO INSS"),
+            (GPSEstilo.CAMPO7_X, GPSEstilo.LINHA2_Y, GPSEstilo.CAMPO7_LARGURA, GPSEstilo.LINHA2_ALTURA, "7 -"),
+            (GPSEstilo.CAMPO8_X, GPSEstilo.LINHA2_Y, GPSEstilo.CAMPO8_LARGURA, GPSEstilo.LINHA2_ALTURA, "8 -"),
+            # LINHA 3: Valor Outras Entidades, ATM/Multa
+            (GPSEstilo.CAMPO9_X, GPSEstilo.LINHA3_Y, GPSEstilo.CAMPO9_LARGURA, GPSEstilo.LINHA3_ALTURA, "9 - VALOR OUTRAS ENTIDADES"),
+            (GPSEstilo.CAMPO10_X, GPSEstilo.LINHA3_Y, GPSEstilo.CAMPO10_LARGURA, GPSEstilo.LINHA3_ALTURA, "10 - ATM/MULTA E JUROS"),
+            # LINHA 4: TOTAL
+            (GPSEstilo.CAMPO11_X, GPSEstilo.LINHA4_Y, GPSEstilo.CAMPO11_LARGURA, GPSEstilo.LINHA4_ALTURA, "11 - TOTAL"),
         )
-        
-        # Valor total (negrito, tamanho 14pt, centralizado)
-        valor_total = dados.get('valor_inss', 0) + dados.get('valor_outras_entidades', 0) + dados.get('atm_multa_juros', 0)
-        valor_formatado = GPSEstilo.formatar_moeda(valor_total)
-        c.setFont(GPSEstilo.FONTE_TOTAL, GPSEstilo.TAMANHO_TOTAL)
-        text_width = c.stringWidth(valor_formatado, GPSEstilo.FONTE_TOTAL, GPSEstilo.TAMANHO_TOTAL)
-        x_centered = GPSEstilo.CAMPO11_X + (GPSEstilo.CAMPO11_LARGURA - text_width) / 2
-        y_valor = GPSEstilo.LINHA4_Y - GPSEstilo.LINHA4_ALTURA/2 - GPSEstilo.TAMANHO_TOTAL/3
-        c.drawString(x_centered, y_valor, valor_formatado)
-    
-    def _desenhar_campo_numerico(self, c: canvas.Canvas, x: float, y: float, 
-                                 largura: float, altura: float, label: str, 
-                                 valor: str, tamanho_valor: int = 9, negrito_valor: bool = True):
-        """
-        Desenha campo numérico com label e valor conforme GPSEstilo
-        """
-        c.setStrokeColor(GPSEstilo.COR_BORDA)
-        c.setLineWidth(GPSEstilo.BORDA_FINA)
-        c.rect(x, y - altura, largura, altura)
-        
-        # Label
-        c.setFont(GPSEstilo.FONTE_LABEL, GPSEstilo.TAMANHO_LABEL)
-        c.setFillColor(GPSEstilo.COR_TEXTO_NORMAL)
-        c.drawString(x + GPSEstilo.PADDING_HORIZONTAL, y - GPSEstilo.PADDING_VERTICAL_LABEL, label)
-        
-        # Valor (centralizado)
-        if valor:
-            fonte_valor = GPSEstilo.FONTE_NUMERICO if negrito_valor else GPSEstilo.FONTE_VALOR
-            c.setFont(fonte_valor, tamanho_valor)
-            text_width = c.stringWidth(valor, fonte_valor, tamanho_valor)
-            x_centered = x + (largura - text_width) / 2
-            y_centered = y - altura/2 - tamanho_valor/3
-            c.drawString(x_centered, y_centered, valor)
-    
-    def _desenhar_campo_valor(self, c: canvas.Canvas, x: float, y: float,
-                              largura: float, altura: float, label: str, valor: float):
-        """
-        Desenha campo de valor monetário conforme GPSEstilo (formato brasileiro: R$ 1.234,56)
-        """
-        c.setStrokeColor(GPSEstilo.COR_BORDA)
-        c.setLineWidth(GPSEstilo.BORDA_FINA)
-        c.rect(x, y - altura, largura, altura)
-        
-        # Label
-        c.setFont(GPSEstilo.FONTE_LABEL, GPSEstilo.TAMANHO_LABEL)
-        c.setFillColor(GPSEstilo.COR_TEXTO_NORMAL)
-        c.drawString(x + GPSEstilo.PADDING_HORIZONTAL, y - GPSEstilo.PADDING_VERTICAL_LABEL, label)
-        
-        # Valor formatado (formato brasileiro: R$ 1.234,56)
-        valor_formatado = GPSEstilo.formatar_moeda(valor)
-        c.setFont(GPSEstilo.FONTE_VALOR, GPSEstilo.TAMANHO_VALOR_GRANDE)
-        text_width = c.stringWidth(valor_formatado, GPSEstilo.FONTE_VALOR, GPSEstilo.TAMANHO_VALOR_GRANDE)
-        x_centered = x + (largura - text_width) / 2
-        y_centered = y - altura/2 - GPSEstilo.TAMANHO_VALOR_GRANDE/3
-        c.drawString(x_centered, y_centered, valor_formatado)
+        for x, y, largura, altura, label in campos:
+            c.rect(x, y - altura, largura, altura)
+            c.drawString(x + GPSEstilo.PADDING_HORIZONTAL, y - GPSEstilo.PADDING_VERTICAL_LABEL, label)
     
     def _desenhar_rodape_atencao(self, c: canvas.Canvas):
         """
@@ -609,52 +546,167 @@ class GPSPDFGeneratorOficial:
         if linha_atual:
             c.drawString(x, y, linha_atual)
     
-    def _desenhar_competencias_consolidadas(self, c: canvas.Canvas, dados: Dict):
+    def _desenhar_label_consolidadas(self, c: canvas.Canvas):
         """
-        Desenha texto "Competências consolidadas nesta GPS:" e linha digitável ACIMA do código de barras
-        conforme GPSEstilo - a linha digitável deve estar ACIMA do código de barras
+        Desenha texto "Competências consolidadas nesta GPS:" (a linha digitável vem logo abaixo)
         """
-        x = GPSEstilo.MARGEM_ESQUERDA
-        y = GPSEstilo.CONSOLIDADO_Y
-        
         c.setFont(GPSEstilo.FONTE_VALOR, GPSEstilo.TAMANHO_VALOR_PEQUENO)
         c.setFillColor(GPSEstilo.COR_TEXTO_NORMAL)
-        c.drawString(x, y, "Competências consolidadas nesta GPS:")
-        
-        # [OK] CORREÇÃO: Desenhar linha digitável ACIMA do código de barras (na seção de competências consolidadas)
-        linha_digitavel = dados.get('linha_digitavel', '')
-        if linha_digitavel:
-            # Posição Y: abaixo do label "Competências consolidadas"
-            y_linha = y - GPSEstilo.CONSOLIDADO_VALOR_Y_OFFSET
-            
-            # [OK] CORREÇÃO: Linha digitável em Courier-Bold 9pt conforme GPSEstilo
-            c.setFont(GPSEstilo.FONTE_LINHA_DIGITAVEL, GPSEstilo.TAMANHO_LINHA_DIGITAVEL)
-            c.setFillColor(GPSEstilo.COR_TEXTO_NORMAL)
-            
-            # Centraliza horizontalmente
-            texto_width = c.stringWidth(linha_digitavel, GPSEstilo.FONTE_LINHA_DIGITAVEL, GPSEstilo.TAMANHO_LINHA_DIGITAVEL)
-            x_linha = (GPSEstilo.PAGINA_LARGURA - texto_width) / 2
-            
-            print(f"[PDF] [DEBUG] Desenhando linha digitável ACIMA do código de barras: x={x_linha/mm:.1f}mm, y={y_linha/mm:.1f}mm, texto='{linha_digitavel}'")
-            
-            c.drawString(x_linha, y_linha, linha_digitavel)
-            
-            print(f"[PDF] [OK] Linha digitável desenhada ACIMA do código de barras em Courier-Bold 9pt")
-        
-        # Guardar posição Y para referência do código de barras
-        self._y_competencias = y
+        c.drawString(GPSEstilo.MARGEM_ESQUERDA, GPSEstilo.CONSOLIDADO_Y, "Competências consolidadas nesta GPS:")
     
     def _desenhar_autenticacao_bancaria(self, c: canvas.Canvas):
         """
         Desenha texto "AUTENTICAÇÃO BANCÁRIA" no canto direito conforme GPSEstilo
         """
-        y_referencia = getattr(self, '_y_competencias', GPSEstilo.CONSOLIDADO_Y)
         texto = "AUTENTICAÇÃO BANCÁRIA"
         c.setFont(GPSEstilo.FONTE_LABEL, GPSEstilo.TAMANHO_LABEL)
         c.setFillColor(GPSEstilo.COR_TEXTO_NORMAL)
         text_width = c.stringWidth(texto, GPSEstilo.FONTE_LABEL, GPSEstilo.TAMANHO_LABEL)
         x_texto = GPSEstilo.PAGINA_LARGURA - GPSEstilo.MARGEM_DIREITA - text_width
-        c.drawString(x_texto, y_referencia, texto)
+        c.drawString(x_texto, GPSEstilo.CONSOLIDADO_Y, texto)
+
+    # ============================================
+    # CAMADA VARIÁVEL
+    # ============================================
+
+    @staticmethod
+    def _desenhar_centralizado(c: canvas.Canvas, texto: str, fonte: str, tamanho: float,
+                               x: float, largura: float, y: float):
+        """Desenha texto centralizado horizontalmente em [x, x + largura]."""
+        c.setFont(fonte, tamanho)
+        text_width = c.stringWidth(texto, fonte, tamanho)
+        c.drawString(x + (largura - text_width) / 2, y, texto)
+    
+    def _desenhar_dados_contribuinte(self, c: canvas.Canvas, dados: Dict):
+        """
+        Desenha dados do contribuinte (campos 1 e 2) conforme GPSEstilo
+        """
+        x = GPSEstilo.MARGEM_ESQUERDA + GPSEstilo.PADDING_HORIZONTAL
+        y_campo1 = GPSEstilo.CAMPO1_Y
+        c.setFillColor(GPSEstilo.COR_TEXTO_NORMAL)
+        
+        # NIT/PIS/PASEP
+        nit_raw = dados.get('nit', '')
+        nit_formatado = GPSEstilo.formatar_nit(nit_raw) if nit_raw else ''
+        c.setFont(GPSEstilo.FONTE_VALOR, GPSEstilo.TAMANHO_VALOR_PEQUENO)
+        c.drawString(x, y_campo1 - GPSEstilo.CAMPO1_NIT_Y_OFFSET, f"NIT/PIS/PASEP: {nit_formatado}")
+        
+        # Nome (em negrito, tamanho 9pt)
+        c.setFont(GPSEstilo.FONTE_NOME, GPSEstilo.TAMANHO_NOME)
+        c.drawString(x, y_campo1 - GPSEstilo.CAMPO1_NOME_Y_OFFSET, dados.get('nome', '').upper())
+        
+        # UF
+        c.setFont(GPSEstilo.FONTE_VALOR, GPSEstilo.TAMANHO_VALOR_PEQUENO)
+        c.drawString(x, y_campo1 - GPSEstilo.CAMPO1_UF_Y_OFFSET, f"UF: {dados.get('uf', '').upper()}")
+        
+        # Data de vencimento (centralizado, negrito, tamanho 11pt)
+        self._desenhar_centralizado(
+            c, dados.get('vencimento', ''),
+            GPSEstilo.FONTE_VENCIMENTO, GPSEstilo.TAMANHO_VENCIMENTO,
+            GPSEstilo.MARGEM_ESQUERDA, GPSEstilo.SECAO_ESQUERDA_LARGURA,
+            GPSEstilo.CAMPO2_Y - GPSEstilo.CAMPO2_VALOR_Y_OFFSET
+        )
+    
+    def _desenhar_dados_pagamento(self, c: canvas.Canvas, dados: Dict):
+        """
+        Desenha valores da seção de pagamento (campos 3-11) conforme GPSEstilo
+        """
+        c.setFillColor(GPSEstilo.COR_TEXTO_NORMAL)
+        nit_raw = dados.get('nit', '')
+        
+        # LINHA 1: Código, Competência, Identificador
+        self._desenhar_valor_numerico(
+            c, GPSEstilo.CAMPO3_X, GPSEstilo.LINHA1_Y, GPSEstilo.CAMPO3_LARGURA, GPSEstilo.LINHA1_ALTURA,
+            dados.get('codigo_pagamento', ''), GPSEstilo.TAMANHO_NUMERICO
+        )
+        self._desenhar_valor_numerico(
+            c, GPSEstilo.CAMPO4_X, GPSEstilo.LINHA1_Y, GPSEstilo.CAMPO4_LARGURA, GPSEstilo.LINHA1_ALTURA,
+            dados.get('competencia', ''), GPSEstilo.TAMANHO_NUMERICO
+        )
+        self._desenhar_valor_numerico(
+            c, GPSEstilo.CAMPO5_X, GPSEstilo.LINHA1_Y, GPSEstilo.CAMPO5_LARGURA, GPSEstilo.LINHA1_ALTURA,
+            GPSEstilo.formatar_nit(nit_raw) if nit_raw else '', GPSEstilo.TAMANHO_VALOR_PEQUENO
+        )
+        
+        # LINHA 2 e 3: valores monetários (formato brasileiro: R$ 1.234,56)
+        for x, y, largura, altura, chave in (
+            (GPSEstilo.CAMPO6_X, GPSEstilo.LINHA2_Y, GPSEstilo.CAMPO6_LARGURA, GPSEstilo.LINHA2_ALTURA, 'valor_inss'),
+            (GPSEstilo.CAMPO9_X, GPSEstilo.LINHA3_Y, GPSEstilo.CAMPO9_LARGURA, GPSEstilo.LINHA3_ALTURA, 'valor_outras_entidades'),
+            (GPSEstilo.CAMPO10_X, GPSEstilo.LINHA3_Y, GPSEstilo.CAMPO10_LARGURA, GPSEstilo.LINHA3_ALTURA, 'atm_multa_juros'),
+        ):
+            self._desenhar_centralizado(
+                c, GPSEstilo.formatar_moeda(dados.get(chave, 0.00)),
+                GPSEstilo.FONTE_VALOR, GPSEstilo.TAMANHO_VALOR_GRANDE,
+                x, largura, y - altura/2 - GPSEstilo.TAMANHO_VALOR_GRANDE/3
+            )
+        
+        # LINHA 4: TOTAL (negrito, tamanho 14pt, centralizado)
+        valor_total = sum(
+            Centavos.de_reais(dados.get(chave, 0))
+            for chave in ('valor_inss', 'valor_outras_entidades', 'atm_multa_juros')
+        )
+        self._desenhar_centralizado(
+            c, GPSEstilo.formatar_moeda(valor_total),
+            GPSEstilo.FONTE_TOTAL, GPSEstilo.TAMANHO_TOTAL,
+            GPSEstilo.CAMPO11_X, GPSEstilo.CAMPO11_LARGURA,
+            GPSEstilo.LINHA4_Y - GPSEstilo.LINHA4_ALTURA/2 - GPSEstilo.TAMANHO_TOTAL/3
+        )
+    
+    def _desenhar_valor_numerico(self, c: canvas.Canvas, x: float, y: float,
+                                 largura: float, altura: float, valor: str, tamanho_valor: float):
+        """
+        Desenha valor de campo numérico centralizado (negrito) conforme GPSEstilo
+        """
+        if valor:
+            self._desenhar_centralizado(
+                c, valor, GPSEstilo.FONTE_NUMERICO, tamanho_valor,
+                x, largura, y - altura/2 - tamanho_valor/3
+            )
+    
+    def _desenhar_linha_digitavel(self, c: canvas.Canvas, dados: Dict):
+        """
+        Desenha a linha digitável abaixo de "Competências consolidadas" e ACIMA do código de barras
+        """
+        linha_digitavel = dados.get('linha_digitavel', '')
+        if linha_digitavel:
+            # [OK] CORREÇÃO: Linha digitável em Courier-Bold 9pt conforme GPSEstilo
+            c.setFillColor(GPSEstilo.COR_TEXTO_NORMAL)
+            self._desenhar_centralizado(
+                c, linha_digitavel,
+                GPSEstilo.FONTE_LINHA_DIGITAVEL, GPSEstilo.TAMANHO_LINHA_DIGITAVEL,
+                0, GPSEstilo.PAGINA_LARGURA,
+                GPSEstilo.CONSOLIDADO_Y - GPSEstilo.CONSOLIDADO_VALOR_Y_OFFSET
+            )
+
+    @classmethod
+    def _largura_barra_i2of5(cls, quantidade_digitos: int) -> float:
+        """
+        Módulo fino (barWidth) do I2of5 para aproximar ~150mm de largura total.
+
+        Padrão bancário: módulo fino entre 0.33mm e 0.52mm; parte de 0.43mm e
+        ajusta se a largura resultante diferir mais de 15mm. Como a largura só
+        depende da quantidade de dígitos, o resultado fica em cache.
+        """
+        bar_width = cls._largura_barra_cache.get(quantidade_digitos)
+        if bar_width is not None:
+            return bar_width
+
+        bar_width = 0.43 * mm
+        barcode = common.I2of5(
+            "0" * quantidade_digitos,
+            barWidth=bar_width,
+            barHeight=GPSEstilo.CODIGO_BARRAS_ALTURA,
+            humanReadable=False,
+            checksum=0
+        )
+        largura_desejada = GPSEstilo.CODIGO_BARRAS_LARGURA_TOTAL  # 150mm
+        if abs(barcode.width - largura_desejada) > 15 * mm:
+            fator_ajuste = largura_desejada / barcode.width
+            # Manter dentro dos limites FEBRABAN: 0.33mm a 0.52mm
+            bar_width = min(max(bar_width * fator_ajuste, 0.33 * mm), 0.52 * mm)
+
+        cls._largura_barra_cache[quantidade_digitos] = bar_width
+        return bar_width
 
     def _desenhar_codigo_barras(self, c: canvas.Canvas, dados: Dict):
         """
@@ -679,73 +731,19 @@ class GPSPDFGeneratorOficial:
         y_barcode_bottom = GPSEstilo.CODIGO_BARRAS_Y - GPSEstilo.CODIGO_BARRAS_ALTURA
 
         try:
-            # Interleaved 2 of 5 (I2of5) é o padrão FEBRABAN para GPS/Arrecadação
-            #
-            # Características I2of5:
-            # - Codifica apenas dígitos numéricos (0-9)
-            # - Número PAR de dígitos (44 é par ✓)
-            # - Cada par de dígitos codificado em 5 barras
-            # - Largura de barras: fina (1x) ou grossa (2x ou 3x o módulo)
-            
-            # Para I2of5, barWidth é o módulo fino
-            # Padrão bancário: módulo fino entre 0.33mm e 0.52mm
-            # Vamos usar 0.43mm para boa legibilidade
-            bar_width_i2of5 = 0.43 * mm
-
-            print(f"[PDF] [DEBUG] Gerando Interleaved 2 of 5: {len(codigo_barras)} dígitos")
-            print(f"[PDF] [DEBUG] barWidth (módulo fino): {bar_width_i2of5/mm:.3f}mm")
-
-            # Gerar código de barras I2of5
+            # Interleaved 2 of 5 (I2of5) é o padrão FEBRABAN para GPS/Arrecadação:
+            # apenas dígitos, número PAR de dígitos (44 ✓), sem checksum próprio
             barcode = common.I2of5(
                 codigo_barras,
-                barWidth=bar_width_i2of5,  # Módulo fino
+                barWidth=self._largura_barra_i2of5(len(codigo_barras)),
                 barHeight=GPSEstilo.CODIGO_BARRAS_ALTURA,  # 12mm
                 humanReadable=False,  # Não mostrar números (linha digitável separada)
                 checksum=0  # GPS já tem DV próprio, não adicionar checksum I2of5
             )
 
-            # Verificar largura gerada
-            barcode_width = barcode.width
-
-            print(f"[PDF] [DEBUG] Código I2of5 gerado: largura={barcode_width/mm:.1f}mm")
-
-            # Ajustar barWidth se necessário para aproximar de 150mm
-            largura_desejada = GPSEstilo.CODIGO_BARRAS_LARGURA_TOTAL  # 150mm
-            diferenca = abs(barcode_width - largura_desejada)
-
-            if diferenca > 15 * mm:  # Se diferença > 15mm, ajustar
-                fator_ajuste = largura_desejada / barcode_width
-                bar_width_ajustado = bar_width_i2of5 * fator_ajuste
-
-                # Manter dentro dos limites FEBRABAN: 0.33mm a 0.52mm
-                bar_width_minimo = 0.33 * mm
-                bar_width_maximo = 0.52 * mm
-                bar_width_ajustado = min(max(bar_width_ajustado, bar_width_minimo), bar_width_maximo)
-
-                print(f"[PDF] [DEBUG] Ajustando barWidth I2of5: {bar_width_ajustado/mm:.3f}mm (fator: {fator_ajuste:.3f})")
-
-                # Regenerar código de barras com largura ajustada
-                barcode = common.I2of5(
-                    codigo_barras,
-                    barWidth=bar_width_ajustado,
-                    barHeight=GPSEstilo.CODIGO_BARRAS_ALTURA,
-                    humanReadable=False,
-                    checksum=0
-                )
-                barcode_width = barcode.width
-                print(f"[PDF] [DEBUG] Código I2of5 ajustado: largura={barcode_width/mm:.1f}mm")
-
             # Centraliza horizontalmente
-            x_barcode = (GPSEstilo.PAGINA_LARGURA - barcode_width) / 2
-
-            print(f"[PDF] [DEBUG] Desenhando I2of5: x={x_barcode/mm:.1f}mm, y={y_barcode_bottom/mm:.1f}mm")
-
+            x_barcode = (GPSEstilo.PAGINA_LARGURA - barcode.width) / 2
             barcode.drawOn(c, x_barcode, y_barcode_bottom)
-
-            # Guardar posição Y do código de barras para desenhar linha digitável abaixo
-            self._y_barcode_bottom = y_barcode_bottom
-
-            print(f"[PDF] [OK] Código de barras I2of5 desenhado com sucesso")
             
         except Exception as e:
             print(f"[PDF] [ERRO] Erro ao gerar código de barras: {e}")
@@ -756,7 +754,6 @@ class GPSPDFGeneratorOficial:
             text_width = c.stringWidth(codigo_barras, "Courier", 6)
             x_centro = GPSEstilo.PAGINA_LARGURA / 2
             c.drawString(x_centro - text_width/2, y_barcode_bottom, codigo_barras)
-            self._y_barcode_bottom = y_barcode_bottom
 
 
 # FUNÇÃO DE TESTE
@@ -8,6 +8,8 @@ from io import BytesIO
 from datetime import date
 from decimal import Decimal
 
+from ..utils.dinheiro import Centavos, formatar_moeda
+
 # Tenta importar barcode, se não tiver, usa fallback
 try:
     import barcode
@@ -107,24 +109,24 @@ class PDFGeneratorV2:
         
         # Valores
         y_position -= 0.35 * cm
-        val_contrib = float(gps_data.get('valor_contribuicao', 0))
-        c.drawString(margin_left, y_position, f"Valor Contribuição: R$ {val_contrib:,.2f}")
+        val_contrib = Centavos.de_reais(gps_data.get('valor_contribuicao', 0))
+        c.drawString(margin_left, y_position, f"Valor Contribuição: {formatar_moeda(val_contrib)}")
         
         y_position -= 0.35 * cm
-        val_juros = float(gps_data.get('valor_juros', 0))
-        if val_juros > 0:
-            c.drawString(margin_left, y_position, f"Juros (1% a.m.): R$ {val_juros:,.2f}")
+        val_juros = Centavos.de_reais(gps_data.get('valor_juros', 0))
+        if val_juros > Centavos(0):
+            c.drawString(margin_left, y_position, f"Juros (1% a.m.): {formatar_moeda(val_juros)}")
             y_position -= 0.35 * cm
         
-        val_multa = float(gps_data.get('valor_multa', 0))
-        if val_multa > 0:
-            c.drawString(margin_left, y_position, f"Multa por Atraso: R$ {val_multa:,.2f}")
+        val_multa = Centavos.de_reais(gps_data.get('valor_multa', 0))
+        if val_multa > Centavos(0):
+            c.drawString(margin_left, y_position, f"Multa por Atraso: {formatar_moeda(val_multa)}")
             y_position -= 0.35 * cm
         
         # Valor Total - Destacado
         c.setFont("Helvetica-Bold", 11)
-        val_total = float(gps_data.get('valor_total', 0))
-        c.drawString(margin_left, y_position, f"VALOR TOTAL: R$ {val_total:,.2f}")
+        val_total = Centavos.de_reais(gps_data.get('valor_total', 0))
+        c.drawString(margin_left, y_position, f"VALOR TOTAL: {formatar_moeda(val_total)}")
         
         y_position -= 0.35 * cm
         c.setFont("Helvetica", 9)
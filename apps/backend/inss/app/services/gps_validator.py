@@ -1,7 +1,7 @@
 from datetime import datetime, date
 from typing import Tuple, Optional, Dict, Any
 from decimal import Decimal
-from ..services.supabase_service import SupabaseService
+from ..services.supabase_service import SupabaseService, get_supabase_service
 from ..services.sal_version_manager import SALVersionManager
 
 class GPSValidator:
@@ -10,7 +10,7 @@ class GPSValidator:
     """
     
     def __init__(self, supabase_service: Optional[SupabaseService] = None, sal_manager: Optional[SALVersionManager] = None):
-        self.supabase = supabase_service or SupabaseService()
+        self.supabase = supabase_service or get_supabase_service()
         self.sal_manager = sal_manager or SALVersionManager(self.supabase)
     
     def validar_periodo(self, periodo_mes: int, periodo_ano: int) -> Tuple[bool, str]:
@@ -103,22 +103,31 @@ class GPSValidator:
         if tipo in ["autonomo", "individual"]: tipo_norm = "ci_normal"
         if tipo in ["autonomo_simplificado"]: tipo_norm = "ci_simplificado"
         
-        # Formatar competência MM/YYYY
-        competencia = f"{periodo_mes:02d}/{periodo_ano}"
-        
-        # Buscar no Supabase
-        # Precisamos filtrar por cpf (que pode estar no user metadata ou na tabela gps_emissions se tivermos essa coluna)
-        # A tabela atual é 'gps_emissions' ou 'guias'. Vamos checar 'gps_emissions' primeiro.
-        
-        # Nota: A estrutura atual do banco pode não ter CPF na tabela de guias, apenas user_id.
-        # Se for o caso, a validação de duplicidade por CPF exige join ou busca prévia do user_id.
-        # Vamos simplificar validando por user_id se possível, ou assumir que não temos como validar por CPF direto sem user_id.
-        # Mas o método recebe CPF. Vamos tentar buscar user_id pelo CPF primeiro? Muito custoso.
-        # Vamos assumir que a validação de duplicidade é feita no nível do serviço que tem o user_id.
-        
-        # Por enquanto, retornamos False para não bloquear se não tivermos certeza.
-        # Implementação futura: query na tabela gps_history (nova)
-        return False, None
+        # Guias salvas pelo /emitir guardam cpf, período e tipo (ver guias_inss)
+        cpf_limpo = "".join(filter(str.isdigit, cpf or ""))
+        if not cpf_limpo:
+            return False, None
+
+        try:
+            registros = await (
+                self.supabase.tabela("guias_inss")
+                .select("reference_number", "cpf")
+                .in_("cpf", sorted({cpf, cpf_limpo}))
+                .eq("periodo_mes", periodo_mes)
+                .eq("periodo_ano", periodo_ano)
+                .eq("tipo_contribuinte", tipo_norm)
+                .neq("status", "cancelada")
+                .limit(1)
+                .executar()
+            )
+        except Exception as e:
+            # Na dúvida não bloqueia a emissão
+            print(f"[GPS-VALIDATOR] Falha ao consultar duplicidade: {e}")
+            return False, None
+
+        if not registros:
+            return False, None
+        return True, registros[0].get("reference_number")
     
     async def validar_tipo_contribuinte(self, tipo: str) -> bool:
         """
@@ -147,7 +156,8 @@ class GPSValidator:
             erros.append(msg)
         
         # Validação 2: CPF
-        if not self.validar_cpf(cpf):
+        cpf_valido = self.validar_cpf(cpf)
+        if not cpf_valido:
             erros.append("CPF inválido")
         
         # Validação 3: Tipo de Contribuinte
@@ -160,10 +170,14 @@ class GPSValidator:
         if not valido:
             erros.append(msg)
         
-        # Validação 5: Duplicidade (Opcional por enquanto)
-        # existe, ref_anterior = await self.validar_duplicidade(cpf, periodo_mes, periodo_ano, tipo_contribuinte)
-        # if existe:
-        #     erros.append(f"GPS já foi emitida para este período (Referência: {ref_anterior})")
+        # Validação 5: Duplicidade (informativa)
+        # Repetições do mesmo pedido não chegam aqui: o /emitir devolve a guia
+        # existente antes de validar (ver services/idempotencia.py). Outra guia
+        # no mesmo período (ex.: valor corrigido) é reemissão legítima.
+        if cpf_valido:
+            existe, ref_anterior = await self.validar_duplicidade(cpf, periodo_mes, periodo_ano, tipo_contribuinte)
+            if existe:
+                avisos.append(f"GPS já foi emitida para este período (Referência: {ref_anterior})")
         
         return {
             'valido': len(erros) == 0,
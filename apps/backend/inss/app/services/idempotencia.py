@@ -0,0 +1,195 @@
+"""
+Idempotência da emissão de guias.
+
+Retentativas de /emitir (WhatsApp, frontend) não devem renderizar o PDF, fazer
+upload e inserir guias_inss de novo. Cada emissão tem uma chave de
+idempotência, derivada só do pedido (WhatsApp + competência + tipo + valor
+base) ou enviada pelo cliente (header Idempotency-Key), para ser consultada
+antes da busca de perfil, da validação e do cálculo. A guia emitida fica
+indexada:
+
+- em memória (CacheService LRU/TTL): repetição no mesmo processo sai do dict;
+- no banco (coluna guias_inss.idempotency_key): vale entre processos e restarts.
+
+Emissões concorrentes com a mesma chave são coalescidas pelo single-flight do
+CacheService: só a primeira emite, as demais aguardam o mesmo resultado. Entre
+processos, o índice único de idempotency_key rejeita o segundo insert (409) e
+a guia gravada pelo outro processo é devolvida no lugar.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from ..utils.cache_service import CacheService
+from ..utils.dinheiro import Centavos, ValorReais
+
+TABELA_GUIAS = "guias_inss"
+COLUNA_CHAVE = "idempotency_key"
+NAMESPACE = "idempotencia"
+
+TTL_PADRAO = int(os.getenv("GPS_IDEMPOTENCIA_TTL", "86400"))
+MAX_ENTRADAS_PADRAO = int(os.getenv("GPS_IDEMPOTENCIA_MAX_ENTRADAS", "4096"))
+
+
+def chave_idempotencia(
+    usuario: str,
+    competencia: str,
+    tipo_contribuinte: str,
+    valor_base: ValorReais,
+    chave_cliente: Optional[str] = None,
+) -> str:
+    """
+    Chave de idempotência da emissão (sha256 hex, 64 caracteres).
+
+    Só usa dados do pedido, para ser calculada antes de qualquer I/O.
+
+    Args:
+        usuario: Identificação do usuário no pedido (WhatsApp normalizado)
+        competencia: Competência MM/AAAA
+        tipo_contribuinte: Tipo de contribuinte pedido
+        valor_base: Valor base em reais (normalizado para centavos)
+        chave_cliente: Idempotency-Key enviada pelo cliente; se informada,
+            substitui os demais campos (mas continua restrita ao usuário)
+    """
+    if chave_cliente:
+        material = f"cliente|{usuario}|{chave_cliente.strip()}"
+    else:
+        centavos = Centavos.de_reais(valor_base).centavos
+        material = f"emissao|{usuario}|{competencia}|{tipo_contribuinte}|{centavos}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class IndiceIdempotencia:
+    """
+    Índice chave -> guia emitida, em memória e no banco, com coalescência.
+
+    Uso:
+        guia, reaproveitada = await indice.obter_ou_emitir(chave, emitir)
+
+    `emitir` é a corrotina que gera, faz upload e salva a guia; ela deve gravar
+    a chave em guias_inss.idempotency_key para que o índice persistente a
+    encontre depois, e levantar exceção se a guia não foi gravada (nada é
+    indexado nesse caso).
+    """
+
+    def __init__(
+        self,
+        supabase_service: Any = None,
+        ttl: int = TTL_PADRAO,
+        max_entradas: int = MAX_ENTRADAS_PADRAO,
+    ):
+        """
+        Args:
+            supabase_service: SupabaseService para o índice persistente (padrão: global)
+            ttl: Segundos que a guia fica no índice em memória
+            max_entradas: Limite do índice em memória (LRU)
+        """
+        self._supabase = supabase_service
+        self.ttl = ttl
+        self._memoria = CacheService(max_entradas=max_entradas, ttl_padrao=ttl)
+        self._hits_persistente = 0
+        self._emissoes = 0
+
+    @property
+    def supabase(self) -> Any:
+        if self._supabase is None:
+            from .supabase_service import get_supabase_service
+            self._supabase = get_supabase_service()
+        return self._supabase
+
+    @staticmethod
+    def _chave_cache(chave: str) -> str:
+        return f"{NAMESPACE}:{chave}"
+
+    async def buscar_persistida(self, chave: str) -> Optional[Dict[str, Any]]:
+        """Guia salva com a chave em guias_inss (cancelada não conta), ou None."""
+        registros = await (
+            self.supabase.tabela(TABELA_GUIAS)
+            .eq(COLUNA_CHAVE, chave)
+            .neq("status", "cancelada")
+            .limit(1)
+            .executar()
+        )
+        return registros[0] if registros else None
+
+    async def buscar(self, chave: str) -> Optional[Dict[str, Any]]:
+        """Guia já emitida com a chave (memória, depois banco), ou None."""
+        guia = self._memoria.get(self._chave_cache(chave))
+        if guia is not None:
+            return guia
+        guia = await self.buscar_persistida(chave)
+        if guia is not None:
+            self._hits_persistente += 1
+            self._memoria.set(self._chave_cache(chave), guia, self.ttl)
+        return guia
+
+    async def obter_ou_emitir(
+        self,
+        chave: str,
+        emitir: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Retorna a guia da chave, emitindo uma única vez.
+
+        Args:
+            chave: Chave de idempotência (ver chave_idempotencia)
+            emitir: Corrotina sem argumentos que emite e salva a guia
+
+        Returns:
+            (guia, reaproveitada): reaproveitada é False só para a chamada que emitiu
+
+        Raises:
+            Exceções de `emitir` são propagadas a todas as chamadas coalescidas
+            e nada é indexado (a próxima tentativa emite de novo). A exceção é
+            um 409 no insert (outro processo gravou a mesma chave): aí a guia
+            gravada é relida e devolvida como reaproveitada.
+        """
+        emitiu = False
+
+        async def buscar_ou_emitir() -> Dict[str, Any]:
+            nonlocal emitiu
+            guia = await self.buscar_persistida(chave)
+            if guia is not None:
+                self._hits_persistente += 1
+                return guia
+            emitiu = True
+            self._emissoes += 1
+            try:
+                return await emitir()
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 409:
+                    raise
+                guia = await self.buscar_persistida(chave)
+                if guia is None:
+                    raise
+                emitiu = False
+                self._hits_persistente += 1
+                print("[IDEMPOTENCIA] [WARN] Guia gravada por emissão concorrente; devolvendo a existente")
+                return guia
+
+        guia = await self._memoria.obter_ou_calcular(self._chave_cache(chave), buscar_ou_emitir, self.ttl)
+        return guia, not emitiu
+
+    def esquecer(self, chave: str) -> None:
+        """Remove a chave do índice em memória (ex.: guia cancelada)."""
+        self._memoria.delete(self._chave_cache(chave))
+
+    def metricas(self) -> Dict[str, Any]:
+        """Hits em memória/banco, emissões coalescidas e emissões efetivas."""
+        memoria = self._memoria.get_stats()
+        namespace = memoria["namespaces"].get(NAMESPACE, {})
+        return {
+            "entradas": memoria["total_entries"],
+            "hits_memoria": namespace.get("hits", 0),
+            "hits_persistente": self._hits_persistente,
+            "coalescidas": namespace.get("aguardando_recalculo", 0),
+            "emissoes": self._emissoes,
+        }
+
+
+# Instância global (compartilhada pelas rotas de emissão)
+indice_idempotencia = IndiceIdempotencia()
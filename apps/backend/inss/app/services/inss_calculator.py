@@ -2,14 +2,41 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import date
-from typing import Literal
+import math
+from typing import Dict, Literal, Optional, Sequence, Tuple
+
+import numpy as np
 
 from ..config import get_settings
+from ..services.selic_service import (
+    RegistroSelic,
+    SelicForaDoAlcance,
+    indice_competencia,
+    indices_competencias,
+    registro_selic,
+)
 from ..utils.constants import SAL_CLASSES, TABELA_PROGRESSIVA_DOMESTICO
+from ..utils.dinheiro import (
+    Centavos,
+    aplicar_aliquota_lote,
+    aplicar_fator_lote,
+    centavos_de_reais_lote,
+    dividir_meio_para_cima,
+    fracao_aliquota,
+)
 from ..utils.validators import normalizar_competencia
 
 Plano = Literal["normal", "simplificado"]
 
+# Tipos aceitos por calcular_lote (chaves de SAL_CLASSES)
+TIPOS_LOTE = (
+    "autonomo",
+    "autonomo_simplificado",
+    "complementacao",
+    "domestico",
+    "produtor_rural",
+)
+
 
 @dataclass
 class CalculoSAL:
@@ -20,15 +47,65 @@ class CalculoSAL:
     detalhes: dict | None = None
 
 
+@dataclass
+class LoteCalculo:
+    """Resultado colunar de calcular_lote (uma posição por linha; valores em centavos int64)."""
+    tipo: np.ndarray
+    codigo_gps: np.ndarray
+    base_calculo_centavos: np.ndarray
+    valor_centavos: np.ndarray
+    juros_centavos: np.ndarray
+    meses_atraso: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.valor_centavos)
+
+    def colunas(self) -> Dict[str, np.ndarray]:
+        return {
+            "tipo": self.tipo,
+            "codigo_gps": self.codigo_gps,
+            "base_calculo_centavos": self.base_calculo_centavos,
+            "valor_centavos": self.valor_centavos,
+            "juros_centavos": self.juros_centavos,
+            "meses_atraso": self.meses_atraso,
+        }
+
+
+def _faixas_domestico() -> Tuple[int, Tuple[Tuple[Optional[int], float, int], ...]]:
+    """
+    TABELA_PROGRESSIVA_DOMESTICO em centavos, com as alíquotas sobre um denominador comum.
+
+    Returns:
+        (denominador, ((teto_centavos ou None, aliquota, numerador), ...))
+    """
+    fracoes = [fracao_aliquota(aliquota) for _, aliquota in TABELA_PROGRESSIVA_DOMESTICO]
+    denominador = math.lcm(*(den for _, den in fracoes))
+    faixas = tuple(
+        (
+            None if math.isinf(teto) else Centavos.de_reais(teto).centavos,
+            aliquota,
+            num * (denominador // den),
+        )
+        for (teto, aliquota), (num, den) in zip(TABELA_PROGRESSIVA_DOMESTICO, fracoes)
+    )
+    return denominador, faixas
+
+
+_DENOMINADOR_DOMESTICO, _FAIXAS_DOMESTICO = _faixas_domestico()
+
+
 class INSSCalculator:
     """Realiza cálculos de contribuições conforme regras SAL."""
 
-    def __init__(self, sal_manager=None) -> None:
+    def __init__(self, sal_manager=None, selic: Optional[RegistroSelic] = None) -> None:
         # sal_manager é aceito para compatibilidade com chamadas que injetam SALVersionManager
         self.sal_manager = sal_manager
+        self.selic = selic or registro_selic
         settings = get_settings()
         self.salario_minimo_2025 = settings.salario_minimo_2025
         self.teto_inss_2025 = settings.teto_inss_2025
+        self._salario_minimo = Centavos.de_reais(self.salario_minimo_2025)
+        self._teto_inss = Centavos.de_reais(self.teto_inss_2025)
 
     def calcular_contribuinte_individual(self, valor_base: float, plano: Plano) -> CalculoSAL:
         """
@@ -42,64 +119,83 @@ class INSSCalculator:
 
         if plano == "simplificado":
             codigo = SAL_CLASSES["autonomo_simplificado"]["codigo_gps"]
-            valor = round(self.salario_minimo_2025 * SAL_CLASSES["autonomo_simplificado"]["aliquota"], 2)
+            valor = self._salario_minimo.aplicar_aliquota(SAL_CLASSES["autonomo_simplificado"]["aliquota"])
             return CalculoSAL(
                 codigo_gps=codigo,
-                valor=valor,
+                valor=valor.como_float(),
                 descricao=SAL_CLASSES["autonomo_simplificado"]["descricao"],
                 detalhes={
                     "plano": plano,
-                    "base_calculo": self.salario_minimo_2025,
+                    "base_calculo": self._salario_minimo.como_float(),
                     "aliquota": SAL_CLASSES["autonomo_simplificado"]["aliquota"],
                 },
             )
 
-        base_calculo = max(self.salario_minimo_2025, min(valor_base, self.teto_inss_2025))
-        valor = round(base_calculo * SAL_CLASSES["autonomo"]["aliquota"], 2)
+        base_calculo = max(self._salario_minimo, min(Centavos.de_reais(valor_base), self._teto_inss))
+        valor = base_calculo.aplicar_aliquota(SAL_CLASSES["autonomo"]["aliquota"])
         return CalculoSAL(
             codigo_gps=SAL_CLASSES["autonomo"]["codigo_gps"],
-            valor=valor,
+            valor=valor.como_float(),
             descricao=SAL_CLASSES["autonomo"]["descricao"],
             detalhes={
                 "plano": plano,
-                "base_calculo": base_calculo,
+                "base_calculo": base_calculo.como_float(),
                 "aliquota": SAL_CLASSES["autonomo"]["aliquota"],
             },
         )
 
-    def calcular_complementacao(self, competencias: list[str], valor_base: float) -> CalculoSAL:
+    def calcular_complementacao(
+        self,
+        competencias: list[str],
+        valor_base: float,
+        data_pagamento: Optional[date] = None,
+    ) -> CalculoSAL:
         """
         Calcula complementação de 11% para 20% com juros.
 
-        A taxa SELIC é aproximada por 0,5% ao mês para ilustração.
+        Juros SELIC acumulados da competência até o mês de pagamento (tabela
+        de registro_selic). Os juros de cada competência são arredondados ao
+        centavo antes da soma.
+
+        Se a tabela não cobre algum mês, os juros são estimados repetindo a
+        taxa da borda; detalhes traz juros_estimados=True e aviso_selic.
         """
 
         competencias_normalizadas = [normalizar_competencia(item) for item in competencias]
         aliquota_diferenca = SAL_CLASSES["complementacao"]["aliquota"]
-        diferenca = round(valor_base * aliquota_diferenca, 2)
-
-        # Juros SELIC simplificados
-        taxa_mensal = 0.005
-        hoje = date.today()
-        total_juros = 0.0
-        for competencia in competencias_normalizadas:
-            mes, ano = competencia.split("/")
-            meses_atraso = (hoje.year - int(ano)) * 12 + (hoje.month - int(mes))
-            meses_atraso = max(meses_atraso, 0)
-            juros = diferenca * ((1 + taxa_mensal) ** meses_atraso - 1)
-            total_juros += juros
-
-        total = round(diferenca + total_juros, 2)
+        diferenca = Centavos.de_reais(valor_base).aplicar_aliquota(aliquota_diferenca)
+
+        tabela = self.selic.tabela
+        pagamento = data_pagamento or date.today()
+
+        def juros(estimar: bool) -> Centavos:
+            return sum(
+                (diferenca.aplicar_fator(tabela.fator(competencia, pagamento, estimar=estimar))
+                 for competencia in competencias_normalizadas),
+                Centavos(0),
+            )
+
+        aviso_selic = None
+        try:
+            total_juros = juros(estimar=False)
+        except SelicForaDoAlcance as e:
+            aviso_selic = f"{e}; juros estimados com a taxa da borda"
+            print(f"[SELIC] [WARN] {aviso_selic}")
+            total_juros = juros(estimar=True)
+
+        total = diferenca + total_juros
         return CalculoSAL(
             codigo_gps=SAL_CLASSES["complementacao"]["codigo_gps"],
-            valor=total,
+            valor=total.como_float(),
             descricao=SAL_CLASSES["complementacao"]["descricao"],
             detalhes={
                 "competencias": competencias_normalizadas,
                 "valor_base": valor_base,
-                "diferenca": diferenca,
-                "juros": round(total_juros, 2),
-                "taxa_mensal_aplicada": taxa_mensal,
+                "diferenca": diferenca.como_float(),
+                "juros": total_juros.como_float(),
+                "tabela_selic": tabela.versao,
+                "juros_estimados": aviso_selic is not None,
+                **({"aviso_selic": aviso_selic} if aviso_selic else {}),
             },
         )
 
@@ -115,10 +211,10 @@ class INSSCalculator:
 
         chave = "produtor_rural_especial" if segurado_especial else "produtor_rural"
         aliquota = SAL_CLASSES[chave]["aliquota"]
-        valor = round(receita_bruta * aliquota, 2)
+        valor = Centavos.de_reais(receita_bruta).aplicar_aliquota(aliquota)
         return CalculoSAL(
             codigo_gps=SAL_CLASSES[chave]["codigo_gps"],
-            valor=valor,
+            valor=valor.como_float(),
             descricao=SAL_CLASSES[chave]["descricao"],
             detalhes={
                 "receita_bruta": receita_bruta,
@@ -130,29 +226,139 @@ class INSSCalculator:
     def calcular_domestico(self, salario: float) -> CalculoSAL:
         """
         Calcula contribuição de empregado doméstico utilizando tabela progressiva 7,5% a 14%.
+
+        As parcelas são somadas exatas e o total é arredondado uma única vez.
         """
 
         if salario <= 0:
             raise ValueError("Salário deve ser positivo")
 
-        restante = salario
+        restante = Centavos.de_reais(salario).centavos
         faixas = []
-        valor_total = 0.0
-        base_anterior = 0.0
-        for teto, aliquota in TABELA_PROGRESSIVA_DOMESTICO:
-            base_faixa = min(restante, teto - base_anterior)
+        total = 0
+        base_anterior = 0
+        for teto, aliquota, numerador in _FAIXAS_DOMESTICO:
+            base_faixa = restante if teto is None else min(restante, teto - base_anterior)
             if base_faixa <= 0:
                 break
-            parcela = base_faixa * aliquota
-            faixas.append({"base": round(base_faixa, 2), "aliquota": aliquota, "valor": round(parcela, 2)})
-            valor_total += parcela
+            parcela = base_faixa * numerador
+            faixas.append({
+                "base": base_faixa / 100,
+                "aliquota": aliquota,
+                "valor": dividir_meio_para_cima(parcela, _DENOMINADOR_DOMESTICO) / 100,
+            })
+            total += parcela
             restante -= base_faixa
             base_anterior = teto
 
         return CalculoSAL(
             codigo_gps=SAL_CLASSES["domestico"]["codigo_gps"],
-            valor=round(valor_total, 2),
+            valor=dividir_meio_para_cima(total, _DENOMINADOR_DOMESTICO) / 100,
             descricao=SAL_CLASSES["domestico"]["descricao"],
             detalhes={"faixas": faixas, "salario": salario},
         )
 
+    def calcular_lote(
+        self,
+        tipos: Sequence[str],
+        valores_base: Sequence[float],
+        competencias: Optional[Sequence[Optional[str]]] = None,
+        data_pagamento: Optional[date] = None,
+    ) -> LoteCalculo:
+        """
+        Calcula muitas contribuições de uma vez (exportação contábil, simulações).
+
+        Mesmas regras e os mesmos centavos dos métodos escalares, como
+        operações de array int64:
+        - autonomo: base limitada ao salário mínimo/teto, 20%
+        - autonomo_simplificado: 11% do salário mínimo
+        - domestico: tabela progressiva (TABELA_PROGRESSIVA_DOMESTICO)
+        - complementacao: 9% + juros SELIC acumulados da competência ao pagamento
+        - produtor_rural: alíquota sobre a receita bruta
+
+        Args:
+            tipos: Tipo de cada linha (ver TIPOS_LOTE)
+            valores_base: Valor base, salário ou receita bruta de cada linha
+            competencias: Competência MM/AAAA de cada linha (obrigatória em complementacao)
+            data_pagamento: Mês de pagamento para os juros (padrão: hoje)
+
+        Returns:
+            LoteCalculo com uma posição por linha (valores em centavos)
+
+        Raises:
+            ValueError: Tamanhos diferentes, tipo desconhecido, valor não positivo
+                em domestico/produtor rural ou complementacao sem competência
+        """
+        tipos_arr = np.asarray(tipos, dtype=str)
+        valores = np.asarray(valores_base, dtype=np.float64)
+        n = len(valores)
+        if len(tipos_arr) != n or (competencias is not None and len(competencias) != n):
+            raise ValueError("tipos, valores_base e competencias devem ter o mesmo tamanho")
+
+        mascaras = {tipo: tipos_arr == tipo for tipo in TIPOS_LOTE}
+        conhecidos = np.logical_or.reduce(list(mascaras.values())) if n else np.ones(0, dtype=bool)
+        if not conhecidos.all():
+            raise ValueError(f"Tipos não suportados em lote: {sorted(set(tipos_arr[~conhecidos].tolist()))}")
+        exige_positivo = mascaras["domestico"] | mascaras["produtor_rural"]
+        if (exige_positivo & ~(valores > 0)).any():
+            raise ValueError("Salário/receita bruta deve ser positivo em domestico e produtor rural")
+
+        centavos = centavos_de_reais_lote(valores)
+        base_calculo = centavos.copy()
+        valor = np.zeros(n, dtype=np.int64)
+        juros = np.zeros(n, dtype=np.int64)
+        meses = np.zeros(n, dtype=np.int64)
+        codigos = np.empty(n, dtype=object)
+        for tipo, mascara in mascaras.items():
+            codigos[mascara] = SAL_CLASSES[tipo]["codigo_gps"]
+
+        # Contribuinte individual 20%: clamp salário mínimo/teto
+        m = mascaras["autonomo"]
+        base_calculo[m] = np.clip(centavos[m], self._salario_minimo.centavos, self._teto_inss.centavos)
+        valor[m] = aplicar_aliquota_lote(base_calculo[m], SAL_CLASSES["autonomo"]["aliquota"])
+
+        # Simplificado 11%: sempre sobre o salário mínimo
+        m = mascaras["autonomo_simplificado"]
+        base_calculo[m] = self._salario_minimo.centavos
+        valor[m] = self._salario_minimo.aplicar_aliquota(SAL_CLASSES["autonomo_simplificado"]["aliquota"]).centavos
+
+        m = mascaras["produtor_rural"]
+        valor[m] = aplicar_aliquota_lote(centavos[m], SAL_CLASSES["produtor_rural"]["aliquota"])
+
+        # Doméstico: mesma recorrência de calcular_domestico, uma faixa por vez para todas as linhas
+        m = mascaras["domestico"]
+        if m.any():
+            restante = centavos[m].copy()
+            total = np.zeros(len(restante), dtype=np.int64)
+            base_anterior = 0
+            for teto, _, numerador in _FAIXAS_DOMESTICO:
+                base_faixa = restante if teto is None else np.minimum(restante, teto - base_anterior)
+                base_faixa = np.maximum(base_faixa, 0)
+                total += base_faixa * numerador
+                restante = restante - base_faixa
+                base_anterior = teto
+            valor[m] = (2 * total + _DENOMINADOR_DOMESTICO) // (2 * _DENOMINADOR_DOMESTICO)
+
+        # Complementação: fatores SELIC por consulta à tabela acumulada
+        m = mascaras["complementacao"]
+        if m.any():
+            indices = np.flatnonzero(m)
+            if competencias is None or any(competencias[i] is None for i in indices):
+                raise ValueError("complementacao exige competência em todas as linhas")
+            meses_competencia = indices_competencias([competencias[i] for i in indices])
+            mes_pagamento = indice_competencia(data_pagamento or date.today())
+            meses[m] = np.maximum(mes_pagamento - meses_competencia, 0)
+
+            fatores = self.selic.tabela.fatores(meses_competencia, mes_pagamento)
+            diferenca = aplicar_aliquota_lote(centavos[m], SAL_CLASSES["complementacao"]["aliquota"])
+            juros[m] = aplicar_fator_lote(diferenca, fatores)
+            valor[m] = diferenca + juros[m]
+
+        return LoteCalculo(
+            tipo=tipos_arr,
+            codigo_gps=codigos,
+            base_calculo_centavos=base_calculo,
+            valor_centavos=valor,
+            juros_centavos=juros,
+            meses_atraso=meses,
+        )
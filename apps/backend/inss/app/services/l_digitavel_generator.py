@@ -1,6 +1,9 @@
 from decimal import Decimal
 from datetime import date
 
+from .digito_verificador import dv_modulo97_10
+from ..utils.dinheiro import Centavos
+
 class LDigitavelGenerator:
     """
     Gera linha digitável conforme ISO 7064 MOD 97-10
@@ -34,7 +37,7 @@ class LDigitavelGenerator:
         # Se o documento pede ISO 7064 MOD 97-10, é o padrão de boleto de arrecadação (começa com 8).
         
         venc_str = vencimento.strftime('%d%m%Y')
-        valor_str = f"{int(valor*100):011d}"  # Valor em centavos
+        valor_str = f"{Centavos.de_reais(valor).centavos:011d}"  # Valor em centavos
         
         # Montando base para cálculo (exemplo genérico de arrecadação)
         # 8 (Produto) + 5 (Segmento) + 2 (Valor real) + 0 (Verificador geral - placeholder)
@@ -70,16 +73,8 @@ class LDigitavelGenerator:
         Implementa algoritmo ISO 7064 MOD 97-10
         """
         try:
-            # Converte string para número
-            numero = int(base)
-            
-            # Resto da divisão por 97
-            resto = numero % 97
-            
-            # Dígito verificador = 98 - resto
-            dv = 98 - resto
-            
-            return dv
+            # Dígito verificador = 98 - (base mod 97)
+            return dv_modulo97_10(base)
         except:
             return 0 # Fallback
     
@@ -10,6 +10,7 @@ from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 
 from ..utils.constants import calcular_vencimento_padrao
+from ..utils.dinheiro import Centavos
 
 try:
     import barcode
@@ -49,7 +50,7 @@ class GPSGenerator:
             ("NIT/PIS/PASEP", dados_contribuinte.get("nit", "Não informado")),
             ("Código de Pagamento", codigo),
             ("Competência", competencia),
-            ("Valor da Contribuição", f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")),
+            ("Valor da Contribuição", Centavos.de_reais(valor).formatar()),
             (
                 "Data de Vencimento",
                 calcular_vencimento_padrao(competencia).strftime("%d/%m/%Y"),
@@ -72,7 +73,7 @@ class GPSGenerator:
 
         # Simples representação do código em vez de gerar barcode
         pdf.setFont("Helvetica-Bold", 11)
-        codigo_texto = f"{codigo}{competencia.replace('/', '')}{int(valor*100):011d}"
+        codigo_texto = f"{codigo}{competencia.replace('/', '')}{Centavos.de_reais(valor).centavos:011d}"
         pdf.drawString(margem, y, f"Código de Barras: {codigo_texto}")
 
         pdf.showPage()
@@ -0,0 +1,251 @@
+"""
+Pool de renderização de PDFs de GPS.
+
+ReportLab é CPU-bound e segura o GIL: renderizar no event loop (ou em
+run_in_threadpool) bloqueia as demais requisições. O PDFRenderPool envia os
+jobs para um ProcessPoolExecutor com workers aquecidos (fontes, logo e camada
+estática do template já carregados), limita a quantidade de jobs pendentes
+(backpressure) e expõe métricas como a profundidade da fila. Se um worker
+morre (BrokenProcessPool), o executor é recriado e o job é tentado de novo
+uma vez.
+
+Configuração (variáveis de ambiente):
+- GPS_PDF_WORKERS: número de processos por worker web. 0 = threads no próprio processo.
+  Padrão: CPUs / WEB_CONCURRENCY (workers do uvicorn/gunicorn), entre 1 e 4, para
+  que N workers web não criem N x CPUs processos de renderização
+- GPS_PDF_MAX_PENDENTES: jobs aceitos ao mesmo tempo (padrão: 4 x workers)
+- GPS_PDF_FILA_TIMEOUT: segundos aguardando vaga antes de rejeitar (padrão: 30)
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from .gps_pdf_generator_oficial import GPSPDFGeneratorOficial
+
+
+class PDFRenderPoolSobrecarregado(RuntimeError):
+    """Fila de renderização cheia por mais tempo que o timeout configurado."""
+
+
+# Guia usada para aquecer workers (fontes, logo, camada estática, I2of5)
+_DADOS_AQUECIMENTO: Dict[str, Any] = {
+    'nome': 'AQUECIMENTO',
+    'nit': '00000000000',
+    'uf': 'SC',
+    'codigo_pagamento': '1007',
+    'competencia': '01/2025',
+    'valor_inss': 0.0,
+    'valor_outras_entidades': 0.0,
+    'atm_multa_juros': 0.0,
+    'vencimento': '15/02/2025',
+    'codigo_barras': '0' * 44,
+    'linha_digitavel': '',
+}
+
+# Gerador do processo worker (criado no initializer)
+_gerador_worker: Optional[GPSPDFGeneratorOficial] = None
+
+
+def _inicializar_worker() -> None:
+    """Initializer dos workers: cria o gerador e renderiza uma guia de aquecimento."""
+    global _gerador_worker
+    _gerador_worker = GPSPDFGeneratorOficial()
+    _gerador_worker.gerar(_DADOS_AQUECIMENTO)
+
+
+def _renderizar(dados: Dict[str, Any]) -> bytes:
+    """Renderiza uma GPS no worker atual e retorna os bytes do PDF."""
+    global _gerador_worker
+    if _gerador_worker is None:
+        _gerador_worker = GPSPDFGeneratorOficial()
+    return _gerador_worker.gerar(dados).getvalue()
+
+
+def _ping() -> int:
+    """Job vazio usado para forçar a criação (e aquecimento) dos workers."""
+    return os.getpid()
+
+
+def _int_env(nome: str, padrao: int) -> int:
+    try:
+        return int(os.getenv(nome, str(padrao)))
+    except ValueError:
+        return padrao
+
+
+# Teto do padrão automático (GPS_PDF_WORKERS explícito não é limitado)
+MAX_WORKERS_PADRAO = 4
+
+
+def _workers_padrao() -> int:
+    """CPUs divididas entre os workers web (WEB_CONCURRENCY), entre 1 e MAX_WORKERS_PADRAO."""
+    workers_web = max(1, _int_env("WEB_CONCURRENCY", 1))
+    return min(MAX_WORKERS_PADRAO, max(1, (os.cpu_count() or 1) // workers_web))
+
+
+class PDFRenderPool:
+    """
+    Pool de renderização de GPS em processos (ou threads, com workers=0).
+
+    Uso:
+        pdf_bytes = await pdf_render_pool.renderizar(dados_pdf)
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pendentes: Optional[int] = None,
+        timeout_fila: Optional[float] = None
+    ):
+        """
+        Args:
+            workers: Processos do pool (padrão GPS_PDF_WORKERS ou CPUs / WEB_CONCURRENCY); 0 usa threads
+            max_pendentes: Limite de jobs aceitos simultaneamente (backpressure)
+            timeout_fila: Segundos aguardando vaga antes de PDFRenderPoolSobrecarregado
+        """
+        if workers is None:
+            workers = _int_env("GPS_PDF_WORKERS", _workers_padrao())
+        self.workers = max(0, workers)
+        if max_pendentes is None:
+            max_pendentes = _int_env("GPS_PDF_MAX_PENDENTES", 4 * max(1, self.workers))
+        self.max_pendentes = max(1, max_pendentes)
+        if timeout_fila is None:
+            timeout_fila = float(os.getenv("GPS_PDF_FILA_TIMEOUT", "30"))
+        self.timeout_fila = timeout_fila
+
+        self._executor: Optional[Executor] = None
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._semaforo_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Métricas
+        self._aguardando = 0
+        self._em_execucao = 0
+        self._concluidos = 0
+        self._falhas = 0
+        self._rejeitados = 0
+        self._reinicios = 0
+        self._tempo_total = 0.0
+
+    @property
+    def modo(self) -> str:
+        return "processos" if self.workers > 0 else "threads"
+
+    def _obter_semaforo(self) -> asyncio.Semaphore:
+        """Semáforo de backpressure do event loop atual."""
+        loop = asyncio.get_running_loop()
+        if self._semaforo is None or self._semaforo_loop is not loop:
+            self._semaforo = asyncio.Semaphore(self.max_pendentes)
+            self._semaforo_loop = loop
+        return self._semaforo
+
+    def _criar_executor(self) -> Executor:
+        if self.workers > 0:
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_inicializar_worker
+            )
+        _inicializar_worker()
+        return ThreadPoolExecutor(max_workers=self.max_pendentes, thread_name_prefix="gps-pdf")
+
+    async def iniciar(self) -> None:
+        """Cria o executor e aquece todos os workers (chamado no startup da aplicação)."""
+        if self._executor is not None:
+            return
+        self._executor = self._criar_executor()
+        if self.workers > 0:
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*[
+                loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)
+            ])
+        print(f"[PDF POOL] [OK] Pool iniciado: modo={self.modo}, workers={self.workers}, max_pendentes={self.max_pendentes}")
+
+    def _recriar_executor(self, quebrado: Executor) -> None:
+        """Troca o executor quebrado por um novo (uma vez, mesmo com vários jobs falhando juntos)."""
+        if self._executor is not quebrado:
+            return
+        quebrado.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._criar_executor()
+        self._reinicios += 1
+        print(f"[PDF POOL] [WARN] Worker encerrado inesperadamente; executor recriado ({self._reinicios}x)")
+
+    def encerrar(self) -> None:
+        """Encerra o executor (jobs pendentes são cancelados)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def renderizar(self, dados: Dict[str, Any]) -> bytes:
+        """
+        Renderiza uma GPS fora do event loop.
+
+        Args:
+            dados: Dicionário no formato de GPSPDFGeneratorOficial.gerar
+
+        Returns:
+            Bytes do PDF
+
+        Raises:
+            PDFRenderPoolSobrecarregado: Sem vaga na fila dentro de timeout_fila
+            BrokenProcessPool: O pool quebrou de novo após ser recriado
+        """
+        if self._executor is None:
+            await self.iniciar()
+
+        semaforo = self._obter_semaforo()
+        self._aguardando += 1
+        try:
+            await asyncio.wait_for(semaforo.acquire(), timeout=self.timeout_fila)
+        except asyncio.TimeoutError:
+            self._rejeitados += 1
+            raise PDFRenderPoolSobrecarregado(
+                f"Fila de renderização cheia ({self.max_pendentes} jobs) por mais de {self.timeout_fila}s"
+            )
+        finally:
+            self._aguardando -= 1
+
+        self._em_execucao += 1
+        inicio = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            try:
+                pdf_bytes = await loop.run_in_executor(executor, _renderizar, dados)
+            except BrokenProcessPool:
+                self._recriar_executor(executor)
+                pdf_bytes = await loop.run_in_executor(self._executor, _renderizar, dados)
+            self._concluidos += 1
+            return pdf_bytes
+        except Exception:
+            self._falhas += 1
+            raise
+        finally:
+            self._tempo_total += time.perf_counter() - inicio
+            self._em_execucao -= 1
+            semaforo.release()
+
+    def metricas(self) -> Dict[str, Any]:
+        """Profundidade da fila, jobs em execução e contadores."""
+        finalizados = self._concluidos + self._falhas
+        return {
+            "modo": self.modo,
+            "workers": self.workers,
+            "max_pendentes": self.max_pendentes,
+            "fila": self._aguardando,
+            "em_execucao": self._em_execucao,
+            "concluidos": self._concluidos,
+            "falhas": self._falhas,
+            "rejeitados": self._rejeitados,
+            "reinicios": self._reinicios,
+            "tempo_medio_ms": round(self._tempo_total / finalizados * 1000, 2) if finalizados else 0.0,
+        }
+
+
+# Instância global (iniciada no lifespan da aplicação; sob demanda se necessário)
+pdf_render_pool = PDFRenderPool()
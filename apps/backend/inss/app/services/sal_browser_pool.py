@@ -0,0 +1,324 @@
+"""
+Pool de contextos Playwright aquecidos para o sistema SAL.
+
+Abrir o Chromium, criar um BrowserContext com os init scripts e navegar até o
+módulo do SAL custa segundos a cada emissão. O SALBrowserPool mantém um único
+navegador e N contextos já posicionados na página do módulo; cada emissão pega
+um contexto livre, usa a página e devolve. Contextos são verificados antes do
+uso (health check), reciclados após max_usos ou após falha, e a espera por um
+contexto livre tem timeout (backpressure), como no PDFRenderPool.
+
+Configuração (variáveis de ambiente):
+- GPS_SAL_POOL_TAMANHO: contextos aquecidos / emissões simultâneas (padrão: 2)
+- GPS_SAL_POOL_MAX_USOS: usos de um contexto antes de recriá-lo (padrão: 50)
+- GPS_SAL_POOL_FILA_TIMEOUT: segundos aguardando contexto livre (padrão: 60)
+- GPS_SAL_BASE_URL: URL base do SAL (padrão: https://sal.rfb.gov.br)
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+SAL_BASE_URL_PADRAO = "https://sal.rfb.gov.br"
+SAL_MODULO_PATH = "/contribuintes-filiados-depois-de-29-11-1999"
+
+# Remove indicadores de automação (executado antes de qualquer script da página)
+INIT_SCRIPT_SAL = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+
+    // Remover outras propriedades que indicam automação
+    delete navigator.__proto__.webdriver;
+"""
+
+OPCOES_CONTEXTO = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'locale': 'pt-BR',
+    'timezone_id': 'America/Sao_Paulo',
+    'accept_downloads': True,
+}
+
+# Timeouts em milissegundos (Playwright)
+TIMEOUT_NAVEGACAO_MS = 60000
+TIMEOUT_HEALTH_CHECK_S = 5.0
+
+
+class SALBrowserPoolSobrecarregado(RuntimeError):
+    """Nenhum contexto livre dentro do timeout configurado."""
+
+
+def _int_env(nome: str, padrao: int) -> int:
+    try:
+        return int(os.getenv(nome, str(padrao)))
+    except ValueError:
+        return padrao
+
+
+class _ContextoSAL:
+    """Um BrowserContext do pool com sua página e contador de usos."""
+
+    __slots__ = ("contexto", "pagina", "usos", "criado_em")
+
+    def __init__(self, contexto: Any, pagina: Any) -> None:
+        self.contexto = contexto
+        self.pagina = pagina
+        self.usos = 0
+        self.criado_em = time.monotonic()
+
+
+class SALBrowserPool:
+    """
+    Navegador compartilhado com N contextos aquecidos no módulo do SAL.
+
+    Uso:
+        async with sal_browser_pool.pagina() as page:
+            await page.fill('input[name="nit"]', nit)
+            ...
+    """
+
+    def __init__(
+        self,
+        tamanho: Optional[int] = None,
+        max_usos: Optional[int] = None,
+        timeout_fila: Optional[float] = None,
+        base_url: Optional[str] = None,
+        headless: bool = True,
+        navegador: Any = None,
+    ):
+        """
+        Args:
+            tamanho: Contextos aquecidos, que é também o limite de emissões simultâneas
+            max_usos: Usos de um contexto antes de ser recriado
+            timeout_fila: Segundos aguardando contexto livre antes de SALBrowserPoolSobrecarregado
+            base_url: URL base do SAL (um site local nos testes)
+            headless: Executar o Chromium sem janela
+            navegador: Browser já aberto (o pool não o fecha); padrão: lança Chromium
+        """
+        if tamanho is None:
+            tamanho = _int_env("GPS_SAL_POOL_TAMANHO", 2)
+        self.tamanho = max(1, tamanho)
+        if max_usos is None:
+            max_usos = _int_env("GPS_SAL_POOL_MAX_USOS", 50)
+        self.max_usos = max(1, max_usos)
+        if timeout_fila is None:
+            timeout_fila = float(os.getenv("GPS_SAL_POOL_FILA_TIMEOUT", "60"))
+        self.timeout_fila = timeout_fila
+        self.base_url = (base_url or os.getenv("GPS_SAL_BASE_URL") or SAL_BASE_URL_PADRAO).rstrip("/")
+        self.headless = headless
+
+        self._navegador = navegador
+        self._navegador_proprio = navegador is None
+        self._playwright = None
+        self._livres: Optional[asyncio.Queue] = None
+        self._contextos: List[_ContextoSAL] = []
+        self._lock_inicio: Optional[asyncio.Lock] = None
+
+        # Métricas
+        self._aguardando = 0
+        self._em_uso = 0
+        self._concluidos = 0
+        self._falhas = 0
+        self._rejeitados = 0
+        self._reciclados = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._execucao_total = 0.0
+
+    @property
+    def modulo_url(self) -> str:
+        return f"{self.base_url}{SAL_MODULO_PATH}"
+
+    @property
+    def iniciado(self) -> bool:
+        return self._livres is not None
+
+    async def _lancar_navegador(self) -> Any:
+        if not PLAYWRIGHT_AVAILABLE:
+            raise RuntimeError(
+                "Playwright não está disponível. "
+                "Instale com: pip install playwright && playwright install chromium"
+            )
+        self._playwright = await async_playwright().start()
+        return await self._playwright.chromium.launch(
+            headless=self.headless,
+            args=['--no-sandbox', '--disable-setuid-sandbox']
+        )
+
+    async def _posicionar(self, pagina: Any) -> None:
+        """Leva a página ao módulo do SAL (estado inicial de toda emissão)."""
+        await pagina.goto(self.modulo_url, wait_until="domcontentloaded", timeout=TIMEOUT_NAVEGACAO_MS)
+
+    async def _criar_contexto(self) -> _ContextoSAL:
+        """Cria contexto com init scripts e página já posicionada no módulo."""
+        contexto = await self._navegador.new_context(**OPCOES_CONTEXTO)
+        await contexto.add_init_script(INIT_SCRIPT_SAL)
+        pagina = await contexto.new_page()
+        item = _ContextoSAL(contexto, pagina)
+        try:
+            await self._posicionar(pagina)
+        except Exception as e:
+            # Mantém o contexto; a navegação é refeita no próximo uso
+            print(f"[SAL POOL] [WARN] Falha ao aquecer contexto: {e}")
+        return item
+
+    async def _fechar_contexto(self, item: _ContextoSAL) -> None:
+        try:
+            await item.contexto.close()
+        except Exception as e:
+            print(f"[SAL POOL] [WARN] Erro ao fechar contexto: {e}")
+
+    async def _reciclar(self, item: _ContextoSAL) -> _ContextoSAL:
+        """Fecha o contexto e cria outro no mesmo lugar do pool."""
+        await self._fechar_contexto(item)
+        novo = await self._criar_contexto()
+        if item in self._contextos:
+            self._contextos[self._contextos.index(item)] = novo
+        else:
+            self._contextos.append(novo)
+        self._reciclados += 1
+        return novo
+
+    async def _saudavel(self, item: _ContextoSAL) -> bool:
+        """Health check: página aberta e respondendo a JavaScript."""
+        try:
+            if item.pagina.is_closed():
+                return False
+            return await asyncio.wait_for(item.pagina.evaluate("1 + 1"), TIMEOUT_HEALTH_CHECK_S) == 2
+        except Exception:
+            return False
+
+    async def iniciar(self) -> None:
+        """Abre o navegador e aquece os contextos (chamado no startup da aplicação)."""
+        if self._lock_inicio is None:
+            self._lock_inicio = asyncio.Lock()
+        async with self._lock_inicio:
+            if self._livres is not None:
+                return
+            if self._navegador is None:
+                self._navegador = await self._lancar_navegador()
+            self._contextos = list(await asyncio.gather(*[self._criar_contexto() for _ in range(self.tamanho)]))
+            livres: asyncio.Queue = asyncio.Queue()
+            for item in self._contextos:
+                livres.put_nowait(item)
+            self._livres = livres
+        print(f"[SAL POOL] [OK] Pool iniciado: contextos={self.tamanho}, max_usos={self.max_usos}, url={self.modulo_url}")
+
+    async def encerrar(self) -> None:
+        """Fecha contextos e, se foi o pool que o abriu, o navegador."""
+        contextos, self._contextos, self._livres = self._contextos, [], None
+        for item in contextos:
+            await self._fechar_contexto(item)
+        if self._navegador_proprio and self._navegador is not None:
+            await self._navegador.close()
+            self._navegador = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _adquirir(self) -> _ContextoSAL:
+        if self._livres is None:
+            await self.iniciar()
+        livres = self._livres
+        self._aguardando += 1
+        inicio = time.perf_counter()
+        try:
+            item = await asyncio.wait_for(livres.get(), timeout=self.timeout_fila)
+        except asyncio.TimeoutError:
+            self._rejeitados += 1
+            raise SALBrowserPoolSobrecarregado(
+                f"Nenhum contexto SAL livre ({self.tamanho} em uso) por mais de {self.timeout_fila}s"
+            )
+        finally:
+            self._aguardando -= 1
+        espera = time.perf_counter() - inicio
+        self._espera_total += espera
+        self._espera_max = max(self._espera_max, espera)
+
+        try:
+            if not await self._saudavel(item):
+                print("[SAL POOL] Contexto não respondeu ao health check, recriando...")
+                item = await self._reciclar(item)
+            if not item.pagina.url.startswith(self.modulo_url):
+                await self._posicionar(item.pagina)
+        except BaseException:
+            livres.put_nowait(item)
+            raise
+        return item
+
+    async def _devolver(self, item: _ContextoSAL, falhou: bool) -> None:
+        livres = self._livres
+        if livres is None:
+            # Pool encerrado durante o uso
+            await self._fechar_contexto(item)
+            return
+        try:
+            item.usos += 1
+            if falhou or item.usos >= self.max_usos:
+                item = await self._reciclar(item)
+            else:
+                await self._posicionar(item.pagina)
+        except Exception as e:
+            print(f"[SAL POOL] [WARN] Erro ao preparar contexto para o próximo uso: {e}")
+        finally:
+            livres.put_nowait(item)
+
+    @asynccontextmanager
+    async def pagina(self) -> AsyncIterator[Any]:
+        """
+        Empresta a página de um contexto livre, já no módulo do SAL.
+
+        Ao sair, a página volta ao módulo (ou o contexto é recriado após
+        falha ou max_usos) e é devolvida ao pool.
+
+        Raises:
+            SALBrowserPoolSobrecarregado: Nenhum contexto livre dentro de timeout_fila
+        """
+        item = await self._adquirir()
+        self._em_uso += 1
+        inicio = time.perf_counter()
+        falhou = True
+        try:
+            yield item.pagina
+            falhou = False
+            self._concluidos += 1
+        except BaseException:
+            self._falhas += 1
+            raise
+        finally:
+            self._execucao_total += time.perf_counter() - inicio
+            self._em_uso -= 1
+            await self._devolver(item, falhou)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Fila, contextos em uso, contadores e tempos de espera e execução."""
+        atendidos = self._concluidos + self._falhas + self._em_uso
+        finalizados = self._concluidos + self._falhas
+        return {
+            "iniciado": self.iniciado,
+            "contextos": self.tamanho,
+            "max_usos": self.max_usos,
+            "fila": self._aguardando,
+            "em_uso": self._em_uso,
+            "concluidos": self._concluidos,
+            "falhas": self._falhas,
+            "rejeitados": self._rejeitados,
+            "reciclados": self._reciclados,
+            "espera_media_ms": round(self._espera_total / atendidos * 1000, 2) if atendidos else 0.0,
+            "espera_max_ms": round(self._espera_max * 1000, 2),
+            "execucao_media_ms": round(self._execucao_total / finalizados * 1000, 2) if finalizados else 0.0,
+        }
+
+
+# Instância global (iniciada no lifespan da aplicação; sob demanda se necessário)
+sal_browser_pool = SALBrowserPool()
@@ -0,0 +1,258 @@
+"""
+Resolução de seletores das etapas do SAL.
+
+O SAL muda o HTML sem aviso, então cada etapa tem uma lista de seletores
+candidatos. Em vez de tentar um por um (cada tentativa esperando o timeout
+inteiro), o ResolvedorSeletores espera por todos de uma vez com um locator
+combinado ("a, b, c") e depois identifica qual candidato está visível. O
+vencedor de cada etapa fica em cache e é verificado primeiro nas próximas
+execuções, normalmente sem espera nenhuma.
+
+Também mede o tempo de cada etapa (resolução + ação), exposto em metricas().
+"""
+from __future__ import annotations
+
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Sequence
+
+try:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+except ImportError:
+    class PlaywrightTimeoutError(Exception):  # type: ignore[no-redef]
+        """Substituto quando o Playwright não está instalado."""
+
+# Candidatos por etapa, em ordem de preferência
+SELETORES_SAL: Dict[str, Sequence[str]] = {
+    "nit": (
+        'input[name="nit"]',
+        'input[id*="nit"]',
+        'input[placeholder*="NIT"]',
+        'input[placeholder*="PIS"]',
+        'input[type="text"]',
+    ),
+    "consultar": (
+        'button:has-text("Consultar")',
+        'button[type="submit"]',
+        'input[type="submit"]',
+        'button.btn-primary',
+        'a:has-text("Consultar")',
+    ),
+    "adicionar": (
+        'button:has-text("Adicionar")',
+        'button:has-text("+ Adicionar")',
+        'a:has-text("Adicionar")',
+        'button.btn-success',
+    ),
+    "competencia": (
+        'input[name="competencia"]',
+        'input[placeholder*="Competência"]',
+        'input[id*="competencia"]',
+    ),
+    "salario": (
+        'input[name="salario"]',
+        'input[placeholder*="Salário"]',
+        'input[id*="salario"]',
+    ),
+    "confirmar": (
+        'button:has-text("Confirmar")',
+        'button.btn-primary:has-text("Confirmar")',
+        'button[type="submit"]',
+    ),
+    "codigo_pagamento": (
+        'select[name="codigoPagamento"]',
+        'input[name="codigoPagamento"]',
+        'select[id*="codigo"]',
+        'input[id*="codigo"]',
+    ),
+    "data_pagamento": (
+        'input[name="dataPagamento"]',
+        'input[type="date"]',
+        'input[id*="data"]',
+    ),
+    "emitir": (
+        'button:has-text("Emitir GPS")',
+        'button:has-text("Emitir")',
+        'button:has-text("Confirmar")',
+        'button.btn-primary:has-text("Emitir")',
+    ),
+    "codigo_barras": (
+        'span[id*="codigo"]',
+        'div[id*="codigo"]',
+        'input[id*="codigo"][readonly]',
+        'span:has-text("274")',
+    ),
+    "valor_total": (
+        'span[id*="total"]',
+        'div[id*="total"]',
+        'td:has-text("Total")',
+    ),
+}
+
+TIMEOUT_ETAPA_MS = 30000
+
+
+class SeletorNaoEncontrado(RuntimeError):
+    """Nenhum candidato da etapa apareceu dentro do timeout."""
+
+
+class ResolvedorSeletores:
+    """
+    Resolve o seletor de cada etapa com espera única e aprende o vencedor.
+
+    Uso:
+        seletor = await resolvedor.resolver(page, "nit")
+        await resolvedor.preencher(page, "nit", "123.45678.90-1", tempos)
+    """
+
+    def __init__(self, seletores: Optional[Mapping[str, Sequence[str]]] = None):
+        self.seletores: Dict[str, List[str]] = {
+            etapa: list(candidatos) for etapa, candidatos in (seletores or SELETORES_SAL).items()
+        }
+        self._vencedores: Dict[str, str] = {}
+        self._estatisticas: Dict[str, Dict[str, float]] = {}
+
+    def candidatos(self, etapa: str) -> List[str]:
+        """Candidatos da etapa com o último vencedor na frente."""
+        candidatos = self.seletores[etapa]
+        vencedor = self._vencedores.get(etapa)
+        if vencedor is None:
+            return list(candidatos)
+        return [vencedor] + [seletor for seletor in candidatos if seletor != vencedor]
+
+    def vencedor(self, etapa: str) -> Optional[str]:
+        return self._vencedores.get(etapa)
+
+    @staticmethod
+    async def _presente(page: Any, seletor: str, estado: str) -> bool:
+        localizador = page.locator(seletor)
+        if estado == "attached":
+            return await localizador.count() > 0
+        return await localizador.first.is_visible()
+
+    async def resolver(
+        self,
+        page: Any,
+        etapa: str,
+        timeout_ms: int = TIMEOUT_ETAPA_MS,
+        estado: str = "visible",
+    ) -> str:
+        """
+        Aguarda qualquer candidato da etapa e retorna o seletor encontrado.
+
+        Args:
+            page: Página do Playwright
+            etapa: Chave em SELETORES_SAL
+            timeout_ms: Espera máxima pela etapa inteira (não por candidato)
+            estado: "visible" ou "attached"
+
+        Raises:
+            SeletorNaoEncontrado: Nenhum candidato apareceu dentro do timeout
+        """
+        candidatos = self.candidatos(etapa)
+
+        # Caminho rápido: o vencedor anterior já está na página
+        vencedor = self._vencedores.get(etapa)
+        if vencedor is not None and await self._presente(page, vencedor, estado):
+            return vencedor
+
+        try:
+            await page.locator(", ".join(candidatos)).first.wait_for(state=estado, timeout=timeout_ms)
+        except PlaywrightTimeoutError as e:
+            raise SeletorNaoEncontrado(
+                f"Etapa '{etapa}': nenhum seletor encontrado em {timeout_ms}ms ({', '.join(candidatos)})"
+            ) from e
+
+        for seletor in candidatos:
+            if await self._presente(page, seletor, estado):
+                if seletor != vencedor:
+                    print(f"[SAL] Etapa '{etapa}' resolvida por {seletor}")
+                self._vencedores[etapa] = seletor
+                return seletor
+
+        # O elemento sumiu entre a espera e a verificação: usa o preferido
+        return candidatos[0]
+
+    @asynccontextmanager
+    async def medir(self, etapa: str, tempos: Optional[Dict[str, float]] = None) -> AsyncIterator[None]:
+        """Registra a duração da etapa (agregado global e, se dado, em `tempos` em ms)."""
+        inicio = time.perf_counter()
+        falhou = True
+        try:
+            yield
+            falhou = False
+        finally:
+            duracao = time.perf_counter() - inicio
+            estatistica = self._estatisticas.setdefault(
+                etapa, {"execucoes": 0, "falhas": 0, "total": 0.0, "max": 0.0, "ultimo": 0.0}
+            )
+            estatistica["execucoes"] += 1
+            estatistica["falhas"] += falhou
+            estatistica["total"] += duracao
+            estatistica["max"] = max(estatistica["max"], duracao)
+            estatistica["ultimo"] = duracao
+            if tempos is not None:
+                tempos[etapa] = round(duracao * 1000, 2)
+
+    async def clicar(
+        self,
+        page: Any,
+        etapa: str,
+        tempos: Optional[Dict[str, float]] = None,
+        timeout_ms: int = TIMEOUT_ETAPA_MS,
+    ) -> str:
+        """Resolve a etapa e clica no elemento."""
+        async with self.medir(etapa, tempos):
+            seletor = await self.resolver(page, etapa, timeout_ms)
+            await page.click(seletor, timeout=timeout_ms)
+            return seletor
+
+    async def preencher(
+        self,
+        page: Any,
+        etapa: str,
+        valor: str,
+        tempos: Optional[Dict[str, float]] = None,
+        timeout_ms: int = TIMEOUT_ETAPA_MS,
+    ) -> str:
+        """Resolve a etapa e preenche o campo (select_option se for um <select>)."""
+        async with self.medir(etapa, tempos):
+            seletor = await self.resolver(page, etapa, timeout_ms)
+            if seletor.startswith("select"):
+                await page.select_option(seletor, valor, timeout=timeout_ms)
+            else:
+                await page.fill(seletor, valor, timeout=timeout_ms)
+            return seletor
+
+    async def texto(
+        self,
+        page: Any,
+        etapa: str,
+        tempos: Optional[Dict[str, float]] = None,
+        timeout_ms: int = TIMEOUT_ETAPA_MS,
+    ) -> Optional[str]:
+        """Texto do elemento da etapa, ou None se nenhum candidato existir."""
+        async with self.medir(etapa, tempos):
+            try:
+                seletor = await self.resolver(page, etapa, timeout_ms, estado="attached")
+            except SeletorNaoEncontrado:
+                return None
+            return await page.locator(seletor).first.inner_text()
+
+    def metricas(self) -> Dict[str, Any]:
+        """Tempo médio, máximo e último por etapa, falhas e seletor vencedor."""
+        return {
+            etapa: {
+                "execucoes": int(estatistica["execucoes"]),
+                "falhas": int(estatistica["falhas"]),
+                "media_ms": round(estatistica["total"] / estatistica["execucoes"] * 1000, 2),
+                "max_ms": round(estatistica["max"] * 1000, 2),
+                "ultimo_ms": round(estatistica["ultimo"] * 1000, 2),
+                "seletor": self._vencedores.get(etapa),
+            }
+            for etapa, estatistica in self._estatisticas.items()
+        }
+
+
+# Instância global (o aprendizado vale para todas as emissões do processo)
+resolvedor_sal = ResolvedorSeletores()
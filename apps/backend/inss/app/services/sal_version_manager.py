@@ -1,142 +1,364 @@
+"""
+Regras SAL versionadas (teto INSS, salário mínimo e alíquotas) em memória.
+
+Todas as linhas de sal_version_history são carregadas no startup em um
+IndiceSAL imutável: datas de vigência ordenadas + bisect, com teto, salário
+mínimo e faixas já em Centavos e alíquotas convertidas de JSON para Decimal.
+Validações consultam apenas o índice, sem I/O. A recarga monta um índice novo
+e troca a referência de uma vez, então leitores nunca veem um estado parcial.
+
+Configuração (variáveis de ambiente):
+- GPS_SAL_REFRESH_INTERVALO: segundos entre recargas periódicas (padrão: 3600; 0 desliga)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
 from datetime import date
 from decimal import Decimal
-from typing import Optional, Dict, Any
-import json
-from ..services.supabase_service import SupabaseService
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from ..services.supabase_service import SupabaseService, get_supabase_service
+from ..utils.dinheiro import Centavos, ValorReais, formatar_moeda
+
+# Regras 2025 (conforme documento) usadas quando a tabela está vazia ou inacessível
+FALLBACK_SAL_2025: Dict[str, Any] = {
+    "effective_date": "2025-01-01",
+    "teto_inss": 7786.02,
+    "salario_minimo": 1518.00,
+    "tabela_aliquotas": {
+        "ci_normal": [
+            {"faixa_min": 0.00, "faixa_max": 1518.00, "aliquota": 0.075},
+            {"faixa_min": 1518.01, "faixa_max": 2666.68, "aliquota": 0.09},
+            {"faixa_min": 2666.69, "faixa_max": 4000.03, "aliquota": 0.12},
+            {"faixa_min": 4000.04, "faixa_max": 7786.02, "aliquota": 0.14}
+        ],
+        "ci_simplificado": [
+            {"faixa_min": 0.00, "faixa_max": 7786.02, "aliquota": 0.11}
+        ],
+        "domestico": [
+            {"faixa_min": 0.00, "faixa_max": 7786.02, "aliquota": 0.08}  # Simplificado para exemplo, real é progressivo
+        ],
+        "rural": [
+            {"faixa_min": 0.00, "faixa_max": 999999.99, "aliquota": 0.115}
+        ]
+    }
+}
+
+# Nomes antigos de tipo de contribuinte
+MAPA_TIPOS = {
+    "autonomo": "ci_normal",
+    "autonomo_simplificado": "ci_simplificado",
+    "individual": "ci_normal"
+}
+
+
+def _decimal(valor: Any) -> Decimal:
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+
+def _data(valor: Any) -> date:
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+@dataclass(frozen=True)
+class TabelaAliquotas:
+    """Faixas de um tipo de contribuinte em colunas paralelas (centavos, ordenadas por faixa_max)."""
+    faixas_min: Tuple[int, ...]
+    faixas_max: Tuple[int, ...]
+    aliquotas: Tuple[Decimal, ...]
+
+    @classmethod
+    def de_json(cls, faixas: Iterable[Mapping[str, Any]]) -> "TabelaAliquotas":
+        ordenadas = sorted(
+            (
+                (
+                    Centavos.de_reais(f["faixa_min"]).centavos,
+                    Centavos.de_reais(f["faixa_max"]).centavos,
+                    _decimal(f["aliquota"]),
+                )
+                for f in faixas
+            ),
+            key=lambda faixa: faixa[1]
+        )
+        if not ordenadas:
+            return cls((), (), ())
+        minimos, maximos, aliquotas = zip(*ordenadas)
+        return cls(tuple(minimos), tuple(maximos), tuple(aliquotas))
+
+    def aliquota_para(self, valor: ValorReais) -> Optional[Decimal]:
+        """Alíquota da faixa que contém o valor (None se fora de todas)."""
+        centavos = Centavos.de_reais(valor).centavos
+        i = bisect_left(self.faixas_max, centavos)
+        if i >= len(self.faixas_max) or centavos < self.faixas_min[i]:
+            return None
+        return self.aliquotas[i]
+
+    def como_dicts(self) -> List[Dict[str, float]]:
+        """Formato original do JSON (compatível com quem consumia get_aliquotas)."""
+        return [
+            {"faixa_min": minimo / 100, "faixa_max": maximo / 100, "aliquota": float(aliquota)}
+            for minimo, maximo, aliquota in zip(self.faixas_min, self.faixas_max, self.aliquotas)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.aliquotas)
+
+
+@dataclass(frozen=True)
+class VersaoSAL:
+    """Conjunto de regras SAL vigente a partir de effective_date."""
+    effective_date: date
+    teto_inss: Centavos
+    salario_minimo: Centavos
+    tabelas: Mapping[str, TabelaAliquotas]
+    registro: Mapping[str, Any]
+
+    @classmethod
+    def de_registro(cls, registro: Mapping[str, Any]) -> "VersaoSAL":
+        tabela = registro.get("tabela_aliquotas") or {}
+        if isinstance(tabela, str):
+            tabela = json.loads(tabela)
+        return cls(
+            effective_date=_data(registro["effective_date"]),
+            teto_inss=Centavos.de_reais(registro["teto_inss"]),
+            salario_minimo=Centavos.de_reais(registro["salario_minimo"]),
+            tabelas=MappingProxyType({tipo: TabelaAliquotas.de_json(faixas) for tipo, faixas in tabela.items()}),
+            registro=MappingProxyType(dict(registro))
+        )
+
+    def tabela(self, tipo_contribuinte: str) -> Optional[TabelaAliquotas]:
+        tabela = self.tabelas.get(tipo_contribuinte)
+        if not tabela:
+            tipo_mapeado = MAPA_TIPOS.get(tipo_contribuinte)
+            tabela = self.tabelas.get(tipo_mapeado) if tipo_mapeado else None
+        return tabela or None
+
+
+class IndiceSAL:
+    """
+    Índice imutável de versões SAL por intervalo de vigência.
+
+    Cada versão vale de effective_date até a véspera da seguinte; a busca é um
+    bisect sobre as datas ordenadas.
+    """
+
+    __slots__ = ("datas", "versoes", "origem", "carregado_em")
+
+    def __init__(self, versoes: Iterable[VersaoSAL], origem: str = "banco") -> None:
+        ordenadas = sorted(versoes, key=lambda v: v.effective_date)
+        self.versoes: Tuple[VersaoSAL, ...] = tuple(ordenadas)
+        self.datas: Tuple[date, ...] = tuple(v.effective_date for v in ordenadas)
+        self.origem = origem
+        self.carregado_em = time.time()
+
+    @classmethod
+    def de_registros(cls, registros: Iterable[Mapping[str, Any]], origem: str = "banco") -> "IndiceSAL":
+        return cls((VersaoSAL.de_registro(r) for r in registros), origem)
+
+    def versao_para(self, data_competencia: date) -> VersaoSAL:
+        """
+        Versão vigente na data.
+
+        Raises:
+            ValueError: Data anterior à primeira versão cadastrada
+        """
+        i = bisect_right(self.datas, data_competencia)
+        if i == 0:
+            raise ValueError(f"Não há regras SAL configuradas para {data_competencia.isoformat()}")
+        return self.versoes[i - 1]
+
+    def __len__(self) -> int:
+        return len(self.versoes)
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            "versoes": [d.isoformat() for d in self.datas],
+            "origem": self.origem,
+            "carregado_em": self.carregado_em
+        }
+
+
+class RegistroSAL:
+    """
+    Dono do IndiceSAL do processo: carga inicial, recarga periódica e sob demanda.
+
+    Uso (lifespan):
+        await registro_sal.carregar()
+        registro_sal.iniciar_atualizacao()
+        ...
+        await registro_sal.parar_atualizacao()
+    """
+
+    def __init__(self, supabase_service: Optional[SupabaseService] = None) -> None:
+        self._supabase_service = supabase_service
+        self._indice: Optional[IndiceSAL] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._tarefa_atualizacao: Optional[asyncio.Task] = None
+
+    @property
+    def supabase_service(self) -> SupabaseService:
+        return self._supabase_service or get_supabase_service()
+
+    @property
+    def indice(self) -> Optional[IndiceSAL]:
+        return self._indice
+
+    async def carregar(self, supabase_service: Optional[SupabaseService] = None) -> IndiceSAL:
+        """
+        Lê todas as versões e troca o índice atomicamente.
+
+        Se a leitura falhar e já houver índice, mantém o atual; sem índice, usa
+        o fallback 2025.
+
+        Returns:
+            Índice em uso após a carga
+        """
+        supabase = supabase_service or self.supabase_service
+        try:
+            registros = await supabase.tabela("sal_version_history").order("effective_date").executar()
+            if registros:
+                novo = IndiceSAL.de_registros(registros, origem="banco")
+            else:
+                print("[SAL MANAGER] Tabela sal_version_history vazia, usando regras SAL 2025 (Fallback)")
+                novo = IndiceSAL.de_registros([FALLBACK_SAL_2025], origem="fallback")
+        except Exception as e:
+            print(f"[SAL MANAGER] Erro ao buscar regras SAL do banco: {e}")
+            if self._indice is not None:
+                return self._indice
+            novo = IndiceSAL.de_registros([FALLBACK_SAL_2025], origem="fallback")
+
+        self._indice = novo
+        print(f"[SAL MANAGER] {len(novo)} versão(ões) SAL carregada(s) ({novo.origem})")
+        return novo
+
+    async def garantir_carregado(self, supabase_service: Optional[SupabaseService] = None) -> IndiceSAL:
+        """Índice atual, carregando uma única vez se o lifespan ainda não carregou."""
+        indice = self._indice
+        if indice is not None:
+            return indice
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._indice is None:
+                await self.carregar(supabase_service)
+            return self._indice
+
+    async def atualizar(self) -> IndiceSAL:
+        """Recarga sob demanda (ex.: após inserir uma nova versão SAL)."""
+        return await self.carregar()
+
+    async def _loop_atualizacao(self, intervalo: float) -> None:
+        while True:
+            await asyncio.sleep(intervalo)
+            await self.carregar()
+
+    def iniciar_atualizacao(self, intervalo: Optional[float] = None) -> None:
+        """Agenda recargas periódicas no event loop atual (0 desliga)."""
+        if self._tarefa_atualizacao is not None and not self._tarefa_atualizacao.done():
+            return
+        if intervalo is None:
+            intervalo = float(os.getenv("GPS_SAL_REFRESH_INTERVALO", "3600"))
+        if intervalo <= 0:
+            return
+        self._tarefa_atualizacao = asyncio.get_running_loop().create_task(self._loop_atualizacao(intervalo))
+
+    async def parar_atualizacao(self) -> None:
+        if self._tarefa_atualizacao is not None:
+            self._tarefa_atualizacao.cancel()
+            try:
+                await self._tarefa_atualizacao
+            except asyncio.CancelledError:
+                pass
+            self._tarefa_atualizacao = None
+
+
+# Instância global (um índice por processo, carregado no lifespan)
+registro_sal = RegistroSAL()
+
 
 class SALVersionManager:
     """
     Gerenciador de versões das tabelas SAL.
     Responsável por recuperar e validar as regras SAL para uma determinada competência.
-    Adaptado para usar cache em memória (substituindo Redis por enquanto).
+    Consultas são servidas pelo IndiceSAL em memória (registro_sal); só a
+    primeira chamada do processo faz I/O, caso o lifespan não tenha carregado.
     """
-    
-    _cache: Dict[str, Any] = {}
-    
-    def __init__(self, supabase_service: Optional[SupabaseService] = None):
-        self.supabase_service = supabase_service or SupabaseService()
-    
+
+    def __init__(
+        self,
+        supabase_service: Optional[SupabaseService] = None,
+        registro: Optional[RegistroSAL] = None
+    ):
+        self.supabase_service = supabase_service or get_supabase_service()
+        self.registro = registro or registro_sal
+
+    async def _versao(self, data_competencia: date) -> VersaoSAL:
+        indice = self.registro.indice or await self.registro.garantir_carregado(self.supabase_service)
+        return indice.versao_para(data_competencia)
+
+    async def get_versao(self, data_competencia: date) -> VersaoSAL:
+        """Versão SAL tipada vigente na data de competência."""
+        return await self._versao(data_competencia)
+
     async def get_sal_version(self, data_competencia: date) -> Dict[str, Any]:
         """
         Retorna o conjunto de regras SAL válido para a data de competência especificada.
-        Prioridade: Memória Cache > Supabase
+        (registro original de sal_version_history)
         """
-        ano = data_competencia.year
-        cache_key = f"sal:version:{ano}"
-        
-        # 1. Tentar buscar do Cache
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        
-        # 2. Buscar do Supabase
-        # Como o supabase_service.client pode ser None ou assíncrono, vamos usar o método get_records
-        # Assumindo que existe uma tabela 'sal_version_history'
-        # Se não existir, vamos retornar um fallback hardcoded para 2025 por enquanto
-        
-        try:
-            records = await self.supabase_service.get_records(
-                "sal_version_history", 
-                {"effective_date": f"{ano}-01-01"}
-            )
-            
-            if records and len(records) > 0:
-                sal_data = records[0]
-                self._cache[cache_key] = sal_data
-                return sal_data
-        except Exception as e:
-            print(f"[SAL MANAGER] Erro ao buscar regras SAL do banco: {e}")
-        
-        # Fallback Hardcoded para 2025 (conforme documento)
-        if ano == 2025:
-            print(f"[SAL MANAGER] Usando regras SAL 2025 (Fallback)")
-            fallback_2025 = {
-                "effective_date": "2025-01-01",
-                "teto_inss": 7786.02,
-                "salario_minimo": 1518.00,
-                "tabela_aliquotas": {
-                    "ci_normal": [
-                        {"faixa_min": 0.00, "faixa_max": 1518.00, "aliquota": 0.075},
-                        {"faixa_min": 1518.01, "faixa_max": 2666.68, "aliquota": 0.09},
-                        {"faixa_min": 2666.69, "faixa_max": 4000.03, "aliquota": 0.12},
-                        {"faixa_min": 4000.04, "faixa_max": 7786.02, "aliquota": 0.14}
-                    ],
-                    "ci_simplificado": [
-                        {"faixa_min": 0.00, "faixa_max": 7786.02, "aliquota": 0.11}
-                    ],
-                    "domestico": [
-                        {"faixa_min": 0.00, "faixa_max": 7786.02, "aliquota": 0.08} # Simplificado para exemplo, real é progressivo
-                    ],
-                    "rural": [
-                        {"faixa_min": 0.00, "faixa_max": 999999.99, "aliquota": 0.115}
-                    ]
-                }
-            }
-            self._cache[cache_key] = fallback_2025
-            return fallback_2025
-            
-        raise ValueError(f"Não há regras SAL configuradas para o ano {ano}")
-    
+        versao = await self._versao(data_competencia)
+        return dict(versao.registro)
+
     async def get_teto_inss(self, ano: int) -> Decimal:
         """Retorna o teto INSS para um determinado ano"""
-        sal_version = await self.get_sal_version(date(ano, 1, 1))
-        return Decimal(str(sal_version['teto_inss']))
-    
+        return (await self._versao(date(ano, 1, 1))).teto_inss.reais
+
     async def get_salario_minimo(self, ano: int) -> Decimal:
         """Retorna o salário mínimo para um determinado ano"""
-        sal_version = await self.get_sal_version(date(ano, 1, 1))
-        return Decimal(str(sal_version['salario_minimo']))
-    
+        return (await self._versao(date(ano, 1, 1))).salario_minimo.reais
+
     async def get_aliquotas(self, tipo_contribuinte: str, data: date) -> list:
         """
         Retorna as faixas e alíquotas para um tipo de contribuinte específico
         """
-        sal_version = await self.get_sal_version(data)
-        # Ajuste para estrutura JSONB ou dict Python
-        tabela = sal_version.get('tabela_aliquotas', {})
-        if isinstance(tabela, str):
-            tabela = json.loads(tabela)
-            
-        aliquotas = tabela.get(tipo_contribuinte, [])
-        
-        if not aliquotas:
-            # Tentar mapeamento de nomes antigos se necessário
-            mapa_tipos = {
-                "autonomo": "ci_normal",
-                "autonomo_simplificado": "ci_simplificado",
-                "individual": "ci_normal"
-            }
-            tipo_mapeado = mapa_tipos.get(tipo_contribuinte)
-            if tipo_mapeado:
-                aliquotas = tabela.get(tipo_mapeado, [])
-        
-        if not aliquotas:
+        tabela = (await self._versao(data)).tabela(tipo_contribuinte)
+
+        if tabela is None:
             # Fallback seguro se não encontrar alíquotas
             print(f"[SAL MANAGER] [WARN] Alíquotas não encontradas para {tipo_contribuinte}, usando padrão")
             if tipo_contribuinte in ["ci_simplificado", "autonomo_simplificado"]:
-                 return [{"faixa_min": 0, "faixa_max": 99999, "aliquota": 0.11}]
+                return [{"faixa_min": 0, "faixa_max": 99999, "aliquota": 0.11}]
             return []
-            # raise ValueError(f"Alíquotas não encontradas para tipo: {tipo_contribuinte}")
-        
-        return aliquotas
-    
-    async def validate_against_sal(self, tipo: str, valor: Decimal, data: date) -> tuple:
+
+        return tabela.como_dicts()
+
+    async def validate_against_sal(self, tipo: str, valor: ValorReais, data: date) -> tuple:
         """
         Valida se um valor está dentro dos limites SAL
         Retorna (valido: bool, mensagem: str)
         """
         try:
-            teto = await self.get_teto_inss(data.year)
-            salario_minimo = await self.get_salario_minimo(data.year)
-            
-            if valor > teto:
-                return False, f"Valor R$ {valor:,.2f} excede teto INSS de R$ {teto:,.2f}"
-            
+            versao = await self._versao(data)
+            centavos = Centavos.de_reais(valor)
+
+            if centavos > versao.teto_inss:
+                return False, f"Valor {formatar_moeda(centavos)} excede teto INSS de {formatar_moeda(versao.teto_inss)}"
+
             # Para simplificado, pode ser menor que salário mínimo? Não, regra D diz que mínimo é SM.
             # Exceto se for complemento, mas aqui é validação base.
-            if valor < salario_minimo:
-                return False, f"Valor R$ {valor:,.2f} abaixo do salário mínimo R$ {salario_minimo:,.2f}"
-            
+            if centavos < versao.salario_minimo:
+                return False, (
+                    f"Valor {formatar_moeda(centavos)} abaixo do salário mínimo {formatar_moeda(versao.salario_minimo)}"
+                )
+
             return True, "Válido"
-        
+
         except Exception as e:
             return False, f"Erro ao validar regras SAL: {str(e)}"
@@ -0,0 +1,402 @@
+"""
+Fatores de juros SELIC acumulados para complementação e contribuições em atraso.
+
+A tabela de taxas mensais (app/data/selic_mensal.json, versionada) é
+convertida no carregamento em produtos acumulados: acumulado[m] = Π(1 + taxa)
+até o mês m. O fator de juros entre a competência c e o mês de pagamento p é
+acumulado[p] / acumulado[c] - 1, ou seja, uma consulta O(1) por competência,
+e a versão NumPy atende lotes de muitos contribuintes de uma vez.
+
+Só os MARGEM_MESES meses vizinhos às bordas repetem a taxa da borda (a taxa
+do mês corrente ainda não foi publicada); fora disso fator() levanta
+SelicForaDoAlcance em vez de inventar juros. Quando o pagamento passa do fim
+da tabela, ou a competência é anterior ao início, RegistroSelic.garantir_cobertura
+busca os meses que faltam na série 4390 do SGS (Banco Central) e troca a tabela.
+
+Fallback: se o SGS não responder, fator(..., estimar=True) repete a taxa da
+borda pelos meses que faltam. INSSCalculator.calcular_complementacao usa esse
+fallback e marca o resultado com juros_estimados=True e aviso_selic, em vez de
+recusar a emissão. O arquivo é regenerado com atualizar_tabela_selic.py.
+
+Configuração (variáveis de ambiente):
+- GPS_SELIC_ARQUIVO: caminho do JSON de taxas (padrão: app/data/selic_mensal.json)
+- GPS_SELIC_REFRESH_INTERVALO: segundos entre verificações do arquivo (padrão: 300; 0 desliga)
+- GPS_SELIC_MARGEM_MESES: meses além das bordas que repetem a taxa da borda (padrão: 2)
+- GPS_SELIC_BCB_URL: série SGS consultada quando a tabela não cobre as datas (vazio desliga)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import httpx
+import numpy as np
+
+from ..config import get_settings
+from ..utils.validators import normalizar_competencia
+
+ARQUIVO_PADRAO = Path(__file__).resolve().parent.parent / "data" / "selic_mensal.json"
+
+# Meses além das bordas que repetem a taxa da borda (mês corrente ainda sem taxa publicada)
+MARGEM_MESES = int(os.getenv("GPS_SELIC_MARGEM_MESES", "2"))
+
+# SGS 4390: taxa SELIC acumulada no mês (% a.m.)
+URL_BCB_PADRAO = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.4390/dados"
+
+# Segundos sem nova consulta ao BCB depois de uma falha
+ESPERA_APOS_FALHA_BCB = 300.0
+
+Competencia = Union[str, date]
+
+
+def indice_mes(ano: int, mes: int) -> int:
+    """Número sequencial do mês (ano * 12 + mes - 1)."""
+    return ano * 12 + mes - 1
+
+
+def indice_competencia(competencia: Competencia) -> int:
+    """Índice do mês de uma competência MM/AAAA ou de uma data."""
+    if isinstance(competencia, date):
+        return indice_mes(competencia.year, competencia.month)
+    mes, ano = normalizar_competencia(competencia).split("/")
+    return indice_mes(int(ano), int(mes))
+
+
+class SelicForaDoAlcance(ValueError):
+    """Mês anterior ao início ou posterior ao fim da tabela SELIC (além da margem)."""
+
+
+def _mes(indice: int) -> str:
+    return f"{indice // 12}-{indice % 12 + 1:02d}"
+
+
+class TabelaSelic:
+    """
+    Tabela imutável de fatores SELIC acumulados.
+
+    Args:
+        taxas: Mapa "AAAA-MM" -> taxa do mês em percentual (1.12 = 1,12% a.m.)
+        versao: Identificação da versão da tabela
+        margem_meses: Meses além das bordas que repetem a taxa da borda (padrão: MARGEM_MESES)
+    """
+
+    __slots__ = (
+        "versao", "inicio", "fim", "taxas", "_base", "_acumulado", "_acumulado_array", "_taxa_inicio", "_taxa_fim"
+    )
+
+    def __init__(self, taxas: Mapping[str, float], versao: str = "", margem_meses: Optional[int] = None) -> None:
+        if not taxas:
+            raise ValueError("Tabela SELIC vazia")
+        por_mes: Dict[int, float] = {}
+        for chave, percentual in taxas.items():
+            ano, mes = chave.split("-")
+            por_mes[indice_mes(int(ano), int(mes))] = float(percentual) / 100
+
+        self.versao = versao
+        self.taxas = dict(taxas)
+        self.inicio = min(por_mes)
+        self.fim = max(por_mes)
+        faltando = [m for m in range(self.inicio, self.fim + 1) if m not in por_mes]
+        if faltando:
+            raise ValueError(f"Tabela SELIC com {len(faltando)} mês(es) faltando (primeiro índice {faltando[0]})")
+
+        self._taxa_inicio, self._taxa_fim = por_mes[self.inicio], por_mes[self.fim]
+        margem = MARGEM_MESES if margem_meses is None else max(0, margem_meses)
+        self._base = self.inicio - margem
+        acumulado: List[float] = []
+        fator = 1.0
+        for m in range(self._base, self.fim + margem + 1):
+            fator *= 1 + por_mes[min(max(m, self.inicio), self.fim)]
+            acumulado.append(fator)
+        self._acumulado = acumulado
+        self._acumulado_array = np.array(acumulado, dtype=np.float64)
+
+    @classmethod
+    def de_json(cls, dados: Mapping[str, Any]) -> "TabelaSelic":
+        return cls(dados["taxas_percentuais"], versao=str(dados.get("versao", "")))
+
+    @classmethod
+    def de_arquivo(cls, caminho: Union[str, Path]) -> "TabelaSelic":
+        with open(caminho, encoding="utf-8") as arquivo:
+            return cls.de_json(json.load(arquivo))
+
+    @property
+    def ultimo_mes_coberto(self) -> int:
+        """Índice do último mês aceito (fim da tabela + margem)."""
+        return self._base + len(self._acumulado) - 1
+
+    def cobre(self, competencia: Competencia) -> bool:
+        """Se o mês está na tabela ou na margem das bordas."""
+        return self._base <= indice_competencia(competencia) <= self.ultimo_mes_coberto
+
+    def _fora_do_alcance(self, indice: Optional[int] = None) -> SelicForaDoAlcance:
+        mes = f" ({_mes(indice)})" if indice is not None else ""
+        return SelicForaDoAlcance(
+            f"Mês fora do alcance da tabela SELIC {self.versao}{mes}: taxas de {_mes(self.inicio)} a {_mes(self.fim)}"
+        )
+
+    def _acumulado_em(self, indice: int, estimar: bool) -> float:
+        posicao = indice - self._base
+        ultima = len(self._acumulado) - 1
+        if 0 <= posicao <= ultima:
+            return self._acumulado[posicao]
+        if not estimar:
+            raise self._fora_do_alcance(indice)
+        # Estimativa: taxa da borda repetida pelos meses além do alcance
+        if posicao > ultima:
+            return self._acumulado[-1] * (1 + self._taxa_fim) ** (posicao - ultima)
+        return self._acumulado[0] / (1 + self._taxa_inicio) ** -posicao
+
+    def fator(self, competencia: Competencia, pagamento: Competencia, estimar: bool = False) -> float:
+        """
+        Fator de juros (acumulado - 1) de uma competência paga no mês de pagamento.
+
+        Juros dos meses após a competência até o mês de pagamento, inclusive;
+        zero se o pagamento não é posterior à competência.
+
+        Args:
+            estimar: Fora do alcance, repete a taxa da borda em vez de levantar
+
+        Raises:
+            SelicForaDoAlcance: Mês fora do alcance da tabela (incluindo a margem) sem estimar
+        """
+        inicio = indice_competencia(competencia)
+        fim = indice_competencia(pagamento)
+        if fim <= inicio:
+            return 0.0
+        return self._acumulado_em(fim, estimar) / self._acumulado_em(inicio, estimar) - 1
+
+    def fatores(self, competencias: np.ndarray, pagamentos: Union[np.ndarray, int]) -> np.ndarray:
+        """
+        Versão vetorizada de fator() sobre índices de mês (ver indice_competencia).
+
+        Args:
+            competencias: Array de índices de mês das competências
+            pagamentos: Índice do mês de pagamento (um para todos ou um por linha)
+
+        Raises:
+            SelicForaDoAlcance: Algum mês fora do alcance da tabela
+        """
+        inicio = np.asarray(competencias, dtype=np.int64) - self._base
+        fim = np.broadcast_to(np.asarray(pagamentos, dtype=np.int64) - self._base, inicio.shape)
+        # Como em fator(): sem juros (nem checagem de alcance) se o pagamento não é posterior
+        com_juros = fim > inicio
+        limite = len(self._acumulado)
+        if com_juros.any() and (inicio[com_juros].min() < 0 or fim[com_juros].max() >= limite):
+            raise self._fora_do_alcance()
+        inicio, fim = np.clip(inicio, 0, limite - 1), np.clip(fim, 0, limite - 1)
+        fatores = self._acumulado_array[fim] / self._acumulado_array[inicio] - 1
+        return np.where(com_juros, fatores, 0.0)
+
+    def resumo(self) -> Dict[str, Any]:
+        return {"versao": self.versao, "inicio": _mes(self.inicio), "fim": _mes(self.fim)}
+
+
+class RegistroSelic:
+    """
+    Dono da TabelaSelic do processo, com recarga a quente quando o arquivo muda.
+
+    A recarga monta uma tabela nova e troca a referência; leitores em curso
+    continuam com a anterior. Se o arquivo novo for inválido, mantém a atual.
+    Meses buscados no BCB (antes ou depois do arquivo) entram na tabela e são
+    preservados nas recargas, até o arquivo passar a contê-los.
+    """
+
+    def __init__(self, caminho: Optional[Union[str, Path]] = None, url_bcb: Optional[str] = None) -> None:
+        self.caminho = Path(caminho or os.getenv("GPS_SELIC_ARQUIVO") or ARQUIVO_PADRAO)
+        self.url_bcb = os.getenv("GPS_SELIC_BCB_URL", URL_BCB_PADRAO) if url_bcb is None else url_bcb
+        self._tabela: Optional[TabelaSelic] = None
+        self._mtime: Optional[float] = None
+        self._tarefa_atualizacao: Optional[asyncio.Task] = None
+        # Taxas do SGS posteriores ao arquivo ("AAAA-MM" -> % a.m.)
+        self._taxas_bcb: Dict[str, float] = {}
+        self._versao_arquivo = ""
+        # Transporte alternativo ao de rede (backends locais para testes de carga)
+        self._transporte: Optional[httpx.AsyncBaseTransport] = None
+        self._lock_bcb: Optional[asyncio.Lock] = None
+        self._lock_bcb_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._proxima_consulta_bcb = 0.0
+
+    @property
+    def tabela(self) -> TabelaSelic:
+        """Tabela atual (carrega do arquivo na primeira chamada)."""
+        tabela = self._tabela
+        if tabela is None:
+            tabela = self.recarregar()
+        return tabela
+
+    def _montar(self, taxas: Mapping[str, float], versao: str) -> TabelaSelic:
+        """Tabela do arquivo acrescida dos meses do BCB que ele não tem."""
+        extras = {mes: taxa for mes, taxa in self._taxas_bcb.items() if mes not in taxas}
+        if extras:
+            try:
+                return TabelaSelic({**taxas, **extras}, versao=f"{versao}+bcb-{max(extras)}")
+            except ValueError:
+                pass  # buraco entre o arquivo e os meses do BCB: só o arquivo
+        return TabelaSelic(taxas, versao=versao)
+
+    def recarregar(self) -> TabelaSelic:
+        """
+        Lê o arquivo e troca a tabela.
+
+        Raises:
+            OSError, ValueError: Arquivo inválido e nenhuma tabela carregada ainda
+        """
+        try:
+            mtime = self.caminho.stat().st_mtime
+            with open(self.caminho, encoding="utf-8") as arquivo:
+                dados = json.load(arquivo)
+            versao = str(dados.get("versao", ""))
+            nova = self._montar(dados["taxas_percentuais"], versao)
+        except (OSError, ValueError, KeyError) as e:
+            if self._tabela is None:
+                raise
+            print(f"[SELIC] Erro ao recarregar {self.caminho}: {e} (mantendo versão {self._tabela.versao})")
+            return self._tabela
+        self._tabela, self._mtime, self._versao_arquivo = nova, mtime, versao
+        print(f"[SELIC] Tabela {nova.versao} carregada ({nova.resumo()['inicio']} a {nova.resumo()['fim']})")
+        return nova
+
+    def recarregar_se_alterado(self) -> TabelaSelic:
+        """Recarrega apenas se o arquivo mudou desde a última carga."""
+        try:
+            mtime = self.caminho.stat().st_mtime
+        except OSError:
+            return self.tabela
+        if self._tabela is None or mtime != self._mtime:
+            return self.recarregar()
+        return self._tabela
+
+    async def garantir_cobertura(
+        self, pagamento: Competencia, competencias: Sequence[Competencia] = ()
+    ) -> TabelaSelic:
+        """
+        Tabela que cobre o mês de pagamento e as competências, buscando no BCB os meses que faltam.
+
+        A margem só vale enquanto o SGS não publicou o mês. Sem
+        GPS_SELIC_BCB_URL, ou com o SGS indisponível, devolve a tabela atual e
+        fator() levanta SelicForaDoAlcance para o mês não coberto (ou estima,
+        com estimar=True).
+        """
+        fim = indice_competencia(pagamento)
+        # Os juros de uma competência usam as taxas a partir do mês seguinte
+        desde = min((indice + 1 for indice in indices_competencias(competencias) if indice < fim), default=None)
+        tabela = self.tabela
+        if fim > tabela.fim or (desde is not None and desde < tabela.inicio):
+            await self.atualizar_do_bcb(desde=desde)
+        return self.tabela
+
+    def _obter_lock_bcb(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock_bcb is None or self._lock_bcb_loop is not loop:
+            self._lock_bcb, self._lock_bcb_loop = asyncio.Lock(), loop
+        return self._lock_bcb
+
+    def _transporte_bcb(self) -> Optional[httpx.AsyncBaseTransport]:
+        if self._transporte is None and get_settings().backend_local:
+            from .backends_locais import obter_backends_locais
+
+            self._transporte = obter_backends_locais().sgs
+        return self._transporte
+
+    async def atualizar_do_bcb(self, desde: Optional[int] = None) -> bool:
+        """
+        Acrescenta à tabela os meses fechados publicados no SGS após o seu fim
+        e, com desde, os meses entre desde e o seu início.
+
+        Uma consulta por vez; depois de uma falha, espera ESPERA_APOS_FALHA_BCB
+        segundos antes de consultar de novo. Meses do arquivo prevalecem sobre
+        os do SGS.
+
+        Args:
+            desde: Índice do primeiro mês necessário (ver indice_mes)
+
+        Returns:
+            True se a tabela ganhou meses novos
+        """
+        hoje = date.today()
+        ultimo_fechado = indice_mes(hoje.year, hoje.month) - 1
+
+        def faltando(tabela: TabelaSelic) -> bool:
+            return tabela.fim < ultimo_fechado or (desde is not None and desde < tabela.inicio)
+
+        if not self.url_bcb or not faltando(self.tabela):
+            return False
+        async with self._obter_lock_bcb():
+            tabela = self.tabela
+            if not faltando(tabela) or time.monotonic() < self._proxima_consulta_bcb:
+                return False
+            inicio = desde if desde is not None and desde < tabela.inicio else tabela.fim + 1
+            try:
+                async with httpx.AsyncClient(timeout=10.0, transport=self._transporte_bcb()) as cliente:
+                    resposta = await cliente.get(self.url_bcb, params={
+                        "formato": "json",
+                        "dataInicial": f"01/{inicio % 12 + 1:02d}/{inicio // 12}",
+                        "dataFinal": hoje.strftime("%d/%m/%Y"),
+                    })
+                    resposta.raise_for_status()
+                novas: Dict[str, float] = {}
+                for item in resposta.json():
+                    _, mes, ano = item["data"].split("/")
+                    chave = f"{ano}-{mes}"
+                    if inicio <= indice_mes(int(ano), int(mes)) <= ultimo_fechado and chave not in tabela.taxas:
+                        novas[chave] = float(item["valor"])
+                if not novas:
+                    raise ValueError(f"nenhum mês novo publicado desde {_mes(inicio)}")
+                nova = TabelaSelic(
+                    {**novas, **tabela.taxas}, versao=f"{self._versao_arquivo or tabela.versao}+bcb-{max(novas)}"
+                )
+            except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+                self._proxima_consulta_bcb = time.monotonic() + ESPERA_APOS_FALHA_BCB
+                print(f"[SELIC] [WARN] SGS indisponível ({e}); tabela {tabela.versao} termina em {_mes(tabela.fim)}")
+                return False
+            self._taxas_bcb.update(novas)
+            self._tabela = nova
+            print(f"[SELIC] [OK] {len(novas)} mês(es) do SGS: tabela {nova.versao} até {_mes(nova.fim)}")
+            return True
+
+    async def _loop_atualizacao(self, intervalo: float) -> None:
+        while True:
+            await asyncio.sleep(intervalo)
+            self.recarregar_se_alterado()
+            await self.atualizar_do_bcb()
+
+    def iniciar_atualizacao(self, intervalo: Optional[float] = None) -> None:
+        """Verifica o arquivo (e meses novos no BCB) periodicamente no event loop atual (0 desliga)."""
+        if self._tarefa_atualizacao is not None and not self._tarefa_atualizacao.done():
+            return
+        if intervalo is None:
+            intervalo = float(os.getenv("GPS_SELIC_REFRESH_INTERVALO", "300"))
+        if intervalo <= 0:
+            return
+        self._tarefa_atualizacao = asyncio.get_running_loop().create_task(self._loop_atualizacao(intervalo))
+
+    async def parar_atualizacao(self) -> None:
+        if self._tarefa_atualizacao is not None:
+            self._tarefa_atualizacao.cancel()
+            try:
+                await self._tarefa_atualizacao
+            except asyncio.CancelledError:
+                pass
+            self._tarefa_atualizacao = None
+
+
+# Instância global
+registro_selic = RegistroSelic()
+
+
+def indices_competencias(competencias: Sequence[Competencia]) -> np.ndarray:
+    """Índices de mês de muitas competências (cada valor distinto é normalizado uma vez)."""
+    cache: Dict[Competencia, int] = {}
+    indices = np.empty(len(competencias), dtype=np.int64)
+    for i, competencia in enumerate(competencias):
+        indice = cache.get(competencia)
+        if indice is None:
+            indice = cache[competencia] = indice_competencia(competencia)
+        indices[i] = indice
+    return indices
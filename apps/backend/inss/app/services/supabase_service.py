@@ -1,70 +1,469 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, List, Optional
+import concurrent.futures
+import hashlib
+import os
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple, Union
+from urllib.parse import quote
+
+import httpx
 
 from ..config import get_settings
+from ..utils.cache_service import CacheService
+
+
+def _http2_disponivel() -> bool:
+    """HTTP/2 no httpx depende do pacote opcional h2."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _valor_postgrest(valor: Any) -> str:
+    """Formata um valor para filtros do PostgREST."""
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    if valor is None:
+        return "null"
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _total_content_range(content_range: Optional[str]) -> int:
+    """Extrai o total de 'Content-Range: 0-24/3573' (ou '*/3573')."""
+    if not content_range or "/" not in content_range:
+        return 0
+    total = content_range.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else 0
+
+
+class ConsultaSupabase:
+    """
+    Construtor de consultas PostgREST executadas no servidor.
+
+    Uso:
+        consulta = (
+            supabase.tabela("gps_emissions")
+            .select("id", "metodo_emissao")
+            .gte("created_at", inicio)
+            .lt("created_at", fim)
+        )
+        total = await consulta.contar()
+        async for guia in consulta.stream(tamanho_pagina=1000):
+            ...
+
+    Os métodos de filtro retornam a própria consulta (encadeáveis). Sem Supabase
+    disponível, executar/stream não retornam registros e contar retorna 0.
+    """
+
+    def __init__(self, servico: "SupabaseService", tabela: str) -> None:
+        self._servico = servico
+        self._tabela = tabela
+        self._colunas: Tuple[str, ...] = ()
+        self._filtros: List[Tuple[str, str]] = []
+        self._ordem: List[str] = []
+        self._limite: Optional[int] = None
+        self._offset: Optional[int] = None
+
+    # ----- Projeção, ordenação e paginação -----
+
+    def select(self, *colunas: str) -> "ConsultaSupabase":
+        """Colunas retornadas (padrão: todas)."""
+        self._colunas = colunas
+        return self
+
+    def order(self, coluna: str, desc: bool = False) -> "ConsultaSupabase":
+        self._ordem.append(f"{coluna}.{'desc' if desc else 'asc'}")
+        return self
+
+    def limit(self, limite: int) -> "ConsultaSupabase":
+        self._limite = limite
+        return self
+
+    def offset(self, offset: int) -> "ConsultaSupabase":
+        self._offset = offset
+        return self
+
+    # ----- Filtros -----
+
+    def _filtro(self, coluna: str, operador: str, valor: Any) -> "ConsultaSupabase":
+        self._filtros.append((coluna, f"{operador}.{_valor_postgrest(valor)}"))
+        return self
+
+    def eq(self, coluna: str, valor: Any) -> "ConsultaSupabase":
+        return self._filtro(coluna, "eq", valor)
+
+    def neq(self, coluna: str, valor: Any) -> "ConsultaSupabase":
+        return self._filtro(coluna, "neq", valor)
+
+    def gt(self, coluna: str, valor: Any) -> "ConsultaSupabase":
+        return self._filtro(coluna, "gt", valor)
+
+    def gte(self, coluna: str, valor: Any) -> "ConsultaSupabase":
+        return self._filtro(coluna, "gte", valor)
+
+    def lt(self, coluna: str, valor: Any) -> "ConsultaSupabase":
+        return self._filtro(coluna, "lt", valor)
+
+    def lte(self, coluna: str, valor: Any) -> "ConsultaSupabase":
+        return self._filtro(coluna, "lte", valor)
+
+    def is_(self, coluna: str, valor: Optional[bool]) -> "ConsultaSupabase":
+        return self._filtro(coluna, "is", valor)
+
+    def in_(self, coluna: str, valores: Sequence[Any]) -> "ConsultaSupabase":
+        lista = ",".join(_valor_postgrest(v) for v in valores)
+        self._filtros.append((coluna, f"in.({lista})"))
+        return self
+
+    def filtros(self, filtros: Optional[Dict[str, Any]]) -> "ConsultaSupabase":
+        """Aplica um dicionário de igualdades (formato legado de get_records)."""
+        for coluna, valor in (filtros or {}).items():
+            self.eq(coluna, valor)
+        return self
+
+    # ----- Execução -----
+
+    def _params(
+        self,
+        filtros_extras: Sequence[Tuple[str, str]] = (),
+        limite: Optional[int] = None,
+    ) -> List[Tuple[str, str]]:
+        params = [("select", ",".join(self._colunas) or "*")]
+        params.extend(self._filtros)
+        params.extend(filtros_extras)
+        if self._ordem:
+            params.append(("order", ",".join(self._ordem)))
+        limite = limite if limite is not None else self._limite
+        if limite is not None:
+            params.append(("limit", str(limite)))
+        if self._offset:
+            params.append(("offset", str(self._offset)))
+        return params
+
+    async def _get(self, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        client = self._servico.client
+        if not client:
+            return []
+        resposta = await client.get(f"/rest/v1/{self._tabela}", params=params)
+        resposta.raise_for_status()
+        return resposta.json() or []
+
+    async def executar(self) -> List[Dict[str, Any]]:
+        """
+        Executa a consulta e retorna os registros.
+
+        Raises:
+            httpx.HTTPError: Erro de rede ou resposta não-2xx do PostgREST
+        """
+        return await self._get(self._params())
+
+    async def contar(self) -> int:
+        """
+        Conta os registros que atendem aos filtros (HEAD + Prefer: count=exact).
+
+        Nenhuma linha é transferida, apenas o cabeçalho Content-Range.
+        """
+        client = self._servico.client
+        if not client:
+            return 0
+        params = [("select", ",".join(self._colunas) or "*")] + self._filtros
+        resposta = await client.head(
+            f"/rest/v1/{self._tabela}",
+            params=params,
+            headers={"Prefer": "count=exact"},
+        )
+        resposta.raise_for_status()
+        return _total_content_range(resposta.headers.get("content-range"))
+
+    async def pagina(
+        self,
+        apos: Any = None,
+        limite: int = 100,
+        chave: str = "id",
+    ) -> Tuple[List[Dict[str, Any]], Any]:
+        """
+        Uma página por keyset (chave > apos, ordenada pela chave).
+
+        Args:
+            apos: Último valor de chave da página anterior (None = início)
+            limite: Tamanho da página
+            chave: Coluna única e ordenável usada como cursor
+
+        Returns:
+            Tupla (registros, cursor da próxima página ou None se acabou)
+        """
+        extras = [(chave, f"gt.{_valor_postgrest(apos)}")] if apos is not None else []
+        colunas = self._colunas
+        if colunas and chave not in colunas:
+            colunas = colunas + (chave,)
+        params = [("select", ",".join(colunas) or "*")]
+        params.extend(self._filtros)
+        params.extend(extras)
+        params.append(("order", f"{chave}.asc"))
+        params.append(("limit", str(limite)))
+        registros = await self._get(params)
+        cursor = registros[-1][chave] if len(registros) == limite else None
+        return registros, cursor
+
+    async def stream(self, tamanho_pagina: int = 1000, chave: str = "id") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Itera sobre todos os registros em páginas por keyset.
+
+        Memória constante (uma página por vez) e sem o custo crescente de OFFSET.
+        """
+        cursor = None
+        while True:
+            registros, cursor = await self.pagina(apos=cursor, limite=tamanho_pagina, chave=chave)
+            for registro in registros:
+                yield registro
+            if cursor is None:
+                return
+
+
+# Objetos do Storage sao imutaveis (caminho = hash do conteudo)
+TTL_PDF_ARMAZENADO = 7 * 24 * 3600
+
+
+class ArmazenamentoIndisponivel(RuntimeError):
+    """Upload falhou; carrega a URL temp:// devolvida por upload_file."""
+
+    def __init__(self, url: str) -> None:
+        super().__init__(url)
+        self.url = url
 
 
 class SupabaseService:
-    """Servicos utilitarios para acesso ao Supabase com fallback offline."""
+    """
+    Servicos utilitarios para acesso ao Supabase com fallback offline.
+
+    Usa um httpx.AsyncClient proprio (PostgREST + Storage) com pool de conexoes,
+    keep-alive e HTTP/2 quando disponivel, sem saltos para threads. A aplicacao
+    cria a instancia no lifespan (app.dependencias.ServicosApp), que abre o pool
+    no event loop do servidor e o fecha no shutdown; as rotas a recebem por Depends.
+
+    Configuracao (variaveis de ambiente):
+    - GPS_SUPABASE_MAX_CONEXOES: conexoes simultaneas no pool (padrao: 50)
+    - GPS_SUPABASE_KEEPALIVE: conexoes ociosas mantidas abertas (padrao: 20)
+    - GPS_SUPABASE_TIMEOUT: timeout de leitura em segundos (padrao: 10)
+    - GPS_PDF_ARMAZENADOS_MAX: PDFs com existencia conhecida em cache (padrao: 4096)
+    - GPS_BACKEND_LOCAL: atende PostgREST e Storage localmente (ver services/backends_locais)
+    """
 
     def __init__(self, url: Optional[str] = None, key: Optional[str] = None) -> None:
         settings = get_settings()
-        self.url = url or str(settings.supabase_url)
+        self.url = (url or str(settings.supabase_url)).rstrip("/")
         self.key = key or settings.supabase_key
-        self._client: Any = None
+        self.disponivel = bool(self.key) and re.match(r"^https?://.+", self.url) is not None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Fechamentos de clientes de event loops anteriores ainda em andamento
+        self._fechamentos: Set[Union[asyncio.Task, concurrent.futures.Future]] = set()
+        # Transporte alternativo ao de rede (backends locais para testes de carga)
+        self._transporte: Optional[httpx.AsyncBaseTransport] = None
+        if settings.backend_local:
+            from .backends_locais import obter_backends_locais
+
+            self._transporte = obter_backends_locais().supabase
+            self.disponivel = True
+        # pdf:<bucket>/<caminho> -> URL publica dos PDFs ja presentes no Storage
+        self._pdfs_armazenados = CacheService(
+            max_entradas=int(os.getenv("GPS_PDF_ARMAZENADOS_MAX", "4096")),
+            ttl_padrao=TTL_PDF_ARMAZENADO,
+        )
+
+    def _criar_client(self) -> httpx.AsyncClient:
+        limites = httpx.Limits(
+            max_connections=int(os.getenv("GPS_SUPABASE_MAX_CONEXOES", "50")),
+            max_keepalive_connections=int(os.getenv("GPS_SUPABASE_KEEPALIVE", "20")),
+            keepalive_expiry=30.0,
+        )
+        timeout = httpx.Timeout(float(os.getenv("GPS_SUPABASE_TIMEOUT", "10")), connect=5.0)
+        if self._transporte is not None:
+            return httpx.AsyncClient(
+                base_url=self.url,
+                headers={"apikey": self.key, "Authorization": f"Bearer {self.key}"},
+                timeout=timeout,
+                transport=self._transporte,
+            )
+        return httpx.AsyncClient(
+            base_url=self.url,
+            headers={"apikey": self.key, "Authorization": f"Bearer {self.key}"},
+            limits=limites,
+            timeout=timeout,
+            http2=_http2_disponivel(),
+        )
 
     @property
-    def client(self):
-        """Retorna instancia do cliente Supabase (ou None quando indisponivel)."""
-        if self._client is None:
-            try:
-                from supabase import create_client
+    def client(self) -> Optional[httpx.AsyncClient]:
+        """Retorna o cliente HTTP compartilhado (ou None quando Supabase indisponivel)."""
+        if not self.disponivel:
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        # Conexoes do pool pertencem ao event loop que as abriu
+        if self._client is None or (loop is not None and self._client_loop not in (None, loop)):
+            if self._client is not None:
+                self._descartar_client(self._client, self._client_loop, loop)
+            self._client = self._criar_client()
+            self._client_loop = loop
+        elif self._client_loop is None:
+            self._client_loop = loop
+        return self._client
 
-                self._client = create_client(self.url, self.key)
-            except Exception as exc:  # pragma: no cover - somente logamos
-                print(f"[WARN] Problema ao conectar Supabase: {str(exc)[:60]}...")
-                print("  Sistema funcionara em modo limitado (sem persistencia)")
-                self._client = False  # marca que a tentativa ja ocorreu
+    def _descartar_client(
+        self,
+        client: httpx.AsyncClient,
+        loop_antigo: Optional[asyncio.AbstractEventLoop],
+        loop_atual: asyncio.AbstractEventLoop,
+    ) -> None:
+        """
+        Fecha o cliente de um event loop anterior sem bloquear o atual.
+        
+        Com o loop antigo rodando (outra thread), o aclose roda nele, onde estao
+        as conexoes; parado ou fechado, roda no loop atual e so libera o pool.
+        """
+        if loop_antigo is not None and loop_antigo.is_running() and not loop_antigo.is_closed():
+            fechamento = asyncio.run_coroutine_threadsafe(self._fechar_client(client), loop_antigo)
+        else:
+            fechamento = loop_atual.create_task(self._fechar_client(client))
+        self._fechamentos.add(fechamento)
+        fechamento.add_done_callback(self._fechamentos.discard)
 
-        return self._client if self._client else None
+    @staticmethod
+    async def _fechar_client(client: httpx.AsyncClient) -> None:
+        try:
+            await client.aclose()
+        except Exception as e:
+            print(f"[WARN] Supabase: falha ao fechar cliente HTTP do event loop anterior: {e}")
+
+    async def iniciar(self) -> None:
+        """Abre o pool de conexoes (chamado no startup da aplicacao)."""
+        if not self.client:
+            print("[WARN] Supabase indisponivel - sistema funcionara em modo limitado (sem persistencia)")
+            return
+        if self._transporte is not None:
+            print(f"[OK] Supabase: backend local ({get_settings().backend_local_dir or 'memoria'})")
+            return
+        print(f"[OK] Supabase: pool HTTP pronto (http2={_http2_disponivel()})")
+
+    async def encerrar(self) -> None:
+        """Fecha o pool de conexoes (chamado no shutdown da aplicacao)."""
+        loop = asyncio.get_running_loop()
+        pendentes = [
+            asyncio.wrap_future(f) if isinstance(f, concurrent.futures.Future) else f
+            for f in list(self._fechamentos)
+            if isinstance(f, concurrent.futures.Future) or f.get_loop() is loop
+        ]
+        if pendentes:
+            await asyncio.gather(*pendentes, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
 
     async def create_record(self, table: str, data: Dict[str, Any]) -> Dict[str, Any]:
         if not self.client:
             print("[WARN] Supabase indisponivel - criando registro em memoria")
             return data
 
-        def _create():
-            return self.client.table(table).insert(data).execute()
-
         try:
-            result = await asyncio.to_thread(_create)
-            return result.data[0] if result.data else {}
+            resposta = await self.client.post(
+                f"/rest/v1/{table}",
+                json=data,
+                headers={"Prefer": "return=representation"},
+            )
+            resposta.raise_for_status()
+            registros = resposta.json()
+            return registros[0] if registros else {}
         except Exception as exc:  # pragma: no cover
             print(f"[ERROR] Erro ao criar registro: {str(exc)[:60]}...")
             return data
 
+    async def upsert_record(
+        self, table: str, data: Dict[str, Any], on_conflict: Sequence[str]
+    ) -> Dict[str, Any]:
+        """
+        Insere ou atualiza pela restricao unica on_conflict (resolution=merge-duplicates).
+
+        Raises:
+            RuntimeError: Supabase indisponivel
+            httpx.HTTPError: Erro de rede ou resposta não-2xx
+        """
+        if not self.client:
+            raise RuntimeError("Supabase indisponivel")
+        resposta = await self.client.post(
+            f"/rest/v1/{table}",
+            json=data,
+            params={"on_conflict": ",".join(on_conflict)},
+            headers={"Prefer": "resolution=merge-duplicates,return=representation"},
+        )
+        resposta.raise_for_status()
+        registros = resposta.json()
+        return registros[0] if registros else {}
+
+    async def update_record(
+        self, table: str, filters: Dict[str, Any], data: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Atualiza (PATCH) as linhas que casam com os filtros eq. e devolve as linhas alteradas.
+
+        Raises:
+            RuntimeError: Supabase indisponivel
+            httpx.HTTPError: Erro de rede ou resposta não-2xx
+        """
+        if not self.client:
+            raise RuntimeError("Supabase indisponivel")
+        resposta = await self.client.patch(
+            f"/rest/v1/{table}",
+            json=data,
+            params=self.tabela(table).filtros(filters)._params(),
+            headers={"Prefer": "return=representation"},
+        )
+        resposta.raise_for_status()
+        return resposta.json()
+
+    def tabela(self, table: str) -> ConsultaSupabase:
+        """Inicia uma consulta filtrada/paginada no servidor (ver ConsultaSupabase)."""
+        return ConsultaSupabase(self, table)
+
     async def get_records(
         self, table: str, filters: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         if not self.client:
             return []
 
-        def _get():
-            query = self.client.table(table).select("*")
-            if filters:
-                for key, value in filters.items():
-                    query = query.eq(key, value)
-            return query.execute()
-
         try:
-            result = await asyncio.to_thread(_get)
-            return result.data or []
+            return await self.tabela(table).filtros(filters).executar()
         except Exception as exc:  # pragma: no cover
             print(f"[ERROR] Erro ao buscar registros: {str(exc)[:60]}...")
             return []
 
+    async def execute_rpc(self, funcao: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Executa uma função SQL exposta pelo PostgREST (POST /rpc/<funcao>).
+
+        Raises:
+            RuntimeError: Supabase indisponivel
+            httpx.HTTPError: Erro de rede ou resposta não-2xx
+        """
+        if not self.client:
+            raise RuntimeError("Supabase indisponivel")
+        resposta = await self.client.post(f"/rest/v1/rpc/{funcao}", json=params or {})
+        resposta.raise_for_status()
+        return resposta.json() if resposta.content else None
+
+    def public_url(self, bucket: str, file_path: str) -> str:
+        """URL publica de um objeto do Storage (calculada localmente)."""
+        return f"{self.url}/storage/v1/object/public/{bucket}/{quote(file_path)}"
+
     async def upload_file(
         self,
         bucket: str,
@@ -79,22 +478,16 @@ class SupabaseService:
         try:
             print(f"[DEBUG] Iniciando upload para bucket '{bucket}', path '{file_path}'")
 
-            def _upload():
-                return self.client.storage.from_(bucket).upload(
-                    file_path, file_data, {"content-type": content_type, "upsert": "true"}
-                )
+            resposta = await self.client.post(
+                f"/storage/v1/object/{bucket}/{quote(file_path)}",
+                content=file_data,
+                headers={"content-type": content_type, "x-upsert": "true"},
+            )
+            resposta.raise_for_status()
+            print(f"[DEBUG] Upload concluído: {resposta.status_code}")
 
-            upload_result = await asyncio.to_thread(_upload)
-            print(f"[DEBUG] Upload concluído: {upload_result}")
-
-            def _get_public_url():
-                return self.client.storage.from_(bucket).get_public_url(file_path)
-
-            public_url = await asyncio.to_thread(_get_public_url)
+            public_url = self.public_url(bucket, file_path)
             print(f"[DEBUG] URL pública gerada: {public_url}")
-
-            if not public_url:
-                raise RuntimeError("Nao foi possivel obter URL publica do arquivo")
             return public_url
         except Exception as exc:  # pragma: no cover
             import traceback
@@ -105,6 +498,66 @@ class SupabaseService:
             print(f"[ERROR]   Traceback: {traceback.format_exc()}")
             return f"temp://{file_path}"
 
+    async def arquivo_existe(self, bucket: str, file_path: str) -> bool:
+        """Verifica (HEAD, sem baixar o conteudo) se o objeto existe no Storage."""
+        if not self.client:
+            return False
+
+        try:
+            resposta = await self.client.head(f"/storage/v1/object/authenticated/{bucket}/{quote(file_path)}")
+            return resposta.status_code == 200
+        except Exception as exc:  # pragma: no cover
+            print(f"[WARN] Falha ao verificar arquivo {bucket}/{file_path}: {str(exc)[:60]}...")
+            return False
+
+    @staticmethod
+    def caminho_pdf(conteudo: bytes) -> str:
+        """Caminho enderecado pelo conteudo: pdf/<2 primeiros hex>/<sha256>.pdf."""
+        digest = hashlib.sha256(conteudo).hexdigest()
+        return f"pdf/{digest[:2]}/{digest}.pdf"
+
+    def url_pdf(self, conteudo: bytes, bucket: str = "guias") -> str:
+        """URL publica que armazenar_pdf devolve para o conteudo (sem I/O)."""
+        return self.public_url(bucket, self.caminho_pdf(conteudo))
+
+    async def armazenar_pdf(self, conteudo: bytes, bucket: str = "guias") -> str:
+        """
+        Armazena o PDF enderecado pelo conteudo e retorna a URL publica.
+
+        O caminho e o SHA-256 dos bytes (pdf/ab/abcd....pdf), entao o mesmo
+        documento vira um unico objeto, nao importa quantas vezes seja enviado.
+        Repeticoes no processo saem do cache sem round-trip; entre processos um
+        HEAD evita reenviar os bytes. Envios concorrentes do mesmo PDF sao
+        coalescidos em um unico upload.
+
+        Returns:
+            URL publica, ou temp://<caminho> se o Storage estiver indisponivel
+            (falhas nao ficam em cache)
+        """
+        caminho = self.caminho_pdf(conteudo)
+
+        async def enviar_se_ausente() -> str:
+            if await self.arquivo_existe(bucket, caminho):
+                return self.public_url(bucket, caminho)
+            url = await self.upload_file(bucket, caminho, conteudo, "application/pdf")
+            if url.startswith("temp://"):
+                raise ArmazenamentoIndisponivel(url)
+            return url
+
+        try:
+            return await self._pdfs_armazenados.obter_ou_calcular(f"pdf:{bucket}/{caminho}", enviar_se_ausente)
+        except ArmazenamentoIndisponivel as exc:
+            return exc.url
+
+    def metricas_armazenamento(self) -> Dict[str, Any]:
+        """Hits do cache de existencia, idas ao Storage (HEAD + upload) e envios coalescidos de PDFs."""
+        metricas = self._pdfs_armazenados.get_stats()["namespaces"].get("pdf", {})
+        return {
+            "hits": metricas.get("hits", 0),
+            "consultas_storage": metricas.get("recalculos", 0),
+            "coalescidos": metricas.get("aguardando_recalculo", 0),
+        }
+
     async def obter_usuario_por_whatsapp(self, whatsapp: str) -> Optional[Dict[str, Any]]:
         """Obtem usuario pelo numero de WhatsApp."""
         if not self.client:
@@ -131,20 +584,60 @@ class SupabaseService:
             return {**data, "id": f"error-{data.get('whatsapp_phone', 'unknown')}"}
 
     async def salvar_guia(self, user_id: str, guia_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Salva guia no banco de dados."""
+        """
+        Salva guia no banco de dados e devolve a linha gravada (com id).
+
+        Raises:
+            RuntimeError: Supabase indisponivel ou insert sem a linha gravada
+            httpx.HTTPError: Erro de rede ou resposta não-2xx (409 se a
+                idempotency_key já existe, ver services/idempotencia.py)
+        """
         if not self.client:
-            print("[WARN] Supabase indisponivel - guia nao sera persistida")
-            return {**guia_data, "id": "mock-guia", "usuario_id": user_id}
+            raise RuntimeError("Supabase indisponivel - guia nao foi persistida")
 
-        try:
-            # Remove usuario_id se já existe (será adicionado abaixo)
-            data_clean = {k: v for k, v in guia_data.items() if k != "usuario_id"}
-            data = {**data_clean, "usuario_id": user_id}
-            return await self.create_record("guias_inss", data)
-        except Exception as exc:  # pragma: no cover
-            print(f"[ERROR] Erro ao salvar guia: {str(exc)[:60]}...")
-            return {**guia_data, "id": "error-guia", "usuario_id": user_id}
+        # Remove usuario_id se já existe (será adicionado abaixo)
+        data_clean = {k: v for k, v in guia_data.items() if k != "usuario_id"}
+        resposta = await self.client.post(
+            "/rest/v1/guias_inss",
+            json={**data_clean, "usuario_id": user_id},
+            headers={"Prefer": "return=representation"},
+        )
+        resposta.raise_for_status()
+        registros = resposta.json()
+        if not registros or not registros[0].get("id"):
+            raise RuntimeError("Insert em guias_inss não devolveu a guia gravada")
+        return registros[0]
+
+    async def registrar_conversa(self, usuario_id: str, mensagem: str, resposta: str) -> Dict[str, Any]:
+        """Registra a troca de mensagens do webhook do WhatsApp (tabela conversas)."""
+        return await self.create_record(
+            "conversas",
+            {"usuario_id": usuario_id, "mensagem": mensagem, "resposta": resposta},
+        )
 
     async def subir_pdf(self, bucket: str, caminho: str, conteudo: bytes) -> str:
         """Alias para upload_file - mantem compatibilidade retroativa."""
         return await self.upload_file(bucket, caminho, conteudo, content_type="application/pdf")
+
+
+# Instancia do processo: a do lifespan (definir_supabase_service) ou criada sob demanda
+_servico_processo: Optional[SupabaseService] = None
+
+
+def get_supabase_service() -> SupabaseService:
+    """
+    Retorna a instancia de SupabaseService do processo.
+
+    Na aplicacao e a criada no lifespan (app.state.servicos, ver app.dependencias);
+    fora dela (scripts, testes) e criada no primeiro acesso.
+    """
+    global _servico_processo
+    if _servico_processo is None:
+        _servico_processo = SupabaseService()
+    return _servico_processo
+
+
+def definir_supabase_service(servico: Optional[SupabaseService]) -> None:
+    """Define a instancia do processo (None volta a criar sob demanda)."""
+    global _servico_processo
+    _servico_processo = servico
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import asyncio
-import uuid
 from dataclasses import dataclass
 from typing import Optional
 
@@ -10,7 +9,7 @@ from twilio.rest import Client as TwilioClient
 
 from ..config import get_settings
 from ..utils.validators import validar_whatsapp
-from .supabase_service import SupabaseService
+from .supabase_service import SupabaseService, get_supabase_service
 
 
 @dataclass
@@ -26,7 +25,7 @@ class WhatsAppService:
     def __init__(self, supabase_service: Optional[SupabaseService] = None) -> None:
         try:
             settings = get_settings()
-            self.supabase_service = supabase_service or SupabaseService()
+            self.supabase_service = supabase_service or get_supabase_service()
             self.account_sid = settings.twilio_account_sid
             self.auth_token = settings.twilio_auth_token
             self.remetente = settings.twilio_whatsapp_number
@@ -35,7 +34,15 @@ class WhatsAppService:
 
             credenciais_placeholder = {"", None, "seu-sid", "seu-token", "your-sid", "your-token"}
             remetente_invalido = not self.remetente or not self.remetente.startswith("whatsapp:")
-            if (
+            if settings.backend_local:
+                from .backends_locais import REMETENTE_LOCAL, obter_backends_locais
+
+                self.account_sid = None
+                self.auth_token = None
+                self.remetente = self.remetente if not remetente_invalido else REMETENTE_LOCAL
+                self._twilio_client = obter_backends_locais().twilio  # type: ignore[assignment]
+                print("[OK] WhatsAppService com Twilio local (GPS_BACKEND_LOCAL)")
+            elif (
                 self.account_sid in credenciais_placeholder
                 or self.auth_token in credenciais_placeholder
                 or remetente_invalido
@@ -49,7 +56,7 @@ class WhatsAppService:
                 print("[OK] WhatsAppService inicializado (cliente lazy-loaded)")
         except Exception as exc:  # pragma: no cover
             print(f"[WARN] Problema ao inicializar WhatsAppService: {str(exc)[:60]}...")
-            self.supabase_service = supabase_service or SupabaseService()
+            self.supabase_service = supabase_service or get_supabase_service()
             self.account_sid = None
             self.auth_token = None
             self.remetente = None
@@ -69,9 +76,14 @@ class WhatsAppService:
         return self._twilio_client if self._twilio_client else None
 
     async def enviar_pdf_whatsapp(
-        self, numero: str, pdf_bytes: bytes, mensagem: str
+        self, numero: str, pdf_bytes: bytes, mensagem: str, pdf_url: Optional[str] = None
     ) -> WhatsAppMessageResult:
-        """Envia PDF via WhatsApp usando Twilio."""
+        """
+        Envia PDF via WhatsApp usando Twilio.
+
+        pdf_url: URL pública já obtida na emissão; sem ela (ou se temporária)
+        o PDF é armazenado pelo conteúdo, reaproveitando o objeto se já existir.
+        """
         if not validar_whatsapp(numero):
             raise ValueError("Numero de WhatsApp invalido")
 
@@ -79,13 +91,9 @@ class WhatsAppService:
             print("[WARN] WhatsApp client indisponivel - retornando mock")
             return WhatsAppMessageResult(sid="mock-sid", status="mock", media_url="mock-url")
 
-        arquivo_id = uuid.uuid4()
-        caminho_pdf = f"guias/{arquivo_id}.pdf"
-        media_url = await self.supabase_service.subir_pdf(
-            bucket=self.bucket_pdf,
-            caminho=caminho_pdf,
-            conteudo=pdf_bytes,
-        )
+        media_url = pdf_url
+        if not media_url or media_url.startswith("temp://"):
+            media_url = await self.supabase_service.armazenar_pdf(pdf_bytes, bucket=self.bucket_pdf)
 
         try:
             message = await asyncio.to_thread(
@@ -0,0 +1,261 @@
+"""
+Backends de cache compartilháveis entre workers.
+
+Com vários workers uvicorn, o cache em memória aquece N vezes e cada worker
+tem a sua cópia. GPS_CACHE_URL escolhe o backend:
+
+- memory:// (padrão): MemoryCacheBackend sobre o CacheService do processo
+- redis://host:6379/0: RedisCacheBackend (qualquer servidor que fale o
+  protocolo Redis), valores serializados em msgpack
+
+Chaves são prefixadas com GPS_CACHE_PREFIXO (padrão: "gps") para que vários
+ambientes possam dividir o mesmo Redis. O rate limiting (slowapi) usa o mesmo
+servidor quando GPS_CACHE_URL aponta para Redis (ver middleware/rate_limit.py).
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import os
+import threading
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .cache_service import CacheService, MetricasNamespace, _AUSENTE, _namespace, cache_service
+
+# Tipos ExtType do msgpack para valores que não são nativos
+_EXT_DECIMAL = 1
+_EXT_DATE = 2
+_EXT_DATETIME = 3
+
+
+def _msgpack_default(valor: Any) -> Any:
+    import msgpack
+
+    if isinstance(valor, Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(valor).encode())
+    if isinstance(valor, dt.datetime):
+        return msgpack.ExtType(_EXT_DATETIME, valor.isoformat().encode())
+    if isinstance(valor, dt.date):
+        return msgpack.ExtType(_EXT_DATE, valor.isoformat().encode())
+    if isinstance(valor, (set, frozenset, tuple)):
+        return list(valor)
+    raise TypeError(f"Tipo não serializável no cache: {type(valor).__name__}")
+
+
+def _msgpack_ext_hook(codigo: int, dados: bytes) -> Any:
+    import msgpack
+
+    texto = dados.decode()
+    if codigo == _EXT_DECIMAL:
+        return Decimal(texto)
+    if codigo == _EXT_DATETIME:
+        return dt.datetime.fromisoformat(texto)
+    if codigo == _EXT_DATE:
+        return dt.date.fromisoformat(texto)
+    return msgpack.ExtType(codigo, dados)
+
+
+def serializar(valor: Any) -> bytes:
+    """Serializa em msgpack (Decimal, date e datetime via ExtType)."""
+    import msgpack
+
+    return msgpack.packb(valor, use_bin_type=True, default=_msgpack_default)
+
+
+def desserializar(dados: bytes) -> Any:
+    import msgpack
+
+    return msgpack.unpackb(dados, raw=False, ext_hook=_msgpack_ext_hook, strict_map_key=False)
+
+
+class CacheBackend:
+    """
+    Interface assíncrona de cache com métricas por namespace e single-flight local.
+
+    Implementações definem _obter/_gravar/_remover; o restante é comum.
+    """
+
+    nome = "base"
+
+    def __init__(self) -> None:
+        self._metricas: Dict[str, MetricasNamespace] = {}
+        self._lock_metricas = threading.Lock()
+        self._em_voo: Dict[str, asyncio.Future] = {}
+
+    async def _obter(self, key: str) -> Any:
+        """Valor da chave ou _AUSENTE."""
+        raise NotImplementedError
+
+    async def _gravar(self, key: str, value: Any, ttl: int) -> None:
+        raise NotImplementedError
+
+    async def _remover(self, key: str) -> None:
+        raise NotImplementedError
+
+    def _metrica(self, key: str) -> MetricasNamespace:
+        namespace = _namespace(key)
+        with self._lock_metricas:
+            metrica = self._metricas.get(namespace)
+            if metrica is None:
+                metrica = self._metricas[namespace] = MetricasNamespace()
+            return metrica
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Valor armazenado ou None."""
+        valor = await self._obter(key)
+        return None if valor is _AUSENTE else valor
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        await self._gravar(key, value, 300 if ttl is None else ttl)
+        self._metrica(key).sets += 1
+
+    async def delete(self, key: str) -> None:
+        await self._remover(key)
+
+    async def obter_ou_calcular(
+        self,
+        key: str,
+        calcular: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None
+    ) -> Any:
+        """
+        Retorna o valor em cache ou calcula uma única vez por worker (single-flight).
+
+        Args:
+            key: Chave do cache (o namespace é o prefixo antes de ':')
+            calcular: Corrotina sem argumentos que produz o valor
+            ttl: Time to live em segundos
+        """
+        valor = await self._obter(key)
+        if valor is not _AUSENTE:
+            return valor
+
+        em_voo = self._em_voo.get(key)
+        if em_voo is not None:
+            self._metrica(key).aguardando_recalculo += 1
+            return await asyncio.shield(em_voo)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_voo[key] = futuro
+        try:
+            self._metrica(key).recalculos += 1
+            valor = await calcular()
+            await self.set(key, valor, ttl)
+            futuro.set_result(valor)
+            return valor
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as exc:
+            futuro.set_exception(exc)
+            futuro.exception()
+            raise
+        finally:
+            self._em_voo.pop(key, None)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        with self._lock_metricas:
+            namespaces = {nome: m.to_dict() for nome, m in self._metricas.items()}
+        return {"backend": self.nome, "namespaces": namespaces}
+
+    async def encerrar(self) -> None:
+        """Libera conexões (chamado no shutdown)."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Backend em processo sobre CacheService (LRU/TTL, métricas próprias)."""
+
+    nome = "memory"
+
+    def __init__(self, cache: Optional[CacheService] = None) -> None:
+        super().__init__()
+        self.cache = cache or cache_service
+
+    async def _obter(self, key: str) -> Any:
+        return self.cache._buscar(key)
+
+    async def _gravar(self, key: str, value: Any, ttl: int) -> None:
+        self.cache.set(key, value, ttl)
+
+    async def _remover(self, key: str) -> None:
+        self.cache.delete(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        # CacheService já conta sets por namespace
+        await self._gravar(key, value, 300 if ttl is None else ttl)
+
+    def _metrica(self, key: str) -> MetricasNamespace:
+        return self.cache._metrica(key)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.nome, **self.cache.get_stats()}
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend compartilhado via protocolo Redis (redis.asyncio), valores em msgpack.
+
+    Args:
+        url: URL redis:// ou rediss:// (ignorado se cliente for informado)
+        prefixo: Prefixo das chaves (namespacing entre ambientes)
+        cliente: Cliente redis.asyncio já criado (ex.: fakeredis nos testes)
+    """
+
+    nome = "redis"
+
+    def __init__(self, url: Optional[str] = None, prefixo: Optional[str] = None, cliente: Any = None) -> None:
+        super().__init__()
+        if cliente is None:
+            try:
+                import redis.asyncio as redis_asyncio
+            except ImportError as exc:  # pragma: no cover - depende do ambiente
+                raise RuntimeError("Pacote 'redis' não instalado (necessário para GPS_CACHE_URL=redis://)") from exc
+            cliente = redis_asyncio.from_url(url, decode_responses=False)
+        self.cliente = cliente
+        self.prefixo = prefixo if prefixo is not None else os.getenv("GPS_CACHE_PREFIXO", "gps")
+
+    def _chave(self, key: str) -> str:
+        return f"{self.prefixo}:{key}" if self.prefixo else key
+
+    async def _obter(self, key: str) -> Any:
+        dados = await self.cliente.get(self._chave(key))
+        metrica = self._metrica(key)
+        if dados is None:
+            metrica.misses += 1
+            return _AUSENTE
+        metrica.hits += 1
+        return desserializar(dados)
+
+    async def _gravar(self, key: str, value: Any, ttl: int) -> None:
+        await self.cliente.set(self._chave(key), serializar(value), ex=max(1, int(ttl)))
+
+    async def _remover(self, key: str) -> None:
+        await self.cliente.delete(self._chave(key))
+
+    async def get_stats(self) -> Dict[str, Any]:
+        stats = await super().get_stats()
+        stats["prefixo"] = self.prefixo
+        return stats
+
+    async def encerrar(self) -> None:
+        await self.cliente.aclose()
+
+
+def criar_cache_backend(url: Optional[str] = None) -> CacheBackend:
+    """
+    Cria o backend conforme a URL (padrão: GPS_CACHE_URL ou memory://).
+
+    Raises:
+        ValueError: Esquema de URL não suportado
+    """
+    url = url or os.getenv("GPS_CACHE_URL", "memory://")
+    if url.startswith("memory://"):
+        return MemoryCacheBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(url)
+    raise ValueError(f"GPS_CACHE_URL não suportada: {url}")
+
+
+# Instância global (memória por padrão; Redis quando GPS_CACHE_URL apontar para ele)
+cache_backend = criar_cache_backend()
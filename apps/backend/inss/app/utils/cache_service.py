@@ -1,51 +1,124 @@
 """
-Serviço de cache simples para estatísticas e dados frequentes.
-Usa cache em memória (pode migrar para Redis em produção).
+Serviço de cache em memória para estatísticas e dados frequentes.
+
+LRU limitado (max_entradas), TTL em relógio monotônico, limpeza periódica de
+entradas expiradas em background, contadores por namespace (prefixo da chave
+antes de ':') e single-flight: misses concorrentes da mesma chave disparam um
+único cálculo.
+
+Configuração (variáveis de ambiente):
+- GPS_CACHE_MAX_ENTRADAS: máximo de entradas (padrão: 1024)
+- GPS_CACHE_LIMPEZA_INTERVALO: segundos entre varreduras de expirados (padrão: 60)
 """
 from __future__ import annotations
 
+import asyncio
+import functools
+import heapq
+import os
+import threading
 import time
-from typing import Any, Optional, Dict
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+_AUSENTE = object()
+
+
+@dataclass
+class MetricasNamespace:
+    """Contadores de um namespace do cache."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    sets: int = 0
+    recalculos: int = 0
+    aguardando_recalculo: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        dados = asdict(self)
+        consultas = self.hits + self.misses
+        dados["hit_rate"] = round(self.hits / consultas, 4) if consultas else 0.0
+        return dados
+
+
+def _namespace(key: str) -> str:
+    return key.split(":", 1)[0]
 
 
 class CacheService:
     """
-    Serviço de cache em memória com TTL (Time To Live).
+    Cache LRU com TTL, thread-safe.
+
+    Uso:
+        cache_service.set("gps_estatisticas", resultado, ttl=300)
+        valor = cache_service.get("gps_estatisticas")
+        valor = await cache_service.obter_ou_calcular("gps_estatisticas", calcular, ttl=300)
     """
-    
-    def __init__(self):
-        """Inicializa o serviço de cache."""
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._default_ttl = 300  # 5 minutos padrão
-    
+
+    def __init__(self, max_entradas: Optional[int] = None, ttl_padrao: int = 300):
+        """
+        Args:
+            max_entradas: Limite de entradas antes de evictar a menos usada
+            ttl_padrao: TTL em segundos quando set() não informa
+        """
+        if max_entradas is None:
+            max_entradas = int(os.getenv("GPS_CACHE_MAX_ENTRADAS", "1024"))
+        self.max_entradas = max(1, max_entradas)
+        self._default_ttl = ttl_padrao
+
+        # chave -> (valor, expira_em monotônico)
+        self._cache: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # (expira_em, chave) para varredura sem percorrer o cache inteiro
+        self._expiracoes: List[Tuple[float, str]] = []
+        self._lock = threading.RLock()
+        self._metricas: Dict[str, MetricasNamespace] = {}
+        self._em_voo: Dict[str, asyncio.Future] = {}
+        self._tarefa_limpeza: Optional[asyncio.Task] = None
+
+    def _metrica(self, key: str) -> MetricasNamespace:
+        namespace = _namespace(key)
+        metrica = self._metricas.get(namespace)
+        if metrica is None:
+            metrica = self._metricas[namespace] = MetricasNamespace()
+        return metrica
+
+    def _buscar(self, key: str) -> Any:
+        """Valor da chave ou _AUSENTE (conta hit/miss e remove se expirado)."""
+        with self._lock:
+            entrada = self._cache.get(key)
+            metrica = self._metrica(key)
+            if entrada is None:
+                metrica.misses += 1
+                return _AUSENTE
+            valor, expira_em = entrada
+            if time.monotonic() >= expira_em:
+                del self._cache[key]
+                metrica.expirations += 1
+                metrica.misses += 1
+                return _AUSENTE
+            self._cache.move_to_end(key)
+            metrica.hits += 1
+            return valor
+
     def get(self, key: str) -> Optional[Any]:
         """
         Obtém valor do cache.
-        
+
         Args:
             key: Chave do cache
-        
+
         Returns:
             Valor armazenado ou None se expirado/não existe
         """
-        if key not in self._cache:
-            return None
-        
-        entry = self._cache[key]
-        expires_at = entry.get("expires_at")
-        
-        # Verificar se expirou
-        if expires_at and datetime.now() > expires_at:
-            del self._cache[key]
-            return None
-        
-        return entry.get("value")
-    
+        valor = self._buscar(key)
+        return None if valor is _AUSENTE else valor
+
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
         """
-        Armazena valor no cache.
-        
+        Armazena valor no cache (evicta a entrada menos usada se cheio).
+
         Args:
             key: Chave do cache
             value: Valor a armazenar
@@ -53,51 +126,179 @@ class CacheService:
         """
         if ttl is None:
             ttl = self._default_ttl
-        
-        expires_at = datetime.now() + timedelta(seconds=ttl)
-        
-        self._cache[key] = {
-            "value": value,
-            "expires_at": expires_at,
-            "created_at": datetime.now()
-        }
-    
+        expira_em = time.monotonic() + ttl
+
+        with self._lock:
+            self._cache[key] = (value, expira_em)
+            self._cache.move_to_end(key)
+            heapq.heappush(self._expiracoes, (expira_em, key))
+            self._metrica(key).sets += 1
+            while len(self._cache) > self.max_entradas:
+                chave_antiga, _ = self._cache.popitem(last=False)
+                self._metrica(chave_antiga).evictions += 1
+
     def delete(self, key: str):
         """
         Remove valor do cache.
-        
+
         Args:
             key: Chave do cache
         """
-        if key in self._cache:
-            del self._cache[key]
-    
+        with self._lock:
+            self._cache.pop(key, None)
+
     def clear(self):
-        """Limpa todo o cache."""
-        self._cache.clear()
-    
+        """Limpa todo o cache (métricas são mantidas)."""
+        with self._lock:
+            self._cache.clear()
+            self._expiracoes.clear()
+
+    def limpar_expirados(self) -> int:
+        """
+        Remove entradas expiradas. Custo proporcional às expiradas, não ao cache.
+
+        Returns:
+            Quantidade de entradas removidas
+        """
+        agora = time.monotonic()
+        removidas = 0
+        with self._lock:
+            while self._expiracoes and self._expiracoes[0][0] <= agora:
+                expira_em, key = heapq.heappop(self._expiracoes)
+                entrada = self._cache.get(key)
+                # Ignora registros antigos de chaves regravadas depois
+                if entrada is not None and entrada[1] == expira_em:
+                    del self._cache[key]
+                    self._metrica(key).expirations += 1
+                    removidas += 1
+            # Evita crescimento do heap com chaves regravadas com frequência
+            if len(self._expiracoes) > 4 * self.max_entradas:
+                self._expiracoes = [(expira_em, key) for key, (_, expira_em) in self._cache.items()]
+                heapq.heapify(self._expiracoes)
+        return removidas
+
+    async def _loop_limpeza(self, intervalo: float) -> None:
+        while True:
+            await asyncio.sleep(intervalo)
+            self.limpar_expirados()
+
+    def iniciar_limpeza(self, intervalo: Optional[float] = None) -> None:
+        """Inicia a varredura periódica de expirados no event loop atual (lifespan)."""
+        if self._tarefa_limpeza is not None and not self._tarefa_limpeza.done():
+            return
+        if intervalo is None:
+            intervalo = float(os.getenv("GPS_CACHE_LIMPEZA_INTERVALO", "60"))
+        self._tarefa_limpeza = asyncio.get_running_loop().create_task(self._loop_limpeza(intervalo))
+
+    async def parar_limpeza(self) -> None:
+        """Cancela a varredura periódica."""
+        if self._tarefa_limpeza is not None:
+            self._tarefa_limpeza.cancel()
+            try:
+                await self._tarefa_limpeza
+            except asyncio.CancelledError:
+                pass
+            self._tarefa_limpeza = None
+
+    async def obter_ou_calcular(
+        self,
+        key: str,
+        calcular: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None
+    ) -> Any:
+        """
+        Retorna o valor em cache ou calcula, com single-flight.
+
+        Misses concorrentes da mesma chave aguardam o primeiro cálculo em vez
+        de recalcular. Exceções são propagadas a todos e nada é armazenado.
+
+        Args:
+            key: Chave do cache
+            calcular: Corrotina sem argumentos que produz o valor
+            ttl: Time to live em segundos
+        """
+        valor = self._buscar(key)
+        if valor is not _AUSENTE:
+            return valor
+
+        em_voo = self._em_voo.get(key)
+        if em_voo is not None:
+            with self._lock:
+                self._metrica(key).aguardando_recalculo += 1
+            return await asyncio.shield(em_voo)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_voo[key] = futuro
+        try:
+            with self._lock:
+                self._metrica(key).recalculos += 1
+            valor = await calcular()
+            self.set(key, valor, ttl)
+            futuro.set_result(valor)
+            return valor
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as exc:
+            futuro.set_exception(exc)
+            # Marca a exceção como recuperada caso ninguém esteja aguardando
+            futuro.exception()
+            raise
+        finally:
+            self._em_voo.pop(key, None)
+
     def get_stats(self) -> Dict[str, Any]:
         """
-        Retorna estatísticas do cache.
-        
+        Retorna estatísticas do cache (sem percorrer as entradas).
+
         Returns:
-            Dicionário com estatísticas
+            Dicionário com estatísticas gerais e por namespace
         """
-        now = datetime.now()
-        total_entries = len(self._cache)
-        expired_entries = sum(
-            1 for entry in self._cache.values()
-            if entry.get("expires_at") and entry["expires_at"] < now
-        )
-        valid_entries = total_entries - expired_entries
-        
-        return {
-            "total_entries": total_entries,
-            "valid_entries": valid_entries,
-            "expired_entries": expired_entries
-        }
+        with self._lock:
+            return {
+                "total_entries": len(self._cache),
+                "max_entries": self.max_entradas,
+                "pending_expirations": len(self._expiracoes),
+                "namespaces": {nome: m.to_dict() for nome, m in self._metricas.items()}
+            }
+
+
+def cached(
+    ttl: Optional[int] = None,
+    key: Union[str, Callable[..., str], None] = None,
+    cache: Optional[CacheService] = None
+):
+    """
+    Decorator de cache para funções async, com single-flight.
+
+    Args:
+        ttl: Time to live em segundos
+        key: Chave fixa, template str.format com os argumentos nomeados/posicionais
+            ("sal:{0}") ou função (*args, **kwargs) -> str. Padrão: nome da função + argumentos
+        cache: CacheService ou CacheBackend (padrão: cache_backend global, ver GPS_CACHE_URL)
+
+    Exemplo:
+        @cached(ttl=300, key="gps_estatisticas")
+        async def calcular_estatisticas(): ...
+    """
+    def decorator(funcao: Callable[..., Awaitable[Any]]):
+        @functools.wraps(funcao)
+        async def wrapper(*args, **kwargs):
+            if callable(key):
+                chave = key(*args, **kwargs)
+            elif key is not None:
+                chave = key.format(*args, **kwargs)
+            else:
+                chave = f"{funcao.__qualname__}:{args!r}:{sorted(kwargs.items())!r}"
+            if cache is not None:
+                destino = cache
+            else:
+                from .cache_backend import cache_backend
+                destino = cache_backend
+            return await destino.obter_ou_calcular(chave, lambda: funcao(*args, **kwargs), ttl)
+        return wrapper
+    return decorator
 
 
 # Instância global do cache
 cache_service = CacheService()
-
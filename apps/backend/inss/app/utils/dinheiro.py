@@ -0,0 +1,220 @@
+"""
+Valores monetários em centavos inteiros.
+
+Centavos é o tipo usado por calculadora, validador SAL, código de barras e PDFs:
+a conversão de float/Decimal/str acontece uma vez na borda (Centavos.de_reais)
+e daí em diante soma, comparação e aplicação de alíquota são aritmética de
+inteiros, sem deriva de float nem idas e voltas por Decimal(str(...)).
+
+Arredondamento: meio centavo para cima (ROUND_HALF_UP, afastando do zero).
+Alíquotas são convertidas uma vez para fração exata (0.075 -> 3/40).
+
+Também oferece as versões NumPy (int64) usadas por INSSCalculator.calcular_lote.
+"""
+from __future__ import annotations
+
+import math
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache, total_ordering
+from typing import Tuple, Union
+
+import numpy as np
+
+ValorReais = Union["Centavos", int, float, Decimal, str]
+
+_CEM = Decimal(100)
+
+
+def dividir_meio_para_cima(numerador: int, denominador: int) -> int:
+    """numerador / denominador arredondado para o inteiro mais próximo (meio afasta do zero)."""
+    if numerador >= 0:
+        return (2 * numerador + denominador) // (2 * denominador)
+    return -((2 * -numerador + denominador) // (2 * denominador))
+
+
+@lru_cache(maxsize=256)
+def fracao_aliquota(aliquota: Union[float, Decimal, str]) -> Tuple[int, int]:
+    """
+    Alíquota como fração exata (numerador, denominador).
+
+    Floats são lidos pela representação decimal mais curta (0.075 -> 3/40),
+    que é o valor escrito nas tabelas.
+    """
+    if isinstance(aliquota, float):
+        aliquota = repr(aliquota)
+    return Decimal(aliquota).as_integer_ratio()
+
+
+def _centavos_de_decimal(valor: Decimal) -> int:
+    return int((valor * _CEM).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+@total_ordering
+class Centavos:
+    """
+    Valor monetário imutável em centavos inteiros.
+
+    Uso:
+        valor = Centavos.de_reais(1518.00).aplicar_aliquota(0.11)  # Centavos(16698)
+        valor.reais        # Decimal("166.98")
+        valor.formatar()   # "R$ 166,98"
+    """
+
+    __slots__ = ("centavos",)
+
+    def __init__(self, centavos: int = 0) -> None:
+        object.__setattr__(self, "centavos", int(centavos))
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("Centavos é imutável")
+
+    @classmethod
+    def de_reais(cls, valor: ValorReais) -> "Centavos":
+        """
+        Converte um valor em reais (float, Decimal, int ou str) para centavos.
+
+        Floats com até duas casas (o caso normal) saem por um caminho rápido;
+        os demais são lidos pela representação decimal e arredondados meio
+        para cima.
+
+        Raises:
+            ValueError: Valor não numérico ou não finito
+        """
+        if isinstance(valor, Centavos):
+            return valor
+        if isinstance(valor, float):
+            if not math.isfinite(valor):
+                raise ValueError(f"Valor monetário inválido: {valor!r}")
+            escalado = valor * 100
+            inteiro = round(escalado)
+            if abs(escalado - inteiro) < 1e-6:
+                return cls(inteiro)
+            return cls(_centavos_de_decimal(Decimal(repr(valor))))
+        if isinstance(valor, int):
+            return cls(valor * 100)
+        try:
+            decimal = valor if isinstance(valor, Decimal) else Decimal(str(valor).strip())
+        except ArithmeticError as exc:
+            raise ValueError(f"Valor monetário inválido: {valor!r}") from exc
+        if not decimal.is_finite():
+            raise ValueError(f"Valor monetário inválido: {valor!r}")
+        return cls(_centavos_de_decimal(decimal))
+
+    @property
+    def reais(self) -> Decimal:
+        """Valor em reais com duas casas (Decimal exato)."""
+        return Decimal(self.centavos).scaleb(-2)
+
+    def como_float(self) -> float:
+        """Valor em reais como float (para respostas JSON e campos legados)."""
+        return self.centavos / 100
+
+    def aplicar_aliquota(self, aliquota: Union[float, Decimal, str]) -> "Centavos":
+        """Valor * alíquota, exato e arredondado ao centavo (meio para cima)."""
+        numerador, denominador = fracao_aliquota(aliquota)
+        return Centavos(dividir_meio_para_cima(self.centavos * numerador, denominador))
+
+    def aplicar_fator(self, fator: float) -> "Centavos":
+        """Valor * fator real (ex.: juros compostos), arredondado ao centavo."""
+        produto = self.centavos * fator
+        return Centavos(math.floor(produto + 0.5) if produto >= 0 else -math.floor(-produto + 0.5))
+
+    def formatar(self) -> str:
+        return formatar_centavos(self.centavos)
+
+    def __add__(self, outro: "Centavos") -> "Centavos":
+        if not isinstance(outro, Centavos):
+            return NotImplemented
+        return Centavos(self.centavos + outro.centavos)
+
+    def __radd__(self, outro):
+        # Permite sum() começando em 0
+        if outro == 0 and not isinstance(outro, Centavos):
+            return self
+        return NotImplemented
+
+    def __sub__(self, outro: "Centavos") -> "Centavos":
+        if not isinstance(outro, Centavos):
+            return NotImplemented
+        return Centavos(self.centavos - outro.centavos)
+
+    def __mul__(self, quantidade: int) -> "Centavos":
+        if isinstance(quantidade, bool) or not isinstance(quantidade, int):
+            return NotImplemented
+        return Centavos(self.centavos * quantidade)
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> "Centavos":
+        return Centavos(-self.centavos)
+
+    def __eq__(self, outro) -> bool:
+        if not isinstance(outro, Centavos):
+            return NotImplemented
+        return self.centavos == outro.centavos
+
+    def __lt__(self, outro: "Centavos") -> bool:
+        if not isinstance(outro, Centavos):
+            return NotImplemented
+        return self.centavos < outro.centavos
+
+    def __hash__(self) -> int:
+        return hash(self.centavos)
+
+    def __bool__(self) -> bool:
+        return self.centavos != 0
+
+    def __int__(self) -> int:
+        return self.centavos
+
+    def __repr__(self) -> str:
+        return f"Centavos({self.centavos})"
+
+    def __str__(self) -> str:
+        return self.formatar()
+
+    def __reduce__(self):
+        return (Centavos, (self.centavos,))
+
+
+def formatar_centavos(centavos: int) -> str:
+    """Centavos inteiros no padrão brasileiro: 123456 -> 'R$ 1.234,56'."""
+    reais, resto = divmod(abs(centavos), 100)
+    sinal = "-" if centavos < 0 else ""
+    return f"R$ {sinal}{reais:,}".replace(",", ".") + f",{resto:02d}"
+
+
+def formatar_moeda(valor: ValorReais) -> str:
+    """Formata valor em reais (ou Centavos) no padrão brasileiro: 'R$ 1.234,56'."""
+    return formatar_centavos(Centavos.de_reais(valor).centavos)
+
+
+# ============================================================
+# LOTE (NumPy int64)
+# ============================================================
+
+def centavos_de_reais_lote(valores) -> np.ndarray:
+    """Array de reais (float) -> array int64 de centavos, mesmo resultado de Centavos.de_reais."""
+    reais = np.asarray(valores, dtype=np.float64)
+    if not np.isfinite(reais).all():
+        raise ValueError("Valores monetários devem ser finitos")
+    escalado = reais * 100
+    resultado = np.rint(escalado).astype(np.int64)
+    # Valores com mais de duas casas: mesmo caminho decimal do escalar
+    for i in np.flatnonzero(np.abs(escalado - resultado) >= 1e-6):
+        resultado[i] = Centavos.de_reais(float(reais[i])).centavos
+    return resultado
+
+
+def aplicar_aliquota_lote(centavos: np.ndarray, aliquota: Union[float, Decimal, str]) -> np.ndarray:
+    """Versão vetorizada de Centavos.aplicar_aliquota."""
+    numerador, denominador = fracao_aliquota(aliquota)
+    modulo = (2 * np.abs(centavos) * numerador + denominador) // (2 * denominador)
+    return np.where(centavos < 0, -modulo, modulo)
+
+
+def aplicar_fator_lote(centavos: np.ndarray, fatores: np.ndarray) -> np.ndarray:
+    """Versão vetorizada de Centavos.aplicar_fator."""
+    produto = centavos * fatores
+    modulo = np.floor(np.abs(produto) + 0.5).astype(np.int64)
+    return np.where(produto < 0, -modulo, modulo)
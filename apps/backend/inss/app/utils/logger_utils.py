@@ -1,136 +1,214 @@
 """
 Utilitários para logging estruturado e mascaramento de dados sensíveis.
+
+O logging da aplicação passa por uma fila (QueueHandler/QueueListener): o
+event loop só enfileira o registro e uma thread dedicada formata e escreve em
+stdout e no arquivo. Configuração (variáveis de ambiente):
+
+- GPS_LOG_LEVEL: nível do logger raiz (padrão: INFO)
+- GPS_LOG_ARQUIVO: arquivo de log (padrão: app_debug.log; vazio desliga)
+- GPS_LOG_JSON: StructuredLogger emite JSON (padrão: false)
 """
 from __future__ import annotations
 
+import atexit
 import json
 import logging
 import os
-from typing import Any, Dict, Optional
+import queue
+import re
+import sys
 from datetime import datetime
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+FORMATO_LOG = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Campos cujo valor é mascarado (busca por substring no nome, sem diferenciar maiúsculas)
+_CAMPO_SENSIVEL = re.compile(
+    r"cpf|nit|pis|document|password|token|api_key|x-api-key|secret|authorization|senha|cookie",
+    re.IGNORECASE,
+)
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+@lru_cache(maxsize=1024)
+def _campo_sensivel(chave: str) -> bool:
+    return _CAMPO_SENSIVEL.search(chave) is not None
+
+
+def _mascarar_valor(valor: Any) -> str:
+    if isinstance(valor, str) and len(valor) > 5:
+        # Manter primeiros 3 e últimos 2 caracteres
+        return f"{valor[:3]}***{valor[-2:]}"
+    return "***"
+
+
+def mascarar_dados(dados: Any) -> Any:
+    """
+    Mascara dados sensíveis (campos sensíveis e strings de 11 dígitos).
+
+    Dicts e listas são percorridos recursivamente; outros valores passam intactos.
+    """
+    if isinstance(dados, dict):
+        return {
+            chave: _mascarar_valor(valor) if _campo_sensivel(str(chave)) else mascarar_dados(valor)
+            for chave, valor in dados.items()
+        }
+    if isinstance(dados, (list, tuple)):
+        return [mascarar_dados(item) for item in dados]
+    if isinstance(dados, str) and len(dados) == 11 and dados.isdigit():
+        # Parece CPF/NIT/PIS
+        return f"{dados[:3]}***{dados[-2:]}"
+    return dados
+
+
+def configurar_logging(nivel: Optional[str] = None, arquivo: Optional[str] = None) -> QueueListener:
+    """
+    Configura o logger raiz com escrita fora do event loop.
+
+    O raiz recebe um QueueHandler; o QueueListener (thread própria) escreve
+    em stdout e, se configurado, no arquivo. Chamadas repetidas só ajustam o
+    nível e reaproveitam o listener em execução.
+
+    Args:
+        nivel: Nível do raiz (padrão: GPS_LOG_LEVEL ou INFO)
+        arquivo: Arquivo de log (padrão: GPS_LOG_ARQUIVO ou app_debug.log; "" desliga)
+
+    Returns:
+        QueueListener em execução
+    """
+    global _listener, _queue_handler
+
+    nivel = (nivel or os.getenv("GPS_LOG_LEVEL", "INFO")).upper()
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    if _listener is not None:
+        return _listener
+
+    if arquivo is None:
+        arquivo = os.getenv("GPS_LOG_ARQUIVO", "app_debug.log")
+    formatador = logging.Formatter(FORMATO_LOG)
+    destinos = [logging.StreamHandler(sys.stdout)]
+    if arquivo:
+        destinos.append(logging.FileHandler(arquivo, encoding="utf-8"))
+    for destino in destinos:
+        destino.setFormatter(formatador)
+
+    fila: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _queue_handler = QueueHandler(fila)
+    raiz.addHandler(_queue_handler)
+
+    _listener = QueueListener(fila, *destinos, respect_handler_level=True)
+    _listener.start()
+    atexit.register(parar_logging)
+    return _listener
+
+
+def parar_logging() -> None:
+    """Escreve o que está na fila e para o listener (idempotente)."""
+    global _listener, _queue_handler
+
+    if _listener is None:
+        return
+    _listener.stop()
+    for destino in _listener.handlers:
+        destino.close()
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
 
 
 class StructuredLogger:
     """
     Logger estruturado que gera logs em formato JSON.
+
+    O nível é verificado antes de montar, mascarar ou serializar o registro:
+    chamadas desabilitadas (ex.: debug em produção) não custam nada além disso.
     """
-    
+
     def __init__(self, name: str):
         """
         Inicializa logger estruturado.
-        
+
         Args:
             name: Nome do logger
         """
         self.logger = logging.getLogger(name)
         self.use_json = os.getenv("GPS_LOG_JSON", "false").lower() == "true"
-    
+
     def _mask_sensitive_data(self, data: Any) -> Any:
         """
         Mascara dados sensíveis em logs.
-        
+
         Args:
             data: Dados a serem mascarados
-        
+
         Returns:
             Dados com informações sensíveis mascaradas
         """
-        if isinstance(data, dict):
-            masked = {}
-            for key, value in data.items():
-                # Mascarar campos sensíveis
-                if any(sensitive in key.lower() for sensitive in [
-                    'cpf', 'nit', 'pis', 'document', 'password', 'token', 
-                    'api_key', 'secret', 'authorization', 'senha'
-                ]):
-                    if isinstance(value, str) and len(value) > 0:
-                        # Manter primeiros 3 e últimos 2 caracteres
-                        if len(value) > 5:
-                            masked[key] = f"{value[:3]}***{value[-2:]}"
-                        else:
-                            masked[key] = "***"
-                    else:
-                        masked[key] = "***"
-                else:
-                    masked[key] = self._mask_sensitive_data(value)
-            return masked
-        elif isinstance(data, list):
-            return [self._mask_sensitive_data(item) for item in data]
-        elif isinstance(data, str):
-            # Verificar se parece ser um CPF/NIT/PIS (11 dígitos)
-            if data.isdigit() and len(data) == 11:
-                return f"{data[:3]}***{data[-2:]}"
-            return data
-        else:
-            return data
-    
+        return mascarar_dados(data)
+
     def _format_log(self, level: str, message: str, **kwargs) -> str:
         """
         Formata log como JSON ou texto simples.
-        
+
         Args:
             level: Nível do log (INFO, WARNING, ERROR, etc.)
             message: Mensagem do log
             **kwargs: Campos adicionais
-        
+
         Returns:
             String formatada (JSON ou texto)
         """
-        log_data = {
-            "timestamp": datetime.now().isoformat(),
-            "level": level,
-            "message": message,
-            **kwargs
-        }
-        
-        # Mascarar dados sensíveis
-        log_data = self._mask_sensitive_data(log_data)
-        
+        campos: Dict[str, Any] = self._mask_sensitive_data({"message": message, **kwargs})
+
         if self.use_json:
-            return json.dumps(log_data, ensure_ascii=False)
-        else:
-            # Formato legível para desenvolvimento
-            parts = [f"[{level}] {message}"]
-            for key, value in kwargs.items():
-                if key != "message":
-                    parts.append(f"{key}={value}")
-            return " | ".join(parts)
-    
+            log_data = {"timestamp": datetime.now().isoformat(), "level": level, **campos}
+            return json.dumps(log_data, ensure_ascii=False, default=str)
+
+        # Formato legível para desenvolvimento
+        parts = [f"[{level}] {campos.pop('message')}"]
+        parts.extend(f"{key}={value}" for key, value in campos.items())
+        return " | ".join(parts)
+
+    def _log(self, nivel: int, nome_nivel: str, message: str, kwargs: Dict[str, Any]) -> None:
+        if self.logger.isEnabledFor(nivel):
+            self.logger.log(nivel, self._format_log(nome_nivel, message, **kwargs))
+
     def info(self, message: str, **kwargs):
         """Log de informação."""
-        formatted = self._format_log("INFO", message, **kwargs)
-        self.logger.info(formatted)
-    
+        self._log(logging.INFO, "INFO", message, kwargs)
+
     def warning(self, message: str, **kwargs):
         """Log de aviso."""
-        formatted = self._format_log("WARNING", message, **kwargs)
-        self.logger.warning(formatted)
-    
+        self._log(logging.WARNING, "WARNING", message, kwargs)
+
     def error(self, message: str, **kwargs):
         """Log de erro."""
-        formatted = self._format_log("ERROR", message, **kwargs)
-        self.logger.error(formatted)
-    
+        self._log(logging.ERROR, "ERROR", message, kwargs)
+
     def debug(self, message: str, **kwargs):
         """Log de debug."""
-        formatted = self._format_log("DEBUG", message, **kwargs)
-        self.logger.debug(formatted)
-    
+        self._log(logging.DEBUG, "DEBUG", message, kwargs)
+
     def critical(self, message: str, **kwargs):
         """Log crítico."""
-        formatted = self._format_log("CRITICAL", message, **kwargs)
-        self.logger.critical(formatted)
+        self._log(logging.CRITICAL, "CRITICAL", message, kwargs)
 
 
 def get_logger(name: str) -> StructuredLogger:
     """
     Obtém instância de logger estruturado.
-    
+
     Args:
         name: Nome do logger
-    
+
     Returns:
         Instância de StructuredLogger
     """
     return StructuredLogger(name)
-
@@ -0,0 +1,244 @@
+"""
+Métricas da aplicação no formato texto do Prometheus (exposto em /metrics).
+
+Contadores, gauges e histogramas com rótulos, thread-safe e sem dependências
+externas. As etapas da emissão são medidas com um cronômetro leve:
+
+    with cronometro_etapa("pdf"):
+        pdf_bytes = await pool.renderizar(dados)
+
+    url = await medir_etapa("armazenamento", supabase.armazenar_pdf(pdf_bytes))
+    guia = await medir_etapa("persistencia", supabase.salvar_guia(...))
+
+Etapas usadas: perfil, regras_sal, validacao, calculo, emissao, codigo_barras,
+pdf, armazenamento, persistencia, sal e whatsapp.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Limites (segundos) cobrindo de chamadas em memória até a automação do SAL
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_numero(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    partes = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class _Metrica:
+    """Base: nome, ajuda, rótulos e valores por combinação de rótulos."""
+
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> None:
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+
+    def _chave(self, valores: Dict[str, str]) -> Tuple[str, ...]:
+        if set(valores) != set(self.rotulos):
+            raise ValueError(f"{self.nome}: rótulos esperados {self.rotulos}, recebidos {tuple(valores)}")
+        return tuple(str(valores[nome]) for nome in self.rotulos)
+
+    def _amostras(self) -> List[str]:
+        raise NotImplementedError
+
+    def exportar(self) -> str:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        linhas.extend(self._amostras())
+        return "\n".join(linhas)
+
+
+class Contador(_Metrica):
+    """Valor que só cresce (ex.: emissões por método)."""
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> None:
+        super().__init__(nome, ajuda, rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def incrementar(self, valor: float = 1.0, **rotulos: str) -> None:
+        if valor < 0:
+            raise ValueError("Contador só pode ser incrementado")
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def valor(self, **rotulos: str) -> float:
+        with self._lock:
+            return self._valores.get(self._chave(rotulos), 0.0)
+
+    def _amostras(self) -> List[str]:
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [
+            f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}"
+            for chave, valor in itens
+        ]
+
+
+class Gauge(Contador):
+    """Valor instantâneo (ex.: profundidade de fila), definido a cada coleta."""
+
+    tipo = "gauge"
+
+    def definir(self, valor: float, **rotulos: str) -> None:
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = float(valor)
+
+
+class Histograma(_Metrica):
+    """Distribuição de durações (segundos) em buckets cumulativos."""
+
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nome: str,
+        ajuda: str,
+        rotulos: Sequence[str] = (),
+        buckets: Sequence[float] = BUCKETS_PADRAO,
+    ) -> None:
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+        # chave -> [contagem por bucket..., soma, contagem total]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observar(self, valor: float, **rotulos: str) -> None:
+        chave = self._chave(rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [0.0] * (len(self.buckets) + 2)
+            for indice, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[indice] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def contagem(self, **rotulos: str) -> int:
+        with self._lock:
+            serie = self._series.get(self._chave(rotulos))
+            return int(serie[-1]) if serie else 0
+
+    def _amostras(self) -> List[str]:
+        with self._lock:
+            itens = sorted((chave, list(serie)) for chave, serie in self._series.items())
+        linhas = []
+        for chave, serie in itens:
+            acumulado = 0.0
+            for limite, quantidade in zip(self.buckets, serie):
+                acumulado += quantidade
+                rotulos = _formatar_rotulos(self.rotulos, chave, f'le="{_formatar_numero(limite)}"')
+                linhas.append(f"{self.nome}_bucket{rotulos} {_formatar_numero(acumulado)}")
+            rotulos_inf = _formatar_rotulos(self.rotulos, chave, 'le="+Inf"')
+            linhas.append(f"{self.nome}_bucket{rotulos_inf} {_formatar_numero(serie[-1])}")
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_numero(serie[-2])}")
+            linhas.append(f"{self.nome}_count{rotulos} {_formatar_numero(serie[-1])}")
+        return linhas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas exportadas juntas (nomes únicos)."""
+
+    def __init__(self) -> None:
+        self._metricas: Dict[str, _Metrica] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, classe: type, nome: str, ajuda: str, rotulos: Sequence[str], **extras) -> _Metrica:
+        with self._lock:
+            existente = self._metricas.get(nome)
+            if existente is not None:
+                if type(existente) is not classe or existente.rotulos != tuple(rotulos):
+                    raise ValueError(f"Métrica {nome} já registrada com outro tipo/rótulos")
+                return existente
+            metrica = self._metricas[nome] = classe(nome, ajuda, rotulos, **extras)
+            return metrica
+
+    def contador(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador, nome, ajuda, rotulos)
+
+    def gauge(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Gauge:
+        return self._registrar(Gauge, nome, ajuda, rotulos)
+
+    def histograma(
+        self,
+        nome: str,
+        ajuda: str,
+        rotulos: Sequence[str] = (),
+        buckets: Sequence[float] = BUCKETS_PADRAO,
+    ) -> Histograma:
+        return self._registrar(Histograma, nome, ajuda, rotulos, buckets=buckets)
+
+    def exportar(self) -> str:
+        """Todas as métricas no formato texto do Prometheus (0.0.4)."""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return "\n".join(metrica.exportar() for metrica in metricas) + "\n"
+
+
+# Instância global (exportada em /metrics)
+registro_metricas = RegistroMetricas()
+
+latencia_requisicoes = registro_metricas.histograma(
+    "gps_http_requisicao_segundos", "Latência das requisições HTTP por rota", ("metodo", "rota", "status")
+)
+duracao_etapas = registro_metricas.histograma(
+    "gps_emissao_etapa_segundos", "Duração das etapas da emissão de GPS", ("etapa",)
+)
+emissoes_por_metodo = registro_metricas.contador(
+    "gps_emissoes_total", "Emissões de GPS por método e resultado", ("metodo", "resultado")
+)
+profundidade_filas = registro_metricas.gauge(
+    "gps_fila_profundidade", "Itens aguardando em filas e pools", ("fila",)
+)
+tarefas_em_execucao = registro_metricas.gauge(
+    "gps_tarefas_em_execucao", "Tarefas em execução em segundo plano", ("componente",)
+)
+taxa_acerto_cache = registro_metricas.gauge(
+    "gps_cache_hit_ratio", "Taxa de acerto dos caches (0 a 1)", ("cache", "namespace")
+)
+
+
+@contextmanager
+def cronometro_etapa(etapa: str, histograma: Optional[Histograma] = None) -> Iterator[None]:
+    """Mede o bloco como etapa da emissão (registra também se ele levantar exceção)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histograma or duracao_etapas).observar(time.perf_counter() - inicio, etapa=etapa)
+
+
+async def medir_etapa(etapa: str, aguardavel: Awaitable[T]) -> T:
+    """Aguarda a corrotina medindo a etapa (útil dentro de asyncio.gather)."""
+    with cronometro_etapa(etapa):
+        return await aguardavel
@@ -0,0 +1,230 @@
+"""
+Profiling sob demanda de um worker em produção (endpoints administrativos).
+
+- CPU: amostrador de pilhas em Python puro. Uma thread lê sys._current_frames()
+  a cada intervalo durante N segundos e devolve as pilhas no formato
+  "collapsed" (uma linha "frame;frame;frame contagem"), aceito pelo
+  flamegraph.pl, speedscope e inferno.
+- Memória: @perfil_memoria("nome") marca funções quentes (renderização do PDF,
+  emissão no SAL). Com uma janela de captura ativa, cada chamada registra o
+  pico e as linhas que mais alocaram (tracemalloc). Em funções async, as
+  alocações de tarefas concorrentes entram na mesma captura.
+
+Desligado por padrão (GPS_PROFILING=false): o decorador devolve a própria
+função, sem wrapper, e nenhuma thread é criada; o custo em produção é zero.
+Com GPS_PROFILING=true e sem janela ativa, o custo é uma verificação de flag.
+Mesmo habilitados, os endpoints exigem JWT com o papel GPS_PROFILING_PAPEL
+(padrão "admin") ou o token próprio GPS_PROFILING_TOKEN (header X-Profiling-Token);
+a API key comum dos endpoints GPS não basta.
+
+Renderizações feitas nos processos do PDFRenderPool rodam fora deste processo:
+capturas de memória do PDF aparecem com GPS_PDF_WORKERS=0 ou chamadas diretas.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+PROFILING_HABILITADO = os.getenv("GPS_PROFILING", "false").lower() == "true"
+TOKEN_PROFILING = os.getenv("GPS_PROFILING_TOKEN") or None
+PAPEL_ADMIN = os.getenv("GPS_PROFILING_PAPEL", "admin")
+
+MAX_SEGUNDOS = 60.0
+MAX_CAPTURAS_MEMORIA = 50
+
+
+class ProfilingEmAndamento(RuntimeError):
+    """Já existe uma amostragem de CPU em execução neste worker."""
+
+
+def token_profiling_valido(token: Optional[str]) -> bool:
+    """Compara (timing-safe) com GPS_PROFILING_TOKEN; sem token configurado, nada passa."""
+    if not TOKEN_PROFILING or not token:
+        return False
+    return hmac.compare_digest(token, TOKEN_PROFILING)
+
+
+def _rotulo_frame(frame) -> str:
+    codigo = frame.f_code
+    arquivo = os.path.basename(codigo.co_filename)
+    return f"{codigo.co_name} ({arquivo}:{codigo.co_firstlineno})".replace(";", ":")
+
+
+def _pilha(frame) -> List[str]:
+    rotulos = []
+    while frame is not None:
+        rotulos.append(_rotulo_frame(frame))
+        frame = frame.f_back
+    rotulos.reverse()
+    return rotulos
+
+
+class AmostradorPilhas:
+    """
+    Amostrador de pilhas de CPU (uma execução por vez).
+
+    Uso:
+        pilhas = amostrador_pilhas.amostrar(segundos=10, intervalo=0.005)
+        texto = AmostradorPilhas.collapsed(pilhas)
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def amostrar(
+        self,
+        segundos: float,
+        intervalo: float = 0.005,
+        threads: Optional[Iterable[int]] = None,
+    ) -> Counter:
+        """
+        Amostra as pilhas das threads (bloqueante: rodar fora do event loop).
+
+        Args:
+            segundos: Duração da amostragem (máximo MAX_SEGUNDOS)
+            intervalo: Segundos entre amostras
+            threads: Idents das threads amostradas (padrão: todas, exceto a própria)
+
+        Returns:
+            Counter {pilha collapsed: amostras}
+
+        Raises:
+            ProfilingEmAndamento: Se outra amostragem estiver em execução
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilingEmAndamento("Amostragem de CPU já em andamento neste worker")
+        try:
+            propria = threading.get_ident()
+            alvo = set(threads) if threads is not None else None
+            nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+            pilhas: Counter = Counter()
+            fim = time.perf_counter() + min(max(segundos, 0.0), MAX_SEGUNDOS)
+            while time.perf_counter() < fim:
+                for ident, frame in sys._current_frames().items():
+                    if ident == propria or (alvo is not None and ident not in alvo):
+                        continue
+                    raiz = nomes.get(ident, f"thread-{ident}")
+                    pilhas[";".join([raiz, *_pilha(frame)])] += 1
+                time.sleep(intervalo)
+            return pilhas
+        finally:
+            self._lock.release()
+
+    async def amostrar_async(self, segundos: float, intervalo: float = 0.005, apenas_event_loop: bool = True) -> Counter:
+        """Amostra a partir do event loop sem bloqueá-lo (por padrão, só a thread do loop)."""
+        threads = [threading.get_ident()] if apenas_event_loop else None
+        return await asyncio.to_thread(self.amostrar, segundos, intervalo, threads)
+
+    @staticmethod
+    def collapsed(pilhas: Counter) -> str:
+        """Formato collapsed: uma pilha por linha, da mais amostrada para a menos."""
+        return "".join(f"{pilha} {quantidade}\n" for pilha, quantidade in pilhas.most_common())
+
+
+class CapturaMemoria:
+    """Janela de captura de memória (tracemalloc) para funções marcadas."""
+
+    def __init__(self, max_capturas: int = MAX_CAPTURAS_MEMORIA) -> None:
+        self.ativa = False
+        self._ate = 0.0
+        self._lock = threading.Lock()
+        self.capturas: Deque[Dict[str, Any]] = deque(maxlen=max_capturas)
+
+    def ativar(self, segundos: float, quadros: int = 10) -> None:
+        """Liga o tracemalloc e as capturas pelos próximos segundos."""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(quadros)
+            self._ate = time.monotonic() + min(max(segundos, 0.0), MAX_SEGUNDOS)
+            self.ativa = True
+
+    def desativar(self) -> None:
+        with self._lock:
+            self.ativa = False
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def esta_ativa(self) -> bool:
+        """Janela aberta (desliga o tracemalloc se ela já expirou)."""
+        return self.ativa and not self._expirada()
+
+    def _expirada(self) -> bool:
+        if time.monotonic() < self._ate:
+            return False
+        self.desativar()
+        return True
+
+    def _antes(self):
+        if self._expirada():
+            return None
+        tracemalloc.reset_peak()
+        return tracemalloc.take_snapshot(), time.perf_counter()
+
+    def _depois(self, nome: str, inicio, limite: int = 10) -> None:
+        if inicio is None or not tracemalloc.is_tracing():
+            return
+        snapshot_antes, t0 = inicio
+        atual, pico = tracemalloc.get_traced_memory()
+        diferencas = tracemalloc.take_snapshot().compare_to(snapshot_antes, "lineno")
+        self.capturas.append({
+            "funcao": nome,
+            "duracao_ms": round((time.perf_counter() - t0) * 1000, 2),
+            "memoria_atual_kb": round(atual / 1024, 1),
+            "pico_kb": round(pico / 1024, 1),
+            "maiores_alocacoes": [
+                {"linha": str(estatistica.traceback[0]), "kb": round(estatistica.size_diff / 1024, 1),
+                 "blocos": estatistica.count_diff}
+                for estatistica in diferencas[:limite]
+            ],
+        })
+
+
+# Instâncias globais (endpoints administrativos em /api/v1/gps/profiling)
+amostrador_pilhas = AmostradorPilhas()
+captura_memoria = CapturaMemoria()
+
+
+def perfil_memoria(nome: str) -> Callable[[F], F]:
+    """
+    Marca uma função (sync ou async) para captura de memória sob demanda.
+
+    Com GPS_PROFILING desligado devolve a própria função (custo zero).
+    """
+    def decorator(funcao: F) -> F:
+        if not PROFILING_HABILITADO:
+            return funcao
+
+        if asyncio.iscoroutinefunction(funcao):
+            @functools.wraps(funcao)
+            async def wrapper_async(*args, **kwargs):
+                if not captura_memoria.ativa:
+                    return await funcao(*args, **kwargs)
+                inicio = captura_memoria._antes()
+                try:
+                    return await funcao(*args, **kwargs)
+                finally:
+                    captura_memoria._depois(nome, inicio)
+            return wrapper_async  # type: ignore[return-value]
+
+        @functools.wraps(funcao)
+        def wrapper(*args, **kwargs):
+            if not captura_memoria.ativa:
+                return funcao(*args, **kwargs)
+            inicio = captura_memoria._antes()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                captura_memoria._depois(nome, inicio)
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,72 @@
+"""
+Medição de etapas de uma requisição exposta no header Server-Timing.
+
+Uso:
+    tempos = ServerTiming()
+    with tempos.etapa("calculo"):
+        ...
+    usuario, indice = await asyncio.gather(
+        tempos.medir("perfil", buscar_usuario()),
+        tempos.medir("regras_sal", registro_sal.garantir_carregado()),
+    )
+    response.headers["Server-Timing"] = tempos.cabecalho()
+
+Etapas concorrentes são medidas separadamente (a soma pode passar do total).
+O navegador mostra o header na aba Network; os load tests leem dele a
+latência de cada etapa. Com um histograma (ex.: metricas.duracao_etapas),
+cada etapa também é observada nele e aparece em /metrics.
+"""
+from __future__ import annotations
+
+import re
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Awaitable, Dict, Iterator, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from .metricas import Histograma
+
+T = TypeVar("T")
+
+_NOME_INVALIDO = re.compile(r"[^A-Za-z0-9_\-]")
+
+
+class ServerTiming:
+    """Acumula a duração (ms) de cada etapa na ordem em que terminaram."""
+
+    def __init__(self, histograma: Optional[Histograma] = None) -> None:
+        self._inicio = time.perf_counter()
+        self._histograma = histograma
+        self.etapas: Dict[str, float] = {}
+
+    def registrar(self, nome: str, duracao_ms: float) -> None:
+        """Soma a duração à etapa (etapas repetidas acumulam)."""
+        self.etapas[nome] = self.etapas.get(nome, 0.0) + duracao_ms
+        if self._histograma is not None:
+            self._histograma.observar(duracao_ms / 1000, etapa=nome)
+
+    @contextmanager
+    def etapa(self, nome: str) -> Iterator[None]:
+        """Mede o bloco (registra também se ele levantar exceção)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nome, (time.perf_counter() - inicio) * 1000)
+
+    async def medir(self, nome: str, aguardavel: Awaitable[T]) -> T:
+        """Aguarda a corrotina/future medindo a etapa (útil dentro de asyncio.gather)."""
+        with self.etapa(nome):
+            return await aguardavel
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._inicio) * 1000
+
+    def cabecalho(self, incluir_total: bool = True) -> str:
+        """Valor do header: 'perfil;dur=12.3, regras_sal;dur=0.1, total;dur=80.2'."""
+        partes = [
+            f"{_NOME_INVALIDO.sub('_', nome)};dur={duracao:.1f}" for nome, duracao in self.etapas.items()
+        ]
+        if incluir_total:
+            partes.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(partes)
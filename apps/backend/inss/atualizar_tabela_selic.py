@@ -0,0 +1,71 @@
+"""
+Script para regenerar app/data/selic_mensal.json a partir da série 4390 do SGS (Banco Central)
+Execute: python atualizar_tabela_selic.py [AAAA-MM inicial, padrão 2000-01]
+
+Grava todos os meses fechados do mês inicial até o mês anterior ao atual;
+a versão do arquivo é o último mês gravado.
+"""
+
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+import httpx
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.selic_service import ARQUIVO_PADRAO, URL_BCB_PADRAO, TabelaSelic, indice_mes
+
+FONTE = (
+    "Banco Central do Brasil - SGS série 4390 (taxa SELIC acumulada no mês, % a.m.). "
+    "Gerado por atualizar_tabela_selic.py."
+)
+
+
+def baixar_taxas(inicio: str) -> dict:
+    """Taxas mensais fechadas ("AAAA-MM" -> % a.m.) desde o mês inicial."""
+    ano, mes = map(int, inicio.split("-"))
+    hoje = date.today()
+    ultimo_fechado = indice_mes(hoje.year, hoje.month) - 1
+    resposta = httpx.get(URL_BCB_PADRAO, timeout=30.0, params={
+        "formato": "json",
+        "dataInicial": f"01/{mes:02d}/{ano}",
+        "dataFinal": hoje.strftime("%d/%m/%Y"),
+    })
+    resposta.raise_for_status()
+    taxas = {}
+    for item in resposta.json():
+        _, mes_item, ano_item = item["data"].split("/")
+        if indice_mes(int(ano_item), int(mes_item)) <= ultimo_fechado:
+            taxas[f"{ano_item}-{mes_item}"] = float(item["valor"])
+    return taxas
+
+
+def gravar(taxas: dict, caminho: Path = ARQUIVO_PADRAO) -> TabelaSelic:
+    """Valida (meses contíguos) e grava o JSON no formato lido por RegistroSelic."""
+    versao = max(taxas)
+    tabela = TabelaSelic(taxas, versao=versao)
+    linhas = []
+    chaves = sorted(taxas)
+    for i in range(0, len(chaves), 6):
+        linhas.append("    " + ", ".join(f'"{chave}": {taxas[chave]:.2f}' for chave in chaves[i:i + 6]))
+    conteudo = (
+        "{\n"
+        f'  "versao": {json.dumps(versao)},\n'
+        f'  "fonte": {json.dumps(FONTE, ensure_ascii=False)},\n'
+        '  "taxas_percentuais": {\n'
+        + ",\n".join(linhas)
+        + "\n  }\n}\n"
+    )
+    caminho.write_text(conteudo, encoding="utf-8")
+    return tabela
+
+
+if __name__ == "__main__":
+    inicio = sys.argv[1] if len(sys.argv) > 1 else "2000-01"
+    print(f"[SELIC] Consultando SGS 4390 desde {inicio}...")
+    tabela = gravar(baixar_taxas(inicio))
+    resumo = tabela.resumo()
+    print(f"[SELIC] [OK] {ARQUIVO_PADRAO} gravado: {resumo['inicio']} a {resumo['fim']} (versão {tabela.versao})")
@@ -0,0 +1,16 @@
+"""
+Benchmarks do pipeline de emissão de GPS com baselines em JSON.
+
+Executar (a partir de apps/backend/inss):
+    python -m benchmarks executar --saida benchmarks/resultados/atual.json
+    python -m benchmarks executar --filtro calculadora
+    python -m benchmarks comparar benchmarks/baselines/referencia.json benchmarks/resultados/atual.json
+
+O comparar termina com código 1 quando algum caso ficou mais lento que a base
+além do limite (--limite, padrão 10%). Para atualizar a referência, execute
+com --saida benchmarks/baselines/referencia.json na mesma máquina usada nas
+comparações (o ambiente fica registrado no JSON).
+
+Carga em RPS fixo sobre os backends locais (ver benchmarks/carga.py):
+    python -m benchmarks carga --rps emitir=20 --rps gps=10 --rps webhook=5 --duracao 60
+"""
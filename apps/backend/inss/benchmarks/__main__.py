@@ -0,0 +1,143 @@
+"""
+CLI dos benchmarks: python -m benchmarks {executar,comparar,carga} ...
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+
+
+def _configurar_ambiente() -> None:
+    # Antes de importar a aplicação: sem rede, sem validação SAL sorteada, log enxuto
+    os.environ.setdefault("SUPABASE_URL", "http://supabase.local")
+    os.environ.setdefault("SUPABASE_KEY", "chave-benchmark")
+    os.environ.setdefault("GPS_VALIDATION_RATE", "0")
+    os.environ.setdefault("GPS_LOG_LEVEL", "WARNING")
+    os.environ.setdefault("GPS_LOG_ARQUIVO", "")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks da emissão de GPS")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    executar = comandos.add_parser("executar", help="Executa os casos e grava o JSON de resultados")
+    executar.add_argument("--saida", help="Arquivo JSON de resultados")
+    executar.add_argument("--filtro", help="Só casos cujo nome contém o texto")
+    executar.add_argument("--rodadas", type=int, default=7)
+    executar.add_argument("--tempo-rodada", type=float, default=0.1, help="Segundos mínimos por rodada")
+    executar.add_argument("--comparar-com", help="Baseline JSON para comparar ao final")
+    executar.add_argument("--limite", type=float, default=None, help="Regressão tolerada (0.10 = 10%%)")
+
+    comparar = comandos.add_parser("comparar", help="Compara dois JSON de resultados")
+    comparar.add_argument("base")
+    comparar.add_argument("atual")
+    comparar.add_argument("--limite", type=float, default=None, help="Regressão tolerada (0.10 = 10%%)")
+
+    carga = comandos.add_parser("carga", help="Gera carga em RPS fixo sobre os backends locais")
+    carga.add_argument("--rps", action="append", default=[], metavar="ROTA=RPS",
+                       help="Taxa por rota (emitir, gps, webhook); repetível. Padrão: emitir=10")
+    carga.add_argument("--duracao", type=float, default=30.0, help="Segundos de geração")
+    carga.add_argument("--perfis", type=int, default=100, help="Perfis semeados (usados em rodízio)")
+    carga.add_argument("--url", help="API já no ar com GPS_BACKEND_LOCAL=true (padrão: em processo)")
+    carga.add_argument("--dir", help="Diretório dos backends locais (o GPS_BACKEND_LOCAL_DIR da API)")
+    carga.add_argument("--api-key", default=os.getenv("GPS_API_KEY"), help="X-API-Key para /api/v1/gps/emitir")
+    carga.add_argument("--max-pendentes", type=int, default=1000, help="Requisições em voo por rota")
+    carga.add_argument("--apenas-semear", action="store_true", help="Só semeia os perfis em --dir e termina")
+    carga.add_argument("--saida", help="Arquivo JSON do resumo")
+
+    args = parser.parse_args(argv)
+    _configurar_ambiente()
+    from . import nucleo
+
+    if args.comando == "carga":
+        return _carga(args, nucleo)
+
+    limite = nucleo.LIMITE_REGRESSAO_PADRAO if args.limite is None else args.limite
+
+    if args.comando == "executar":
+        from . import casos  # noqa: F401  (registra os casos)
+
+        documento = nucleo.executar(args.filtro, args.rodadas, args.tempo_rodada)
+        if args.saida:
+            nucleo.salvar(documento, args.saida)
+            print(f"[BENCH] Resultados gravados em {args.saida}")
+        if not args.comparar_com:
+            return 0
+        base, atual = nucleo.carregar(args.comparar_com), documento
+        if args.filtro:
+            # Casos fora do filtro não rodaram: não aparecem como removidos
+            base = {**base, "resultados": {
+                nome: valor for nome, valor in base.get("resultados", {}).items() if nome in atual["resultados"]
+            }}
+    else:
+        base, atual = nucleo.carregar(args.base), nucleo.carregar(args.atual)
+
+    if base.get("ambiente") != atual.get("ambiente"):
+        print("[BENCH] [WARN] Ambientes diferentes: a comparação pode não ser significativa")
+    linhas = nucleo.comparar(base, atual, limite)
+    print(nucleo.formatar_comparacao(linhas))
+    regressoes = [linha["nome"] for linha in linhas if linha["status"] == "regressao"]
+    if regressoes:
+        print(f"[BENCH] [ERROR] {len(regressoes)} regressão(ões) acima de {limite:.0%}: {', '.join(regressoes)}")
+        return 1
+    print(f"[BENCH] [OK] Nenhuma regressão acima de {limite:.0%}")
+    return 0
+
+
+def _taxas(especificacoes) -> dict:
+    taxas = {}
+    for especificacao in especificacoes or ["emitir=10"]:
+        rota, _, valor = especificacao.partition("=")
+        try:
+            taxas[rota.strip()] = float(valor)
+        except ValueError:
+            raise SystemExit(f"[BENCH] [ERROR] --rps inválido: {especificacao!r} (use ROTA=RPS)")
+    return taxas
+
+
+def _carga(args, nucleo) -> int:
+    # O limite padrão (100/hour) de /api/v1/gps/emitir transformaria a carga em 429
+    os.environ.setdefault("GPS_RATE_LIMIT", "1000000/hour")
+    from app.config import get_settings
+    from app.services.backends_locais import Latencia
+
+    from . import carga
+    from .backends_locais import BackendsLocais
+
+    if (args.url or args.apenas_semear) and not args.dir:
+        print("[BENCH] [ERROR] --url e --apenas-semear exigem --dir (o GPS_BACKEND_LOCAL_DIR da API)")
+        return 2
+    taxas = _taxas(args.rps)
+    settings = get_settings()
+    backends = BackendsLocais(
+        diretorio=args.dir or settings.backend_local_dir,
+        latencia_supabase=Latencia(settings.backend_local_supabase_p50_ms, settings.backend_local_supabase_p99_ms),
+        latencia_twilio=Latencia(settings.backend_local_twilio_p50_ms, settings.backend_local_twilio_p99_ms),
+    )
+
+    if args.apenas_semear:
+        carga.semear(backends, args.perfis)
+        print(f"[BENCH] {args.perfis} perfis semeados em {args.dir}")
+        return 0
+    if args.url:
+        perfis = carga.semear(backends, args.perfis)
+        documento = asyncio.run(carga.carga_em_servidor(
+            args.url, taxas, perfis, args.duracao, args.max_pendentes, args.api_key,
+        ))
+    else:
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            documento = asyncio.run(carga.carga_em_processo(taxas, backends, args.perfis, args.duracao, args.max_pendentes))
+
+    documento["ambiente"] = nucleo.ambiente()
+    print(carga.formatar(documento))
+    if args.saida:
+        nucleo.salvar(documento, args.saida)
+        print(f"[BENCH] Resumo gravado em {args.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Backends locais (app.services.backends_locais) nos serviços já criados.
+
+Os casos ponta a ponta rodam no mesmo processo que os demais benchmarks, com
+as Settings já carregadas: em vez de GPS_BACKEND_LOCAL, a instalação troca o
+transporte do SupabaseService, o cliente Twilio dos WhatsAppService dos
+serviços da aplicação (app.state.servicos) e o transporte da consulta SELIC
+ao SGS, e desfaz tudo ao final.
+
+Uso:
+    backends = BackendsLocais()
+    adicionar_perfil(backends, whatsapp="5548991234567")
+    instalacao = Instalacao.para_app(backends, app).instalar()
+    ...
+    instalacao.remover()
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Sequence
+
+from app.services.backends_locais import REMETENTE_LOCAL, BackendsLocais
+from app.services.selic_service import registro_selic
+from app.services.supabase_service import SupabaseService, get_supabase_service
+from app.services.whatsapp_service import WhatsAppService
+
+__all__ = ["BackendsLocais", "Instalacao", "adicionar_perfil"]
+
+
+def adicionar_perfil(backends: BackendsLocais, whatsapp: str, **campos: Any) -> Dict[str, Any]:
+    """Cadastra (ou atualiza, pelo WhatsApp) um perfil de autônomo com NIT e CPF válidos para a emissão."""
+    perfil = {
+        "whatsapp_phone": whatsapp,
+        "user_type": "autonomo",
+        "nome": "Contribuinte Benchmark",
+        "cpf": "12345678909",
+        "pis": "12345678901",
+        **campos,
+    }
+    return backends.postgrest.inserir(
+        "profiles", [perfil], on_conflict=("whatsapp_phone",), resolucao="merge-duplicates"
+    )[0]
+
+
+class Instalacao:
+    """Aponta o SupabaseService, os WhatsAppService da aplicação e a consulta SELIC para os backends locais."""
+
+    def __init__(
+        self,
+        backends: BackendsLocais,
+        servico: Optional[SupabaseService] = None,
+        whatsapp: Sequence[WhatsAppService] = (),
+    ) -> None:
+        self.backends = backends
+        self.servico = servico or get_supabase_service()
+        self.whatsapp = list(whatsapp)
+        self._original: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def para_app(cls, backends: BackendsLocais, app: Any) -> "Instalacao":
+        """Instalação sobre os serviços da aplicação FastAPI (criados se o lifespan não rodou)."""
+        from app.dependencias import obter_servicos
+
+        servicos = obter_servicos(app)
+        return cls(backends, servicos.supabase, [servicos.whatsapp])
+
+    def instalar(self) -> "Instalacao":
+        whatsapp = self.whatsapp
+        self._original = {
+            "transporte": self.servico._transporte,
+            "disponivel": self.servico.disponivel,
+            "whatsapp": [(servico._twilio_client, servico.remetente) for servico in whatsapp],
+            "sgs": registro_selic._transporte,
+        }
+        self.servico._transporte = self.backends.supabase
+        self.servico._client = None
+        self.servico.disponivel = True
+        registro_selic._transporte = self.backends.sgs
+        for servico in whatsapp:
+            servico._twilio_client = self.backends.twilio
+            servico.remetente = REMETENTE_LOCAL
+        return self
+
+    def remover(self) -> None:
+        if self._original is None:
+            return
+        self.servico._transporte = self._original["transporte"]
+        self.servico._client = None
+        self.servico.disponivel = self._original["disponivel"]
+        registro_selic._transporte = self._original["sgs"]
+        for servico, (cliente, remetente) in zip(self.whatsapp, self._original["whatsapp"]):
+            servico._twilio_client = cliente
+            servico.remetente = remetente
+        self._original = None
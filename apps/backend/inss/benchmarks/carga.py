@@ -0,0 +1,279 @@
+"""
+Gerador de carga assíncrono para /emitir, /api/v1/gps/emitir e o webhook do WhatsApp.
+
+A carga é de malha aberta: cada rota recebe requisições em instantes fixos
+(1/rps), independente de as anteriores terem respondido, como usuários reais.
+A latência é medida a partir do instante agendado, não do envio efetivo, para
+que um servidor saturado não esconda a fila (coordinated omission).
+
+Dois modos:
+
+- Em processo (padrão): a aplicação ASGI roda no mesmo event loop, com os
+  backends locais instalados (PostgREST, Storage e Twilio com latência).
+- Servidor (--url): a API sobe com GPS_BACKEND_LOCAL=true e
+  GPS_BACKEND_LOCAL_DIR=<dir>; o gerador semeia os perfis no SQLite desse
+  diretório antes de começar (--dir com o mesmo caminho).
+
+    GPS_BACKEND_LOCAL=true GPS_BACKEND_LOCAL_DIR=/tmp/carga GPS_RATE_LIMIT=1000000/hour \\
+        uvicorn app.main:app --workers 4
+    python -m benchmarks carga --url http://localhost:8000 --dir /tmp/carga \\
+        --rps emitir=20 --rps gps=10 --rps webhook=5 --duracao 60
+
+Outros geradores (locust, k6) podem usar o mesmo servidor: semeie com
+--apenas-semear e use os corpos de CORPOS.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from .backends_locais import BackendsLocais, Instalacao, adicionar_perfil
+
+# Rota da carga -> caminho na aplicação (todas via POST)
+ROTAS: Dict[str, str] = {
+    "emitir": "/api/v1/guias/emitir",
+    "gps": "/api/v1/gps/emitir",
+    # O router do webhook já declara /webhook/whatsapp e é incluído com prefix="/webhook"
+    "webhook": "/webhook/webhook/whatsapp",
+}
+MENSAGENS_WEBHOOK = (
+    "Quanto eu pago de INSS como autônomo?",
+    "Qual o vencimento da minha guia?",
+    "Posso complementar as contribuições de 11%?",
+)
+
+
+def _competencia_atual() -> str:
+    hoje = date.today()
+    return f"{hoje.month:02d}/{hoje.year}"
+
+
+def _cpf(numero: int) -> str:
+    """CPF com dígitos verificadores válidos a partir de um número de 9 dígitos."""
+    digitos = [int(d) for d in f"{numero:09d}"]
+    for _ in range(2):
+        soma = sum(d * peso for d, peso in zip(digitos, range(len(digitos) + 1, 1, -1)))
+        digitos.append(0 if soma % 11 < 2 else 11 - soma % 11)
+    return "".join(map(str, digitos))
+
+
+def _corpo_emitir(perfil: Dict[str, Any], sequencia: int) -> Dict[str, Any]:
+    # Mesmo corpo por perfil: a primeira requisição de cada perfil emite e as do
+    # rodízio seguinte são retentativas reaproveitadas pela idempotência
+    # (--perfis >= rps x duração para medir só emissões)
+    return {"json": {
+        "whatsapp": perfil["whatsapp_phone"],
+        "tipo_contribuinte": "autonomo",
+        "valor_base": 1518.00,
+        "competencia": _competencia_atual(),
+    }}
+
+
+def _corpo_gps(perfil: Dict[str, Any], sequencia: int) -> Dict[str, Any]:
+    return {"json": {
+        "user_id": perfil["id"],
+        "competencia": _competencia_atual(),
+        "valor": round(303.60 + sequencia / 100, 2),
+        "codigo_pagamento": "1007",
+        "metodo_forcado": "local",
+        "nome": perfil.get("nome"),
+        "cpf": perfil.get("cpf"),
+        "nit": perfil.get("pis"),
+        "telefone": perfil["whatsapp_phone"],
+    }}
+
+
+def _corpo_webhook(perfil: Dict[str, Any], sequencia: int) -> Dict[str, Any]:
+    return {"data": {
+        "From": f"whatsapp:{perfil['whatsapp_phone']}",
+        "Body": MENSAGENS_WEBHOOK[sequencia % len(MENSAGENS_WEBHOOK)],
+    }}
+
+
+# Rota -> corpo da requisição (kwargs do httpx) para um perfil semeado
+CORPOS: Dict[str, Callable[[Dict[str, Any], int], Dict[str, Any]]] = {
+    "emitir": _corpo_emitir,
+    "gps": _corpo_gps,
+    "webhook": _corpo_webhook,
+}
+
+
+def semear(backends: BackendsLocais, quantidade: int) -> List[Dict[str, Any]]:
+    """Cadastra perfis de autônomo com WhatsApp e CPF distintos (5548900000001, ...)."""
+    return [
+        adicionar_perfil(backends, whatsapp=f"55489{indice:08d}", cpf=_cpf(indice))
+        for indice in range(1, quantidade + 1)
+    ]
+
+
+def _percentil(ordenadas: List[float], percentil: int) -> float:
+    """Percentil pelo posto mais próximo (valor observado, sem interpolação)."""
+    return ordenadas[max(math.ceil(percentil / 100 * len(ordenadas)) - 1, 0)]
+
+
+@dataclass
+class ResultadoRota:
+    """Amostras de uma rota durante a carga."""
+
+    rota: str
+    rps: float
+    latencias_ms: List[float] = field(default_factory=list)
+    status: Counter = field(default_factory=Counter)
+    descartadas: int = 0
+
+    def registrar(self, situacao: str, latencia_ms: float) -> None:
+        self.status[situacao] += 1
+        self.latencias_ms.append(latencia_ms)
+
+    def resumo(self, duracao: float) -> Dict[str, Any]:
+        latencias = sorted(self.latencias_ms)
+        sucesso = sum(quantidade for situacao, quantidade in self.status.items() if situacao.startswith("2"))
+        resumo: Dict[str, Any] = {
+            "rps_alvo": self.rps,
+            "requisicoes": len(latencias),
+            "rps_obtido": round(sucesso / duracao, 2) if duracao else 0.0,
+            "status": dict(sorted(self.status.items())),
+            "descartadas": self.descartadas,
+        }
+        if latencias:
+            resumo.update({
+                "p50_ms": round(_percentil(latencias, 50), 2),
+                "p90_ms": round(_percentil(latencias, 90), 2),
+                "p99_ms": round(_percentil(latencias, 99), 2),
+                "max_ms": round(latencias[-1], 2),
+            })
+        return resumo
+
+
+async def _requisitar(
+    cliente: httpx.AsyncClient,
+    caminho: str,
+    corpo: Dict[str, Any],
+    agendado: float,
+    resultado: ResultadoRota,
+) -> None:
+    try:
+        resposta = await cliente.post(caminho, **corpo)
+        situacao = str(resposta.status_code)
+    except httpx.HTTPError as exc:
+        situacao = type(exc).__name__
+    resultado.registrar(situacao, (time.perf_counter() - agendado) * 1000)
+
+
+async def _gerar_rota(
+    cliente: httpx.AsyncClient,
+    resultado: ResultadoRota,
+    perfis: List[Dict[str, Any]],
+    duracao: float,
+    max_pendentes: int,
+) -> None:
+    caminho, corpo = ROTAS[resultado.rota], CORPOS[resultado.rota]
+    intervalo = 1 / resultado.rps
+    pendentes: set = set()
+    inicio = time.perf_counter()
+    for sequencia in range(round(duracao * resultado.rps)):
+        agendado = inicio + sequencia * intervalo
+        espera = agendado - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        if len(pendentes) >= max_pendentes:
+            # Servidor não acompanha: conta a perda em vez de crescer a memória sem limite
+            resultado.descartadas += 1
+            continue
+        tarefa = asyncio.create_task(
+            _requisitar(cliente, caminho, corpo(perfis[sequencia % len(perfis)], sequencia), agendado, resultado)
+        )
+        pendentes.add(tarefa)
+        tarefa.add_done_callback(pendentes.discard)
+    if pendentes:
+        await asyncio.gather(*pendentes)
+
+
+async def executar_carga(
+    cliente: httpx.AsyncClient,
+    rps: Dict[str, float],
+    perfis: List[Dict[str, Any]],
+    duracao: float = 30.0,
+    max_pendentes: int = 1000,
+) -> Dict[str, Any]:
+    """
+    Dispara as rotas em paralelo, cada uma na sua taxa, e devolve o resumo por rota.
+
+    Args:
+        cliente: Cliente apontado para a API (rede ou ASGITransport)
+        rps: Requisições por segundo por rota (chaves de ROTAS)
+        perfis: Perfis semeados, usados em rodízio
+        duracao: Segundos de geração (as requisições em voo terminam depois)
+        max_pendentes: Requisições em voo por rota antes de descartar novas
+    """
+    desconhecidas = set(rps) - set(ROTAS)
+    if desconhecidas:
+        raise ValueError(f"Rotas desconhecidas: {', '.join(sorted(desconhecidas))} (use {', '.join(ROTAS)})")
+    if not perfis:
+        raise ValueError("Nenhum perfil semeado para a carga")
+
+    resultados = [ResultadoRota(rota, taxa) for rota, taxa in rps.items() if taxa > 0]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_gerar_rota(cliente, resultado, perfis, duracao, max_pendentes) for resultado in resultados))
+    decorrido = time.perf_counter() - inicio
+    return {
+        "duracao_s": round(decorrido, 2),
+        "rotas": {resultado.rota: resultado.resumo(decorrido) for resultado in resultados},
+    }
+
+
+async def carga_em_processo(
+    rps: Dict[str, float],
+    backends: BackendsLocais,
+    perfis: int = 100,
+    duracao: float = 30.0,
+    max_pendentes: int = 1000,
+) -> Dict[str, Any]:
+    """Carga sobre a aplicação ASGI no próprio processo, com os backends locais instalados."""
+    from app.main import app
+
+    semeados = semear(backends, perfis)
+    instalacao = Instalacao.para_app(backends, app).instalar()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://carga") as cliente:
+            documento = await executar_carga(cliente, rps, semeados, duracao, max_pendentes)
+    finally:
+        instalacao.remover()
+    documento["backends"] = backends.metricas()
+    return documento
+
+
+async def carga_em_servidor(
+    url: str,
+    rps: Dict[str, float],
+    perfis: List[Dict[str, Any]],
+    duracao: float = 30.0,
+    max_pendentes: int = 1000,
+    api_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Carga sobre uma API já no ar (GPS_BACKEND_LOCAL=true, mesmo diretório dos perfis)."""
+    limites = httpx.Limits(max_connections=max_pendentes * max(len(rps), 1), max_keepalive_connections=100)
+    cabecalhos = {"X-API-Key": api_key} if api_key else None
+    async with httpx.AsyncClient(base_url=url, limits=limites, headers=cabecalhos, timeout=60.0) as cliente:
+        return await executar_carga(cliente, rps, perfis, duracao, max_pendentes)
+
+
+def formatar(documento: Dict[str, Any]) -> str:
+    linhas = [f"{'rota':<10} {'alvo':>7} {'obtido':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}  status"]
+    for rota, resumo in documento["rotas"].items():
+        status = ", ".join(f"{situacao}={quantidade}" for situacao, quantidade in resumo["status"].items())
+        if resumo["descartadas"]:
+            status += f", descartadas={resumo['descartadas']}"
+        linhas.append(
+            f"{rota:<10} {resumo['rps_alvo']:>7.1f} {resumo['rps_obtido']:>8.1f} "
+            f"{resumo.get('p50_ms', 0):>9.1f} {resumo.get('p90_ms', 0):>9.1f} "
+            f"{resumo.get('p99_ms', 0):>9.1f} {resumo.get('max_ms', 0):>9.1f}  {status}"
+        )
+    return "\n".join(linhas)
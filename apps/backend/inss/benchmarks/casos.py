@@ -0,0 +1,212 @@
+"""
+Casos do pipeline de emissão de GPS.
+
+Núcleo (sem I/O): código de barras, linha digitável, DVs, calculadora, PDF e
+cache. Ponta a ponta: /emitir e /complementacao pela aplicação ASGI, com
+Supabase, Storage e Twilio substituídos por backends locais em memória.
+"""
+from __future__ import annotations
+
+import itertools
+import random
+from datetime import date
+
+import httpx
+
+from app.services import digito_verificador
+from app.services.codigo_barras_gps import CodigoBarrasGPS
+from app.services.gps_pdf_generator_oficial import GPSPDFGeneratorOficial
+from app.services.inss_calculator import INSSCalculator
+from app.utils.cache_service import CacheService
+
+from .backends_locais import BackendsLocais, Instalacao, adicionar_perfil
+from .nucleo import benchmark
+
+LOTE = 1000
+WHATSAPP = "5548991234567"
+
+
+def _competencia_atual() -> str:
+    # Competência do mês corrente nunca está vencida: a emissão segue pelo fluxo local
+    hoje = date.today()
+    return f"{hoje.month:02d}/{hoje.year}"
+
+
+def _itens_lote(quantidade: int = LOTE):
+    gerador = random.Random(42)
+    return [
+        ("1007", f"{gerador.randint(1, 12):02d}/2025", round(gerador.uniform(100, 1500), 2), f"{gerador.randrange(10**10, 10**11)}")
+        for _ in range(quantidade)
+    ]
+
+
+def _codigos_barras(quantidade: int = LOTE):
+    return [resultado["codigo_barras"].encode("ascii") for resultado in CodigoBarrasGPS.gerar_lote(_itens_lote(quantidade))]
+
+
+# ===== Código de barras e linha digitável =====
+
+@benchmark("codigo_barras.gerar")
+def _codigo_barras():
+    return lambda: CodigoBarrasGPS.gerar(
+        codigo_pagamento="1007", competencia="10/2025", valor=303.60, nit="12345678901"
+    )
+
+
+@benchmark("codigo_barras.gerar_lote", operacoes=LOTE)
+def _codigo_barras_lote():
+    itens = _itens_lote()
+    return lambda: CodigoBarrasGPS.gerar_lote(itens)
+
+
+@benchmark("linha_digitavel.dvs")
+def _linha_digitavel():
+    codigo = _codigos_barras(1)[0]
+    return lambda: digito_verificador.dvs_linha_digitavel(codigo)
+
+
+@benchmark("linha_digitavel.dvs_lote", operacoes=LOTE)
+def _linha_digitavel_lote():
+    codigos = _codigos_barras()
+    return lambda: digito_verificador.dvs_linha_digitavel_lote(codigos)
+
+
+@benchmark("dv.validar")
+def _dv_validar():
+    codigo = _codigos_barras(1)[0]
+    return lambda: digito_verificador.validar_codigo_barras(codigo)
+
+
+@benchmark("dv.validar_lote", operacoes=LOTE)
+def _dv_validar_lote():
+    codigos = _codigos_barras()
+    return lambda: digito_verificador.validar_codigos_barras_lote(codigos)
+
+
+# ===== Calculadora =====
+
+@benchmark("calculadora.contribuinte_individual")
+def _calculadora_individual():
+    calculadora = INSSCalculator()
+    return lambda: calculadora.calcular_contribuinte_individual(1518.00, "normal")
+
+
+@benchmark("calculadora.domestico")
+def _calculadora_domestico():
+    calculadora = INSSCalculator()
+    return lambda: calculadora.calcular_domestico(4200.00)
+
+
+@benchmark("calculadora.complementacao")
+def _calculadora_complementacao():
+    calculadora = INSSCalculator()
+    competencias = ["01/2025", "02/2025", "03/2025"]
+    return lambda: calculadora.calcular_complementacao(competencias, 1518.00, data_pagamento=date(2025, 10, 15))
+
+
+@benchmark("calculadora.lote", operacoes=LOTE)
+def _calculadora_lote():
+    calculadora = INSSCalculator()
+    tipos = list(itertools.islice(itertools.cycle(["autonomo", "autonomo_simplificado", "domestico"]), LOTE))
+    valores = [1518.00 + indice for indice in range(LOTE)]
+    return lambda: calculadora.calcular_lote(tipos, valores)
+
+
+# ===== PDF =====
+
+@benchmark("pdf.gerar_oficial")
+def _pdf():
+    gerador = GPSPDFGeneratorOficial()
+    resultado = CodigoBarrasGPS.gerar(codigo_pagamento="1007", competencia="10/2025", valor=303.60, nit="12345678901")
+    dados = {
+        "nome": "Contribuinte Benchmark",
+        "nit": "12345678901",
+        "uf": "SC",
+        "codigo_pagamento": "1007",
+        "competencia": "10/2025",
+        "valor_inss": 303.60,
+        "valor_outras_entidades": 0.0,
+        "atm_multa_juros": 0.0,
+        "vencimento": "15/11/2025",
+        "codigo_barras": resultado["codigo_barras"],
+        "linha_digitavel": resultado["linha_digitavel"],
+    }
+    return lambda: gerador.gerar(dados)
+
+
+# ===== Cache =====
+
+@benchmark("cache.get_hit")
+def _cache_get():
+    cache = CacheService(max_entradas=1024)
+    cache.set("sal:2025", {"teto": 8157.41}, 300)
+    return lambda: cache.get("sal:2025")
+
+
+@benchmark("cache.set")
+def _cache_set():
+    cache = CacheService(max_entradas=1024)
+    chaves = itertools.cycle([f"guia:{indice}" for indice in range(2048)])  # inclui evictions
+    return lambda: cache.set(next(chaves), {"id": 1}, 300)
+
+
+@benchmark("cache.obter_ou_calcular_hit")
+def _cache_obter_ou_calcular():
+    cache = CacheService(max_entradas=1024)
+
+    async def calcular():
+        return {"teto": 8157.41}
+
+    async def operacao():
+        return await cache.obter_ou_calcular("sal:2025", calcular, 300)
+    return operacao
+
+
+# ===== Ponta a ponta (backends locais) =====
+
+def _cliente_app(backends: BackendsLocais) -> httpx.AsyncClient:
+    from app.main import app
+
+    Instalacao.para_app(backends, app).instalar()
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+
+@benchmark("e2e.emitir")
+def _e2e_emitir():
+    backends = BackendsLocais()
+    adicionar_perfil(backends, whatsapp=WHATSAPP)
+    cliente = _cliente_app(backends)
+    competencia = _competencia_atual()
+    valores = itertools.count()
+
+    async def operacao():
+        # Valor diferente a cada chamada: sem reaproveitamento pela idempotência
+        resposta = await cliente.post("/api/v1/guias/emitir", json={
+            "whatsapp": WHATSAPP,
+            "tipo_contribuinte": "autonomo",
+            "valor_base": 1518.00 + next(valores) / 100,
+            "competencia": competencia,
+        })
+        resposta.raise_for_status()
+        backends.postgrest.limpar("guias_inss")
+        backends.armazenamento.limpar()
+    return operacao
+
+
+@benchmark("e2e.complementacao")
+def _e2e_complementacao():
+    backends = BackendsLocais()
+    adicionar_perfil(backends, whatsapp=WHATSAPP)
+    cliente = _cliente_app(backends)
+    valores = itertools.count()
+
+    async def operacao():
+        resposta = await cliente.post("/api/v1/guias/complementacao", json={
+            "whatsapp": WHATSAPP,
+            "competencias": ["01/2025", "02/2025"],
+            "valor_base": 1518.00 + next(valores) / 100,
+        })
+        resposta.raise_for_status()
+        backends.postgrest.limpar("guias_inss")
+        backends.armazenamento.limpar()
+    return operacao
@@ -0,0 +1,209 @@
+"""
+Execução dos benchmarks, gravação dos resultados em JSON e comparação.
+
+Um caso é uma fábrica registrada com @benchmark: ela prepara os dados (fora
+da medição) e devolve a operação medida, síncrona ou async.
+
+    @benchmark("codigo_barras.gerar")
+    def _gerar():
+        return lambda: CodigoBarrasGPS.gerar("1007", "10/2026", 303.6, "12345678901")
+
+Cada caso é calibrado (iterações por rodada até passar de tempo_rodada) e
+medido em várias rodadas; a mediana do tempo por operação é a referência da
+comparação.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+LIMITE_REGRESSAO_PADRAO = 0.10
+
+
+@dataclass
+class Caso:
+    """Benchmark registrado."""
+    nome: str
+    fabrica: Callable[[], Callable[[], Any]]
+    operacoes: int = 1  # operações por chamada (lotes)
+
+
+CASOS: Dict[str, Caso] = {}
+
+
+def benchmark(nome: str, operacoes: int = 1):
+    """Registra a fábrica de um caso (operacoes > 1 para chamadas que processam um lote)."""
+    def decorator(fabrica: Callable[[], Callable[[], Any]]):
+        if nome in CASOS:
+            raise ValueError(f"Benchmark {nome} já registrado")
+        CASOS[nome] = Caso(nome, fabrica, operacoes)
+        return fabrica
+    return decorator
+
+
+def _rodada(operacao: Callable[[], Any], iteracoes: int, loop: asyncio.AbstractEventLoop) -> float:
+    if inspect.iscoroutinefunction(operacao):
+        async def executar() -> float:
+            inicio = time.perf_counter()
+            for _ in range(iteracoes):
+                await operacao()
+            return time.perf_counter() - inicio
+        return loop.run_until_complete(executar())
+
+    inicio = time.perf_counter()
+    for _ in range(iteracoes):
+        operacao()
+    return time.perf_counter() - inicio
+
+
+def medir(
+    caso: Caso,
+    loop: asyncio.AbstractEventLoop,
+    rodadas: int = 7,
+    tempo_rodada: float = 0.1,
+) -> Dict[str, Any]:
+    """
+    Mede um caso e devolve as estatísticas por operação (microssegundos).
+
+    Args:
+        caso: Caso registrado
+        loop: Event loop para operações async (o mesmo para todos os casos)
+        rodadas: Rodadas medidas após a calibração
+        tempo_rodada: Duração mínima de cada rodada em segundos
+    """
+    operacao = caso.fabrica()
+    _rodada(operacao, 1, loop)  # aquecimento (caches, imports tardios, pools)
+
+    iteracoes = 1
+    while True:
+        duracao = _rodada(operacao, iteracoes, loop)
+        if duracao >= tempo_rodada or iteracoes >= 1_000_000:
+            break
+        iteracoes *= 2 if duracao <= 0 else max(2, min(10, int(tempo_rodada / duracao) + 1))
+
+    por_operacao = [
+        _rodada(operacao, iteracoes, loop) / (iteracoes * caso.operacoes) * 1e6
+        for _ in range(rodadas)
+    ]
+    mediana = statistics.median(por_operacao)
+    return {
+        "mediana_us": round(mediana, 3),
+        "min_us": round(min(por_operacao), 3),
+        "media_us": round(statistics.fmean(por_operacao), 3),
+        "desvio_us": round(statistics.stdev(por_operacao), 3) if rodadas > 1 else 0.0,
+        "ops_por_segundo": round(1e6 / mediana, 1) if mediana else 0.0,
+        "iteracoes": iteracoes,
+        "rodadas": rodadas,
+        "operacoes_por_chamada": caso.operacoes,
+    }
+
+
+def ambiente() -> Dict[str, Any]:
+    """Identifica a máquina: comparações só fazem sentido no mesmo ambiente."""
+    return {
+        "python": platform.python_version(),
+        "implementacao": platform.python_implementation(),
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def executar(
+    filtro: Optional[str] = None,
+    rodadas: int = 7,
+    tempo_rodada: float = 0.1,
+    saida=sys.stdout,
+) -> Dict[str, Any]:
+    """
+    Executa os casos (filtro: substring do nome) e devolve o documento de resultados.
+
+    Os prints da aplicação vão para /dev/null durante a medição (escrever no
+    terminal é ruído, não custo do pipeline).
+    """
+    resultados: Dict[str, Any] = {}
+    loop = asyncio.new_event_loop()
+    try:
+        for nome in sorted(CASOS):
+            if filtro and filtro not in nome:
+                continue
+            with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                resultados[nome] = medir(CASOS[nome], loop, rodadas, tempo_rodada)
+            estatisticas = resultados[nome]
+            print(
+                f"[BENCH] {nome:<40} {estatisticas['mediana_us']:>12.2f}us "
+                f"(±{estatisticas['desvio_us']:.2f}) {estatisticas['ops_por_segundo']:>12,.0f} ops/s",
+                file=saida,
+            )
+    finally:
+        loop.close()
+    return {
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": ambiente(),
+        "resultados": resultados,
+    }
+
+
+def salvar(documento: Dict[str, Any], caminho: str) -> None:
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(documento, arquivo, indent=2, ensure_ascii=False, sort_keys=True)
+        arquivo.write("\n")
+
+
+def carregar(caminho: str) -> Dict[str, Any]:
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def comparar(
+    base: Dict[str, Any],
+    atual: Dict[str, Any],
+    limite: float = LIMITE_REGRESSAO_PADRAO,
+) -> List[Dict[str, Any]]:
+    """
+    Compara as medianas caso a caso.
+
+    Status: "regressao" (mais lento que base * (1 + limite)), "melhora" (mais
+    rápido que base * (1 - limite)), "ok", "novo" (só no atual) ou "removido".
+    """
+    resultados_base = base.get("resultados", {})
+    resultados_atual = atual.get("resultados", {})
+    linhas = []
+    for nome in sorted(set(resultados_base) | set(resultados_atual)):
+        antes = resultados_base.get(nome, {}).get("mediana_us")
+        depois = resultados_atual.get(nome, {}).get("mediana_us")
+        if antes is None or depois is None:
+            linhas.append({"nome": nome, "base_us": antes, "atual_us": depois,
+                           "variacao": None, "status": "novo" if antes is None else "removido"})
+            continue
+        variacao = (depois - antes) / antes if antes else 0.0
+        if variacao > limite:
+            situacao = "regressao"
+        elif variacao < -limite:
+            situacao = "melhora"
+        else:
+            situacao = "ok"
+        linhas.append({"nome": nome, "base_us": antes, "atual_us": depois,
+                       "variacao": round(variacao, 4), "status": situacao})
+    return linhas
+
+
+def formatar_comparacao(linhas: List[Dict[str, Any]]) -> str:
+    saida = [f"{'benchmark':<40} {'base (us)':>12} {'atual (us)':>12} {'variação':>9}  status"]
+    for linha in linhas:
+        base = f"{linha['base_us']:.2f}" if linha["base_us"] is not None else "-"
+        atual = f"{linha['atual_us']:.2f}" if linha["atual_us"] is not None else "-"
+        variacao = f"{linha['variacao']:+.1%}" if linha["variacao"] is not None else "-"
+        saida.append(f"{linha['nome']:<40} {base:>12} {atual:>12} {variacao:>9}  {linha['status']}")
+    return "\n".join(saida)
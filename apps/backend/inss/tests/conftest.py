@@ -0,0 +1,161 @@
+"""
+Fixtures compartilhadas: SupabaseService sobre um MockTransport, site local que
+imita as páginas do SAL e navegador Chromium.
+"""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings
+
+
+def _supabase_ficticio_se_ausente() -> None:
+    """Sem Supabase no ambiente nem no .env, Settings() falha ao importar as rotas: usa valores fictícios."""
+    try:
+        Settings()
+    except ValidationError:
+        os.environ.setdefault("SUPABASE_URL", "https://projeto.supabase.co")
+        os.environ.setdefault("SUPABASE_ANON_KEY", "chave-teste")
+
+
+_supabase_ficticio_se_ausente()
+
+from app.services.sal_browser_pool import SAL_MODULO_PATH  # noqa: E402
+from app.services.supabase_service import SupabaseService  # noqa: E402
+
+
+@pytest.fixture
+def supabase_com_transporte():
+    """Fábrica de SupabaseService com o httpx.AsyncClient apontando para um MockTransport(handler)."""
+    def criar(handler) -> SupabaseService:
+        servico = SupabaseService(url="https://projeto.supabase.co", key="chave-teste")
+        servico._criar_client = lambda: httpx.AsyncClient(
+            base_url=servico.url,
+            headers={"apikey": servico.key, "Authorization": f"Bearer {servico.key}"},
+            transport=httpx.MockTransport(handler),
+        )
+        return servico
+
+    return criar
+
+
+CODIGO_BARRAS_STUB = "858600000015669801522025111512345678901000000000"
+PDF_STUB = b"%PDF-1.4\n% GPS emitida pelo SAL de teste\n%%EOF\n"
+
+# Mesmo fluxo do módulo do SAL: NIT -> Consultar -> Adicionar -> modal -> código -> Emitir GPS.
+# As etapas aparecem com atraso, como respostas de rede.
+PAGINA_SAL_STUB = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="utf-8"><title>SAL - Contribuintes filiados depois de 29/11/1999</title></head>
+<body>
+  <form id="consulta" onsubmit="return false">
+    <input type="text" name="nit" placeholder="NIT/PIS/PASEP">
+    <button type="button" id="consultar">Consultar</button>
+  </form>
+  <section id="contribuicoes" hidden>
+    <button type="button" id="adicionar">+ Adicionar</button>
+  </section>
+  <div id="modal" hidden>
+    <input name="competencia" placeholder="Competência">
+    <input name="salario" placeholder="Salário">
+    <button type="button" id="confirmar">Confirmar</button>
+  </div>
+  <section id="emissao" hidden>
+    <select name="codigoPagamento">
+      <option value="1007">1007</option>
+      <option value="1163">1163</option>
+      <option value="1120">1120</option>
+      <option value="1406">1406</option>
+      <option value="1457">1457</option>
+      <option value="1287">1287</option>
+    </select>
+    <input name="dataPagamento" placeholder="DD/MM/AAAA">
+    <button type="button" id="emitir">Emitir GPS</button>
+  </section>
+  <section id="resultado" hidden>
+    <span id="codigoBarras"></span>
+    <span id="total"></span>
+  </section>
+  <script>
+    const atraso = (fn) => setTimeout(fn, 150);
+    const mostrar = (id) => { document.getElementById(id).hidden = false; };
+    document.getElementById("consultar").onclick = () => atraso(() => mostrar("contribuicoes"));
+    document.getElementById("adicionar").onclick = () => atraso(() => mostrar("modal"));
+    document.getElementById("confirmar").onclick = () => atraso(() => {
+      document.getElementById("modal").hidden = true;
+      mostrar("emissao");
+    });
+    document.getElementById("emitir").onclick = () => atraso(() => {
+      document.getElementById("codigoBarras").textContent = "CODIGO_BARRAS";
+      document.getElementById("total").textContent = "166.98";
+      mostrar("resultado");
+      setTimeout(() => {
+        const link = document.createElement("a");
+        link.href = "/gps.pdf";
+        link.download = "gps.pdf";
+        document.body.appendChild(link);
+        link.click();
+      }, 500);
+    });
+  </script>
+</body>
+</html>
+""".replace("CODIGO_BARRAS", CODIGO_BARRAS_STUB)
+
+
+# Variante servida em /alt: campo NIT sem name (só o 2º candidato do SAL encontra)
+PAGINA_SAL_STUB_ALT = PAGINA_SAL_STUB.replace('name="nit"', 'id="nitContribuinte"')
+
+
+class _HandlerSALStub(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith(SAL_MODULO_PATH):
+            corpo, tipo, extra = PAGINA_SAL_STUB.encode("utf-8"), "text/html; charset=utf-8", {}
+        elif self.path.startswith("/alt" + SAL_MODULO_PATH):
+            corpo, tipo, extra = PAGINA_SAL_STUB_ALT.encode("utf-8"), "text/html; charset=utf-8", {}
+        elif self.path == "/gps.pdf":
+            corpo, tipo = PDF_STUB, "application/pdf"
+            extra = {"Content-Disposition": 'attachment; filename="gps.pdf"'}
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in extra.items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def sal_stub_url():
+    """URL base de um servidor HTTP local com as páginas do SAL de teste."""
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _HandlerSALStub)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+async def navegador_chromium():
+    """Chromium headless do Playwright; pula o teste se não estiver instalado."""
+    async_api = pytest.importorskip("playwright.async_api")
+    playwright = await async_api.async_playwright().start()
+    try:
+        navegador = await playwright.chromium.launch(headless=True, args=['--no-sandbox'])
+    except Exception as e:
+        await playwright.stop()
+        pytest.skip(f"Chromium do Playwright indisponível: {e}")
+    yield navegador
+    await navegador.close()
+    await playwright.stop()
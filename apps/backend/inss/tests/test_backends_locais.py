@@ -0,0 +1,168 @@
+"""
+Testes para os backends locais (PostgREST sobre SQLite, Storage e Twilio).
+"""
+import statistics
+
+import httpx
+import pytest
+from twilio.base.exceptions import TwilioRestException
+
+from app.services.backends_locais import (
+    ArmazenamentoLocal,
+    BackendsLocais,
+    ErroPostgREST,
+    Latencia,
+    PostgRESTLocal,
+    TwilioLocal,
+)
+from app.services.supabase_service import SupabaseService
+
+
+def _servico(backends: BackendsLocais) -> SupabaseService:
+    servico = SupabaseService(url="https://projeto.supabase.co", key="chave-teste")
+    servico._transporte = backends.supabase
+    return servico
+
+
+class TestPostgRESTLocal:
+    def test_filtros_ordem_e_paginacao(self):
+        postgrest = PostgRESTLocal()
+        postgrest.inserir("guias_inss", [
+            {"id": "a", "valor": 10, "status": "pago", "validado": True},
+            {"id": "b", "valor": 30, "status": "pendente", "validado": False},
+            {"id": "c", "valor": 20, "status": "pendente", "validado": None},
+        ])
+
+        def ids(*filtros, **kwargs):
+            return [linha["id"] for linha in postgrest.consultar("guias_inss", list(filtros), **kwargs)]
+
+        assert ids(("status", "eq.pendente")) == ["b", "c"]
+        assert ids(("valor", "gte.20"), ordem="valor.desc") == ["b", "c"]
+        assert ids(("id", "in.(a,c)")) == ["a", "c"]
+        assert ids(("validado", "is.null")) == ["c"]
+        assert ids(("validado", "eq.true")) == ["a"]
+        assert ids(("status", "not.eq.pago"), ordem="valor", limite=1, offset=1) == ["b"]
+        assert postgrest.contar("guias_inss", [("valor", "lt.25")]) == 2
+
+    def test_duplicata_upsert_e_ignore(self):
+        postgrest = PostgRESTLocal()
+        postgrest.inserir("profiles", [{"id": "p1", "whatsapp_phone": "5548991234567", "nome": "A"}])
+
+        with pytest.raises(ErroPostgREST) as erro:
+            postgrest.inserir("profiles", [{"whatsapp_phone": "5548991234567"}], on_conflict=("whatsapp_phone",))
+        assert erro.value.status == 409 and erro.value.codigo == "23505"
+
+        assert postgrest.inserir("profiles", [{"whatsapp_phone": "5548991234567"}],
+                                 on_conflict=("whatsapp_phone",), resolucao="ignore-duplicates") == []
+        atualizado = postgrest.inserir("profiles", [{"whatsapp_phone": "5548991234567", "nome": "B"}],
+                                       on_conflict=("whatsapp_phone",), resolucao="merge-duplicates")
+        assert atualizado[0]["id"] == "p1" and atualizado[0]["nome"] == "B"
+        assert postgrest.contar("profiles") == 1
+
+    def test_indice_unico_da_idempotencia(self):
+        postgrest = PostgRESTLocal()
+        postgrest.inserir("guias_inss", [
+            {"idempotency_key": "k1", "status": "emitida"}, {"idempotency_key": None, "status": "emitida"}, {},
+        ])
+
+        with pytest.raises(ErroPostgREST) as erro:
+            postgrest.inserir("guias_inss", [{"idempotency_key": "k1", "status": "pendente"}])
+        assert erro.value.status == 409 and "idx_guias_inss_idempotency_key" in str(erro.value)
+        postgrest.inserir("guias_inss", [{"idempotency_key": None, "status": "emitida"}])  # NULL não conflita
+        assert postgrest.contar("guias_inss") == 4
+
+        # Índice parcial: guias canceladas ficam fora
+        postgrest.atualizar("guias_inss", [("idempotency_key", "eq.k1")], {"status": "cancelada"})
+        postgrest.inserir("guias_inss", [{"idempotency_key": "k1", "status": "emitida"}])
+        postgrest.inserir("guias_inss", [{"idempotency_key": "k1", "status": "cancelada"}])
+        assert postgrest.contar("guias_inss") == 6
+
+    def test_rpc_incrementar_estatisticas(self):
+        postgrest = PostgRESTLocal()
+        for _ in range(2):
+            postgrest.rpc("incrementar_estatisticas_gps", {"data_ref": "2026-10-17", "deltas": {"total_emissoes": 3}})
+
+        buckets = {linha["granularidade"]: linha for linha in postgrest.consultar("gps_estatisticas")}
+        assert buckets["dia"]["data"] == "2026-10-17" and buckets["dia"]["total_emissoes"] == 6
+        assert buckets["mes"]["data"] == "2026-10-01" and buckets["mes"]["total_emissoes"] == 6
+        with pytest.raises(ErroPostgREST):
+            postgrest.rpc("inexistente", {})
+
+    def test_arquivo_compartilhado(self, tmp_path):
+        BackendsLocais(diretorio=str(tmp_path)).postgrest.inserir("profiles", [{"whatsapp_phone": "5548900000001"}])
+        # Outro processo (ex.: a API) abre o mesmo diretório e enxerga a semeadura
+        assert BackendsLocais(diretorio=str(tmp_path)).postgrest.contar("profiles") == 1
+
+
+class TestSupabaseLocal:
+    async def test_servico_via_http(self):
+        backends = BackendsLocais()
+        servico = _servico(backends)
+
+        criado = await servico.create_record("profiles", {"whatsapp_phone": "5548991234567", "user_type": "autonomo"})
+        assert await servico.obter_usuario_por_whatsapp("5548991234567") == criado
+
+        consulta = servico.tabela("profiles").eq("user_type", "autonomo")
+        assert await consulta.contar() == 1
+
+        await servico.registrar_conversa(criado["id"], "oi", "olá")
+        assert backends.postgrest.consultar("conversas")[0]["resposta"] == "olá"
+        assert backends.supabase.requisicoes["rest"] >= 4
+        await servico.encerrar()
+
+    async def test_erro_no_formato_do_postgrest(self):
+        backends = BackendsLocais()
+        async with httpx.AsyncClient(base_url="http://supabase.local", transport=backends.supabase) as cliente:
+            resposta = await cliente.get("/rest/v1/profiles", params={"nome": "contem.x"})
+            rpc = await cliente.post("/rest/v1/rpc/nao_existe", json={})
+        assert resposta.status_code == 400 and resposta.json()["code"] == "PGRST100"
+        assert rpc.status_code == 404 and rpc.json()["code"] == "PGRST202"
+
+
+class TestArmazenamentoLocal:
+    @pytest.mark.parametrize("diretorio", [None, "disco"])
+    async def test_upload_conflito_e_leitura(self, tmp_path, diretorio):
+        armazenamento = ArmazenamentoLocal(str(tmp_path / diretorio) if diretorio else None)
+        backends = BackendsLocais()
+        backends.supabase.armazenamento = armazenamento
+        async with httpx.AsyncClient(base_url="http://supabase.local", transport=backends.supabase) as cliente:
+            caminho = "/storage/v1/object/guias/2026/10/gps.pdf"
+            primeiro = await cliente.post(caminho, content=b"%PDF-1", headers={"content-type": "application/pdf"})
+            duplicado = await cliente.post(caminho, content=b"%PDF-2")
+            upsert = await cliente.post(caminho, content=b"%PDF-3", headers={"x-upsert": "true", "content-type": "application/pdf"})
+            publico = await cliente.get("/storage/v1/object/public/guias/2026/10/gps.pdf")
+            ausente = await cliente.head("/storage/v1/object/public/guias/outro.pdf")
+            invalido = await cliente.post("/storage/v1/object/guias/../fora.pdf", content=b"x")
+
+        assert primeiro.status_code == 200 and primeiro.json()["Key"] == "guias/2026/10/gps.pdf"
+        assert duplicado.status_code == 409 and upsert.status_code == 200
+        assert publico.content == b"%PDF-3" and publico.headers["content-type"] == "application/pdf"
+        assert ausente.status_code == 404 and invalido.status_code in (400, 404)
+        assert len(armazenamento) == 1
+
+
+class TestTwilioLocal:
+    def test_envio_e_erros_do_twilio(self):
+        twilio = TwilioLocal(historico=2)
+        for numero in ("+5548991234567", "+5548991234568", "+5548991234569"):
+            mensagem = twilio.messages.create(from_="whatsapp:+14155238886", to=f"whatsapp:{numero}", body="GPS")
+        assert mensagem.sid.startswith("SM") and len(mensagem.sid) == 34
+        assert twilio.total_enviadas == 3 and len(twilio.enviadas) == 2
+
+        with pytest.raises(TwilioRestException) as erro:
+            twilio.messages.create(from_="whatsapp:+14155238886", to="whatsapp:123", body="GPS")
+        assert erro.value.code == 21211
+        with pytest.raises(TwilioRestException) as erro:
+            twilio.messages.create(from_="whatsapp:+14155238886", to="whatsapp:+5548991234567")
+        assert erro.value.code == 21602
+
+
+class TestLatencia:
+    def test_mediana_e_cauda(self):
+        latencia = Latencia(p50_ms=20, p99_ms=100, semente=7)
+        amostras = sorted(latencia.sortear() * 1000 for _ in range(20_000))
+
+        assert statistics.median(amostras) == pytest.approx(20, rel=0.05)
+        assert amostras[int(len(amostras) * 0.99)] == pytest.approx(100, rel=0.15)
+        assert Latencia(p50_ms=5).sortear() == 0.005
+        assert not Latencia() and Latencia().sortear() == 0.0
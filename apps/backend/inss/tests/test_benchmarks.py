@@ -0,0 +1,91 @@
+"""
+Testes para o núcleo dos benchmarks (medição, comparação), a instalação dos backends locais e a carga.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.backends_locais import BackendsLocais, Instalacao, adicionar_perfil
+from benchmarks.carga import ROTAS, executar_carga
+from benchmarks.nucleo import Caso, comparar, medir
+from app.services.supabase_service import SupabaseService
+
+
+def _documento(**medianas):
+    return {"resultados": {nome: {"mediana_us": valor} for nome, valor in medianas.items()}}
+
+
+class TestComparar:
+    def test_status_por_caso(self):
+        base = _documento(pdf=100.0, dv=10.0, cache=1.0, antigo=5.0)
+        atual = _documento(pdf=115.0, dv=8.0, cache=1.05, novo=3.0)
+
+        status = {linha["nome"]: linha["status"] for linha in comparar(base, atual, limite=0.10)}
+
+        assert status == {"pdf": "regressao", "dv": "melhora", "cache": "ok", "antigo": "removido", "novo": "novo"}
+        assert comparar(base, atual, limite=0.20)[-1]["status"] == "ok"  # pdf: +15% tolerado
+
+
+class TestMedir:
+    def test_sync_e_async(self):
+        chamadas = []
+
+        async def operacao_async():
+            chamadas.append(1)
+
+        loop = asyncio.new_event_loop()
+        try:
+            sync = medir(Caso("sync", lambda: (lambda: sum(range(100))), operacoes=10), loop, rodadas=3, tempo_rodada=0.01)
+            assincrono = medir(Caso("async", lambda: operacao_async), loop, rodadas=3, tempo_rodada=0.01)
+        finally:
+            loop.close()
+
+        assert sync["rodadas"] == 3 and sync["operacoes_por_chamada"] == 10
+        assert sync["min_us"] <= sync["mediana_us"]
+        assert assincrono["mediana_us"] > 0
+        assert len(chamadas) >= 1 + 3 * assincrono["iteracoes"]
+
+
+class TestSupabaseLocal:
+    async def test_rest_e_storage(self):
+        backends = BackendsLocais()
+        perfil = adicionar_perfil(backends, whatsapp="5548991234567")
+        servico = SupabaseService(url="https://projeto.supabase.co", key="chave-teste")
+        Instalacao(backends, servico).instalar()
+
+        encontrados = await servico.tabela("profiles").in_("whatsapp_phone", ["554891234567", "5548991234567"]).executar()
+        assert [linha["id"] for linha in encontrados] == [perfil["id"]]
+
+        guia = await servico.salvar_guia(user_id=perfil["id"], guia_data={"competencia": "10/2026"})
+        assert backends.postgrest.consultar("guias_inss", [("id", f"eq.{guia['id']}")])[0]["usuario_id"] == perfil["id"]
+
+        conteudo = b"%PDF-1.4 benchmark"
+        url = await servico.armazenar_pdf(conteudo)
+        assert url == servico.url_pdf(conteudo)
+        assert await servico.arquivo_existe("guias", servico.caminho_pdf(conteudo))
+        assert adicionar_perfil(backends, whatsapp="5548991234567")["id"] == perfil["id"]  # upsert pelo WhatsApp
+
+
+class TestCarga:
+    async def test_taxa_status_e_percentis(self):
+        recebidas = []
+
+        def responder(request: httpx.Request) -> httpx.Response:
+            recebidas.append(request.url.path)
+            return httpx.Response(503 if request.url.path.startswith("/webhook") else 200)
+
+        perfis = [{"id": "perfil-1", "whatsapp_phone": "5548900000001"}]
+        async with httpx.AsyncClient(transport=httpx.MockTransport(responder), base_url="http://carga") as cliente:
+            documento = await executar_carga(cliente, {"emitir": 50, "webhook": 20}, perfis, duracao=0.2)
+
+        emitir, webhook = documento["rotas"]["emitir"], documento["rotas"]["webhook"]
+        assert emitir["requisicoes"] == 10 and emitir["status"] == {"200": 10}
+        assert webhook["requisicoes"] == 4 and webhook["status"] == {"503": 4} and webhook["rps_obtido"] == 0
+        assert emitir["p50_ms"] <= emitir["p99_ms"] <= emitir["max_ms"]
+        assert recebidas.count(ROTAS["emitir"]) == 10
+
+    async def test_rota_desconhecida(self):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(200))) as cliente:
+            with pytest.raises(ValueError, match="Rotas desconhecidas"):
+                await executar_carga(cliente, {"sal": 1}, [{"id": "p"}], duracao=0.1)
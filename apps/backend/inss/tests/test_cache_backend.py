@@ -0,0 +1,112 @@
+"""
+Testes para os backends de cache (memória e protocolo Redis via fakeredis).
+"""
+import asyncio
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app.utils.cache_backend import (
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    criar_cache_backend,
+    desserializar,
+    serializar,
+)
+from app.utils.cache_service import CacheService, cached
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("msgpack")
+
+
+@pytest.fixture
+def redis_backend():
+    """RedisCacheBackend sobre um servidor fakeredis em memória."""
+    return RedisCacheBackend(prefixo="teste", cliente=fakeredis.FakeAsyncRedis())
+
+
+class TestSerializacao:
+    """Testes para a serialização msgpack."""
+
+    def test_tipos_extras(self):
+        """Decimal, date e datetime sobrevivem à ida e volta."""
+        valor = {
+            "teto": Decimal("8157.41"),
+            "vigencia": date(2025, 1, 1),
+            "atualizado": datetime(2025, 1, 2, 3, 4, 5),
+            "faixas": [{"aliquota": 0.075}],
+        }
+        assert desserializar(serializar(valor)) == valor
+
+
+class TestRedisCacheBackend:
+    """Testes para RedisCacheBackend."""
+
+    async def test_get_set_com_prefixo(self, redis_backend):
+        """Chaves são gravadas com o prefixo e valores em msgpack."""
+        await redis_backend.set("sal:version:2025", {"teto_inss": 7786.02}, ttl=60)
+
+        bruto = await redis_backend.cliente.get("teste:sal:version:2025")
+        assert desserializar(bruto) == {"teto_inss": 7786.02}
+        assert await redis_backend.get("sal:version:2025") == {"teto_inss": 7786.02}
+        assert await redis_backend.cliente.ttl("teste:sal:version:2025") > 0
+
+    async def test_cache_compartilhado_entre_workers(self):
+        """Dois backends (workers) no mesmo servidor veem o mesmo valor."""
+        servidor = fakeredis.FakeServer()
+        worker_1 = RedisCacheBackend(prefixo="gps", cliente=fakeredis.FakeAsyncRedis(server=servidor))
+        worker_2 = RedisCacheBackend(prefixo="gps", cliente=fakeredis.FakeAsyncRedis(server=servidor))
+
+        await worker_1.set("gps_estatisticas", {"total_emitidas": 10})
+        assert await worker_2.get("gps_estatisticas") == {"total_emitidas": 10}
+
+    async def test_single_flight_e_metricas(self, redis_backend):
+        """Misses concorrentes calculam uma vez; hits/misses por namespace."""
+        chamadas = 0
+
+        async def calcular():
+            nonlocal chamadas
+            chamadas += 1
+            await asyncio.sleep(0.01)
+            return {"total_emitidas": 1}
+
+        await asyncio.gather(*[
+            redis_backend.obter_ou_calcular("gps_estatisticas", calcular, ttl=60) for _ in range(5)
+        ])
+        await redis_backend.get("gps_estatisticas")
+
+        assert chamadas == 1
+        stats = await redis_backend.get_stats()
+        assert stats["backend"] == "redis"
+        assert stats["namespaces"]["gps_estatisticas"]["recalculos"] == 1
+        assert stats["namespaces"]["gps_estatisticas"]["hits"] == 1
+
+    async def test_decorator_cached_com_backend(self, redis_backend):
+        """@cached aceita um CacheBackend."""
+        @cached(ttl=60, key="sal:{0}", cache=redis_backend)
+        async def buscar(ano):
+            return {"ano": ano}
+
+        assert await buscar(2025) == {"ano": 2025}
+        assert await redis_backend.get("sal:2025") == {"ano": 2025}
+
+
+class TestMemoryCacheBackend:
+    """Testes para MemoryCacheBackend e a fábrica."""
+
+    async def test_memoria_usa_cache_service(self):
+        """O backend em memória grava no CacheService (mesmas métricas)."""
+        cache = CacheService(max_entradas=10)
+        backend = MemoryCacheBackend(cache)
+        await backend.set("sal:2025", {"teto": 1})
+
+        assert cache.get("sal:2025") == {"teto": 1}
+        assert await backend.get("sal:2025") == {"teto": 1}
+        assert (await backend.get_stats())["backend"] == "memory"
+
+    def test_fabrica_por_url(self):
+        """criar_cache_backend escolhe o backend pelo esquema da URL."""
+        assert isinstance(criar_cache_backend("memory://"), MemoryCacheBackend)
+        with pytest.raises(ValueError):
+            criar_cache_backend("memcached://localhost")
@@ -0,0 +1,113 @@
+"""
+Testes para o cache em memória (LRU/TTL, métricas e single-flight).
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.cache_service import CacheService, cached
+
+
+class TestCacheService:
+    """Testes para CacheService."""
+
+    def test_get_set_delete(self):
+        """Operações básicas preservam a API anterior."""
+        cache = CacheService(max_entradas=10)
+        cache.set("sal:2025", {"teto": 8157.41})
+        assert cache.get("sal:2025") == {"teto": 8157.41}
+        cache.delete("sal:2025")
+        assert cache.get("sal:2025") is None
+
+    def test_eviction_lru(self):
+        """Com o cache cheio, a entrada menos usada recentemente sai."""
+        cache = CacheService(max_entradas=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" passa a ser a menos usada
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.get_stats()["namespaces"]["b"]["evictions"] == 1
+
+    def test_ttl_relogio_monotonico(self):
+        """Expiração usa time.monotonic e a varredura remove só expirados."""
+        cache = CacheService(max_entradas=10)
+        agora = time.monotonic()
+        with patch("app.utils.cache_service.time.monotonic", return_value=agora):
+            cache.set("curta", 1, ttl=1)
+            cache.set("longa", 2, ttl=100)
+        with patch("app.utils.cache_service.time.monotonic", return_value=agora + 5):
+            assert cache.limpar_expirados() == 1
+            assert cache.get("curta") is None
+            assert cache.get("longa") == 2
+
+    def test_metricas_por_namespace(self):
+        """Hits e misses são contados pelo prefixo da chave."""
+        cache = CacheService(max_entradas=10)
+        cache.set("gps:1", "x")
+        cache.get("gps:1")
+        cache.get("gps:2")
+        cache.get("sal:2025")
+
+        namespaces = cache.get_stats()["namespaces"]
+        assert namespaces["gps"]["hits"] == 1
+        assert namespaces["gps"]["misses"] == 1
+        assert namespaces["gps"]["hit_rate"] == 0.5
+        assert namespaces["sal"]["misses"] == 1
+
+    async def test_single_flight(self):
+        """Misses concorrentes da mesma chave executam um único cálculo."""
+        cache = CacheService(max_entradas=10)
+        chamadas = 0
+
+        async def calcular():
+            nonlocal chamadas
+            chamadas += 1
+            await asyncio.sleep(0.01)
+            return {"total_emitidas": 42}
+
+        resultados = await asyncio.gather(*[
+            cache.obter_ou_calcular("gps_estatisticas", calcular, ttl=60) for _ in range(20)
+        ])
+
+        assert chamadas == 1
+        assert all(r == {"total_emitidas": 42} for r in resultados)
+        metricas = cache.get_stats()["namespaces"]["gps_estatisticas"]
+        assert metricas["recalculos"] == 1
+        assert metricas["aguardando_recalculo"] == 19
+
+    async def test_single_flight_propaga_erro_sem_armazenar(self):
+        """Erro no cálculo chega a todos os aguardando e nada fica em cache."""
+        cache = CacheService(max_entradas=10)
+
+        async def falhar():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("Supabase fora")
+
+        resultados = await asyncio.gather(
+            *[cache.obter_ou_calcular("k", falhar) for _ in range(3)],
+            return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in resultados)
+        assert cache.get("k") is None
+
+    async def test_decorator_cached(self):
+        """@cached usa a chave formatada com os argumentos."""
+        cache = CacheService(max_entradas=10)
+        chamadas = []
+
+        @cached(ttl=60, key="sal:{0}", cache=cache)
+        async def buscar_sal(ano):
+            chamadas.append(ano)
+            return {"ano": ano}
+
+        assert await buscar_sal(2025) == {"ano": 2025}
+        assert await buscar_sal(2025) == {"ano": 2025}
+        assert await buscar_sal(2024) == {"ano": 2024}
+        assert chamadas == [2025, 2024]
+        assert cache.get("sal:2025") == {"ano": 2025}
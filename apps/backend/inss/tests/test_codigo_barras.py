@@ -155,3 +155,77 @@ class TestCodigoBarrasGPS:
         
         # Faixa 3: R$ 1.000.000.000,00 a R$ 9.999.999.999,99
         assert CodigoBarrasGPS.identificar_valor(100000000000) == "3"
+
+
+class TestCodigoBarrasGPSLote:
+    """Testes para geração vetorizada em lote."""
+    
+    def test_gerar_lote_igual_ao_gerar_individual(self):
+        """Cada item do lote deve ser idêntico à geração individual."""
+        itens = [
+            ("1007", "11/2025", 400.00, "12345678901"),
+            ("1163", "01/2025", 166.98, "98765432100"),
+            ("1406", "12/2024", 0.01, "11111111111"),
+            ("1007", "06/2025", 123456.78, "10293847561"),
+        ]
+        
+        lote = CodigoBarrasGPS.gerar_lote(itens)
+        
+        assert len(lote) == len(itens)
+        for (codigo, competencia, valor, nit), resultado in zip(itens, lote):
+            individual = CodigoBarrasGPS.gerar(
+                codigo_pagamento=codigo,
+                competencia=competencia,
+                valor=valor,
+                nit=nit
+            )
+            assert resultado["codigo_barras"] == individual["codigo_barras"]
+            assert resultado["linha_digitavel"] == individual["linha_digitavel"]
+            assert len(resultado["codigo_barras"]) == 44
+    
+    def test_gerar_lote_vazio(self):
+        """Lote vazio retorna lista vazia."""
+        assert CodigoBarrasGPS.gerar_lote([]) == []
+    
+    def test_gerar_lote_valor_invalido(self):
+        """Valor zerado em qualquer item deve gerar ValueError."""
+        with pytest.raises(ValueError):
+            CodigoBarrasGPS.gerar_lote([
+                ("1007", "11/2025", 400.00, "12345678901"),
+                ("1007", "11/2025", 0.0, "12345678901"),
+            ])
+
+
+class TestDigitoVerificador:
+    """Testes para o kernel de dígitos verificadores."""
+    
+    CODIGO = "85810000000166980270116300012800186722025113"
+    
+    def test_aceita_bytes_e_memoryview(self):
+        """str, bytes e memoryview devem produzir os mesmos DVs."""
+        from app.services import digito_verificador
+        
+        esperado = digito_verificador.dvs_linha_digitavel(self.CODIGO)
+        assert digito_verificador.dvs_linha_digitavel(self.CODIGO.encode()) == esperado
+        assert digito_verificador.dvs_linha_digitavel(memoryview(self.CODIGO.encode())) == esperado
+    
+    def test_caractere_nao_numerico(self):
+        """Caracteres não numéricos geram ValueError no cálculo e False na validação."""
+        from app.services import digito_verificador
+        
+        with pytest.raises(ValueError):
+            digito_verificador.dv_modulo10("1234567890a")
+        assert digito_verificador.validar_codigo_barras("8581000000016698027011630001280018672202511a") is False
+    
+    def test_lote_igual_individual(self):
+        """Entradas em lote devem concordar com o cálculo individual."""
+        from app.services import digito_verificador
+        
+        codigo_sem_dv = self.CODIGO[:3] + self.CODIGO[4:]
+        codigo = codigo_sem_dv[:3] + str(digito_verificador.dv_modulo11_geral(codigo_sem_dv)) + codigo_sem_dv[3:]
+        
+        assert digito_verificador.dv_modulo11_geral_lote([codigo_sem_dv]).tolist() == [int(codigo[3])]
+        assert digito_verificador.dvs_linha_digitavel_lote([codigo]).tolist() == [
+            list(digito_verificador.dvs_linha_digitavel(codigo))
+        ]
+        assert CodigoBarrasGPS.validar_lote([codigo, "123"]) == [True, False]
@@ -0,0 +1,148 @@
+"""
+Testes de propriedade do tipo monetário em centavos (app.utils.dinheiro).
+"""
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+import pytest
+
+hypothesis = pytest.importorskip("hypothesis")
+from hypothesis import given, settings, strategies as st  # noqa: E402
+
+from app.services.codigo_barras_gps import CodigoBarrasGPS  # noqa: E402
+from app.services.inss_calculator import INSSCalculator, TIPOS_LOTE  # noqa: E402
+from app.utils.constants import SAL_CLASSES, TABELA_PROGRESSIVA_DOMESTICO  # noqa: E402
+from app.utils.dinheiro import (  # noqa: E402
+    Centavos,
+    aplicar_aliquota_lote,
+    centavos_de_reais_lote,
+    formatar_moeda,
+)
+
+# Valores com duas casas, como chegam da API (até R$ 10 milhões)
+centavos_validos = st.integers(min_value=1, max_value=1_000_000_000)
+aliquotas = st.sampled_from(sorted({c["aliquota"] for c in SAL_CLASSES.values() if c.get("aliquota") is not None}))
+
+
+def _decimal(centavos: int) -> Decimal:
+    return Decimal(centavos).scaleb(-2)
+
+
+def _formatar_legado(valor: float) -> str:
+    """Formatação usada antes (GPSEstilo.formatar_moeda)."""
+    return f"R$ {valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+class TestCentavos:
+    """Conversões e aritmética de Centavos."""
+
+    @given(centavos_validos)
+    def test_float_decimal_e_str_convertem_igual(self, centavos):
+        """float, Decimal e str do mesmo valor viram os mesmos centavos."""
+        decimal = _decimal(centavos)
+        esperado = Centavos(centavos)
+        assert Centavos.de_reais(float(decimal)) == esperado
+        assert Centavos.de_reais(decimal) == esperado
+        assert Centavos.de_reais(str(decimal)) == esperado
+        assert Centavos.de_reais(decimal).reais == decimal
+
+    @given(centavos_validos)
+    def test_conversao_igual_a_antiga_do_codigo_de_barras(self, centavos):
+        """Para valores em centavos, int(round(valor * 100)) e Centavos concordam."""
+        valor = float(_decimal(centavos))
+        assert Centavos.de_reais(valor).centavos == int(round(valor * 100))
+
+    @given(st.decimals(min_value=0, max_value=10_000_000, places=6, allow_nan=False))
+    def test_mais_casas_arredonda_meio_para_cima(self, valor):
+        esperado = int((valor * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        assert Centavos.de_reais(valor).centavos == esperado
+        assert Centavos.de_reais(float(valor)).centavos == Centavos.de_reais(Decimal(repr(float(valor)))).centavos
+
+    @given(centavos_validos, aliquotas)
+    def test_aplicar_aliquota_exata(self, centavos, aliquota):
+        """Mesmo resultado do produto exato em Decimal arredondado meio para cima."""
+        esperado = (_decimal(centavos) * Decimal(str(aliquota))).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        assert Centavos(centavos).aplicar_aliquota(aliquota).reais == esperado
+
+    @given(st.lists(centavos_validos, min_size=1, max_size=50), aliquotas)
+    def test_lote_igual_ao_escalar(self, valores, aliquota):
+        reais = [float(_decimal(c)) for c in valores]
+        lote = centavos_de_reais_lote(reais)
+        assert lote.tolist() == valores
+        assert aplicar_aliquota_lote(lote, aliquota).tolist() == [
+            Centavos(c).aplicar_aliquota(aliquota).centavos for c in valores
+        ]
+
+    @given(st.lists(centavos_validos, max_size=20))
+    def test_soma_sem_deriva(self, valores):
+        total = sum((Centavos(c) for c in valores), Centavos(0))
+        assert total.reais == sum((_decimal(c) for c in valores), Decimal(0))
+
+    @given(st.integers(min_value=-10**12, max_value=10**12))
+    def test_formatacao_igual_a_antiga(self, centavos):
+        assert formatar_moeda(Centavos(centavos)) == _formatar_legado(float(_decimal(centavos)))
+
+    def test_valores_invalidos(self):
+        for valor in (float("nan"), float("inf"), "abc"):
+            with pytest.raises(ValueError):
+                Centavos.de_reais(valor)
+
+    def test_nao_mistura_com_float(self):
+        with pytest.raises(TypeError):
+            Centavos(100) + 1.5
+
+
+class TestEquivalenciaCalculadora:
+    """Calculadora, código de barras e lote sobre os mesmos centavos."""
+
+    @settings(deadline=None)
+    @given(centavos_validos)
+    def test_domestico_igual_a_tabela_em_decimal(self, centavos):
+        salario = _decimal(centavos)
+        restante, anterior, total = salario, Decimal(0), Decimal(0)
+        for teto, aliquota in TABELA_PROGRESSIVA_DOMESTICO:
+            limite = restante if teto == float("inf") else min(restante, Decimal(str(teto)) - anterior)
+            if limite <= 0:
+                break
+            total += limite * Decimal(str(aliquota))
+            restante -= limite
+            anterior = Decimal(str(teto)) if teto != float("inf") else anterior
+        esperado = total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+        resultado = INSSCalculator().calcular_domestico(float(salario))
+        assert Decimal(str(resultado.valor)) == esperado
+
+    @settings(deadline=None, max_examples=50)
+    @given(st.lists(st.tuples(st.sampled_from(TIPOS_LOTE), centavos_validos), min_size=1, max_size=30))
+    def test_lote_igual_aos_metodos_escalares(self, linhas):
+        calc = INSSCalculator()
+        pagamento = date(2025, 10, 15)
+        competencia = "03/2024"
+        tipos = [tipo for tipo, _ in linhas]
+        valores = [float(_decimal(c)) for _, c in linhas]
+
+        lote = calc.calcular_lote(tipos, valores, [competencia] * len(linhas), data_pagamento=pagamento)
+
+        for tipo, valor, obtido in zip(tipos, valores, lote.valor_centavos.tolist()):
+            if tipo == "autonomo":
+                escalar = calc.calcular_contribuinte_individual(valor, "normal")
+            elif tipo == "autonomo_simplificado":
+                escalar = calc.calcular_contribuinte_individual(valor, "simplificado")
+            elif tipo == "complementacao":
+                escalar = calc.calcular_complementacao([competencia], valor, pagamento)
+            elif tipo == "domestico":
+                escalar = calc.calcular_domestico(valor)
+            else:
+                escalar = calc.calcular_produtor_rural(valor)
+            assert Centavos.de_reais(escalar.valor).centavos == obtido
+
+    @settings(deadline=None, max_examples=50)
+    @given(st.integers(min_value=1, max_value=99_999_999_999))
+    def test_codigo_de_barras_independe_do_tipo_do_valor(self, centavos):
+        decimal = _decimal(centavos)
+        codigos = {
+            CodigoBarrasGPS.gerar("1007", "11/2025", valor, "12345678901")["codigo_barras"]
+            for valor in (float(decimal), decimal, Centavos(centavos))
+        }
+        assert len(codigos) == 1
+        assert next(iter(codigos))[4:15] == f"{centavos:011d}"
@@ -0,0 +1,125 @@
+"""
+Testes para o serviço de estatísticas GPS (buckets diário/mensal).
+"""
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+
+from app.services.estatisticas_service import EstatisticasService, decompor_periodo
+from app.services.supabase_service import SupabaseService
+
+
+class TestDecomporPeriodo:
+    """Testes para decompor_periodo."""
+
+    def test_meses_completos_e_bordas(self):
+        """Meses inteiros no meio, dias avulsos nas bordas."""
+        meses, dias = decompor_periodo(date(2025, 1, 10), date(2025, 4, 5))
+        assert meses == [date(2025, 2, 1), date(2025, 3, 1)]
+        assert dias == [(date(2025, 1, 10), date(2025, 1, 31)), (date(2025, 4, 1), date(2025, 4, 5))]
+
+    def test_periodo_alinhado_em_meses(self):
+        """Período que começa no dia 1 e termina no último dia usa só meses."""
+        meses, dias = decompor_periodo(date(2024, 12, 1), date(2025, 2, 28))
+        assert meses == [date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)]
+        assert dias == []
+
+    def test_periodo_dentro_do_mes(self):
+        """Período menor que um mês usa só dias."""
+        assert decompor_periodo(date(2025, 3, 5), date(2025, 3, 20)) == (
+            [], [(date(2025, 3, 5), date(2025, 3, 20))]
+        )
+
+    def test_periodo_invertido(self):
+        """Fim antes do início: nada a consultar."""
+        assert decompor_periodo(date(2025, 3, 2), date(2025, 3, 1)) == ([], [])
+
+
+class TestEstatisticasService:
+    """Testes para EstatisticasService."""
+
+    async def test_periodo_soma_buckets(self, supabase_com_transporte):
+        """obter_estatisticas_periodo consulta buckets mensais e diários e soma."""
+        requisicoes = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requisicoes.append(request.url.params)
+            if request.url.params["granularidade"] == "eq.mes":
+                return httpx.Response(200, json=[
+                    {"data": "2025-02-01", "total_emitidas": 100, "emitidas_local": 90, "emitidas_sal_oficial": 10},
+                    {"data": "2025-03-01", "total_emitidas": 50, "emitidas_local": 50, "divergencias": 2},
+                ])
+            return httpx.Response(200, json=[{"data": "2025-01-31", "total_emitidas": 3, "emitidas_local": 3}])
+
+        supabase = supabase_com_transporte(handler)
+        resultado = await EstatisticasService(supabase).obter_estatisticas_periodo(
+            date(2025, 1, 10), date(2025, 4, 5)
+        )
+        await supabase.encerrar()
+
+        # 1 consulta de meses + 2 de bordas, independente do volume de emissões
+        assert len(requisicoes) == 3
+        assert requisicoes[0]["data"] == "in.(2025-02-01,2025-03-01)"
+        assert resultado["total_emitidas"] == 156
+        assert resultado["por_metodo"] == {"local": 146, "sal_validado": 0, "sal_oficial": 10}
+        assert resultado["divergencias"] == 2
+        assert resultado["dias"] == 86
+
+    async def test_registrar_emissao_envia_deltas(self):
+        """registrar_emissao chama o RPC com deltas do método."""
+        supabase = MagicMock(spec=SupabaseService)
+        supabase.execute_rpc = AsyncMock(return_value=None)
+
+        ok = await EstatisticasService(supabase).registrar_emissao(
+            "sal_oficial", validado_sal=True, quantidade=2, data_ref=date(2025, 5, 1)
+        )
+
+        assert ok is True
+        supabase.execute_rpc.assert_awaited_once_with(
+            "incrementar_estatisticas_gps",
+            {
+                "data_ref": "2025-05-01",
+                "deltas": {"total_emitidas": 2, "validacoes_sal": 2, "emitidas_sal_oficial": 2},
+            },
+        )
+
+    async def test_falha_no_rpc_nao_propaga(self):
+        """Erro ao incrementar contadores não interrompe a emissão."""
+        supabase = MagicMock(spec=SupabaseService)
+        supabase.execute_rpc = AsyncMock(side_effect=RuntimeError("Supabase indisponivel"))
+
+        assert await EstatisticasService(supabase).registrar_divergencia() is False
+
+    async def test_reconciliacao_manual_sobrescreve_buckets(self):
+        """Sem popular_estatisticas_gps, o cálculo manual faz upsert do dia e refaz o mês."""
+        from app.services.backends_locais import BackendsLocais
+
+        backends = BackendsLocais()
+        backends.postgrest.inserir("guias_inss", [
+            {"created_at": "2026-10-17T10:00:00", "metodo_emissao": "local"},
+            {"created_at": "2026-10-17T11:00:00", "metodo_emissao": "sal_oficial",
+             "validado_sal": True, "validado_em": "2026-10-17T11:00:00"},
+            # Cópia gravada pela rota /emitir: não é outra emissão
+            {"created_at": "2026-10-17T11:00:00", "metodo_emissao": "v2_secure"},
+            # Emitida na véspera, validada no SAL hoje: conta no dia da validação
+            {"created_at": "2026-10-16T23:00:00", "metodo_emissao": "local",
+             "validado_sal": True, "validado_em": "2026-10-17T09:00:00"},
+        ])
+        # Contadores incrementais já criaram os buckets do dia e do mês
+        backends.postgrest.rpc("incrementar_estatisticas_gps", {"data_ref": "2026-10-17", "deltas": {"total_emitidas": 5}})
+        backends.postgrest.rpc("incrementar_estatisticas_gps", {"data_ref": "2026-10-03", "deltas": {"total_emitidas": 1}})
+        supabase = SupabaseService(url="https://projeto.supabase.co", key="chave")
+        supabase._transporte = backends.supabase
+        servico = EstatisticasService(supabase)
+
+        for _ in range(2):
+            resultado = await servico.popular_estatisticas_dia(date(2026, 10, 17))
+            assert resultado["success"], resultado
+        await supabase.encerrar()
+
+        buckets = {(linha["granularidade"], linha["data"]): linha for linha in backends.postgrest.consultar("gps_estatisticas")}
+        assert backends.postgrest.contar("gps_estatisticas") == 3
+        dia = buckets[("dia", "2026-10-17")]
+        assert (dia["total_emitidas"], dia["emitidas_local"], dia["emitidas_sal_oficial"], dia["validacoes_sal"]) == (2, 1, 1, 2)
+        assert buckets[("mes", "2026-10-01")]["total_emitidas"] == 3
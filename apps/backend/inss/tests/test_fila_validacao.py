@@ -0,0 +1,182 @@
+"""
+Testes para a fila durável de validações SAL.
+"""
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.services.fila_validacao import DIRETORIO_APP, FilaValidacaoSAL
+
+
+@pytest.fixture
+def caminho_db(tmp_path):
+    return str(tmp_path / "fila.db")
+
+
+def _status(caminho, job_id):
+    with sqlite3.connect(caminho) as conexao:
+        return conexao.execute(
+            "SELECT status, tentativas FROM validacoes_sal WHERE id = ?", (job_id,)
+        ).fetchone()
+
+
+class TestFilaValidacaoSAL:
+    """Testes para FilaValidacaoSAL."""
+
+    async def test_jobs_sobrevivem_ao_restart(self, caminho_db):
+        """Job gravado por uma instância é processado por outra (novo processo)."""
+        fila = FilaValidacaoSAL(caminho_db)
+        job_id = await fila.enfileirar({"guia_id": "g1", "valor": 166.98})
+        fila.fechar()
+
+        processados = []
+
+        async def processador(payload):
+            processados.append(payload)
+
+        nova = FilaValidacaoSAL(caminho_db)
+        assert await nova.processar_proximo(processador) is True
+        assert await nova.processar_proximo(processador) is False
+        nova.fechar()
+
+        assert processados == [{"guia_id": "g1", "valor": 166.98}]
+        assert _status(caminho_db, job_id) == ("concluida", 1)
+
+    async def test_atraso_respeitado(self, caminho_db):
+        fila = FilaValidacaoSAL(caminho_db)
+        await fila.enfileirar({"guia_id": "g1"}, atraso=60)
+
+        async def processador(payload):
+            raise AssertionError("não deveria processar antes do atraso")
+
+        assert await fila.processar_proximo(processador) is False
+        assert (await fila.metricas())["pendentes"] == 1
+        assert (await fila.metricas())["lag_segundos"] == 0.0
+        fila.fechar()
+
+    async def test_retry_com_backoff_e_dead_letter(self, caminho_db):
+        fila = FilaValidacaoSAL(caminho_db, max_tentativas=3, backoff_base=0)
+        job_id = await fila.enfileirar({"guia_id": "g1"})
+
+        async def falhar(payload):
+            raise RuntimeError("SAL indisponível")
+
+        for tentativa in (1, 2):
+            assert await fila.processar_proximo(falhar) is True
+            assert _status(caminho_db, job_id) == ("pendente", tentativa)
+        assert await fila.processar_proximo(falhar) is True
+        assert _status(caminho_db, job_id) == ("morta", 3)
+        assert await fila.processar_proximo(falhar) is False
+
+        mortas = await fila.mortas()
+        assert [m["id"] for m in mortas] == [job_id]
+        assert "SAL indisponível" in mortas[0]["ultimo_erro"]
+        assert (await fila.metricas())["mortas"] == 1
+
+        assert await fila.reprocessar(job_id) is True
+        assert await fila.reprocessar(job_id) is False
+        assert _status(caminho_db, job_id) == ("pendente", 0)
+        fila.fechar()
+
+    async def test_backoff_adia_nova_tentativa(self, caminho_db):
+        fila = FilaValidacaoSAL(caminho_db, backoff_base=60)
+        await fila.enfileirar({"guia_id": "g1"})
+
+        async def falhar(payload):
+            raise RuntimeError("timeout")
+
+        assert await fila.processar_proximo(falhar) is True
+        assert await fila.processar_proximo(falhar) is False
+        fila.fechar()
+
+    async def test_lease_expirado_volta_para_a_fila(self, caminho_db):
+        """Job reservado por um processo que morreu é retomado após o lease."""
+        fila = FilaValidacaoSAL(caminho_db, lease=0)
+        job_id = await fila.enfileirar({"guia_id": "g1"})
+        assert fila._reservar()["id"] == job_id  # reservado e "abandonado"
+
+        processados = []
+
+        async def processador(payload):
+            processados.append(payload["guia_id"])
+
+        assert await fila.processar_proximo(processador) is True
+        assert processados == ["g1"]
+        assert _status(caminho_db, job_id) == ("concluida", 2)
+        fila.fechar()
+
+    async def test_workers_limitam_concorrencia(self, caminho_db):
+        fila = FilaValidacaoSAL(caminho_db, workers=2, intervalo_poll=0.01)
+        for i in range(6):
+            await fila.enfileirar({"guia_id": f"g{i}"})
+
+        ativos = 0
+        pico = 0
+        concluidos = []
+
+        async def processador(payload):
+            nonlocal ativos, pico
+            ativos += 1
+            pico = max(pico, ativos)
+            await asyncio.sleep(0.02)
+            ativos -= 1
+            concluidos.append(payload["guia_id"])
+
+        fila.iniciar(processador)
+        for _ in range(500):
+            if (await fila.metricas())["concluidas"] == 6:
+                break
+            await asyncio.sleep(0.01)
+        await fila.parar()
+
+        assert sorted(concluidos) == [f"g{i}" for i in range(6)]
+        assert pico == 2
+        metricas = await fila.metricas()
+        assert metricas["concluidas"] == 6
+        assert metricas["pendentes"] == 0
+        fila.fechar()
+
+    async def test_parar_devolve_job_em_execucao(self, caminho_db):
+        fila = FilaValidacaoSAL(caminho_db, intervalo_poll=0.01)
+        job_id = await fila.enfileirar({"guia_id": "g1"})
+        iniciou = asyncio.Event()
+
+        async def lento(payload):
+            iniciou.set()
+            await asyncio.sleep(10)
+
+        fila.iniciar(lento)
+        await asyncio.wait_for(iniciou.wait(), 2)
+        await fila.parar()
+
+        assert _status(caminho_db, job_id) == ("pendente", 0)
+        fila.fechar()
+
+    async def test_retencao_remove_jobs_finalizados(self, caminho_db):
+        fila = FilaValidacaoSAL(caminho_db, max_tentativas=1, retencao_dias=1, retencao_mortas_dias=30)
+        ids = [await fila.enfileirar({"guia_id": f"g{i}"}) for i in range(4)]
+
+        async def processador(payload):
+            if payload["guia_id"] in ("g2", "g3"):
+                raise RuntimeError("SAL indisponível")
+
+        for _ in range(3):
+            assert await fila.processar_proximo(processador) is True
+        # Concluída e morta há 2 dias; concluída recente; pendente antiga
+        fila._executar("UPDATE validacoes_sal SET atualizado_em = atualizado_em - 2 * 86400 WHERE id IN (?, ?, ?)",
+                       (ids[0], ids[2], ids[3]))
+
+        assert await fila.limpar() == 1
+        assert _status(caminho_db, ids[0]) is None
+        assert [_status(caminho_db, i)[0] for i in ids[1:]] == ["concluida", "morta", "pendente"]
+        assert (await fila.metricas())["processo"]["removidas"] == 1
+        fila.fechar()
+
+    def test_caminho_relativo_independe_do_diretorio_corrente(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("GPS_FILA_VALIDACAO_DB", raising=False)
+        assert FilaValidacaoSAL().caminho == str(DIRETORIO_APP / "fila_validacao_sal.db")
+        assert FilaValidacaoSAL("dados/fila.db").caminho == str(DIRETORIO_APP / "dados" / "fila.db")
+        assert FilaValidacaoSAL(":memory:").caminho == ":memory:"
+        assert (DIRETORIO_APP / "app" / "main.py").exists()
@@ -6,7 +6,8 @@ from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 
 from app.services.gps_hybrid_service import GPSHybridService, MetodoEmissao
-from app.services.supabase_service import SupabaseService
+from app.services.pdf_render_pool import PDFRenderPool
+from app.services.supabase_service import ArmazenamentoIndisponivel, SupabaseService
 
 
 @pytest.fixture
@@ -15,15 +16,18 @@ def mock_supabase():
     supabase = MagicMock(spec=SupabaseService)
     supabase.get_records = AsyncMock(return_value=[])
     supabase.create_record = AsyncMock(return_value={"id": "test-id"})
-    supabase.upload_file = AsyncMock(return_value="https://storage.supabase.co/test.pdf")
+    supabase.armazenar_pdf = AsyncMock(return_value="https://storage.supabase.co/test.pdf")
+    supabase.url_pdf = MagicMock(return_value="https://storage.supabase.co/test.pdf")
     supabase.salvar_guia = AsyncMock(return_value={"id": "test-id", "pdf_url": "https://storage.supabase.co/test.pdf"})
+    supabase.execute_rpc = AsyncMock(return_value=None)
+    supabase.update_record = AsyncMock(return_value=[])
     return supabase
 
 
 @pytest.fixture
 def gps_service(mock_supabase):
     """Instância do serviço GPS híbrido."""
-    return GPSHybridService(mock_supabase)
+    return GPSHybridService(mock_supabase, pdf_pool=PDFRenderPool(workers=0))
 
 
 class TestGPSHybridService:
@@ -59,11 +63,17 @@ class TestGPSHybridService:
         hoje = datetime.now()
         competencia_atual = hoje.strftime("%m/%Y")
         
-        # Forçar não usar SAL (mockar random)
-        with patch('random.random', return_value=0.5):  # > 0.01
+        gps_service.taxa_validacao = 0.01
+        
+        # Sorteio acima da taxa: emissão local (decidir_metodo sorteia com secrets.randbelow)
+        with patch('app.services.gps_hybrid_service.secrets.randbelow', return_value=100):
             metodo = await gps_service._decidir_metodo(competencia_atual)
             
             assert metodo == MetodoEmissao.LOCAL
+        
+        # Sorteio abaixo da taxa: amostra para validação no SAL
+        with patch('app.services.gps_hybrid_service.secrets.randbelow', return_value=99):
+            assert await gps_service._decidir_metodo(competencia_atual) == MetodoEmissao.SAL_VALIDADO
     
     @pytest.mark.asyncio
     async def test_decidir_metodo_forcado(self, gps_service):
@@ -99,10 +109,27 @@ class TestGPSHybridService:
         
         assert resultado['id'] == "test-id"
         assert resultado['pdf_url'] == "https://storage.supabase.co/test.pdf"
-        assert len(resultado['codigo_barras']) == 48
+        assert len(resultado['codigo_barras']) == 44
+        assert sum(c.isdigit() for c in resultado['linha_digitavel']) == 48
         assert resultado['metodo_emissao'] == MetodoEmissao.LOCAL.value
         assert resultado['validado_sal'] is False
     
+    @pytest.mark.asyncio
+    async def test_emitir_local_storage_indisponivel_nao_grava(self, gps_service, mock_supabase):
+        """Upload falhou (temp://): nenhuma guia é registrada apontando para objeto inexistente."""
+        mock_supabase.armazenar_pdf.return_value = "temp://pdf/ab/abcd.pdf"
+        
+        with pytest.raises(ArmazenamentoIndisponivel):
+            await gps_service._emitir_local(
+                user_id="test-user-id",
+                competencia="11/2025",
+                valor=400.00,
+                codigo_pagamento="1007",
+                dados_usuario={"nome": "Teste Usuario", "nit": "12345678901", "endereco": "Rua Teste, 123"}
+            )
+        
+        mock_supabase.salvar_guia.assert_not_awaited()
+    
     @pytest.mark.asyncio
     async def test_emitir_gps_completo(self, gps_service, mock_supabase):
         """Testa fluxo completo de emissão."""
@@ -128,3 +155,78 @@ class TestGPSHybridService:
             assert resultado['pdf_url'] is not None
             assert resultado['codigo_barras'] is not None
             assert resultado['metodo_emissao'] == MetodoEmissao.LOCAL.value
+            
+            # Contadores incrementados no momento da emissão
+            mock_supabase.execute_rpc.assert_awaited_once()
+            funcao, params = mock_supabase.execute_rpc.await_args.args
+            assert funcao == "incrementar_estatisticas_gps"
+            assert params["deltas"] == {"total_emitidas": 1, "emitidas_local": 1}
+    
+    @pytest.mark.asyncio
+    async def test_emitir_lote(self, gps_service, mock_supabase):
+        """Testa emissão em lote com falha isolada por item."""
+        dados_usuario = {
+            "nome": "Teste Usuario",
+            "nit": "12345678901",
+            "endereco": "Rua Teste, 123"
+        }
+        itens = [
+            {"user_id": f"user-{i}", "competencia": "11/2025", "valor": 166.98,
+             "codigo_pagamento": "1163", "dados_usuario": dados_usuario}
+            for i in range(5)
+        ]
+        itens.append({"user_id": "user-invalido", "competencia": "11/2025", "valor": 166.98,
+                      "codigo_pagamento": "1163", "dados_usuario": {"nit": "123"}})
+        
+        resultado = await gps_service.emitir_lote(itens, concorrencia_pdf=2)
+        
+        assert resultado['total'] == 6
+        assert resultado['sucesso'] == 5
+        assert resultado['falhas'] == 1
+        assert 'erro' in resultado['resultados'][5]
+        assert [r['user_id'] for r in resultado['resultados'][:5]] == [f"user-{i}" for i in range(5)]
+        assert all(len(r['codigo_barras']) == 44 for r in resultado['resultados'][:5])
+        assert resultado['estagios']['pdf']['processados'] == 5
+        assert resultado['estagios']['pdf']['concorrencia'] == 2
+        assert resultado['estagios']['persistencia']['processados'] == 5
+        assert mock_supabase.armazenar_pdf.await_count == 5
+        # Um único incremento de estatísticas para o lote
+        mock_supabase.execute_rpc.assert_awaited_once()
+        assert mock_supabase.execute_rpc.await_args.args[1]["deltas"]["total_emitidas"] == 5
+
+
+class TestValidacaoEmBackground:
+    """Validação SAL via fila durável."""
+
+    @pytest.mark.asyncio
+    async def test_emissao_enfileira_e_worker_valida(self, mock_supabase, tmp_path):
+        from app.services.fila_validacao import FilaValidacaoSAL
+
+        fila = FilaValidacaoSAL(str(tmp_path / "fila.db"))
+        servico = GPSHybridService(mock_supabase, pdf_pool=PDFRenderPool(workers=0), fila_validacao=fila)
+        dados_usuario = {"nome": "Teste Usuario", "nit": "12345678901", "endereco": "Rua Teste, 123"}
+
+        resultado = await servico._emitir_local_com_validacao(
+            user_id="test-user-id",
+            competencia="11/2025",
+            valor=166.98,
+            codigo_pagamento="1163",
+            dados_usuario=dados_usuario
+        )
+        assert resultado['validacao_pendente'] is True
+        assert (await fila.metricas())["pendentes"] == 1
+
+        # Disponibiliza o job agendado com atraso e processa com o SAL mockado
+        fila._executar("UPDATE validacoes_sal SET disponivel_em = 0")
+        servico.sal_automation.emitir_gps = AsyncMock(return_value={"codigo_barras": resultado['codigo_barras']})
+        assert await fila.processar_proximo(servico.processar_validacao_sal) is True
+
+        dados_sal = servico.sal_automation.emitir_gps.await_args.args[0]
+        assert dados_sal["nit_pis_pasep"] == "12345678901"
+        assert dados_sal["codigo_pagamento"] == "1163"
+        assert (await fila.metricas())["concluidas"] == 1
+        # A guia validada é marcada em guias_inss, a mesma tabela que a reconciliação conta
+        tabela, filtros, dados = mock_supabase.update_record.await_args.args
+        assert (tabela, filtros, dados["validado_sal"]) == ("guias_inss", {"id": resultado['id']}, True)
+        assert "validado_em" in dados
+        fila.fechar()
@@ -0,0 +1,61 @@
+"""
+Testes para o GPSPDFGeneratorOficial (modo template x desenho completo).
+"""
+import re
+import zlib
+
+import pytest
+
+from app.services.gps_pdf_generator_oficial import GPSPDFGeneratorOficial
+
+DADOS = {
+    'nome': 'TESTE TEMPLATE',
+    'nit': '128.00186.72-2',
+    'uf': 'SC',
+    'codigo_pagamento': '1007',
+    'competencia': '11/2025',
+    'valor_inss': 303.60,
+    'valor_outras_entidades': 0.00,
+    'atm_multa_juros': 0.00,
+    'vencimento': '15/12/2025',
+    'codigo_barras': '85810000003036002701007000128001867222025113',
+    'linha_digitavel': '85810000003-6 03600270100-7 70001280018-4 67222025113-0'
+}
+
+
+def _streams(pdf: bytes):
+    """Conteúdo descomprimido de cada stream do PDF (páginas, forms, imagens)."""
+    conteudos = []
+    for bruto in re.findall(rb"stream\r?\n(.*?)endstream", pdf, re.S):
+        try:
+            conteudos.append(zlib.decompressobj().decompress(bruto))
+        except zlib.error:
+            conteudos.append(bruto)  # JPEG (DCTDecode) é embutido como está
+    return conteudos
+
+
+def _textos(pdf: bytes):
+    return sorted(
+        texto for stream in _streams(pdf) for texto in re.findall(rb"\((.*?)\) Tj", stream)
+    )
+
+
+class TestModoTemplate:
+    @pytest.mark.parametrize("template", [False, True])
+    def test_pdf_valido(self, template):
+        pdf = GPSPDFGeneratorOficial(modo_template=template).gerar(DADOS).getvalue()
+        assert pdf.startswith(b"%PDF-") and pdf.rstrip().endswith(b"%%EOF")
+        assert b"TESTE TEMPLATE" in b"".join(_streams(pdf))
+
+    def test_mesmo_conteudo_que_o_desenho_completo(self):
+        completo = GPSPDFGeneratorOficial(modo_template=False).gerar(DADOS).getvalue()
+        template = GPSPDFGeneratorOficial(modo_template=True)
+        template.gerar(DADOS)  # primeira guia: codifica o logo
+        pdf = template.gerar(DADOS).getvalue()
+
+        # Layout fixo e campos variáveis: mesmos textos nos dois modos
+        assert _textos(pdf) == _textos(completo)
+        assert b"/Subtype /Form" in pdf
+        if GPSPDFGeneratorOficial._logo_jpeg:
+            assert b"/DCTDecode" in pdf
+        assert len(pdf) <= len(completo)
@@ -0,0 +1,215 @@
+"""
+Testes para a idempotência da emissão de guias.
+"""
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from app.services.gps_validator import GPSValidator
+from app.services.idempotencia import IndiceIdempotencia, chave_idempotencia
+
+
+class _ConsultaEmMemoria:
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.filtros = []
+
+    def select(self, *colunas):
+        return self
+
+    def eq(self, coluna, valor):
+        self.filtros.append(lambda linha: linha.get(coluna) == valor)
+        return self
+
+    def neq(self, coluna, valor):
+        self.filtros.append(lambda linha: linha.get(coluna) != valor)
+        return self
+
+    def in_(self, coluna, valores):
+        self.filtros.append(lambda linha: linha.get(coluna) in valores)
+        return self
+
+    def limit(self, limite):
+        return self
+
+    async def executar(self):
+        return [linha for linha in self.linhas if all(filtro(linha) for filtro in self.filtros)]
+
+
+class _SupabaseEmMemoria:
+    """guias_inss em memória, só com o que o índice e o validador consultam."""
+
+    def __init__(self, guias=()):
+        self.guias = list(guias)
+        self.consultas = 0
+
+    def tabela(self, tabela):
+        assert tabela == "guias_inss"
+        self.consultas += 1
+        return _ConsultaEmMemoria(self.guias)
+
+
+def _guia(chave, **extra):
+    return {
+        "id": "g1",
+        "idempotency_key": chave,
+        "pdf_url": "https://storage/guias/gps.pdf",
+        "linha_digitavel": "85860000001-5 66980152202-5 51115123456-7 78901000000-0",
+        "codigo_barras": "858600000015669801522025111512345678901000000000",
+        "valor_total": 166.98,
+        **extra,
+    }
+
+
+class TestChaveIdempotencia:
+    def test_valor_normalizado_em_centavos(self):
+        chave = chave_idempotencia("u1", "10/2025", "1163", 166.98)
+        assert chave == chave_idempotencia("u1", "10/2025", "1163", Decimal("166.980"))
+        assert chave == chave_idempotencia("u1", "10/2025", "1163", "166.98")
+        assert len(chave) == 64
+
+    def test_campos_distinguem_emissoes(self):
+        base = chave_idempotencia("u1", "10/2025", "1163", 166.98)
+        assert base != chave_idempotencia("u2", "10/2025", "1163", 166.98)
+        assert base != chave_idempotencia("u1", "11/2025", "1163", 166.98)
+        assert base != chave_idempotencia("u1", "10/2025", "1007", 166.98)
+        assert base != chave_idempotencia("u1", "10/2025", "1163", 166.99)
+
+    def test_chave_do_cliente_substitui_os_campos_mas_e_por_usuario(self):
+        chave = chave_idempotencia("u1", "10/2025", "1163", 166.98, "req-123")
+        assert chave == chave_idempotencia("u1", "11/2025", "1007", 303.60, "req-123")
+        assert chave != chave_idempotencia("u2", "10/2025", "1163", 166.98, "req-123")
+        assert chave != chave_idempotencia("u1", "10/2025", "1163", 166.98)
+
+
+class TestIndiceIdempotencia:
+    """Testes para IndiceIdempotencia."""
+
+    async def test_repeticao_devolve_guia_sem_emitir(self):
+        supabase = _SupabaseEmMemoria()
+        indice = IndiceIdempotencia(supabase)
+        emissoes = []
+
+        async def emitir():
+            emissoes.append(1)
+            guia = _guia("k1")
+            supabase.guias.append(guia)
+            return guia
+
+        guia, reaproveitada = await indice.obter_ou_emitir("k1", emitir)
+        assert reaproveitada is False
+        consultas = supabase.consultas
+
+        repetida, reaproveitada = await indice.obter_ou_emitir("k1", emitir)
+        assert reaproveitada is True
+        assert repetida == guia
+        assert len(emissoes) == 1
+        assert supabase.consultas == consultas  # saiu da memória
+        assert indice.metricas()["hits_memoria"] == 1
+
+    async def test_indice_persistente_vale_entre_processos(self):
+        supabase = _SupabaseEmMemoria([_guia("k1")])
+        indice = IndiceIdempotencia(supabase)
+
+        async def emitir():
+            raise AssertionError("guia já existe no banco")
+
+        guia, reaproveitada = await indice.obter_ou_emitir("k1", emitir)
+        assert reaproveitada is True
+        assert guia["pdf_url"] == "https://storage/guias/gps.pdf"
+        assert await indice.buscar("k1") == guia
+        assert indice.metricas()["hits_persistente"] == 1
+
+    async def test_guia_cancelada_nao_e_reaproveitada(self):
+        supabase = _SupabaseEmMemoria([_guia("k1", status="cancelada")])
+        indice = IndiceIdempotencia(supabase)
+
+        async def emitir():
+            return _guia("k1", id="g2", status="emitida")
+
+        guia, reaproveitada = await indice.obter_ou_emitir("k1", emitir)
+        assert reaproveitada is False
+        assert guia["id"] == "g2"
+
+    async def test_duplicatas_concorrentes_coalescem(self):
+        indice = IndiceIdempotencia(_SupabaseEmMemoria())
+        emissoes = 0
+
+        async def emitir():
+            nonlocal emissoes
+            emissoes += 1
+            await asyncio.sleep(0.05)
+            return _guia("k1")
+
+        resultados = await asyncio.gather(*(indice.obter_ou_emitir("k1", emitir) for _ in range(5)))
+
+        assert emissoes == 1
+        assert sorted(reaproveitada for _, reaproveitada in resultados) == [False, True, True, True, True]
+        assert all(guia["id"] == "g1" for guia, _ in resultados)
+        metricas = indice.metricas()
+        assert metricas["coalescidas"] == 4
+        assert metricas["emissoes"] == 1
+
+    async def test_insert_concorrente_de_outro_processo_devolve_a_guia_gravada(self):
+        supabase = _SupabaseEmMemoria()
+        indice = IndiceIdempotencia(supabase)
+
+        async def emitir():
+            # Outro processo gravou a mesma chave entre a consulta e o insert
+            supabase.guias.append(_guia("k1", id="g-outro"))
+            resposta = httpx.Response(409, request=httpx.Request("POST", "https://x/rest/v1/guias_inss"))
+            raise httpx.HTTPStatusError("duplicate key", request=resposta.request, response=resposta)
+
+        guia, reaproveitada = await indice.obter_ou_emitir("k1", emitir)
+        assert (guia["id"], reaproveitada) == ("g-outro", True)
+        assert await indice.buscar("k1") == guia
+
+    async def test_falha_nao_fica_indexada(self):
+        indice = IndiceIdempotencia(_SupabaseEmMemoria())
+
+        async def falhar():
+            raise RuntimeError("SAL indisponível")
+
+        async def emitir():
+            return _guia("k1")
+
+        with pytest.raises(RuntimeError, match="SAL indisponível"):
+            await indice.obter_ou_emitir("k1", falhar)
+        guia, reaproveitada = await indice.obter_ou_emitir("k1", emitir)
+        assert reaproveitada is False
+        assert guia["id"] == "g1"
+
+
+class TestValidarDuplicidade:
+    async def test_encontra_guia_emitida_no_periodo(self):
+        supabase = _SupabaseEmMemoria([
+            {"cpf": "12345678909", "periodo_mes": 10, "periodo_ano": 2025,
+             "tipo_contribuinte": "ci_normal", "status": "emitida",
+             "reference_number": "GPS-u1-102025"},
+        ])
+        validator = GPSValidator(supabase, sal_manager=object())
+
+        assert await validator.validar_duplicidade("123.456.789-09", 10, 2025, "autonomo") == (True, "GPS-u1-102025")
+        assert await validator.validar_duplicidade("12345678909", 11, 2025, "autonomo") == (False, None)
+        assert await validator.validar_duplicidade("12345678909", 10, 2025, "ci_simplificado") == (False, None)
+
+    async def test_validacao_completa_avisa_periodo_ja_emitido(self):
+        class _Sal:
+            async def validate_against_sal(self, tipo, valor, data):
+                return True, "ok"
+
+        hoje = date.today()
+        supabase = _SupabaseEmMemoria([
+            {"cpf": "12345678909", "periodo_mes": hoje.month, "periodo_ano": hoje.year,
+             "tipo_contribuinte": "ci_normal", "status": "emitida", "reference_number": "GPS-u1"},
+        ])
+        validator = GPSValidator(supabase, sal_manager=_Sal())
+
+        validacao = await validator.validar_completo("12345678909", hoje.month, hoje.year, "ci_normal", Decimal("1518"))
+        assert validacao["valido"] is True and validacao["erros"] == []
+        assert validacao["avisos"] == ["GPS já foi emitida para este período (Referência: GPS-u1)"]
+        validacao = await validator.validar_completo("12345678909", hoje.month, hoje.year, "ci_simplificado", Decimal("1518"))
+        assert validacao["valido"] is True and validacao["avisos"] == []
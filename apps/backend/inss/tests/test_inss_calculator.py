@@ -1,6 +1,11 @@
+from datetime import date
+
+import numpy as np
 import pytest
 
-from app.services.inss_calculator import INSSCalculator
+from app.services.inss_calculator import INSSCalculator, TIPOS_LOTE
+from app.services.selic_service import RegistroSelic
+from app.utils.constants import SAL_CLASSES
 
 
 def test_calculo_autonomo_normal():
@@ -16,3 +21,67 @@ def test_calculo_simplificado():
     assert resultado.valor == pytest.approx(166.98, 0.01)
     assert resultado.codigo_gps == "1163"
 
+
+
+def _escalar(calc, tipo, valor, competencia, data_pagamento):
+    if tipo == "autonomo":
+        return calc.calcular_contribuinte_individual(valor, "normal").valor
+    if tipo == "autonomo_simplificado":
+        return calc.calcular_contribuinte_individual(valor, "simplificado").valor
+    if tipo == "complementacao":
+        return calc.calcular_complementacao([competencia], valor, data_pagamento).valor
+    if tipo == "domestico":
+        return calc.calcular_domestico(valor).valor
+    return calc.calcular_produtor_rural(valor).valor
+
+
+def test_calculo_lote_igual_aos_metodos_escalares():
+    calc = INSSCalculator()
+    rng = np.random.default_rng(42)
+    n = 3000
+    tipos = rng.choice(TIPOS_LOTE, size=n).tolist()
+    # Centavos inteiros, como chegam da API, com faixas abaixo do mínimo e acima do teto
+    valores = (rng.integers(1, 1_200_000, size=n) / 100).tolist()
+    pagamento = date(2025, 10, 15)
+    competencias = [f"{rng.integers(1, 13):02d}/{rng.integers(2020, 2026)}" for _ in range(n)]
+
+    lote = calc.calcular_lote(tipos, valores, competencias, data_pagamento=pagamento)
+
+    assert len(lote) == n
+    esperado = [round(_escalar(calc, t, v, c, pagamento) * 100) for t, v, c in zip(tipos, valores, competencias)]
+    assert lote.valor_centavos.tolist() == esperado
+    assert lote.codigo_gps[0] == SAL_CLASSES[tipos[0]]["codigo_gps"]
+
+
+def test_calculo_lote_validacoes():
+    calc = INSSCalculator()
+    with pytest.raises(ValueError):
+        calc.calcular_lote(["mei"], [100.0])
+    with pytest.raises(ValueError):
+        calc.calcular_lote(["domestico"], [0.0])
+    with pytest.raises(ValueError):
+        calc.calcular_lote(["complementacao"], [1000.0])
+
+
+def test_complementacao_usa_fatores_selic():
+    calc = INSSCalculator()
+    pagamento = date(2025, 1, 20)
+    resultado = calc.calcular_complementacao(["11/2024", "12/2024"], 1000.00, pagamento)
+    # Dezembro/2024 (0,93%) e janeiro/2025 (1,01%) para 11/2024; só janeiro para 12/2024
+    juros_nov = round(90.00 * (1.0093 * 1.0101 - 1), 2)
+    juros_dez = round(90.00 * 0.0101, 2)
+    assert resultado.detalhes["juros"] == pytest.approx(juros_nov + juros_dez)
+    assert resultado.valor == pytest.approx(90.00 + juros_nov + juros_dez)
+
+
+def test_complementacao_fora_da_tabela_estima_e_sinaliza():
+    calc = INSSCalculator(selic=RegistroSelic(url_bcb=""))
+    tabela = calc.selic.tabela
+    fim = date(tabela.fim // 12, tabela.fim % 12 + 1, 1)
+    dentro = calc.calcular_complementacao(["01/2024"], 1000.00, fim)
+    assert dentro.detalhes["juros_estimados"] is False and "aviso_selic" not in dentro.detalhes
+
+    resultado = calc.calcular_complementacao(["01/2024"], 1000.00, date(fim.year + 1, fim.month, 20))
+    assert resultado.detalhes["juros_estimados"] is True
+    assert "SELIC" in resultado.detalhes["aviso_selic"]
+    assert resultado.valor > dentro.valor
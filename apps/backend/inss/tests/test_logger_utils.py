@@ -0,0 +1,133 @@
+"""
+Testes para o logging estruturado, a fila de logs e o log de requisições.
+"""
+import logging
+import threading
+
+import pytest
+
+from app.middleware.log_requisicoes import LogRequisicoesMiddleware
+from app.utils import logger_utils
+from app.utils.logger_utils import StructuredLogger, configurar_logging, mascarar_dados, parar_logging
+
+
+@pytest.fixture
+def raiz_isolada():
+    """Restaura handlers e nível do logger raiz e para o listener ao final."""
+    raiz = logging.getLogger()
+    handlers, nivel = list(raiz.handlers), raiz.level
+    yield raiz
+    parar_logging()
+    raiz.handlers[:] = handlers
+    raiz.setLevel(nivel)
+
+
+class TestMascaramento:
+    def test_campos_sensiveis_e_documentos(self):
+        dados = {
+            "cpf": "12345678909",
+            "Authorization": "Bearer abcdef",
+            "token": 123,
+            "senha": "abc",
+            "nome": "Maria",
+            "itens": [{"nit_raw": "12345678901"}, "98765432100", "curto"],
+        }
+
+        assert mascarar_dados(dados) == {
+            "cpf": "123***09",
+            "Authorization": "Bea***ef",
+            "token": "***",
+            "senha": "***",
+            "nome": "Maria",
+            "itens": [{"nit_raw": "123***01"}, "987***00", "curto"],
+        }
+
+    def test_texto_mascara_campos_extras(self):
+        logger = StructuredLogger("teste.texto")
+        logger.use_json = False
+        linha = logger._format_log("INFO", "Emitindo", cpf="12345678909", competencia="10/2025")
+        assert linha == "[INFO] Emitindo | cpf=123***09 | competencia=10/2025"
+
+
+class TestStructuredLogger:
+    def test_nivel_desabilitado_nao_formata(self, monkeypatch):
+        logger = StructuredLogger("teste.nivel")
+        logger.logger.setLevel(logging.INFO)
+
+        def formatar(*args, **kwargs):
+            raise AssertionError("não deveria formatar nem mascarar")
+
+        monkeypatch.setattr(logger, "_format_log", formatar)
+        logger.debug("detalhe", dados={"cpf": "12345678909"})
+
+    def test_json(self, caplog):
+        logger = StructuredLogger("teste.json")
+        logger.use_json = True
+        with caplog.at_level(logging.INFO, logger="teste.json"):
+            logger.info("ok", nit="12345678901")
+        assert '"nit": "123***01"' in caplog.records[0].getMessage()
+        assert '"timestamp"' in caplog.records[0].getMessage()
+
+
+class TestConfigurarLogging:
+    def test_escrita_em_thread_do_listener(self, raiz_isolada, tmp_path):
+        arquivo = tmp_path / "app.log"
+        listener = configurar_logging("INFO", str(arquivo))
+        assert configurar_logging("INFO", str(arquivo)) is listener
+
+        threads = []
+
+        class Registrador(logging.Handler):
+            def emit(self, record):
+                threads.append(threading.current_thread())
+
+        listener.handlers = listener.handlers + (Registrador(),)
+        logging.getLogger("teste.fila").info("linha na fila")
+        logging.getLogger("teste.fila").debug("abaixo do nível")
+        parar_logging()
+
+        conteudo = arquivo.read_text(encoding="utf-8")
+        assert "teste.fila - INFO - linha na fila" in conteudo
+        assert "abaixo do nível" not in conteudo
+        assert threads and threads[0] is not threading.current_thread()
+        assert logger_utils._queue_handler is None
+
+
+async def _app(scope, receive, send):
+    status = int(scope["path"].strip("/") or 200)
+    await send({"type": "http.response.start", "status": status, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _chamar(middleware, caminho):
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    await middleware({"type": "http", "method": "GET", "path": caminho, "headers": []}, receive, send)
+
+
+class TestLogRequisicoesMiddleware:
+    async def test_amostragem(self, caplog):
+        sorteios = iter([0.05, 0.5])
+        middleware = LogRequisicoesMiddleware(_app, taxa_amostragem=0.1, sortear=lambda: next(sorteios))
+
+        with caplog.at_level(logging.INFO, logger="app.requisicoes"):
+            await _chamar(middleware, "/200")  # sorteado
+            await _chamar(middleware, "/200")  # descartado
+            await _chamar(middleware, "/404")  # não-2xx: sempre
+            await _chamar(middleware, "/500")  # erro: sempre
+
+        mensagens = [record.getMessage() for record in caplog.records]
+        assert len(mensagens) == 3
+        assert mensagens[0].startswith("[REQUEST] GET /200 200 ")
+        assert "404" in mensagens[1]
+        assert caplog.records[2].levelno == logging.WARNING
+
+    async def test_requisicao_lenta_sempre_registrada(self, caplog):
+        middleware = LogRequisicoesMiddleware(_app, taxa_amostragem=0.0, limiar_lento_ms=0.0)
+        with caplog.at_level(logging.INFO, logger="app.requisicoes"):
+            await _chamar(middleware, "/200")
+        assert len(caplog.records) == 1
@@ -0,0 +1,98 @@
+"""
+Testes para as métricas no formato do Prometheus e a latência por rota.
+"""
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.middleware.metricas_requisicoes import MetricasRequisicoesMiddleware
+from app.utils.metricas import RegistroMetricas, cronometro_etapa, medir_etapa
+from app.utils.server_timing import ServerTiming
+
+
+@pytest.fixture
+def registro():
+    return RegistroMetricas()
+
+
+class TestRegistroMetricas:
+    def test_contador_e_gauge(self, registro):
+        emissoes = registro.contador("emissoes_total", "Emissões", ("metodo",))
+        fila = registro.gauge("fila", "Profundidade")
+        emissoes.incrementar(metodo="local")
+        emissoes.incrementar(2, metodo="local")
+        emissoes.incrementar(metodo='sal "oficial"')
+        fila.definir(3)
+        fila.definir(1)
+
+        texto = registro.exportar()
+        assert "# TYPE emissoes_total counter" in texto
+        assert 'emissoes_total{metodo="local"} 3' in texto
+        assert 'emissoes_total{metodo="sal \\"oficial\\""} 1' in texto
+        assert "# TYPE fila gauge\nfila 1\n" in texto
+        with pytest.raises(ValueError):
+            emissoes.incrementar(-1, metodo="local")
+        with pytest.raises(ValueError):
+            emissoes.incrementar(rota="x")
+
+    def test_histograma_cumulativo(self, registro):
+        duracao = registro.histograma("etapa_segundos", "Etapas", ("etapa",), buckets=(0.1, 1.0))
+        for valor in (0.05, 0.5, 5.0):
+            duracao.observar(valor, etapa="pdf")
+
+        linhas = registro.exportar().splitlines()
+        assert 'etapa_segundos_bucket{etapa="pdf",le="0.1"} 1' in linhas
+        assert 'etapa_segundos_bucket{etapa="pdf",le="1"} 2' in linhas
+        assert 'etapa_segundos_bucket{etapa="pdf",le="+Inf"} 3' in linhas
+        assert 'etapa_segundos_sum{etapa="pdf"} 5.55' in linhas
+        assert 'etapa_segundos_count{etapa="pdf"} 3' in linhas
+
+    def test_nome_repetido(self, registro):
+        assert registro.contador("total", "x") is registro.contador("total", "x")
+        with pytest.raises(ValueError):
+            registro.gauge("total", "x")
+
+
+class TestCronometroEtapa:
+    async def test_registra_inclusive_com_erro(self, registro):
+        duracao = registro.histograma("etapas", "Etapas", ("etapa",))
+        with pytest.raises(RuntimeError):
+            with cronometro_etapa("sal", duracao):
+                raise RuntimeError("SAL fora do ar")
+        assert duracao.contagem(etapa="sal") == 1
+
+    async def test_medir_etapa_e_server_timing(self, registro):
+        from app.utils.metricas import duracao_etapas
+
+        antes = duracao_etapas.contagem(etapa="whatsapp")
+        assert await medir_etapa("whatsapp", _valor(7)) == 7
+        assert duracao_etapas.contagem(etapa="whatsapp") == antes + 1
+
+        duracao = registro.histograma("etapas", "Etapas", ("etapa",))
+        tempos = ServerTiming(histograma=duracao)
+        with tempos.etapa("validacao"):
+            pass
+        assert duracao.contagem(etapa="validacao") == 1
+
+
+async def _valor(valor):
+    return valor
+
+
+class TestMetricasRequisicoesMiddleware:
+    async def test_rota_pelo_template(self, registro):
+        latencia = registro.histograma("latencia", "Latência", ("metodo", "rota", "status"))
+        app = FastAPI()
+        app.add_middleware(MetricasRequisicoesMiddleware, histograma=latencia)
+
+        @app.get("/guias/{guia_id}")
+        async def obter(guia_id: str):
+            return {"id": guia_id}
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste") as cliente:
+            await cliente.get("/guias/1")
+            await cliente.get("/guias/2")
+            await cliente.get("/inexistente")
+
+        assert latencia.contagem(metodo="GET", rota="/guias/{guia_id}", status="200") == 2
+        assert latencia.contagem(metodo="GET", rota="desconhecida", status="404") == 1
@@ -0,0 +1,117 @@
+"""
+Testes para o pool de renderização de PDFs de GPS.
+"""
+import asyncio
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services.pdf_render_pool import PDFRenderPool, PDFRenderPoolSobrecarregado
+
+
+DADOS_GPS = {
+    'nome': 'JOAO DA SILVA',
+    'nit': '12345678901',
+    'uf': 'SC',
+    'codigo_pagamento': '1007',
+    'competencia': '06/2025',
+    'valor_inss': 166.98,
+    'vencimento': '15/07/2025',
+}
+
+
+class _ExecutorQuebrado(Executor):
+    """Executor cujo worker morreu (como um ProcessPoolExecutor após um crash)."""
+
+    def submit(self, fn, *args, **kwargs):
+        raise BrokenProcessPool("worker encerrado inesperadamente")
+
+
+class TestPDFRenderPool:
+    """Testes para PDFRenderPool (modo threads, sem subprocessos)."""
+
+    async def test_renderizar_retorna_pdf(self):
+        """Renderiza uma GPS e atualiza as métricas."""
+        pool = PDFRenderPool(workers=0, max_pendentes=2)
+        try:
+            pdf_bytes = await pool.renderizar(DADOS_GPS)
+        finally:
+            pool.encerrar()
+
+        assert pdf_bytes.startswith(b"%PDF")
+        metricas = pool.metricas()
+        assert metricas["modo"] == "threads"
+        assert metricas["concluidos"] == 1
+        assert metricas["fila"] == 0
+        assert metricas["em_execucao"] == 0
+
+    async def test_renderizacoes_concorrentes(self):
+        """Jobs acima de max_pendentes aguardam vaga e todos concluem."""
+        pool = PDFRenderPool(workers=0, max_pendentes=2)
+        try:
+            resultados = await asyncio.gather(*[pool.renderizar(DADOS_GPS) for _ in range(6)])
+        finally:
+            pool.encerrar()
+
+        assert all(pdf.startswith(b"%PDF") for pdf in resultados)
+        assert pool.metricas()["concluidos"] == 6
+
+    async def test_backpressure_rejeita_quando_fila_cheia(self):
+        """Sem vaga dentro do timeout, renderizar levanta PDFRenderPoolSobrecarregado."""
+        pool = PDFRenderPool(workers=0, max_pendentes=1, timeout_fila=0.01)
+        await pool.iniciar()
+        semaforo = pool._obter_semaforo()
+        await semaforo.acquire()  # ocupa a única vaga
+        try:
+            with pytest.raises(PDFRenderPoolSobrecarregado):
+                await pool.renderizar(DADOS_GPS)
+        finally:
+            semaforo.release()
+            pool.encerrar()
+
+        assert pool.metricas()["rejeitados"] == 1
+
+    async def test_pool_quebrado_e_recriado(self):
+        """BrokenProcessPool recria o executor e o job é tentado de novo."""
+        pool = PDFRenderPool(workers=0, max_pendentes=2)
+        quebrado = _ExecutorQuebrado()
+        pool._executor = quebrado
+        try:
+            pdf_bytes = await pool.renderizar(DADOS_GPS)
+            assert pool._executor is not quebrado
+        finally:
+            pool.encerrar()
+
+        assert pdf_bytes.startswith(b"%PDF")
+        metricas = pool.metricas()
+        assert (metricas["concluidos"], metricas["falhas"], metricas["reinicios"]) == (1, 0, 1)
+
+    async def test_pool_quebrado_de_novo_propaga(self, monkeypatch):
+        """Só uma nova tentativa: se o executor novo também quebra, o erro sobe."""
+        pool = PDFRenderPool(workers=0, max_pendentes=2)
+        pool._executor = _ExecutorQuebrado()
+        monkeypatch.setattr(pool, "_criar_executor", _ExecutorQuebrado)
+
+        with pytest.raises(BrokenProcessPool):
+            await pool.renderizar(DADOS_GPS)
+
+        metricas = pool.metricas()
+        assert (metricas["falhas"], metricas["reinicios"]) == (1, 1)
+
+    @pytest.mark.parametrize("cpus, web, env, esperado", [
+        (16, None, None, 4),   # teto do padrão automático
+        (16, "8", None, 2),    # CPUs divididas entre os workers web
+        (2, "4", None, 1),     # ao menos um processo
+        (16, "8", "6", 6),     # GPS_PDF_WORKERS explícito prevalece
+    ])
+    def test_workers_padrao(self, monkeypatch, cpus, web, env, esperado):
+        """O padrão divide as CPUs entre os workers web em vez de usar todas em cada um."""
+        monkeypatch.setattr("app.services.pdf_render_pool.os.cpu_count", lambda: cpus)
+        for nome, valor in (("WEB_CONCURRENCY", web), ("GPS_PDF_WORKERS", env)):
+            if valor is None:
+                monkeypatch.delenv(nome, raising=False)
+            else:
+                monkeypatch.setenv(nome, valor)
+
+        assert PDFRenderPool().workers == esperado
@@ -0,0 +1,140 @@
+"""
+Testes para o amostrador de pilhas e as capturas de memória sob demanda.
+"""
+import threading
+import time
+
+import httpx
+import jwt
+import pytest
+
+from app.utils import profiling
+from app.utils.profiling import AmostradorPilhas, CapturaMemoria, ProfilingEmAndamento
+
+
+def _ocupado(parar: threading.Event) -> None:
+    while not parar.is_set():
+        sum(range(1000))
+
+
+class TestAmostradorPilhas:
+    def test_collapsed_da_thread_ocupada(self):
+        parar = threading.Event()
+        thread = threading.Thread(target=_ocupado, args=(parar,), name="ocupada")
+        thread.start()
+        try:
+            pilhas = AmostradorPilhas().amostrar(0.2, intervalo=0.002, threads=[thread.ident])
+        finally:
+            parar.set()
+            thread.join()
+
+        texto = AmostradorPilhas.collapsed(pilhas)
+        assert texto
+        for linha in texto.splitlines():
+            pilha, quantidade = linha.rsplit(" ", 1)
+            assert pilha.startswith("ocupada;")
+            assert int(quantidade) > 0
+        assert any("_ocupado (test_profiling.py:" in pilha for pilha in pilhas)
+
+    async def test_uma_amostragem_por_vez(self):
+        amostrador = AmostradorPilhas()
+        thread = threading.Thread(target=amostrador.amostrar, args=(0.3,))
+        thread.start()
+        time.sleep(0.05)
+        try:
+            with pytest.raises(ProfilingEmAndamento):
+                await amostrador.amostrar_async(0.1)
+        finally:
+            thread.join()
+
+
+class TestPerfilMemoria:
+    def test_desabilitado_nao_envolve(self, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILING_HABILITADO", False)
+
+        def gerar():
+            return 1
+
+        assert profiling.perfil_memoria("x")(gerar) is gerar
+
+    async def test_captura_sync_e_async_na_janela(self, monkeypatch):
+        captura = CapturaMemoria()
+        monkeypatch.setattr(profiling, "PROFILING_HABILITADO", True)
+        monkeypatch.setattr(profiling, "captura_memoria", captura)
+
+        @profiling.perfil_memoria("pdf")
+        def gerar():
+            return [bytearray(1024) for _ in range(100)]
+
+        @profiling.perfil_memoria("sal")
+        async def emitir():
+            return bytes(50_000)
+
+        gerar()  # fora da janela: sem captura
+        captura.ativar(5)
+        try:
+            assert len(gerar()) == 100
+            assert len(await emitir()) == 50_000
+        finally:
+            captura.desativar()
+
+        assert [item["funcao"] for item in captura.capturas] == ["pdf", "sal"]
+        assert captura.capturas[0]["pico_kb"] >= 100
+        assert captura.capturas[0]["maiores_alocacoes"]
+        assert not captura.esta_ativa()
+
+
+@pytest.fixture
+def rota_profiling(monkeypatch):
+    """Cliente ASGI do router GPS com profiling habilitado, API key "chave" e JWT com segredo "segredo-de-teste-com-32-bytes-ou-mais"."""
+    from fastapi import FastAPI
+
+    from app.middleware.rate_limit import configurar_rate_limiting
+    from app.routes import gps_hybrid
+
+    monkeypatch.setattr(profiling, "PROFILING_HABILITADO", True)
+    monkeypatch.setattr(profiling, "TOKEN_PROFILING", "token-profiling")
+    monkeypatch.setattr(gps_hybrid.auth_service, "api_key", "chave")
+    monkeypatch.setattr(gps_hybrid.auth_service, "has_api_key", True)
+    monkeypatch.setattr(gps_hybrid.auth_service, "jwt_secret", "segredo-de-teste-com-32-bytes-ou-mais")
+    monkeypatch.setattr(gps_hybrid.auth_service, "has_jwt", True)
+
+    app = FastAPI()
+    configurar_rate_limiting(app)
+    app.include_router(gps_hybrid.router)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste")
+
+
+def _bearer(**claims):
+    return {"Authorization": f"Bearer {jwt.encode({'sub': 'u1', **claims}, 'segredo-de-teste-com-32-bytes-ou-mais', algorithm='HS256')}"}
+
+
+class TestRotasProfiling:
+    async def test_exige_papel_admin_ou_token(self, rota_profiling):
+        async with rota_profiling as cliente:
+            anonimo = await cliente.get("/api/v1/gps/profiling/memoria")
+            api_key = await cliente.get("/api/v1/gps/profiling/memoria", headers={"X-API-Key": "chave"})
+            usuario = await cliente.get("/api/v1/gps/profiling/memoria", headers=_bearer(role="authenticated"))
+            token_errado = await cliente.get("/api/v1/gps/profiling/memoria", headers={"X-Profiling-Token": "x"})
+            admin = await cliente.get("/api/v1/gps/profiling/memoria", headers=_bearer(app_metadata={"roles": ["admin"]}))
+            token = await cliente.get("/api/v1/gps/profiling/memoria", headers={"X-Profiling-Token": "token-profiling"})
+
+        assert anonimo.status_code == 401
+        assert token_errado.status_code == 401
+        assert api_key.status_code == 403
+        assert usuario.status_code == 403
+        assert admin.status_code == 200, admin.text
+        assert token.status_code == 200, token.text
+
+    async def test_desabilitado_responde_404_mesmo_para_admin(self, rota_profiling, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILING_HABILITADO", False)
+        async with rota_profiling as cliente:
+            admin = await cliente.get("/api/v1/gps/profiling/memoria", headers=_bearer(role="admin"))
+            token = await cliente.get("/api/v1/gps/profiling/memoria", headers={"X-Profiling-Token": "token-profiling"})
+
+        assert (admin.status_code, token.status_code) == (404, 404)
+
+    def test_sem_token_configurado_nada_passa(self, monkeypatch):
+        monkeypatch.setattr(profiling, "TOKEN_PROFILING", None)
+        assert not profiling.token_profiling_valido("")
+        assert not profiling.token_profiling_valido("qualquer")
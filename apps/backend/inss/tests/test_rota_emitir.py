@@ -0,0 +1,177 @@
+"""
+Testes para as etapas da rota /emitir (busca de perfil, idempotência e Server-Timing).
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.routes import inss
+from app.utils.server_timing import ServerTiming
+
+WHATSAPP = "5548991234567"
+
+
+@pytest.fixture
+def perfis(supabase_com_transporte):
+    """profiles servidos por um PostgREST falso: (serviço, linhas, requisições feitas)."""
+    linhas = []
+    requisicoes = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requisicoes.append(request)
+        telefones = request.url.params["whatsapp_phone"].removeprefix("in.(").removesuffix(")").split(",")
+        return httpx.Response(200, json=[linha for linha in linhas if linha["whatsapp_phone"] in telefones])
+
+    return supabase_com_transporte(handler), linhas, requisicoes
+
+
+class TestBuscarUsuarioEmissao:
+    async def test_uma_consulta_para_todas_as_variacoes(self, perfis):
+        supabase, linhas, requisicoes = perfis
+        linhas.append({"id": "u1", "whatsapp_phone": "554891234567", "user_type": "autonomo"})
+
+        usuario, telefone = await inss._buscar_usuario_emissao(supabase, "48 99123-4567", "autonomo")
+
+        assert usuario["id"] == "u1"
+        assert telefone == "554891234567"
+        assert len(requisicoes) == 1
+        assert requisicoes[0].url.params["whatsapp_phone"] == "in.(5548991234567,554891234567)"
+
+    async def test_prefere_tipo_e_depois_numero_informado(self, perfis):
+        supabase, linhas, _ = perfis
+        linhas.extend([
+            {"id": "mei", "whatsapp_phone": "5548991234567", "user_type": "mei"},
+            {"id": "sem9", "whatsapp_phone": "554891234567", "user_type": "autonomo"},
+            {"id": "com9", "whatsapp_phone": "5548991234567", "user_type": "autonomo"},
+        ])
+
+        usuario, _ = await inss._buscar_usuario_emissao(supabase, "5548991234567", "autonomo")
+        assert usuario["id"] == "com9"
+
+        # Sem perfil do tipo: busca genérica (qualquer tipo)
+        usuario, telefone = await inss._buscar_usuario_emissao(supabase, "5548991234567", "domestico")
+        assert usuario["id"] in {"mei", "com9"}
+        assert telefone == "5548991234567"
+
+    async def test_sem_perfil(self, perfis):
+        supabase, _, _ = perfis
+        assert await inss._buscar_usuario_emissao(supabase, "5548991234567", "autonomo") == (None, "5548991234567")
+
+
+@pytest.fixture
+def emissao(monkeypatch):
+    """Rotas de guias sobre os backends locais, com índice de idempotência novo: (cliente, backends, supabase)."""
+    from fastapi import FastAPI
+
+    from app.dependencias import obter_servicos
+    from app.services.idempotencia import IndiceIdempotencia
+    from benchmarks.backends_locais import BackendsLocais, Instalacao, adicionar_perfil
+
+    backends = BackendsLocais()
+    adicionar_perfil(backends, whatsapp=WHATSAPP)
+    app = FastAPI()
+    app.include_router(inss.router)
+    instalacao = Instalacao.para_app(backends, app).instalar()
+    supabase = obter_servicos(app).supabase
+    monkeypatch.setattr(inss, "indice_idempotencia", IndiceIdempotencia(supabase))
+    cliente = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste")
+    yield cliente, backends, supabase
+    instalacao.remover()
+
+
+def _pedido(**campos):
+    hoje = inss.date.today()
+    return {"whatsapp": WHATSAPP, "tipo_contribuinte": "autonomo", "valor_base": 1518.00,
+            "competencia": f"{hoje.month:02d}/{hoje.year}", **campos}
+
+
+class TestEmitirIdempotente:
+    async def test_repeticao_nao_busca_perfil_nem_emite(self, emissao):
+        cliente, backends, _ = emissao
+        async with cliente:
+            primeira = await cliente.post("/api/v1/guias/emitir", json=_pedido())
+            assert primeira.status_code == 200, primeira.text
+            backends.postgrest.limpar("profiles")  # a repetição não pode depender do perfil
+            segunda = await cliente.post("/api/v1/guias/emitir", json=_pedido(whatsapp="48 9123-4567"))
+
+        assert segunda.status_code == 200, segunda.text
+        assert (primeira.json()["reaproveitada"], segunda.json()["reaproveitada"]) == (False, True)
+        assert segunda.json()["guia"]["id"] == primeira.json()["guia"]["id"]
+
+    async def test_reemissao_no_mesmo_periodo_so_avisa(self, emissao):
+        cliente, _, _ = emissao
+        async with cliente:
+            primeira = await cliente.post("/api/v1/guias/emitir", json=_pedido())
+            segunda = await cliente.post("/api/v1/guias/emitir", json=_pedido(valor_base=2000.00))
+
+        assert primeira.status_code == 200, primeira.text
+        assert segunda.status_code == 200, segunda.text
+        assert primeira.json()["avisos"] == []
+        assert segunda.json()["reaproveitada"] is False
+        assert segunda.json()["guia"]["id"] != primeira.json()["guia"]["id"]
+        assert any("já foi emitida" in aviso for aviso in segunda.json()["avisos"])
+
+    async def test_falha_ao_gravar_nao_fica_indexada(self, emissao, monkeypatch):
+        cliente, backends, supabase = emissao
+        salvar_guia = supabase.salvar_guia
+
+        async def falhar_com_chave(user_id, guia_data):
+            if "idempotency_key" in guia_data:
+                raise httpx.ConnectError("Supabase fora do ar")
+            return await salvar_guia(user_id=user_id, guia_data=guia_data)
+
+        monkeypatch.setattr(supabase, "salvar_guia", falhar_com_chave)
+        async with cliente:
+            falha = await cliente.post("/api/v1/guias/emitir", json=_pedido())
+            monkeypatch.setattr(supabase, "salvar_guia", salvar_guia)
+            nova = await cliente.post("/api/v1/guias/emitir", json=_pedido())
+
+        assert falha.status_code == 500
+        assert nova.status_code == 200, nova.text
+        assert nova.json()["reaproveitada"] is False
+        gravada = backends.postgrest.consultar("guias_inss", [("id", f"eq.{nova.json()['guia']['id']}")])
+        assert gravada and gravada[0]["idempotency_key"]
+
+
+    async def test_storage_indisponivel_nao_grava_nem_indexa(self, emissao, monkeypatch):
+        cliente, backends, supabase = emissao
+        upload_file = supabase.upload_file
+
+        async def falhar(bucket, caminho, *args, **kwargs):
+            return f"temp://{caminho}"
+
+        monkeypatch.setattr(supabase, "upload_file", falhar)
+        async with cliente:
+            falha = await cliente.post("/api/v1/guias/emitir", json=_pedido())
+            assert backends.postgrest.consultar("guias_inss", []) == []
+            monkeypatch.setattr(supabase, "upload_file", upload_file)
+            nova = await cliente.post("/api/v1/guias/emitir", json=_pedido())
+
+        assert falha.status_code == 503
+        assert nova.status_code == 200, nova.text
+        assert nova.json()["reaproveitada"] is False
+        assert nova.json()["guia"]["pdf_url"].startswith("http")
+
+
+class TestServerTiming:
+    async def test_etapas_concorrentes_e_cabecalho(self):
+        tempos = ServerTiming()
+
+        inicio = time.perf_counter()
+        await asyncio.gather(
+            tempos.medir("perfil", asyncio.sleep(0.05)),
+            tempos.medir("regras sal", asyncio.sleep(0.05)),
+        )
+        assert time.perf_counter() - inicio < 0.09  # em paralelo
+        with pytest.raises(ValueError):
+            with tempos.etapa("validacao"):
+                raise ValueError("inválido")
+
+        assert set(tempos.etapas) == {"perfil", "regras sal", "validacao"}
+        assert tempos.etapas["perfil"] >= 45
+        cabecalho = tempos.cabecalho()
+        nomes = [parte.split(";")[0] for parte in cabecalho.split(", ")]
+        assert nomes == ["perfil", "regras_sal", "validacao", "total"]
+        assert all(";dur=" in parte for parte in cabecalho.split(", "))
@@ -0,0 +1,65 @@
+"""
+Testes para as rotas /api/v1/gps/emitir e /api/v1/gps/emitir-lote (corpo JSON, não query).
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.services.gps_hybrid_service import GPSHybridService
+from app.services.pdf_render_pool import PDFRenderPool
+from app.services.supabase_service import SupabaseService
+
+DADOS_USUARIO = {"nome": "Teste Usuario", "nit": "12345678901", "endereco": "Rua Teste, 123"}
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    """Cliente ASGI só com o router GPS, serviço com Supabase mockado e sem autenticação."""
+    from app.dependencias import obter_gps_hybrid_service
+    from app.middleware.rate_limit import configurar_rate_limiting
+    from app.routes import gps_hybrid
+
+    supabase = MagicMock(spec=SupabaseService)
+    supabase.get_records = AsyncMock(return_value=[])
+    supabase.create_record = AsyncMock(return_value={"id": "guia-id"})
+    supabase.salvar_guia = AsyncMock(return_value={"id": "guia-id"})
+    supabase.armazenar_pdf = AsyncMock(return_value="https://storage.supabase.co/test.pdf")
+    supabase.url_pdf = MagicMock(return_value="https://storage.supabase.co/test.pdf")
+    supabase.execute_rpc = AsyncMock(return_value=None)
+    servico = GPSHybridService(supabase, pdf_pool=PDFRenderPool(workers=0))
+
+    monkeypatch.setattr(gps_hybrid.auth_service, "has_api_key", False)
+    monkeypatch.setattr(gps_hybrid.auth_service, "has_jwt", False)
+
+    app = FastAPI()
+    configurar_rate_limiting(app)
+    app.include_router(gps_hybrid.router)
+    app.dependency_overrides[obter_gps_hybrid_service] = lambda: servico
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste")
+
+
+def _item(**campos):
+    return {"user_id": "user-1", "competencia": "11/2025", "valor": 166.98, "codigo_pagamento": "1163",
+            **DADOS_USUARIO, **campos}
+
+
+class TestRotasGPS:
+    async def test_emitir_le_corpo_json(self, cliente):
+        async with cliente:
+            resposta = await cliente.post("/api/v1/gps/emitir", json={**_item(), "metodo_forcado": "local"})
+
+        assert resposta.status_code == 200, resposta.text
+        assert len(resposta.json()["codigo_barras"]) == 44
+
+    async def test_emitir_lote_com_item_invalido(self, cliente):
+        itens = [_item(user_id="user-1"), _item(user_id="user-2", codigo_pagamento="11A3"), _item(user_id="user-3")]
+        async with cliente:
+            resposta = await cliente.post("/api/v1/gps/emitir-lote", json={"itens": itens})
+
+        assert resposta.status_code == 200, resposta.text
+        corpo = resposta.json()
+        assert (corpo["total"], corpo["sucesso"], corpo["falhas"]) == (3, 2, 1)
+        assert "numéricos" in corpo["resultados"][1]["erro"]
+        assert [r["user_id"] for r in corpo["resultados"][::2]] == ["user-1", "user-3"]
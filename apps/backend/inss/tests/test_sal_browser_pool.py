@@ -0,0 +1,163 @@
+"""
+Testes para o pool de contextos do navegador SAL.
+"""
+import asyncio
+
+import pytest
+
+from app.services.sal_automation import SALAutomation
+from app.services.sal_browser_pool import SALBrowserPool, SALBrowserPoolSobrecarregado
+from tests.conftest import CODIGO_BARRAS_STUB, PDF_STUB
+
+DADOS_SAL = {
+    "nit_pis_pasep": "123.45678.90-1",
+    "competencia": "10/2025",
+    "salario_contribuicao": 1518.00,
+    "codigo_pagamento": "1007",
+    "data_pagamento": "15/11/2025",
+}
+
+
+class _PaginaEmMemoria:
+    """Página mínima com a interface usada pelo pool (goto, evaluate, url)."""
+
+    def __init__(self):
+        self.url = "about:blank"
+        self.fechada = False
+        self.navegacoes = 0
+
+    def is_closed(self):
+        return self.fechada
+
+    async def goto(self, url, **kwargs):
+        self.url = url
+        self.navegacoes += 1
+
+    async def evaluate(self, expressao):
+        return 2
+
+
+class _ContextoEmMemoria:
+    def __init__(self):
+        self.fechado = False
+
+    async def add_init_script(self, script):
+        pass
+
+    async def new_page(self):
+        return _PaginaEmMemoria()
+
+    async def close(self):
+        self.fechado = True
+
+
+class _NavegadorEmMemoria:
+    def __init__(self):
+        self.contextos = []
+
+    async def new_context(self, **opcoes):
+        contexto = _ContextoEmMemoria()
+        self.contextos.append(contexto)
+        return contexto
+
+
+class TestSALBrowserPool:
+    """Ciclo de vida dos contextos (navegador em memória)."""
+
+    async def test_reusa_contexto_aquecido(self):
+        """Emissões seguidas usam o mesmo contexto, já no módulo do SAL."""
+        navegador = _NavegadorEmMemoria()
+        pool = SALBrowserPool(tamanho=1, max_usos=10, base_url="http://sal.teste", navegador=navegador)
+
+        paginas = []
+        for _ in range(3):
+            async with pool.pagina() as pagina:
+                assert pagina.url == pool.modulo_url
+                paginas.append(pagina)
+        await pool.encerrar()
+
+        assert len(navegador.contextos) == 1
+        assert paginas[0] is paginas[1] is paginas[2]
+        metricas = pool.metricas()
+        assert metricas["concluidos"] == 3
+        assert metricas["reciclados"] == 0
+        assert navegador.contextos[0].fechado
+
+    async def test_recicla_apos_max_usos_e_apos_falha(self):
+        navegador = _NavegadorEmMemoria()
+        pool = SALBrowserPool(tamanho=1, max_usos=2, base_url="http://sal.teste", navegador=navegador)
+
+        for _ in range(2):
+            async with pool.pagina():
+                pass
+        assert len(navegador.contextos) == 2
+        assert navegador.contextos[0].fechado
+
+        with pytest.raises(RuntimeError):
+            async with pool.pagina():
+                raise RuntimeError("SAL fora do ar")
+        await pool.encerrar()
+
+        assert len(navegador.contextos) == 3
+        assert pool.metricas()["reciclados"] == 2
+        assert pool.metricas()["falhas"] == 1
+
+    async def test_health_check_recria_pagina_fechada(self):
+        navegador = _NavegadorEmMemoria()
+        pool = SALBrowserPool(tamanho=1, base_url="http://sal.teste", navegador=navegador)
+        await pool.iniciar()
+        pool._contextos[0].pagina.fechada = True
+
+        async with pool.pagina() as pagina:
+            assert not pagina.is_closed()
+        await pool.encerrar()
+
+        assert len(navegador.contextos) == 2
+        assert pool.metricas()["reciclados"] == 1
+
+    async def test_limita_concorrencia_e_rejeita_apos_timeout(self):
+        """No máximo `tamanho` emissões simultâneas; a fila espera até timeout_fila."""
+        pool = SALBrowserPool(tamanho=2, timeout_fila=0.05, base_url="http://sal.teste", navegador=_NavegadorEmMemoria())
+        ativos = 0
+        pico = 0
+
+        async def emitir(duracao):
+            nonlocal ativos, pico
+            async with pool.pagina():
+                ativos += 1
+                pico = max(pico, ativos)
+                await asyncio.sleep(duracao)
+                ativos -= 1
+
+        await asyncio.gather(*[emitir(0.01) for _ in range(6)])
+        assert pico == 2
+
+        resultados = await asyncio.gather(emitir(0.2), emitir(0.2), emitir(0), return_exceptions=True)
+        await pool.encerrar()
+
+        assert isinstance(resultados[2], SALBrowserPoolSobrecarregado)
+        metricas = pool.metricas()
+        assert metricas["rejeitados"] == 1
+        assert metricas["concluidos"] == 8
+        assert metricas["espera_max_ms"] > 0
+
+
+class TestSALAutomationNoSiteLocal:
+    """Fluxo completo contra o site local que imita o SAL (requer Chromium do Playwright)."""
+
+    async def test_emissoes_reusam_contexto(self, sal_stub_url, navegador_chromium):
+        pool = SALBrowserPool(tamanho=1, base_url=sal_stub_url, navegador=navegador_chromium)
+        automacao = SALAutomation(pool)
+        try:
+            primeira = await automacao.emitir_gps(DADOS_SAL)
+            segunda = await automacao.emitir_gps(DADOS_SAL)
+        finally:
+            await automacao.close()
+
+        for resultado in (primeira, segunda):
+            assert resultado["pdf_bytes"] == PDF_STUB
+            assert resultado["codigo_barras"] == CODIGO_BARRAS_STUB
+            assert resultado["valor_total"] == 166.98
+        metricas = pool.metricas()
+        assert metricas["concluidos"] == 2
+        assert metricas["reciclados"] == 0
@@ -0,0 +1,143 @@
+"""
+Testes para a resolução de seletores das etapas do SAL.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.sal_automation import SALAutomation
+from app.services.sal_browser_pool import SALBrowserPool
+from app.services.sal_seletores import PlaywrightTimeoutError, ResolvedorSeletores, SeletorNaoEncontrado
+from tests.conftest import CODIGO_BARRAS_STUB, PDF_STUB
+
+SELETORES = {"nit": ('input[name="nit"]', 'input[id*="nit"]', 'input[type="text"]')}
+
+
+class _LocalizadorEmMemoria:
+    def __init__(self, pagina, seletor):
+        self.pagina = pagina
+        self.seletores = seletor.split(", ")
+
+    @property
+    def first(self):
+        return self
+
+    async def wait_for(self, state, timeout):
+        self.pagina.esperas += 1
+        limite = time.perf_counter() + timeout / 1000
+        while not any(seletor in self.pagina.visiveis for seletor in self.seletores):
+            if time.perf_counter() > limite:
+                raise PlaywrightTimeoutError(f"Timeout {timeout}ms")
+            await asyncio.sleep(0.005)
+
+    async def is_visible(self):
+        return self.seletores[0] in self.pagina.visiveis
+
+    async def count(self):
+        return int(self.seletores[0] in self.pagina.visiveis)
+
+
+class _PaginaEmMemoria:
+    """Página em que os elementos visíveis são um conjunto de seletores."""
+
+    def __init__(self, visiveis=()):
+        self.visiveis = set(visiveis)
+        self.esperas = 0
+        self.preenchidos = {}
+
+    def locator(self, seletor):
+        return _LocalizadorEmMemoria(self, seletor)
+
+    async def fill(self, seletor, valor, timeout):
+        self.preenchidos[seletor] = valor
+
+
+class TestResolvedorSeletores:
+    """Testes para ResolvedorSeletores (página em memória)."""
+
+    async def test_espera_todos_os_candidatos_ao_mesmo_tempo(self):
+        """Um candidato que aparece depois é encontrado sem esperar o timeout dos anteriores."""
+        resolvedor = ResolvedorSeletores(SELETORES)
+        pagina = _PaginaEmMemoria()
+
+        async def aparecer():
+            await asyncio.sleep(0.05)
+            pagina.visiveis.add('input[id*="nit"]')
+
+        inicio = time.perf_counter()
+        seletor, _ = await asyncio.gather(resolvedor.resolver(pagina, "nit", timeout_ms=5000), aparecer())
+
+        assert seletor == 'input[id*="nit"]'
+        assert time.perf_counter() - inicio < 1
+        assert pagina.esperas == 1
+
+    async def test_prefere_a_ordem_e_aprende_o_vencedor(self):
+        resolvedor = ResolvedorSeletores(SELETORES)
+        pagina = _PaginaEmMemoria({'input[id*="nit"]', 'input[type="text"]'})
+
+        assert await resolvedor.resolver(pagina, "nit") == 'input[id*="nit"]'
+        assert resolvedor.candidatos("nit")[0] == 'input[id*="nit"]'
+
+        # Vencedor já na página: nenhuma espera
+        outra = _PaginaEmMemoria({'input[id*="nit"]', 'input[type="text"]'})
+        assert await resolvedor.resolver(outra, "nit") == 'input[id*="nit"]'
+        assert outra.esperas == 0
+
+        # Página mudou: o vencedor é reaprendido
+        nova = _PaginaEmMemoria({'input[name="nit"]'})
+        assert await resolvedor.resolver(nova, "nit") == 'input[name="nit"]'
+        assert resolvedor.vencedor("nit") == 'input[name="nit"]'
+
+    async def test_timeout_da_etapa_inteira(self):
+        resolvedor = ResolvedorSeletores(SELETORES)
+        inicio = time.perf_counter()
+        with pytest.raises(SeletorNaoEncontrado, match="nit"):
+            await resolvedor.resolver(_PaginaEmMemoria(), "nit", timeout_ms=50)
+        assert time.perf_counter() - inicio < 1
+
+    async def test_tempos_por_etapa(self):
+        resolvedor = ResolvedorSeletores(SELETORES)
+        pagina = _PaginaEmMemoria({'input[name="nit"]'})
+        tempos = {}
+
+        await resolvedor.preencher(pagina, "nit", "123", tempos)
+        with pytest.raises(SeletorNaoEncontrado):
+            await resolvedor.preencher(_PaginaEmMemoria(), "nit", "123", timeout_ms=10)
+
+        assert pagina.preenchidos == {'input[name="nit"]': "123"}
+        assert set(tempos) == {"nit"}
+        metricas = resolvedor.metricas()["nit"]
+        assert metricas["execucoes"] == 2
+        assert metricas["falhas"] == 1
+        assert metricas["seletor"] == 'input[name="nit"]'
+
+
+class TestEmissaoNoSiteLocal:
+    """Fluxo completo contra o site local que imita o SAL (requer Chromium do Playwright)."""
+
+    async def test_seletor_alternativo_sem_esperas_fixas(self, sal_stub_url, navegador_chromium):
+        """NIT só pelo 2º candidato; a emissão termina em poucos segundos e registra tempos."""
+        pool = SALBrowserPool(tamanho=1, base_url=f"{sal_stub_url}/alt", navegador=navegador_chromium)
+        resolvedor = ResolvedorSeletores()
+        automacao = SALAutomation(pool, resolvedor)
+        dados = {
+            "nit_pis_pasep": "123.45678.90-1",
+            "competencia": "10/2025",
+            "salario_contribuicao": 1518.00,
+            "codigo_pagamento": "1163",
+        }
+        try:
+            inicio = time.perf_counter()
+            resultado = await automacao.emitir_gps(dados)
+            duracao = time.perf_counter() - inicio
+            await automacao.emitir_gps(dados)
+        finally:
+            await automacao.close()
+
+        assert resultado["pdf_bytes"] == PDF_STUB
+        assert resultado["codigo_barras"] == CODIGO_BARRAS_STUB
+        assert duracao < 10
+        assert resolvedor.vencedor("nit") == 'input[id*="nit"]'
+        assert {"nit", "consultar", "adicionar", "emitir", "download"} <= set(resultado["tempos_etapas"])
+        assert resolvedor.metricas()["nit"]["execucoes"] == 2
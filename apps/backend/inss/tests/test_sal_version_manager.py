@@ -0,0 +1,117 @@
+"""
+Testes para o índice de versões SAL em memória.
+"""
+from datetime import date
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from app.services.sal_version_manager import (
+    FALLBACK_SAL_2025,
+    IndiceSAL,
+    RegistroSAL,
+    SALVersionManager,
+    TabelaAliquotas,
+)
+from app.utils.dinheiro import Centavos
+
+REGISTROS = [
+    {
+        "effective_date": "2026-01-01",
+        "teto_inss": "8157.41",
+        "salario_minimo": "1621.00",
+        "tabela_aliquotas": '{"ci_normal": [{"faixa_min": 0, "faixa_max": 8157.41, "aliquota": 0.2}]}'
+    },
+    FALLBACK_SAL_2025,
+]
+
+
+class TestIndiceSAL:
+    """Testes para IndiceSAL e TabelaAliquotas."""
+
+    def test_busca_por_intervalo_de_vigencia(self):
+        """Cada versão vale até a véspera da seguinte."""
+        indice = IndiceSAL.de_registros(REGISTROS)
+
+        assert indice.datas == (date(2025, 1, 1), date(2026, 1, 1))
+        assert indice.versao_para(date(2025, 12, 31)).teto_inss == Centavos(778602)
+        assert indice.versao_para(date(2026, 1, 1)).salario_minimo == Centavos(162100)
+        assert indice.versao_para(date(2030, 6, 1)).effective_date == date(2026, 1, 1)
+
+    def test_data_anterior_a_primeira_versao(self):
+        """Antes da primeira vigência não há regra."""
+        indice = IndiceSAL.de_registros(REGISTROS)
+        with pytest.raises(ValueError):
+            indice.versao_para(date(2024, 12, 31))
+
+    def test_aliquotas_pre_convertidas(self):
+        """JSON vira colunas Decimal; aliquota_para respeita os limites das faixas."""
+        versao = IndiceSAL.de_registros([FALLBACK_SAL_2025]).versao_para(date(2025, 6, 1))
+        tabela = versao.tabela("autonomo")
+
+        assert isinstance(tabela, TabelaAliquotas)
+        assert tabela.aliquotas == (Decimal("0.075"), Decimal("0.09"), Decimal("0.12"), Decimal("0.14"))
+        assert tabela.aliquota_para(Decimal("1518.00")) == Decimal("0.075")
+        assert tabela.aliquota_para(Decimal("1518.01")) == Decimal("0.09")
+        assert tabela.aliquota_para(Decimal("7786.02")) == Decimal("0.14")
+        assert tabela.aliquota_para(Decimal("7786.03")) is None
+
+
+class TestSALVersionManager:
+    """Testes para RegistroSAL e SALVersionManager."""
+
+    async def test_carrega_uma_vez_e_valida_sem_io(self, supabase_com_transporte):
+        """Todas as versões em uma consulta; validações seguintes não acessam o banco."""
+        requisicoes = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requisicoes.append(request)
+            return httpx.Response(200, json=REGISTROS)
+
+        servico = supabase_com_transporte(handler)
+        manager = SALVersionManager(servico, registro=RegistroSAL(servico))
+
+        assert await manager.validate_against_sal("ci_normal", Decimal("1600"), date(2025, 3, 1)) == (True, "Válido")
+        valido, msg = await manager.validate_against_sal("ci_normal", Decimal("1600"), date(2026, 3, 1))
+        assert valido is False and "abaixo do salário mínimo" in msg
+        assert await manager.get_teto_inss(2026) == Decimal("8157.41")
+        assert (await manager.get_aliquotas("ci_simplificado", date(2025, 5, 1)))[0]["aliquota"] == 0.11
+        await servico.encerrar()
+
+        assert len(requisicoes) == 1
+        assert requisicoes[0].url.path == "/rest/v1/sal_version_history"
+        assert requisicoes[0].url.params["order"] == "effective_date.asc"
+
+    async def test_recarga_troca_indice_e_mantem_o_atual_em_erro(self, supabase_com_transporte):
+        """atualizar() troca a referência; falha na recarga preserva o índice anterior."""
+        respostas = [httpx.Response(200, json=[FALLBACK_SAL_2025]), httpx.Response(200, json=REGISTROS)]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if not respostas:
+                return httpx.Response(500, json={"message": "indisponível"})
+            return respostas.pop(0)
+
+        servico = supabase_com_transporte(handler)
+        registro = RegistroSAL(servico)
+
+        primeiro = await registro.carregar()
+        segundo = await registro.atualizar()
+        terceiro = await registro.atualizar()
+        await servico.encerrar()
+
+        assert len(primeiro) == 1
+        assert segundo is not primeiro and len(segundo) == 2
+        assert terceiro is segundo
+        assert registro.indice is segundo
+
+    async def test_fallback_quando_tabela_vazia(self, supabase_com_transporte):
+        """Sem versões no banco, usa as regras 2025."""
+        servico = supabase_com_transporte(lambda request: httpx.Response(200, json=[]))
+        registro = RegistroSAL(servico)
+
+        indice = await registro.carregar()
+        await servico.encerrar()
+
+        assert indice.origem == "fallback"
+        assert indice.versao_para(date(2025, 7, 1)).teto_inss == Centavos(778602)
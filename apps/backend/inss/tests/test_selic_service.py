@@ -0,0 +1,148 @@
+"""
+Testes para a tabela de fatores SELIC acumulados.
+"""
+import json
+import os
+from datetime import date
+
+import httpx
+import numpy as np
+import pytest
+
+from app.services.selic_service import (
+    RegistroSelic,
+    SelicForaDoAlcance,
+    TabelaSelic,
+    indice_competencia,
+    indices_competencias,
+)
+
+TAXAS = {"2024-01": 1.0, "2024-02": 2.0, "2024-03": 0.5}
+
+
+class TestTabelaSelic:
+    """Testes para TabelaSelic."""
+
+    def test_fator_e_produto_das_taxas_apos_a_competencia(self):
+        tabela = TabelaSelic(TAXAS, versao="t")
+        assert tabela.fator("01/2024", date(2024, 3, 10)) == pytest.approx(1.02 * 1.005 - 1)
+        assert tabela.fator("02/2024", "03/2024") == pytest.approx(0.005)
+        assert tabela.fator("03/2024", "03/2024") == 0.0
+        assert tabela.fator("03/2024", "01/2024") == 0.0
+
+    def test_so_a_margem_repete_a_taxa_da_borda(self):
+        tabela = TabelaSelic(TAXAS, margem_meses=2)
+        assert tabela.fator("03/2024", "05/2024") == pytest.approx(1.005 ** 2 - 1)
+        assert tabela.fator("11/2023", "01/2024") == pytest.approx(1.01 ** 2 - 1)
+        assert tabela.cobre("05/2024") and not tabela.cobre("06/2024")
+        with pytest.raises(SelicForaDoAlcance):
+            tabela.fator("03/2024", "06/2024")
+        with pytest.raises(SelicForaDoAlcance):
+            tabela.fator("10/2023", "01/2024")
+        with pytest.raises(SelicForaDoAlcance):
+            tabela.fatores(indices_competencias(["03/2024"]), indice_competencia("06/2024"))
+
+    def test_estimativa_repete_a_taxa_da_borda(self):
+        tabela = TabelaSelic(TAXAS, margem_meses=0)
+        assert tabela.fator("02/2024", "03/2024", estimar=True) == tabela.fator("02/2024", "03/2024")
+        assert tabela.fator("03/2024", "06/2024", estimar=True) == pytest.approx(1.005 ** 3 - 1)
+        assert tabela.fator("10/2023", "01/2024", estimar=True) == pytest.approx(1.01 ** 3 - 1)
+
+    def test_lote_igual_ao_escalar(self):
+        tabela = TabelaSelic(TAXAS, margem_meses=2)
+        competencias = ["11/2023", "12/2023", "01/2024", "02/2024", "03/2024", "05/2024"]
+        pagamento = date(2024, 4, 1)
+        fatores = tabela.fatores(indices_competencias(competencias), indice_competencia(pagamento))
+        assert fatores.tolist() == [tabela.fator(c, pagamento) for c in competencias]
+
+    def test_tabela_com_buraco_e_rejeitada(self):
+        with pytest.raises(ValueError):
+            TabelaSelic({"2024-01": 1.0, "2024-03": 1.0})
+
+    def test_fixture_versionada_carrega(self):
+        tabela = RegistroSelic().tabela
+        assert tabela.versao
+        assert tabela.fator("01/2024", "01/2025") > 0
+
+
+class TestRegistroSelic:
+    """Testes para a recarga a quente."""
+
+    def test_recarrega_quando_arquivo_muda_e_mantem_em_erro(self, tmp_path):
+        arquivo = tmp_path / "selic.json"
+        arquivo.write_text(json.dumps({"versao": "v1", "taxas_percentuais": TAXAS}))
+        registro = RegistroSelic(arquivo)
+        primeira = registro.tabela
+        assert registro.recarregar_se_alterado() is primeira
+
+        arquivo.write_text(json.dumps({"versao": "v2", "taxas_percentuais": {"2024-01": 3.0}}))
+        os.utime(arquivo, (1, 1))
+        segunda = registro.recarregar_se_alterado()
+        assert segunda.versao == "v2"
+
+        arquivo.write_text("{invalido")
+        os.utime(arquivo, (2, 2))
+        assert registro.recarregar_se_alterado() is segunda
+
+    async def test_completa_a_tabela_com_o_sgs(self, tmp_path):
+        arquivo = tmp_path / "selic.json"
+        arquivo.write_text(json.dumps({"versao": "v1", "taxas_percentuais": TAXAS}))
+        consultas = []
+
+        def sgs(request: httpx.Request) -> httpx.Response:
+            consultas.append(request.url.params)
+            return httpx.Response(200, json=[
+                {"data": "01/04/2024", "valor": "1.00"},
+                {"data": "01/05/2024", "valor": "2.00"},
+                {"data": f"01/{date.today():%m/%Y}", "valor": "9.99"},  # mês corrente, parcial
+            ])
+
+        registro = RegistroSelic(arquivo, url_bcb="https://sgs.teste/dados")
+        registro._transporte = httpx.MockTransport(sgs)
+        tabela = await registro.garantir_cobertura("05/2024")
+
+        assert consultas[0]["dataInicial"] == "01/04/2024"
+        assert tabela.versao == "v1+bcb-2024-05" and tabela.resumo()["fim"] == "2024-05"
+        assert tabela.fator("03/2024", "05/2024") == pytest.approx(1.01 * 1.02 - 1)
+        # Recarga do arquivo preserva os meses do SGS
+        os.utime(arquivo, (1, 1))
+        assert registro.recarregar_se_alterado().resumo()["fim"] == "2024-05"
+
+    async def test_completa_meses_anteriores_ao_arquivo(self, tmp_path):
+        arquivo = tmp_path / "selic.json"
+        arquivo.write_text(json.dumps({"versao": "v1", "taxas_percentuais": TAXAS}))
+        consultas = []
+
+        def sgs(request: httpx.Request) -> httpx.Response:
+            consultas.append(request.url.params)
+            return httpx.Response(200, json=[
+                {"data": "01/10/2023", "valor": "0.50"},
+                {"data": "01/11/2023", "valor": "0.60"},
+                {"data": "01/12/2023", "valor": "0.70"},
+                {"data": "01/01/2024", "valor": "9.99"},  # o arquivo prevalece
+            ])
+
+        registro = RegistroSelic(arquivo, url_bcb="https://sgs.teste/dados")
+        registro._transporte = httpx.MockTransport(sgs)
+        tabela = await registro.garantir_cobertura("03/2024", ["09/2023", "02/2024"])
+
+        assert consultas[0]["dataInicial"] == "01/10/2023"
+        assert tabela.resumo()["inicio"] == "2023-10"
+        assert tabela.fator("09/2023", "01/2024") == pytest.approx(1.005 * 1.006 * 1.007 * 1.01 - 1)
+
+    async def test_sgs_indisponivel_mantem_tabela_e_espera(self, tmp_path):
+        arquivo = tmp_path / "selic.json"
+        arquivo.write_text(json.dumps({"versao": "v1", "taxas_percentuais": TAXAS}))
+        consultas = []
+
+        def sgs(request: httpx.Request) -> httpx.Response:
+            consultas.append(request)
+            return httpx.Response(503)
+
+        registro = RegistroSelic(arquivo, url_bcb="https://sgs.teste/dados")
+        registro._transporte = httpx.MockTransport(sgs)
+        for _ in range(2):
+            tabela = await registro.garantir_cobertura(date.today())
+            with pytest.raises(SelicForaDoAlcance):
+                tabela.fator("03/2024", date.today())
+        assert len(consultas) == 1
@@ -0,0 +1,293 @@
+"""
+Testes para o SupabaseService (cliente HTTP assíncrono).
+"""
+import asyncio
+import hashlib
+import json
+
+import httpx
+import pytest
+
+from app.services.supabase_service import SupabaseService, get_supabase_service
+
+
+class TestSupabaseService:
+    """Testes para SupabaseService."""
+
+    def test_instancia_compartilhada(self):
+        """get_supabase_service retorna sempre a mesma instância."""
+        assert get_supabase_service() is get_supabase_service()
+
+    async def test_servicos_da_aplicacao(self, supabase_com_transporte):
+        """Rotas recebem os serviços do app.state; encerrar fecha o pool HTTP."""
+        from fastapi import FastAPI
+
+        from app.dependencias import ServicosApp, obter_servicos
+
+        app = FastAPI()
+        servico = supabase_com_transporte(lambda request: httpx.Response(200, json=[]))
+        app.state.servicos = ServicosApp(servico)
+        assert obter_servicos(app).gps_hybrid.supabase is servico
+
+        await app.state.servicos.iniciar()
+        cliente = servico.client
+        await app.state.servicos.encerrar()
+        assert cliente.is_closed and servico._client is None
+
+        # Sem lifespan: criados uma vez, sobre a instância do processo
+        outro = FastAPI()
+        assert obter_servicos(outro) is obter_servicos(outro)
+        assert obter_servicos(outro).supabase is get_supabase_service()
+
+    def test_url_invalida_modo_offline(self):
+        """Sem URL http(s) o serviço fica indisponível (client None)."""
+        servico = SupabaseService(url="localhost", key="chave")
+        assert servico.client is None
+
+    async def test_get_records_filtros_postgrest(self, supabase_com_transporte):
+        """Filtros viram parâmetros eq. do PostgREST."""
+        requisicoes = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requisicoes.append(request)
+            return httpx.Response(200, json=[{"id": 1}])
+
+        servico = supabase_com_transporte(handler)
+        registros = await servico.get_records("gps_divergencias", {"resolvido": False, "nit": "123"})
+        await servico.encerrar()
+
+        assert registros == [{"id": 1}]
+        params = requisicoes[0].url.params
+        assert requisicoes[0].url.path == "/rest/v1/gps_divergencias"
+        assert params["select"] == "*"
+        assert params["resolvido"] == "eq.false"
+        assert params["nit"] == "eq.123"
+        assert requisicoes[0].headers["apikey"] == "chave-teste"
+
+    async def test_create_record_retorna_representacao(self, supabase_com_transporte):
+        """Insert pede return=representation e devolve o primeiro registro."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.headers["Prefer"] == "return=representation"
+            corpo = json.loads(request.content)
+            return httpx.Response(201, json=[{**corpo, "id": "novo"}])
+
+        servico = supabase_com_transporte(handler)
+        registro = await servico.create_record("guias_inss", {"valor": 10})
+        await servico.encerrar()
+
+        assert registro == {"valor": 10, "id": "novo"}
+
+    async def test_salvar_guia_levanta_em_falha_de_escrita(self, supabase_com_transporte):
+        """Conflito na idempotency_key ou insert sem linha não vira guia inventada."""
+        respostas = iter([
+            httpx.Response(409, json={"code": "23505", "message": "duplicate key value"}),
+            httpx.Response(201, json=[]),
+        ])
+        servico = supabase_com_transporte(lambda request: next(respostas))
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await servico.salvar_guia("u1", {"idempotency_key": "k1"})
+        with pytest.raises(RuntimeError):
+            await servico.salvar_guia("u1", {"idempotency_key": "k2"})
+        await servico.encerrar()
+
+    async def test_upload_file_retorna_url_publica(self, supabase_com_transporte):
+        """Upload envia o conteúdo ao Storage e calcula a URL pública localmente."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.url.path == "/storage/v1/object/guias/user/guia.pdf"
+            assert request.headers["x-upsert"] == "true"
+            assert request.content == b"%PDF-teste"
+            return httpx.Response(200, json={"Key": "guias/user/guia.pdf"})
+
+        servico = supabase_com_transporte(handler)
+        url = await servico.upload_file("guias", "user/guia.pdf", b"%PDF-teste")
+        await servico.encerrar()
+
+        assert url == "https://projeto.supabase.co/storage/v1/object/public/guias/user/guia.pdf"
+
+    async def test_armazenar_pdf_envia_uma_vez_por_conteudo(self, supabase_com_transporte):
+        """Mesmo PDF (inclusive concorrente) vira um único objeto e um único upload."""
+        requisicoes = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requisicoes.append((request.method, request.url.path))
+            await asyncio.sleep(0.01)
+            if request.method == "HEAD":
+                return httpx.Response(400)
+            return httpx.Response(200, json={})
+
+        servico = supabase_com_transporte(handler)
+        digest = hashlib.sha256(b"%PDF-guia").hexdigest()
+        urls = await asyncio.gather(*(servico.armazenar_pdf(b"%PDF-guia") for _ in range(3)))
+        repetida = await servico.armazenar_pdf(b"%PDF-guia")
+        outra = await servico.armazenar_pdf(b"%PDF-outra")
+        await servico.encerrar()
+
+        esperada = f"https://projeto.supabase.co/storage/v1/object/public/guias/pdf/{digest[:2]}/{digest}.pdf"
+        assert urls == [esperada] * 3
+        assert repetida == esperada
+        assert outra != esperada
+        uploads = [caminho for metodo, caminho in requisicoes if metodo == "POST"]
+        assert uploads[0] == f"/storage/v1/object/guias/pdf/{digest[:2]}/{digest}.pdf"
+        assert len(uploads) == 2
+        assert servico.metricas_armazenamento()["coalescidos"] == 2
+
+    async def test_armazenar_pdf_existente_nao_reenvia(self, supabase_com_transporte):
+        """Objeto já presente no Storage (outro processo): só o HEAD, sem upload."""
+        metodos = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            metodos.append(request.method)
+            return httpx.Response(200)
+
+        servico = supabase_com_transporte(handler)
+        url = await servico.armazenar_pdf(b"%PDF-guia", bucket="guias")
+        await servico.encerrar()
+
+        assert url.startswith("https://projeto.supabase.co/storage/v1/object/public/guias/pdf/")
+        assert metodos == ["HEAD"]
+
+    async def test_armazenar_pdf_falha_nao_fica_em_cache(self, supabase_com_transporte):
+        respostas = iter([httpx.Response(404), httpx.Response(500), httpx.Response(404), httpx.Response(200)])
+        servico = supabase_com_transporte(lambda request: next(respostas))
+
+        assert (await servico.armazenar_pdf(b"%PDF-guia")).startswith("temp://")
+        assert (await servico.armazenar_pdf(b"%PDF-guia")).startswith("https://")
+        await servico.encerrar()
+
+    async def test_update_record_faz_patch_com_filtros(self, supabase_com_transporte):
+        """update_record envia PATCH com filtros eq. e devolve as linhas alteradas."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.method == "PATCH"
+            assert request.url.params["id"] == "eq.guia-1"
+            assert request.headers["Prefer"] == "return=representation"
+            return httpx.Response(200, json=[{"id": "guia-1", "validado_sal": True}])
+
+        servico = supabase_com_transporte(handler)
+        linhas = await servico.update_record("guias_inss", {"id": "guia-1"}, {"validado_sal": True})
+        await servico.encerrar()
+
+        assert linhas == [{"id": "guia-1", "validado_sal": True}]
+
+    async def test_erro_http_usa_fallback(self, supabase_com_transporte):
+        """Erro HTTP mantém o comportamento de fallback (lista vazia)."""
+        servico = supabase_com_transporte(lambda request: httpx.Response(500))
+        assert await servico.get_records("profiles") == []
+        await servico.encerrar()
+
+
+    def test_troca_de_event_loop_fecha_cliente_anterior(self, supabase_com_transporte):
+        """Cliente do loop anterior (já parado) é fechado ao criar o do loop novo."""
+        servico = supabase_com_transporte(lambda request: httpx.Response(200, json=[]))
+
+        async def obter_cliente() -> httpx.AsyncClient:
+            return servico.client
+
+        anterior = asyncio.run(obter_cliente())
+
+        async def trocar_e_encerrar() -> httpx.AsyncClient:
+            novo = servico.client
+            await servico.encerrar()
+            return novo
+
+        novo = asyncio.run(trocar_e_encerrar())
+        assert novo is not anterior
+        assert anterior.is_closed and novo.is_closed
+        assert not servico._fechamentos
+
+    async def test_troca_de_event_loop_fecha_no_loop_anterior(self, supabase_com_transporte):
+        """Com o loop anterior rodando em outra thread, o aclose roda nele."""
+        import threading
+
+        servico = supabase_com_transporte(lambda request: httpx.Response(200, json=[]))
+        loop_anterior = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop_anterior.run_forever, daemon=True)
+        thread.start()
+
+        async def obter_cliente() -> httpx.AsyncClient:
+            return servico.client
+
+        anterior = asyncio.run_coroutine_threadsafe(obter_cliente(), loop_anterior).result(timeout=5)
+        novo = servico.client
+        await servico.encerrar()
+
+        loop_anterior.call_soon_threadsafe(loop_anterior.stop)
+        thread.join(timeout=5)
+        loop_anterior.close()
+        assert novo is not anterior
+        assert anterior.is_closed and novo.is_closed
+
+
+class TestConsultaSupabase:
+    """Testes para o construtor de consultas (ConsultaSupabase)."""
+
+    async def test_projecao_filtros_ordem_paginacao(self, supabase_com_transporte):
+        """select/gte/lt/order/limit/offset viram parâmetros do PostgREST."""
+        requisicoes = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requisicoes.append(request)
+            return httpx.Response(200, json=[])
+
+        servico = supabase_com_transporte(handler)
+        await (
+            servico.tabela("gps_emissions")
+            .select("id", "metodo_emissao")
+            .gte("created_at", "2025-01-01")
+            .lt("created_at", "2025-01-02")
+            .in_("metodo_emissao", ["local", "sal_oficial"])
+            .order("created_at", desc=True)
+            .limit(50)
+            .offset(100)
+            .executar()
+        )
+        await servico.encerrar()
+
+        params = requisicoes[0].url.params
+        assert params["select"] == "id,metodo_emissao"
+        assert params.get_list("created_at") == ["gte.2025-01-01", "lt.2025-01-02"]
+        assert params["metodo_emissao"] == "in.(local,sal_oficial)"
+        assert params["order"] == "created_at.desc"
+        assert params["limit"] == "50"
+        assert params["offset"] == "100"
+
+    async def test_contar_usa_head_count_exact(self, supabase_com_transporte):
+        """contar faz HEAD com Prefer: count=exact e lê o total do Content-Range."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.method == "HEAD"
+            assert request.headers["Prefer"] == "count=exact"
+            return httpx.Response(200, headers={"Content-Range": "*/3573"})
+
+        servico = supabase_com_transporte(handler)
+        total = await servico.tabela("gps_divergencias").eq("resolvido", False).contar()
+        await servico.encerrar()
+
+        assert total == 3573
+
+    async def test_stream_keyset(self, supabase_com_transporte):
+        """stream pagina por keyset (id > cursor) até esgotar a tabela."""
+        tabela = [{"id": i} for i in range(1, 8)]
+        cursores = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            params = request.url.params
+            assert params["order"] == "id.asc"
+            apos = int(params["id"].split(".")[1]) if "id" in params else 0
+            cursores.append(apos)
+            limite = int(params["limit"])
+            return httpx.Response(200, json=[r for r in tabela if r["id"] > apos][:limite])
+
+        servico = supabase_com_transporte(handler)
+        registros = [r async for r in servico.tabela("gps_emissions").stream(tamanho_pagina=3)]
+        await servico.encerrar()
+
+        assert [r["id"] for r in registros] == list(range(1, 8))
+        assert cursores == [0, 3, 6]
+
+    async def test_offline_sem_registros(self):
+        """Sem Supabase: executar/stream vazios e contar = 0."""
+        servico = SupabaseService(url="localhost", key="chave")
+        consulta = servico.tabela("gps_emissions")
+        assert await consulta.executar() == []
+        assert await consulta.contar() == 0
+        assert [r async for r in consulta.stream()] == []
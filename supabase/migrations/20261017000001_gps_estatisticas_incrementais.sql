@@ -0,0 +1,215 @@
+-- Migração: Estatísticas GPS incrementais (buckets diário e mensal)
+-- Data: 2026-10-17
+-- Descrição: gps_estatisticas passa a guardar uma linha por dia e uma por mês
+-- (coluna granularidade). Os contadores são incrementados no momento da emissão
+-- e da divergência via incrementar_estatisticas_gps, e consultas de período
+-- somam no máximo (meses + dias das bordas) linhas, independente do volume.
+
+-- ============================================================
+-- GRANULARIDADE (dia / mes)
+-- ============================================================
+
+ALTER TABLE public.gps_estatisticas
+    ADD COLUMN IF NOT EXISTS granularidade VARCHAR(3) NOT NULL DEFAULT 'dia';
+
+ALTER TABLE public.gps_estatisticas DROP CONSTRAINT IF EXISTS gps_estatisticas_granularidade_check;
+ALTER TABLE public.gps_estatisticas
+    ADD CONSTRAINT gps_estatisticas_granularidade_check CHECK (granularidade IN ('dia', 'mes'));
+
+COMMENT ON COLUMN public.gps_estatisticas.granularidade IS 'dia: uma linha por data; mes: data = primeiro dia do mês';
+
+-- Unicidade passa a ser (granularidade, data)
+ALTER TABLE public.gps_estatisticas DROP CONSTRAINT IF EXISTS gps_estatisticas_data_key;
+DROP INDEX IF EXISTS public.idx_gps_estatisticas_data;
+DROP INDEX IF EXISTS public.idx_gps_estatisticas_data_desc;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_gps_estatisticas_granularidade_data
+    ON public.gps_estatisticas (granularidade, data DESC);
+
+-- ============================================================
+-- INCREMENTO ATÔMICO (chamado pela API a cada emissão/divergência)
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION public.incrementar_estatisticas_gps(data_ref DATE, deltas JSONB)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.gps_estatisticas AS e (
+        granularidade,
+        data,
+        total_emitidas,
+        emitidas_local,
+        emitidas_sal_validado,
+        emitidas_sal_oficial,
+        validacoes_sal,
+        divergencias,
+        divergencias_resolvidas
+    )
+    SELECT
+        b.granularidade,
+        b.data,
+        COALESCE((deltas->>'total_emitidas')::INTEGER, 0),
+        COALESCE((deltas->>'emitidas_local')::INTEGER, 0),
+        COALESCE((deltas->>'emitidas_sal_validado')::INTEGER, 0),
+        COALESCE((deltas->>'emitidas_sal_oficial')::INTEGER, 0),
+        COALESCE((deltas->>'validacoes_sal')::INTEGER, 0),
+        COALESCE((deltas->>'divergencias')::INTEGER, 0),
+        COALESCE((deltas->>'divergencias_resolvidas')::INTEGER, 0)
+    FROM (VALUES
+        ('dia', data_ref),
+        ('mes', date_trunc('month', data_ref)::DATE)
+    ) AS b(granularidade, data)
+    ON CONFLICT (granularidade, data) DO UPDATE SET
+        total_emitidas = e.total_emitidas + EXCLUDED.total_emitidas,
+        emitidas_local = e.emitidas_local + EXCLUDED.emitidas_local,
+        emitidas_sal_validado = e.emitidas_sal_validado + EXCLUDED.emitidas_sal_validado,
+        emitidas_sal_oficial = e.emitidas_sal_oficial + EXCLUDED.emitidas_sal_oficial,
+        validacoes_sal = e.validacoes_sal + EXCLUDED.validacoes_sal,
+        divergencias = e.divergencias + EXCLUDED.divergencias,
+        divergencias_resolvidas = e.divergencias_resolvidas + EXCLUDED.divergencias_resolvidas,
+        updated_at = NOW();
+END;
+$$;
+
+COMMENT ON FUNCTION public.incrementar_estatisticas_gps IS 'Soma deltas (JSONB com colunas de gps_estatisticas) nos buckets do dia e do mês';
+
+-- ============================================================
+-- RECÁLCULO (reconciliação) DE UM DIA E DO SEU MÊS
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION public.recalcular_estatisticas_mes_gps(mes_ref DATE)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.gps_estatisticas (
+        granularidade, data, total_emitidas, emitidas_local, emitidas_sal_validado,
+        emitidas_sal_oficial, validacoes_sal, divergencias, divergencias_resolvidas
+    )
+    SELECT
+        'mes',
+        date_trunc('month', mes_ref)::DATE,
+        COALESCE(SUM(total_emitidas), 0),
+        COALESCE(SUM(emitidas_local), 0),
+        COALESCE(SUM(emitidas_sal_validado), 0),
+        COALESCE(SUM(emitidas_sal_oficial), 0),
+        COALESCE(SUM(validacoes_sal), 0),
+        COALESCE(SUM(divergencias), 0),
+        COALESCE(SUM(divergencias_resolvidas), 0)
+    FROM public.gps_estatisticas
+    WHERE granularidade = 'dia'
+    AND data >= date_trunc('month', mes_ref)::DATE
+    AND data < (date_trunc('month', mes_ref) + INTERVAL '1 month')::DATE
+    ON CONFLICT (granularidade, data) DO UPDATE SET
+        total_emitidas = EXCLUDED.total_emitidas,
+        emitidas_local = EXCLUDED.emitidas_local,
+        emitidas_sal_validado = EXCLUDED.emitidas_sal_validado,
+        emitidas_sal_oficial = EXCLUDED.emitidas_sal_oficial,
+        validacoes_sal = EXCLUDED.validacoes_sal,
+        divergencias = EXCLUDED.divergencias,
+        divergencias_resolvidas = EXCLUDED.divergencias_resolvidas,
+        updated_at = NOW();
+END;
+$$;
+
+COMMENT ON FUNCTION public.recalcular_estatisticas_mes_gps IS 'Refaz o bucket mensal somando os buckets diários do mês';
+
+CREATE OR REPLACE FUNCTION public.popular_estatisticas_gps(data_ref DATE DEFAULT CURRENT_DATE)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.gps_estatisticas (
+        granularidade, data, total_emitidas, emitidas_local, emitidas_sal_validado,
+        emitidas_sal_oficial, validacoes_sal, divergencias, divergencias_resolvidas
+    )
+    SELECT
+        'dia',
+        data_ref,
+        (SELECT COUNT(*) FROM public.gps_emissions
+            WHERE created_at >= data_ref AND created_at < data_ref + 1),
+        (SELECT COUNT(*) FROM public.gps_emissions
+            WHERE created_at >= data_ref AND created_at < data_ref + 1
+            AND COALESCE(metodo_emissao, 'local') = 'local'),
+        (SELECT COUNT(*) FROM public.gps_emissions
+            WHERE created_at >= data_ref AND created_at < data_ref + 1
+            AND metodo_emissao = 'sal_validado'),
+        (SELECT COUNT(*) FROM public.gps_emissions
+            WHERE created_at >= data_ref AND created_at < data_ref + 1
+            AND metodo_emissao = 'sal_oficial'),
+        (SELECT COUNT(*) FROM public.gps_emissions
+            WHERE created_at >= data_ref AND created_at < data_ref + 1
+            AND validado_sal = true),
+        (SELECT COUNT(*) FROM public.gps_divergencias
+            WHERE created_at >= data_ref AND created_at < data_ref + 1
+            AND resolvido = false),
+        (SELECT COUNT(*) FROM public.gps_divergencias
+            WHERE created_at >= data_ref AND created_at < data_ref + 1
+            AND resolvido = true)
+    ON CONFLICT (granularidade, data) DO UPDATE SET
+        total_emitidas = EXCLUDED.total_emitidas,
+        emitidas_local = EXCLUDED.emitidas_local,
+        emitidas_sal_validado = EXCLUDED.emitidas_sal_validado,
+        emitidas_sal_oficial = EXCLUDED.emitidas_sal_oficial,
+        validacoes_sal = EXCLUDED.validacoes_sal,
+        divergencias = EXCLUDED.divergencias,
+        divergencias_resolvidas = EXCLUDED.divergencias_resolvidas,
+        updated_at = NOW();
+
+    PERFORM public.recalcular_estatisticas_mes_gps(data_ref);
+END;
+$$;
+
+COMMENT ON FUNCTION public.popular_estatisticas_gps IS 'Recalcula o bucket do dia a partir das tabelas brutas e refaz o bucket do mês (reconciliação)';
+
+-- ============================================================
+-- BACKFILL: buckets diários e mensais a partir do histórico
+-- ============================================================
+
+INSERT INTO public.gps_estatisticas (
+    granularidade, data, total_emitidas, emitidas_local, emitidas_sal_validado,
+    emitidas_sal_oficial, validacoes_sal
+)
+SELECT
+    'dia',
+    created_at::DATE,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE COALESCE(metodo_emissao, 'local') = 'local'),
+    COUNT(*) FILTER (WHERE metodo_emissao = 'sal_validado'),
+    COUNT(*) FILTER (WHERE metodo_emissao = 'sal_oficial'),
+    COUNT(*) FILTER (WHERE validado_sal = true)
+FROM public.gps_emissions
+GROUP BY created_at::DATE
+ON CONFLICT (granularidade, data) DO UPDATE SET
+    total_emitidas = EXCLUDED.total_emitidas,
+    emitidas_local = EXCLUDED.emitidas_local,
+    emitidas_sal_validado = EXCLUDED.emitidas_sal_validado,
+    emitidas_sal_oficial = EXCLUDED.emitidas_sal_oficial,
+    validacoes_sal = EXCLUDED.validacoes_sal,
+    updated_at = NOW();
+
+INSERT INTO public.gps_estatisticas (granularidade, data, divergencias, divergencias_resolvidas)
+SELECT
+    'dia',
+    created_at::DATE,
+    COUNT(*) FILTER (WHERE resolvido = false),
+    COUNT(*) FILTER (WHERE resolvido = true)
+FROM public.gps_divergencias
+GROUP BY created_at::DATE
+ON CONFLICT (granularidade, data) DO UPDATE SET
+    divergencias = EXCLUDED.divergencias,
+    divergencias_resolvidas = EXCLUDED.divergencias_resolvidas,
+    updated_at = NOW();
+
+SELECT public.recalcular_estatisticas_mes_gps(mes)
+FROM (
+    SELECT DISTINCT date_trunc('month', data)::DATE AS mes
+    FROM public.gps_estatisticas
+    WHERE granularidade = 'dia'
+) AS meses;
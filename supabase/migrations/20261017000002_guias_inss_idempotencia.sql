@@ -0,0 +1,20 @@
+-- Migração: Chave de idempotência das guias emitidas
+-- Data: 2026-10-17
+-- Descrição: /emitir grava em guias_inss.idempotency_key o sha256 de
+-- usuário + competência + código + valor (ou do header Idempotency-Key).
+-- Retentativas com a mesma chave devolvem a guia salva em vez de gerar PDF,
+-- fazer upload e inserir outra linha. O índice único impede que duas
+-- instâncias da API gravem a mesma emissão duas vezes.
+
+ALTER TABLE public.guias_inss
+    ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(64);
+
+COMMENT ON COLUMN public.guias_inss.idempotency_key IS 'sha256 hex da emissão (ver app/services/idempotencia.py)';
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_guias_inss_idempotency_key
+    ON public.guias_inss (idempotency_key)
+    WHERE idempotency_key IS NOT NULL;
+
+-- Consulta de duplicidade por CPF/período (GPSValidator.validar_duplicidade)
+CREATE INDEX IF NOT EXISTS idx_guias_inss_cpf_periodo
+    ON public.guias_inss (cpf, periodo_ano, periodo_mes);
@@ -0,0 +1,12 @@
+-- Migração: Guias canceladas liberam a chave de idempotência
+-- Data: 2026-10-17
+-- Descrição: o /emitir não reaproveita guias com status 'cancelada'
+-- (IndiceIdempotencia.buscar_persistida, filtro status=neq.cancelada). O índice
+-- único usa o mesmo predicado, para que a reemissão com a mesma chave possa
+-- ser gravada.
+
+DROP INDEX IF EXISTS public.idx_guias_inss_idempotency_key;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_guias_inss_idempotency_key
+    ON public.guias_inss (idempotency_key)
+    WHERE idempotency_key IS NOT NULL AND status <> 'cancelada';
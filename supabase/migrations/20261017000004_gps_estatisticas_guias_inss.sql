@@ -0,0 +1,127 @@
+-- Migração: Reconciliação das estatísticas GPS a partir de guias_inss
+-- Data: 2026-10-17
+-- Descrição: a API grava as guias em guias_inss e incrementa gps_estatisticas a
+-- cada emissão; a reconciliação (popular_estatisticas_gps e o backfill) passa a
+-- contar a mesma tabela com as mesmas datas:
+-- - emissões pelo created_at, só os métodos do GPSHybridService (local,
+--   sal_validado, sal_oficial; nulo conta como local). A cópia v2_secure gravada
+--   pela rota /emitir não é outra emissão;
+-- - validacoes_sal pelo validado_em das guias com validado_sal = true;
+-- - divergências pelo created_at, conforme o resolvido atual.
+
+-- ============================================================
+-- COLUNAS USADAS PELA API E PELA RECONCILIAÇÃO
+-- ============================================================
+
+ALTER TABLE public.guias_inss ADD COLUMN IF NOT EXISTS metodo_emissao VARCHAR(50);
+ALTER TABLE public.guias_inss ADD COLUMN IF NOT EXISTS validado_sal BOOLEAN DEFAULT FALSE;
+ALTER TABLE public.guias_inss ADD COLUMN IF NOT EXISTS validado_em TIMESTAMP WITH TIME ZONE;
+
+COMMENT ON COLUMN public.guias_inss.metodo_emissao IS 'Método usado: local, sal_validado, sal_oficial (v2_secure: cópia gravada pela rota /emitir)';
+COMMENT ON COLUMN public.guias_inss.validado_em IS 'Quando a guia foi validada no SAL (data contada em validacoes_sal)';
+
+CREATE INDEX IF NOT EXISTS idx_guias_inss_created_at ON public.guias_inss (created_at);
+CREATE INDEX IF NOT EXISTS idx_guias_inss_validado_em ON public.guias_inss (validado_em)
+    WHERE validado_sal = true;
+
+-- ============================================================
+-- RECÁLCULO (reconciliação) DE UM DIA E DO SEU MÊS
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION public.popular_estatisticas_gps(data_ref DATE DEFAULT CURRENT_DATE)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.gps_estatisticas (
+        granularidade, data, total_emitidas, emitidas_local, emitidas_sal_validado,
+        emitidas_sal_oficial, validacoes_sal, divergencias, divergencias_resolvidas
+    )
+    SELECT
+        'dia',
+        data_ref,
+        e.local + e.sal_validado + e.sal_oficial,
+        e.local,
+        e.sal_validado,
+        e.sal_oficial,
+        (SELECT COUNT(*) FROM public.guias_inss
+            WHERE validado_sal = true
+            AND validado_em >= data_ref AND validado_em < data_ref + 1),
+        (SELECT COUNT(*) FROM public.gps_divergencias
+            WHERE created_at >= data_ref AND created_at < data_ref + 1
+            AND resolvido = false),
+        (SELECT COUNT(*) FROM public.gps_divergencias
+            WHERE created_at >= data_ref AND created_at < data_ref + 1
+            AND resolvido = true)
+    FROM (
+        SELECT
+            COUNT(*) FILTER (WHERE COALESCE(metodo_emissao, 'local') = 'local') AS local,
+            COUNT(*) FILTER (WHERE metodo_emissao = 'sal_validado') AS sal_validado,
+            COUNT(*) FILTER (WHERE metodo_emissao = 'sal_oficial') AS sal_oficial
+        FROM public.guias_inss
+        WHERE created_at >= data_ref AND created_at < data_ref + 1
+    ) AS e
+    ON CONFLICT (granularidade, data) DO UPDATE SET
+        total_emitidas = EXCLUDED.total_emitidas,
+        emitidas_local = EXCLUDED.emitidas_local,
+        emitidas_sal_validado = EXCLUDED.emitidas_sal_validado,
+        emitidas_sal_oficial = EXCLUDED.emitidas_sal_oficial,
+        validacoes_sal = EXCLUDED.validacoes_sal,
+        divergencias = EXCLUDED.divergencias,
+        divergencias_resolvidas = EXCLUDED.divergencias_resolvidas,
+        updated_at = NOW();
+
+    PERFORM public.recalcular_estatisticas_mes_gps(data_ref);
+END;
+$$;
+
+COMMENT ON FUNCTION public.popular_estatisticas_gps IS 'Recalcula o bucket do dia a partir de guias_inss e gps_divergencias e refaz o bucket do mês (reconciliação)';
+
+-- ============================================================
+-- BACKFILL: refaz os buckets diários e mensais a partir do histórico
+-- (o backfill de 20261017000001 contou gps_emissions)
+-- ============================================================
+
+DELETE FROM public.gps_estatisticas;
+
+INSERT INTO public.gps_estatisticas (granularidade, data, total_emitidas, emitidas_local, emitidas_sal_validado, emitidas_sal_oficial)
+SELECT
+    'dia',
+    created_at::DATE,
+    COUNT(*) FILTER (WHERE COALESCE(metodo_emissao, 'local') IN ('local', 'sal_validado', 'sal_oficial')),
+    COUNT(*) FILTER (WHERE COALESCE(metodo_emissao, 'local') = 'local'),
+    COUNT(*) FILTER (WHERE metodo_emissao = 'sal_validado'),
+    COUNT(*) FILTER (WHERE metodo_emissao = 'sal_oficial')
+FROM public.guias_inss
+GROUP BY created_at::DATE;
+
+INSERT INTO public.gps_estatisticas AS e (granularidade, data, validacoes_sal)
+SELECT 'dia', validado_em::DATE, COUNT(*)
+FROM public.guias_inss
+WHERE validado_sal = true AND validado_em IS NOT NULL
+GROUP BY validado_em::DATE
+ON CONFLICT (granularidade, data) DO UPDATE SET
+    validacoes_sal = EXCLUDED.validacoes_sal,
+    updated_at = NOW();
+
+INSERT INTO public.gps_estatisticas (granularidade, data, divergencias, divergencias_resolvidas)
+SELECT
+    'dia',
+    created_at::DATE,
+    COUNT(*) FILTER (WHERE resolvido = false),
+    COUNT(*) FILTER (WHERE resolvido = true)
+FROM public.gps_divergencias
+GROUP BY created_at::DATE
+ON CONFLICT (granularidade, data) DO UPDATE SET
+    divergencias = EXCLUDED.divergencias,
+    divergencias_resolvidas = EXCLUDED.divergencias_resolvidas,
+    updated_at = NOW();
+
+SELECT public.recalcular_estatisticas_mes_gps(mes)
+FROM (
+    SELECT DISTINCT date_trunc('month', data)::DATE AS mes
+    FROM public.gps_estatisticas
+    WHERE granularidade = 'dia'
+) AS meses;